@@ -5,7 +5,7 @@ AI 引擎模块
 包含翻译逻辑、AI 提供商集成和错误检测功能。
 """
 
-from .engine import AIEngine, TranslationCache
+from .engine import AIEngine, TranslationCache, BatchTranslationItem
 from .translation import NaturalLanguageTranslator
 from .providers import AIProvider, get_provider, MockProvider
 from .error_detection import ErrorDetector
@@ -13,6 +13,7 @@ from .error_detection import ErrorDetector
 __all__ = [
     'AIEngine',
     'TranslationCache',
+    'BatchTranslationItem',
     'NaturalLanguageTranslator',
     'AIProvider',
     'get_provider',
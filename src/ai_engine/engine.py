@@ -4,27 +4,62 @@ AI 引擎主类
 负责协调 AI 翻译流程，包括缓存管理、翻译器调用和错误检测。
 """
 
-from typing import Optional, Dict, Any
-from datetime import datetime, timedelta
+import asyncio
+import atexit
+import dataclasses
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, List, Tuple
+from datetime import datetime
 from ..interfaces.base import AIEngineInterface, Suggestion, Context
+from .normalization import normalize_text
 
 
 class TranslationCache:
     """翻译缓存类
     
-    使用内存缓存来存储最近的翻译结果，提高响应速度。
+    使用 OrderedDict 实现的 LRU + TTL 内存缓存，get/set/淘汰均为 O(1)。
+    可选地将快照写入存储引擎的缓存目录，进程重启后无需重新调用模型即可命中。
     """
     
-    def __init__(self, max_size: int = 100, ttl_seconds: int = 3600):
+    # 快照在存储引擎中的缓存键
+    SNAPSHOT_KEY = "translation_cache"
+    
+    def __init__(
+        self,
+        max_size: int = 100,
+        ttl_seconds: int = 3600,
+        storage: Optional[Any] = None,
+        snapshot_interval: int = 20
+    ):
         """初始化缓存
         
         Args:
             max_size: 缓存最大条目数
             ttl_seconds: 缓存过期时间（秒）
+            storage: 存储引擎（需提供 save_cache/load_cache），为 None 时不持久化
+            snapshot_interval: 每写入多少条新结果保存一次快照（0 表示仅手动保存）
         """
-        self._cache: Dict[str, tuple[Suggestion, datetime]] = {}
+        # 键 -> (建议, 过期时间戳)，按最近使用顺序排列，最久未使用的在最前
+        self._cache: "OrderedDict[str, tuple[Suggestion, float]]" = OrderedDict()
         self._max_size = max_size
-        self._ttl = timedelta(seconds=ttl_seconds)
+        self._ttl = ttl_seconds
+        self._lock = threading.Lock()
+        
+        self._storage = storage
+        self._snapshot_interval = snapshot_interval
+        self._pending_writes = 0
+        
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        
+        if self._storage is not None:
+            self.load_snapshot()
     
     def get(self, text: str) -> Optional[Suggestion]:
         """从缓存获取翻译结果
@@ -35,17 +70,24 @@ class TranslationCache:
         Returns:
             Optional[Suggestion]: 缓存的建议，如果不存在或已过期则返回 None
         """
-        if text not in self._cache:
-            return None
-        
-        suggestion, timestamp = self._cache[text]
-        
-        # 检查是否过期
-        if datetime.now() - timestamp > self._ttl:
-            del self._cache[text]
-            return None
-        
-        return suggestion
+        with self._lock:
+            entry = self._cache.get(text)
+            if entry is None:
+                self._misses += 1
+                return None
+            
+            suggestion, expire_at = entry
+            
+            # 检查是否过期
+            if time.time() > expire_at:
+                del self._cache[text]
+                self._expirations += 1
+                self._misses += 1
+                return None
+            
+            self._cache.move_to_end(text)
+            self._hits += 1
+            return suggestion
     
     def set(self, text: str, suggestion: Suggestion):
         """将翻译结果存入缓存
@@ -54,20 +96,159 @@ class TranslationCache:
             text: 用户输入文本
             suggestion: 翻译建议
         """
-        # 如果缓存已满，删除最旧的条目
-        if len(self._cache) >= self._max_size:
-            oldest_key = min(self._cache.keys(), key=lambda k: self._cache[k][1])
-            del self._cache[oldest_key]
+        if self._max_size <= 0:
+            return
+        
+        with self._lock:
+            if text in self._cache:
+                self._cache.move_to_end(text)
+            
+            self._cache[text] = (suggestion, time.time() + self._ttl)
+            
+            # 如果缓存已满，淘汰最久未使用的条目
+            while len(self._cache) > self._max_size:
+                self._cache.popitem(last=False)
+                self._evictions += 1
+            
+            self._pending_writes += 1
+            should_snapshot = (
+                self._storage is not None
+                and self._snapshot_interval > 0
+                and self._pending_writes >= self._snapshot_interval
+            )
         
-        self._cache[text] = (suggestion, datetime.now())
+        if should_snapshot:
+            self.save_snapshot()
+    
+    def delete(self, text: str) -> bool:
+        """删除指定文本的缓存
+        
+        Args:
+            text: 用户输入文本
+            
+        Returns:
+            bool: 是否存在并被删除
+        """
+        with self._lock:
+            return self._cache.pop(text, None) is not None
+    
+    def __contains__(self, text: str) -> bool:
+        return text in self._cache
     
     def clear(self):
         """清空缓存"""
-        self._cache.clear()
+        with self._lock:
+            self._cache.clear()
     
     def size(self) -> int:
         """获取缓存大小"""
         return len(self._cache)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息
+        
+        Returns:
+            Dict[str, Any]: 包含大小、命中、未命中、淘汰次数和命中率
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'size': len(self._cache),
+                'max_size': self._max_size,
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'hit_rate': self._hits / lookups if lookups else 0.0,
+                'persistent': self._storage is not None
+            }
+    
+    def save_snapshot(self) -> bool:
+        """将未过期的缓存条目写入存储引擎
+        
+        Returns:
+            bool: 是否保存成功（未配置存储时返回 False）
+        """
+        if self._storage is None:
+            return False
+        
+        now = time.time()
+        with self._lock:
+            entries = [
+                {
+                    'key': key,
+                    'expire_at': expire_at,
+                    'suggestion': {
+                        'original_input': suggestion.original_input,
+                        'generated_command': suggestion.generated_command,
+                        'confidence_score': suggestion.confidence_score,
+                        'explanation': suggestion.explanation,
+                        'alternatives': list(suggestion.alternatives),
+                        'timestamp': suggestion.timestamp.isoformat()
+                    }
+                }
+                for key, (suggestion, expire_at) in self._cache.items()
+                if expire_at > now
+            ]
+            self._pending_writes = 0
+        
+        return bool(self._storage.save_cache(self.SNAPSHOT_KEY, {'entries': entries}))
+    
+    def load_snapshot(self) -> int:
+        """从存储引擎加载缓存快照（跳过已过期的条目）
+        
+        Returns:
+            int: 加载的条目数
+        """
+        if self._storage is None:
+            return 0
+        
+        data = self._storage.load_cache(self.SNAPSHOT_KEY)
+        if not data:
+            return 0
+        
+        now = time.time()
+        loaded = 0
+        with self._lock:
+            for item in data.get('entries', []):
+                try:
+                    if item['expire_at'] <= now:
+                        continue
+                    raw = item['suggestion']
+                    suggestion = Suggestion(
+                        original_input=raw['original_input'],
+                        generated_command=raw['generated_command'],
+                        confidence_score=raw['confidence_score'],
+                        explanation=raw['explanation'],
+                        alternatives=raw.get('alternatives', []),
+                        timestamp=datetime.fromisoformat(raw['timestamp'])
+                    )
+                except (KeyError, TypeError, ValueError):
+                    continue
+                self._cache[item['key']] = (suggestion, item['expire_at'])
+                self._cache.move_to_end(item['key'])
+                loaded += 1
+            
+            while len(self._cache) > self._max_size:
+                self._cache.popitem(last=False)
+        
+        return loaded
+
+
+@dataclass
+class BatchTranslationItem:
+    """批量翻译中单条输入的结果"""
+    index: int                               # 在输入列表中的位置
+    input: str                               # 原始输入
+    suggestion: Optional[Suggestion] = None  # 翻译建议，失败时为 None
+    error: Optional[str] = None              # 错误信息
+    source: str = ""                         # 结果来源: cache, rule, translator, duplicate
+    elapsed: float = 0.0                     # 该条输入的处理耗时（秒），重复输入为 0
+    
+    @property
+    def success(self) -> bool:
+        """是否翻译成功"""
+        return self.suggestion is not None
 
 
 class AIEngine(AIEngineInterface):
@@ -76,18 +257,35 @@ class AIEngine(AIEngineInterface):
     协调各个子模块完成自然语言到 PowerShell 命令的翻译。
     """
     
-    def __init__(self, config: Optional[Dict] = None):
+    def __init__(self, config: Optional[Dict] = None, storage: Optional[Any] = None):
         """初始化 AI 引擎
         
         Args:
             config: 配置字典，包含 AI 引擎相关配置
+            storage: 存储引擎，配置 cache_persist 时用于保存翻译缓存快照
         """
         self.config = config or {}
         self.cache = TranslationCache(
             max_size=self.config.get('cache_max_size', 100),
-            ttl_seconds=self.config.get('cache_ttl', 3600)
+            ttl_seconds=self.config.get('cache_ttl', 3600),
+            storage=storage if self.config.get('cache_persist', False) else None,
+            snapshot_interval=self.config.get('cache_snapshot_interval', 20)
         )
         
+        # 启用持久化时，进程退出前保存一次快照，使重启后的进程直接命中缓存
+        if self.cache.get_stats()['persistent']:
+            atexit.register(self.cache.save_snapshot)
+        
+        # 缓存键规范化：统计规范化使原本未命中的查询变为命中的次数
+        self.normalize_cache_keys = self.config.get('cache_normalize', True)
+        self._normalized_hits = 0
+        
+        # 请求合并（single-flight）：缓存键 -> 正在进行的翻译的 Future
+        self.coalesce_requests = self.config.get('coalesce_requests', True)
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        self._coalesced_requests = 0
+        
         # 延迟导入以避免循环依赖
         self._translator: Optional[Any] = None
         self._error_detector: Optional[Any] = None
@@ -113,7 +311,8 @@ class AIEngine(AIEngineInterface):
         self, 
         text: str, 
         context: Context,
-        progress_callback=None
+        progress_callback=None,
+        partial_callback=None
     ) -> Suggestion:
         """将自然语言翻译为 PowerShell 命令
         
@@ -121,6 +320,8 @@ class AIEngine(AIEngineInterface):
             text: 用户输入的自然语言文本
             context: 当前上下文信息
             progress_callback: 进度回调函数，接收 (step, total, description) 参数
+            partial_callback: 部分命令回调函数，接收 AI 模型目前输出中提取出的命令预览；
+                设置后 AI 模型使用流式生成，第一条完整命令到达后即停止生成
             
         Returns:
             Suggestion: 包含生成命令和相关信息的建议对象
@@ -129,6 +330,218 @@ class AIEngine(AIEngineInterface):
             ValueError: 当输入文本为空或无效时
             RuntimeError: 当 AI 引擎不可用时
         """
+        text, cache_key, cached = self._lookup_cache(text, context, progress_callback)
+        if cached is not None:
+            return cached
+        
+        return self._translate_uncached(text, cache_key, context, progress_callback, partial_callback)
+    
+    def _translate_uncached(
+        self,
+        text: str,
+        cache_key: str,
+        context: Context,
+        progress_callback=None,
+        partial_callback=None
+    ) -> Suggestion:
+        """翻译未命中缓存的输入（翻译第 2-4 步）
+        
+        Args:
+            text: 去除首尾空白的用户输入
+            cache_key: 缓存键
+            context: 当前上下文信息
+            progress_callback: 进度回调函数
+            partial_callback: 部分命令回调函数
+            
+        Returns:
+            Suggestion: 翻译建议
+        """
+        # 相同的请求正在翻译时等待其结果，不重复调用模型
+        future, is_leader = self._join_inflight(cache_key, context)
+        if not is_leader:
+            return self._coalesced_result(future.result(), text, progress_callback)
+        
+        try:
+            # 2. 使用翻译器进行翻译
+            if progress_callback:
+                progress_callback(2, 4, "AI 模型处理中...")
+            
+            if partial_callback:
+                suggestion = self.translator.translate(text, context, on_partial=partial_callback)
+            else:
+                suggestion = self.translator.translate(text, context)
+            
+            suggestion = self._finish_translation(cache_key, suggestion, progress_callback)
+        except BaseException as e:
+            self._settle_inflight(cache_key, future, error=e)
+            raise
+        
+        self._settle_inflight(cache_key, future, result=suggestion)
+        return suggestion
+    
+    def translate_batch(
+        self,
+        texts: List[str],
+        context: Context,
+        max_concurrency: Optional[int] = None
+    ) -> List[BatchTranslationItem]:
+        """批量翻译自然语言
+        
+        规范化后相同的输入只翻译一次；缓存命中和规则匹配的输入直接返回，
+        剩余的输入交给翻译器（AI 模型）并发翻译，并发数不超过 max_concurrency。
+        单条输入失败不影响其他输入。
+        
+        Args:
+            texts: 用户输入列表
+            context: 当前上下文信息
+            max_concurrency: 同时调用翻译器的最大数量，默认为配置 batch_concurrency
+            
+        Returns:
+            List[BatchTranslationItem]: 与输入顺序一致的翻译结果
+        """
+        if max_concurrency is None:
+            max_concurrency = self.config.get('batch_concurrency', 2)
+        max_concurrency = max(1, max_concurrency)
+        is_regeneration = context.feedback is not None and context.feedback.get('feedback') == 'incorrect'
+        
+        items = [BatchTranslationItem(index=i, input=text) for i, text in enumerate(texts)]
+        # 缓存键 -> 第一次出现该输入的条目
+        representatives: Dict[str, BatchTranslationItem] = {}
+        duplicates: List[Tuple[BatchTranslationItem, BatchTranslationItem]] = []
+        pending: List[Tuple[BatchTranslationItem, str]] = []
+        
+        # 1. 去重，批量处理缓存命中和规则匹配
+        for item in items:
+            start = time.perf_counter()
+            if not item.input or not item.input.strip():
+                item.error = "输入文本不能为空"
+                continue
+            
+            cache_key = self._cache_key(item.input.strip())
+            first = representatives.get(cache_key)
+            if first is not None:
+                duplicates.append((item, first))
+                continue
+            representatives[cache_key] = item
+            
+            try:
+                text, cache_key, cached = self._lookup_cache(item.input, context)
+                rule_suggestion = None
+                if cached is None and not is_regeneration:
+                    rule_suggestion = self.translator.translate_with_rules(text)
+                
+                if cached is not None:
+                    item.suggestion, item.source = cached, 'cache'
+                elif rule_suggestion is not None:
+                    item.suggestion = self._finish_translation(cache_key, rule_suggestion)
+                    item.source = 'rule'
+                else:
+                    pending.append((item, cache_key))
+            except Exception as e:
+                item.error = str(e)
+            item.elapsed = time.perf_counter() - start
+        
+        # 2. 剩余的输入交给翻译器并发翻译
+        def translate_pending(entry: Tuple[BatchTranslationItem, str]) -> None:
+            item, cache_key = entry
+            start = time.perf_counter()
+            try:
+                item.suggestion = self._translate_uncached(item.input.strip(), cache_key, context)
+                item.source = 'translator'
+            except Exception as e:
+                item.error = str(e)
+            item.elapsed = time.perf_counter() - start
+        
+        if len(pending) == 1 or max_concurrency == 1:
+            for entry in pending:
+                translate_pending(entry)
+        elif pending:
+            with ThreadPoolExecutor(max_workers=min(max_concurrency, len(pending))) as executor:
+                list(executor.map(translate_pending, pending))
+        
+        # 3. 重复的输入共享第一次出现的结果
+        for item, first in duplicates:
+            item.source = 'duplicate'
+            item.error = first.error
+            if first.suggestion is not None:
+                text = item.input.strip()
+                item.suggestion = first.suggestion
+                if item.suggestion.original_input != text:
+                    item.suggestion = dataclasses.replace(item.suggestion, original_input=text)
+        
+        return items
+    
+    async def atranslate_natural_language(
+        self,
+        text: str,
+        context: Context,
+        progress_callback=None,
+        partial_callback=None
+    ) -> Suggestion:
+        """异步将自然语言翻译为 PowerShell 命令
+        
+        流程与 translate_natural_language 相同，AI 模型通过提供商的 agenerate
+        调用，多个翻译请求可以在同一个事件循环中并发等待模型响应。
+        
+        Args:
+            text: 用户输入的自然语言文本
+            context: 当前上下文信息
+            progress_callback: 进度回调函数，接收 (step, total, description) 参数
+            partial_callback: 部分命令回调函数，见 translate_natural_language
+            
+        Returns:
+            Suggestion: 包含生成命令和相关信息的建议对象
+            
+        Raises:
+            ValueError: 当输入文本为空或无效时
+        """
+        text, cache_key, cached = self._lookup_cache(text, context, progress_callback)
+        if cached is not None:
+            return cached
+        
+        # 相同的请求正在翻译时等待其结果，不重复调用模型
+        future, is_leader = self._join_inflight(cache_key, context)
+        if not is_leader:
+            result = await asyncio.wrap_future(future)
+            return self._coalesced_result(result, text, progress_callback)
+        
+        try:
+            # 2. 使用翻译器进行翻译
+            if progress_callback:
+                progress_callback(2, 4, "AI 模型处理中...")
+            
+            if partial_callback:
+                suggestion = await self.translator.atranslate(text, context, on_partial=partial_callback)
+            else:
+                suggestion = await self.translator.atranslate(text, context)
+            
+            suggestion = self._finish_translation(cache_key, suggestion, progress_callback)
+        except BaseException as e:
+            self._settle_inflight(cache_key, future, error=e)
+            raise
+        
+        self._settle_inflight(cache_key, future, result=suggestion)
+        return suggestion
+    
+    def _lookup_cache(
+        self,
+        text: str,
+        context: Context,
+        progress_callback=None
+    ) -> Tuple[str, str, Optional[Suggestion]]:
+        """校验输入并查询缓存（翻译第 1 步）
+        
+        Args:
+            text: 用户输入的自然语言文本
+            context: 当前上下文信息
+            progress_callback: 进度回调函数
+            
+        Returns:
+            Tuple[str, str, Optional[Suggestion]]: (去除首尾空白的文本, 缓存键, 缓存命中的建议)
+            
+        Raises:
+            ValueError: 当输入文本为空或无效时
+        """
         if not text or not text.strip():
             raise ValueError("输入文本不能为空")
         
@@ -141,24 +554,110 @@ class AIEngine(AIEngineInterface):
         if progress_callback:
             progress_callback(1, 4, "检查缓存...")
         
+        cache_key = self._cache_key(text)
+        
         if not is_regeneration:
-            cached = self.cache.get(text)
+            cached = self.cache.get(cache_key)
             if cached:
+                if cached.original_input != text:
+                    # 原始文本不同但规范化后相同：规范化把一次未命中变成了命中
+                    self._normalized_hits += 1
+                    cached = dataclasses.replace(cached, original_input=text)
                 if progress_callback:
                     progress_callback(4, 4, "从缓存获取结果")
-                return cached
+                return text, cache_key, cached
         else:
             # 重新生成时清除该文本的缓存
-            if text in self.cache._cache:
-                del self.cache._cache[text]
+            if self.cache.delete(cache_key):
                 print(f"[重新生成] 已清除缓存: {text}")
         
-        # 2. 使用翻译器进行翻译
+        return text, cache_key, None
+    
+    def _join_inflight(self, cache_key: str, context: Context) -> Tuple[Future, bool]:
+        """加入正在进行的相同翻译请求
+        
+        第一个请求成为执行者并登记一个 Future，翻译完成前到达的相同请求共享
+        该 Future。重新生成请求和关闭合并时总是独立执行。
+        
+        Args:
+            cache_key: 缓存键（规范化后的输入）
+            context: 当前上下文信息
+            
+        Returns:
+            Tuple[Future, bool]: (共享的 Future, 是否为执行者)
+        """
+        is_regeneration = context.feedback is not None and context.feedback.get('feedback') == 'incorrect'
+        if not self.coalesce_requests or is_regeneration:
+            return Future(), True
+        
+        with self._inflight_lock:
+            future = self._inflight.get(cache_key)
+            if future is not None:
+                self._coalesced_requests += 1
+                return future, False
+            
+            future = Future()
+            self._inflight[cache_key] = future
+            return future, True
+    
+    def _settle_inflight(
+        self,
+        cache_key: str,
+        future: Future,
+        result: Optional[Suggestion] = None,
+        error: Optional[BaseException] = None
+    ):
+        """完成执行者的 Future，唤醒等待的相同请求
+        
+        结果已在此之前写入缓存，移除登记后到达的请求会直接命中缓存。
+        
+        Args:
+            cache_key: 缓存键
+            future: _join_inflight 返回的 Future
+            result: 翻译结果
+            error: 翻译失败时的异常，原样抛给等待的请求
+        """
+        with self._inflight_lock:
+            if self._inflight.get(cache_key) is future:
+                del self._inflight[cache_key]
+        
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    
+    def _coalesced_result(
+        self,
+        suggestion: Suggestion,
+        text: str,
+        progress_callback=None
+    ) -> Suggestion:
+        """将共享的翻译结果转换为当前请求的结果"""
         if progress_callback:
-            progress_callback(2, 4, "AI 模型处理中...")
+            progress_callback(4, 4, "完成")
+        if suggestion.original_input != text:
+            suggestion = dataclasses.replace(suggestion, original_input=text)
+        return suggestion
+    
+    def _finish_translation(
+        self,
+        cache_key: str,
+        suggestion: Suggestion,
+        progress_callback=None
+    ) -> Suggestion:
+        """错误检测修正并缓存结果（翻译第 3、4 步）
         
-        suggestion = self.translator.translate(text, context)
+        超出延迟预算时的降级结果（元数据 deadline_fallback）不缓存，
+        AI 模型恢复后同样的输入会重新翻译。
         
+        Args:
+            cache_key: 缓存键
+            suggestion: 翻译器生成的建议
+            progress_callback: 进度回调函数
+            
+        Returns:
+            Suggestion: 修正后的建议
+        """
         # 3. 错误检测和修正
         if progress_callback:
             progress_callback(3, 4, "错误检测和修正...")
@@ -170,10 +669,27 @@ class AIEngine(AIEngineInterface):
         if progress_callback:
             progress_callback(4, 4, "完成")
         
-        self.cache.set(text, suggestion)
+        if not suggestion.metadata.get('deadline_fallback'):
+            self.cache.set(cache_key, suggestion)
         
         return suggestion
     
+    def _cache_key(self, text: str) -> str:
+        """生成缓存键
+        
+        启用 cache_normalize 时使用规范化文本，使全半角、繁简体、标点空白
+        和中文数字写法不同的输入共享同一条缓存。
+        
+        Args:
+            text: 去除首尾空白后的用户输入
+            
+        Returns:
+            str: 缓存键
+        """
+        if not self.normalize_cache_keys:
+            return text
+        return normalize_text(text) or text
+    
     def validate_command(self, command: str) -> bool:
         """验证生成的命令是否有效
         
@@ -215,13 +731,26 @@ class AIEngine(AIEngineInterface):
         """清空翻译缓存"""
         self.cache.clear()
     
-    def get_cache_stats(self) -> Dict[str, int]:
+    def get_cache_stats(self) -> Dict[str, Any]:
         """获取缓存统计信息
         
         Returns:
-            Dict[str, int]: 包含缓存大小等统计信息
+            Dict[str, Any]: 包含缓存大小、命中/未命中/淘汰次数、命中率，
+                以及合并到进行中请求的次数（coalesced_requests）
         """
-        return {
-            'size': self.cache.size(),
-            'max_size': self.cache._max_size
-        }
+        stats = self.cache.get_stats()
+        stats['normalized_hits'] = self._normalized_hits
+        stats['normalized_hit_ratio'] = self._normalized_hits / stats['hits'] if stats['hits'] else 0.0
+        with self._inflight_lock:
+            stats['coalesced_requests'] = self._coalesced_requests
+            stats['inflight_requests'] = len(self._inflight)
+        return stats
+    
+    def save_cache_snapshot(self) -> bool:
+        """立即保存翻译缓存快照（未启用持久化时返回 False）"""
+        return self.cache.save_snapshot()
+    
+    def close(self) -> None:
+        """关闭 AI 提供商的连接池和翻译器的后台线程池"""
+        if self._translator is not None:
+            self._translator.close()
@@ -0,0 +1,212 @@
+"""
+输入文本规范化
+
+在查询翻译缓存前将用户输入转换为规范形式，使书写上略有差异的输入共享同一条缓存：
+- 全角字符转半角（NFKC）
+- 繁体中文转简体中文（常用字）
+- 中文数字转阿拉伯数字（如 "三个" -> "3个"）
+- 去除中文标点、句末标点和中文之间的空白
+
+规范化只用于生成缓存键，不会改变传给翻译器的原始文本。
+路径、IP 地址、文件名等 ASCII 片段中的标点和空白保持不变。
+引号中的内容，以及首个词之后不由常用指令词构成的参数词（如文件夹名、
+要写入的文本）原样保留，避免参数不同的输入共享同一条缓存。
+"""
+
+import re
+import unicodedata
+from typing import Optional
+
+
+# 常用繁体字 -> 简体字映射（覆盖命令类输入中常见的字）
+_TRADITIONAL_CHARS = (
+    "顯當錄檔進網絡連線刪創資夾開關腦記憶體間時從輸個盤統務裝設運檢測試據數單現變們這為與兩幾點歷內壓"
+    "縮備複製動讀寫載發啟結殺詳細訊號碼權戶帳環區類選擇條長尋換稱錯誤報頁應舊傳鍵項標籤題頭總計機電鐘"
+    "週圖視頻樂隱屬並後裡裏麼嗎請幫給讓對夠實際無閉擊紀態勢節狀義舉雙層級還盡將風險專業說語譯歸陣則邊"
+    "處齊"
+)
+_SIMPLIFIED_CHARS = (
+    "显当录档进网络连线删创资夹开关脑记忆体间时从输个盘统务装设运检测试据数单现变们这为与两几点历内压"
+    "缩备复制动读写载发启结杀详细讯号码权户账环区类选择条长寻换称错误报页应旧传键项标签题头总计机电钟"
+    "周图视频乐隐属并后里里么吗请帮给让对够实际无闭击纪态势节状义举双层级还尽将风险专业说语译归阵则边"
+    "处齐"
+)
+_TRADITIONAL_TO_SIMPLIFIED = str.maketrans(_TRADITIONAL_CHARS, _SIMPLIFIED_CHARS)
+
+_CHINESE_DIGITS = {
+    '零': 0, '〇': 0, '一': 1, '二': 2, '两': 2, '三': 3, '四': 4,
+    '五': 5, '六': 6, '七': 7, '八': 8, '九': 9,
+}
+_CHINESE_UNITS = {'十': 10, '百': 100, '千': 1000}
+
+# 只转换处于计数语境中的中文数字，避免误伤"一下"、"统一"等普通词语
+_CHINESE_NUMERAL = r'[零〇一二两三四五六七八九十百千]+'
+_MEASURE_WORDS = r'(?:个|条|次|秒|分钟|小时|天|行|项|名|位|台|份|张|页|层|级|列)'
+_NUMERAL_PATTERN = re.compile(
+    rf'(?<=[前后第]){_CHINESE_NUMERAL}|{_CHINESE_NUMERAL}(?={_MEASURE_WORDS})'
+)
+
+# ASCII 句读标点：位于中文旁边或句末时视为可去除的标点
+_SENTENCE_PUNCT = r'[,!?;]'
+_SENTENCE_PUNCT_NEAR_CJK = re.compile(
+    rf'(?<=[^\x00-\x7f]){_SENTENCE_PUNCT}+|{_SENTENCE_PUNCT}+(?=[^\x00-\x7f])'
+)
+_TRAILING_PUNCT = re.compile(r'(?<=[^\x00-\x7f])[,.!?;]+$|[,!?;]+$')
+_PERIOD_BEFORE_CJK = re.compile(r'(?<=[^\x00-\x7f])\.(?=[^\x00-\x7f])')
+_WHITESPACE = re.compile(r'\s+')
+_SPACE_NEAR_CJK = re.compile(r'(?<=[^\x00-\x7f]) | (?=[^\x00-\x7f])')
+
+# 引号片段（半角、全角和中文引号），内容原样保留
+_QUOTED = re.compile(r'"[^"]*"|\'[^\']*\'|＂[^＂]*＂|“[^”]*”|‘[^’]*’|「[^」]*」|『[^』]*』')
+
+# 常用指令词：首个词之后的非 ASCII 词完全由这些词（以及数字、ASCII 字符）构成时
+# 视为句子的一部分参与规范化，否则视为参数原样保留
+_KEYWORDS = frozenset((
+    "显示 列出 查看 看看 获取 查询 查找 搜索 创建 新建 建立 删除 移除 清空 清理 打开 关闭 "
+    "启动 停止 重启 结束 终止 杀死 复制 拷贝 移动 重命名 改名 写入 读取 追加 保存 下载 上传 "
+    "压缩 解压 切换到 切换 进入 返回 测试 连接 检查 设置 修改 安装 卸载 更新 运行 执行 统计 "
+    "排序 导出 导入 当前 目录 文件夹 文件 进程 服务 系统 信息 时间 日期 磁盘 内存 网络 端口 "
+    "用户 环境变量 变量 日志 历史 记录 大小 内容 路径 名称 名字 版本 地址 状态 列表 详细 电脑 "
+    "计算机 桌面 文档 图片 所有 全部 最近 最大 最小 占用 一下 一个 盘 前 后 第 个 条 次 秒 "
+    "分钟 小时 天 行 项 名 位 台 份 张 页 层 级 列 的 到 在 中 里 下 上 和 与 从 把 将 为 给 "
+    "请 帮 我 吗 呢 吧 了"
+).split())
+_MAX_KEYWORD_LENGTH = max(len(word) for word in _KEYWORDS)
+
+
+def chinese_to_int(text: str) -> Optional[int]:
+    """将中文数字（或阿拉伯数字）转换为整数
+
+    支持 "三"、"十二"、"二十"、"一百零五"、"两" 等写法。
+
+    Args:
+        text: 数字文本
+
+    Returns:
+        Optional[int]: 转换结果，无法识别时返回 None
+    """
+    if not text:
+        return None
+    if text.isdigit():
+        return int(text)
+
+    if any(ch not in _CHINESE_DIGITS and ch not in _CHINESE_UNITS for ch in text):
+        return None
+
+    # 不含单位的连续数字，如 "一二三" 按位读作 123
+    if not any(ch in _CHINESE_UNITS for ch in text):
+        return int(''.join(str(_CHINESE_DIGITS[ch]) for ch in text))
+
+    total = 0
+    current = 0
+    for ch in text:
+        if ch in _CHINESE_DIGITS:
+            current = _CHINESE_DIGITS[ch]
+        else:
+            total += (current or 1) * _CHINESE_UNITS[ch]
+            current = 0
+    return total + current
+
+
+def _replace_numeral(match: re.Match) -> str:
+    value = chinese_to_int(match.group())
+    return str(value) if value is not None else match.group()
+
+
+def _strip_cjk_punctuation(text: str) -> str:
+    """去除所有非 ASCII 标点（中文标点、全角引号、省略号等）"""
+    return ''.join(
+        ch for ch in text
+        if ch.isascii() or not unicodedata.category(ch).startswith('P')
+    )
+
+
+def _is_keyword_token(token: str) -> bool:
+    """判断规范化后的词是否完全由常用指令词、数字和 ASCII 字符构成"""
+    reachable = [True] + [False] * len(token)
+    for start in range(len(token)):
+        if not reachable[start]:
+            continue
+        if token[start].isascii():
+            reachable[start + 1] = True
+            continue
+        for end in range(start + 1, min(len(token), start + _MAX_KEYWORD_LENGTH) + 1):
+            if token[start:end] in _KEYWORDS:
+                reachable[end] = True
+    return reachable[-1]
+
+
+def normalize_text(text: str) -> str:
+    """生成用于缓存查找的规范化文本
+
+    Args:
+        text: 用户输入文本
+
+    Returns:
+        str: 规范化后的文本
+    """
+    stripped = text.strip()
+    whole = _QUOTED.fullmatch(stripped)
+    if whole:
+        # 整句加引号时引号只是修饰，去掉后按普通句子处理
+        stripped = whole.group()[1:-1]
+
+    # 片段列表：(是否原样保留, 文本)
+    pieces = []
+    position = 0
+    first_token = True
+    for match in list(_QUOTED.finditer(stripped)) + [None]:
+        end = match.start() if match else len(stripped)
+        for token in stripped[position:end].split():
+            verbatim = (
+                not first_token
+                and not token.isascii()
+                and not _is_keyword_token(_normalize_fragment(token))
+            )
+            pieces.append((verbatim, token))
+            first_token = False
+        if match:
+            pieces.append((True, '"' + match.group()[1:-1] + '"'))
+            first_token = False
+            position = match.end()
+
+    parts = []
+    fragment = []
+    for verbatim, piece in pieces:
+        if not verbatim:
+            fragment.append(piece)
+            continue
+        if fragment:
+            parts.append(_normalize_fragment(' '.join(fragment)))
+            fragment = []
+        parts.append(piece)
+    if fragment:
+        parts.append(_normalize_fragment(' '.join(fragment)))
+
+    return ' '.join(part for part in parts if part)
+
+
+def _normalize_fragment(text: str) -> str:
+    """规范化不含参数的句子片段
+
+    Args:
+        text: 句子片段
+
+    Returns:
+        str: 规范化后的片段
+    """
+    text = unicodedata.normalize('NFKC', text)
+    text = text.translate(_TRADITIONAL_TO_SIMPLIFIED)
+    text = _NUMERAL_PATTERN.sub(_replace_numeral, text)
+    text = _strip_cjk_punctuation(text)
+
+    # 空白：合并连续空白，去除中文两侧的空白，保留 ASCII 片段之间的单个空格
+    text = _WHITESPACE.sub(' ', text).strip()
+    text = _SPACE_NEAR_CJK.sub('', text)
+
+    # ASCII 句读标点：去除中文旁边和句末的标点，保留路径、IP、文件名中的标点
+    text = _SENTENCE_PUNCT_NEAR_CJK.sub('', text)
+    text = _PERIOD_BEFORE_CJK.sub('', text)
+    text = _TRAILING_PUNCT.sub('', text)
+
+    return text.strip()
@@ -5,11 +5,24 @@ AI 提供商模块
 支持 Ollama 本地部署和直接 API 调用。
 """
 
+import asyncio
+import json
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, Optional
+from typing import Any, AsyncGenerator, Callable, Dict, Generator, Optional
 from ..interfaces.base import Suggestion, Context
 
 
+# AI 生成的有效 PowerShell 命令开头
+VALID_COMMAND_PREFIXES = (
+    'Get-', 'Set-', 'Test-', 'New-', 'Remove-', 'Start-', 'Stop-',
+    'Add-', 'Clear-', 'Copy-', 'Move-', 'Invoke-', 'Select-',
+    'Where-', 'Sort-', 'Measure-', 'Format-', 'Out-', 'Write-',
+    'Read-', 'Show-', 'Find-', 'Search-'
+)
+
+
 class AIProvider(ABC):
     """AI 提供商抽象基类
     
@@ -38,6 +51,24 @@ class AIProvider(ABC):
         """
         pass
     
+    async def agenerate(self, text: str, context: Context) -> Suggestion:
+        """异步生成命令建议
+        
+        默认在线程池中执行 generate，支持原生异步请求的提供商应覆盖此方法。
+        
+        Args:
+            text: 用户输入的自然语言
+            context: 当前上下文
+            
+        Returns:
+            Suggestion: 生成的命令建议
+        """
+        return await asyncio.to_thread(self.generate, text, context)
+    
+    def close(self) -> None:
+        """释放提供商持有的连接等资源（默认无需释放）"""
+        pass
+    
     def _build_prompt(self, text: str, context: Context) -> str:
         """构建提示词
         
@@ -57,27 +88,147 @@ Command:"""
         
         return prompt
     
-    def _parse_result(self, result: str, original_input: str) -> Suggestion:
-        """解析 AI 模型返回的结果
+    def stream(self, text: str, context: Context) -> Generator[str, None, None]:
+        """流式生成命令文本
+        
+        默认一次性返回 generate 的结果，支持流式输出的提供商应覆盖此方法，
+        逐段返回模型输出的原始文本。调用方提前关闭迭代器时应停止生成。
         
         Args:
-            result: AI 模型返回的原始结果
-            original_input: 用户原始输入
+            text: 用户输入的自然语言
+            context: 当前上下文
+            
+        Yields:
+            str: 模型输出的文本片段
+        """
+        yield self.generate(text, context).generated_command
+    
+    async def astream(self, text: str, context: Context) -> AsyncGenerator[str, None]:
+        """异步流式生成命令文本
+        
+        默认一次性返回 agenerate 的结果，支持流式输出的提供商应覆盖此方法。
+        
+        Args:
+            text: 用户输入的自然语言
+            context: 当前上下文
+            
+        Yields:
+            str: 模型输出的文本片段
+        """
+        yield (await self.agenerate(text, context)).generated_command
+    
+    def generate_streaming(
+        self,
+        text: str,
+        context: Context,
+        on_partial: Optional[Callable[[str], None]] = None
+    ) -> Suggestion:
+        """流式生成命令建议
+        
+        每当从已收到的输出中提取出的命令发生变化时调用 on_partial(命令预览)；
+        第一条完整的命令行到达后立即关闭流，不再等待模型生成剩余内容。
+        
+        Args:
+            text: 用户输入的自然语言
+            context: 当前上下文
+            on_partial: 部分命令回调
             
         Returns:
-            Suggestion: 解析后的建议
+            Suggestion: 生成的命令建议
+        """
+        chunks = []
+        preview = ''
+        stream = self.stream(text, context)
+        try:
+            for chunk in stream:
+                chunks.append(chunk)
+                partial = ''.join(chunks)
+                if on_partial:
+                    current = self._command_preview(partial)
+                    if current and current != preview:
+                        preview = current
+                        on_partial(preview)
+                if '\n' in chunk and self._has_complete_command(partial):
+                    break
+        finally:
+            stream.close()
+        
+        return self._parse_result(''.join(chunks), text)
+    
+    async def agenerate_streaming(
+        self,
+        text: str,
+        context: Context,
+        on_partial: Optional[Callable[[str], None]] = None
+    ) -> Suggestion:
+        """异步流式生成命令建议，行为与 generate_streaming 相同
+        
+        Args:
+            text: 用户输入的自然语言
+            context: 当前上下文
+            on_partial: 部分命令回调
             
-        Raises:
-            ValueError: 当 AI 返回空结果时
+        Returns:
+            Suggestion: 生成的命令建议
+        """
+        chunks = []
+        preview = ''
+        stream = self.astream(text, context)
+        try:
+            async for chunk in stream:
+                chunks.append(chunk)
+                partial = ''.join(chunks)
+                if on_partial:
+                    current = self._command_preview(partial)
+                    if current and current != preview:
+                        preview = current
+                        on_partial(preview)
+                if '\n' in chunk and self._has_complete_command(partial):
+                    break
+        finally:
+            await stream.aclose()
+        
+        return self._parse_result(''.join(chunks), text)
+    
+    def _has_complete_command(self, partial: str) -> bool:
+        """检查部分输出中是否已经包含完整的命令行
+        
+        只考虑最后一个换行符之前的完整行；思考模式尚未结束时不算完整。
+        判断条件与 _parse_result 一致，提前结束后的输出一定可以解析。
+        
+        Args:
+            partial: 目前收到的模型输出
+            
+        Returns:
+            bool: 是否可以提前结束生成
+        """
+        if 'Thinking...' in partial and '...done thinking.' not in partial:
+            return False
+        command = self._extract_command(partial[:partial.rfind('\n')])
+        return command.startswith(VALID_COMMAND_PREFIXES)
+    
+    def _command_preview(self, partial: str) -> str:
+        """从部分输出中提取当前的命令预览，思考模式尚未结束时为空"""
+        if 'Thinking...' in partial and '...done thinking.' not in partial:
+            return ''
+        if partial.strip().startswith('```') and partial.count('```') == 1:
+            # 代码块尚未结束，补全结束标记后再提取
+            partial += '\n```'
+        command = self._extract_command(partial)
+        return '' if command.startswith('```') else command
+    
+    def _extract_command(self, result: str) -> str:
+        """从 AI 模型的输出中提取主命令
+        
+        Args:
+            result: AI 模型返回的原始结果
+            
+        Returns:
+            str: 清理后的第一行命令，可能为空
         """
         # 清理结果
         command = result.strip()
         
-        # 检查是否为空
-        if not command:
-            print(f"调试: AI 返回空字符串")
-            raise ValueError(f"AI 模型返回空结果，原始输入: {original_input}")
-        
         # 处理思考模式输出 - 查找 "...done thinking." 后的内容
         if '...done thinking.' in command:
             parts = command.split('...done thinking.')
@@ -117,7 +268,27 @@ Command:"""
                 command = command[len(prefix):].strip()
         
         # 提取第一行作为主命令
-        main_command = command.split('\n')[0].strip()
+        return command.split('\n')[0].strip()
+    
+    def _parse_result(self, result: str, original_input: str) -> Suggestion:
+        """解析 AI 模型返回的结果
+        
+        Args:
+            result: AI 模型返回的原始结果
+            original_input: 用户原始输入
+            
+        Returns:
+            Suggestion: 解析后的建议
+            
+        Raises:
+            ValueError: 当 AI 返回空结果时
+        """
+        # 检查是否为空
+        if not result.strip():
+            print(f"调试: AI 返回空字符串")
+            raise ValueError(f"AI 模型返回空结果，原始输入: {original_input}")
+        
+        main_command = self._extract_command(result)
         
         # 再次检查清理后的命令是否为空
         if not main_command:
@@ -125,12 +296,7 @@ Command:"""
             raise ValueError(f"AI 模型返回的命令为空，原始响应: {result[:200]}")
         
         # 验证是否是有效的 PowerShell 命令
-        valid_starts = ['Get-', 'Set-', 'Test-', 'New-', 'Remove-', 'Start-', 'Stop-', 
-                       'Add-', 'Clear-', 'Copy-', 'Move-', 'Invoke-', 'Select-', 
-                       'Where-', 'Sort-', 'Measure-', 'Format-', 'Out-', 'Write-',
-                       'Read-', 'Show-', 'Find-', 'Search-']
-        
-        if not any(main_command.startswith(prefix) for prefix in valid_starts):
+        if not main_command.startswith(VALID_COMMAND_PREFIXES):
             # 可能不是有效的 PowerShell 命令
             print(f"调试: 命令不是有效的 PowerShell 命令: {main_command}")
             raise ValueError(f"AI 返回的不是有效的 PowerShell 命令: {main_command}")
@@ -213,10 +379,61 @@ class LocalLLaMAProvider(AIProvider):
         return self._parse_result(generated_text, text)
 
 
+class CircuitBreaker:
+    """熔断器
+    
+    连续失败达到阈值后熔断，熔断期间直接判定为不可用；冷却时间过后放行请求
+    进行试探，试探成功则恢复，失败则重新熔断。
+    """
+    
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        """初始化熔断器
+        
+        Args:
+            failure_threshold: 触发熔断的连续失败次数
+            reset_timeout: 熔断后的冷却时间（秒）
+        """
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+    
+    @property
+    def is_open(self) -> bool:
+        """是否处于熔断状态（冷却时间内）"""
+        with self._lock:
+            return (
+                self._opened_at is not None
+                and time.monotonic() - self._opened_at < self.reset_timeout
+            )
+    
+    def allow(self) -> bool:
+        """是否允许发起请求"""
+        return not self.is_open
+    
+    def record_success(self) -> None:
+        """记录一次成功，恢复到正常状态"""
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+    
+    def record_failure(self) -> None:
+        """记录一次失败，连续失败达到阈值时熔断"""
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
 class OllamaProvider(AIProvider):
     """Ollama 模型提供商
     
-    使用 Ollama 运行本地 AI 模型。
+    通过 httpx 调用 Ollama HTTP API 运行本地 AI 模型：
+    - 同步和异步客户端各自维护持久连接池，复用 keep-alive 连接
+    - 异步客户端在其事件循环关闭（asyncio.run 结束）或调用 close/aclose 时关闭
+    - 可用性检查结果缓存 availability_ttl 秒，生成请求前不再探测服务
+    - 连续失败达到阈值后熔断，冷却期间直接失败而不是等待超时
     """
     
     def __init__(self, config: Dict):
@@ -227,31 +444,199 @@ class OllamaProvider(AIProvider):
         """
         self.config = config
         self.model_name = config.get('model_name', 'llama2')
-        self.base_url = config.get('ollama_url', 'http://localhost:11434')
-        self.client = None
-        self._initialize_client()
+        self.base_url = config.get('ollama_url', 'http://localhost:11434').rstrip('/')
+        self.timeout = config.get('ollama_timeout', 30.0)
+        self.max_connections = config.get('ollama_max_connections', 10)
+        self.availability_ttl = config.get('ollama_availability_ttl', 30.0)
+        
+        self.breaker = CircuitBreaker(
+            failure_threshold=config.get('ollama_failure_threshold', 3),
+            reset_timeout=self.availability_ttl
+        )
+        self._available: Optional[bool] = None
+        self._checked_at = float('-inf')
+        
+        self._lock = threading.Lock()
+        self._client = None
+        # 异步客户端的连接池绑定事件循环，每个事件循环使用独立的客户端：
+        # 事件循环 -> (客户端, 负责在事件循环关闭时关闭客户端的异步生成器)
+        self._async_clients: Dict[asyncio.AbstractEventLoop, Any] = {}
+    
+    def _client_options(self) -> Dict[str, Any]:
+        """httpx 客户端参数"""
+        import httpx
+        return {
+            'base_url': self.base_url,
+            'timeout': httpx.Timeout(self.timeout, connect=min(self.timeout, 5.0)),
+            'limits': httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections
+            )
+        }
+    
+    @property
+    def client(self):
+        """懒加载同步 HTTP 客户端（线程安全，多个线程共享连接池）"""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import httpx
+                    self._client = httpx.Client(**self._client_options())
+        return self._client
+    
+    async def _async_client(self):
+        """获取当前事件循环的异步 HTTP 客户端"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            # 未经 shutdown_asyncgens 就关闭的事件循环无法再关闭其客户端，只能丢弃引用
+            for closed_loop in [item for item in self._async_clients if item.is_closed()]:
+                del self._async_clients[closed_loop]
+            entry = self._async_clients.get(loop)
+        if entry is not None and not entry[0].is_closed:
+            return entry[0]
+        
+        import httpx
+        client = httpx.AsyncClient(**self._client_options())
+        keeper = self._keep_async_client(loop, client)
+        # 在当前事件循环中启动生成器，事件循环关闭前的 shutdown_asyncgens 会结束它
+        await keeper.__anext__()
+        with self._lock:
+            self._async_clients[loop] = (client, keeper)
+        return client
     
-    def _initialize_client(self):
-        """初始化 Ollama 客户端"""
+    async def _keep_async_client(self, loop: asyncio.AbstractEventLoop, client):
+        """持有异步客户端直到生成器被关闭，随后在同一事件循环中关闭客户端"""
         try:
-            import ollama
-            self.client = ollama.Client(host=self.base_url)
-        except ImportError:
-            print("警告: ollama 包未安装，Ollama 提供商不可用")
-        except Exception as e:
-            print(f"警告: 初始化 Ollama 客户端失败: {e}")
+            yield
+        finally:
+            with self._lock:
+                entry = self._async_clients.get(loop)
+                if entry is not None and entry[0] is client:
+                    del self._async_clients[loop]
+            await client.aclose()
+    
+    def close(self) -> None:
+        """关闭同步客户端和所有异步客户端的连接池
+        
+        不能在持有异步客户端的事件循环中调用（请使用 aclose）。
+        """
+        with self._lock:
+            client, self._client = self._client, None
+            entries = list(self._async_clients.items())
+            self._async_clients.clear()
+        if client is not None:
+            client.close()
+        
+        for loop, (_, keeper) in entries:
+            if loop.is_closed():
+                continue
+            try:
+                if loop.is_running():
+                    asyncio.run_coroutine_threadsafe(keeper.aclose(), loop).result(timeout=5)
+                else:
+                    loop.run_until_complete(keeper.aclose())
+            except Exception:
+                pass
+    
+    async def aclose(self) -> None:
+        """关闭同步客户端和所有异步客户端的连接池"""
+        current = asyncio.get_running_loop()
+        with self._lock:
+            client, self._client = self._client, None
+            entries = list(self._async_clients.items())
+            self._async_clients.clear()
+        if client is not None:
+            client.close()
+        
+        for loop, (_, keeper) in entries:
+            if loop is current:
+                await keeper.aclose()
+            elif loop.is_running():
+                try:
+                    await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(keeper.aclose(), loop))
+                except Exception:
+                    pass
+    
+    def _mark_available(self) -> None:
+        """记录服务可用"""
+        self.breaker.record_success()
+        self._available = True
+        self._checked_at = time.monotonic()
+    
+    def _mark_failed(self) -> None:
+        """记录一次服务故障，下次检查可用性时重新探测"""
+        self.breaker.record_failure()
+        self._available = None
     
     def is_available(self) -> bool:
-        """检查 Ollama 是否可用"""
-        if not self.client:
+        """检查 Ollama 是否可用
+        
+        熔断期间直接返回 False；否则在 availability_ttl 内复用上次的检查结果，
+        过期后请求 /api/tags 重新探测。
+        """
+        if not self.breaker.allow():
             return False
         
+        if self._available is not None and time.monotonic() - self._checked_at < self.availability_ttl:
+            return self._available
+        
         try:
-            # 尝试列出模型来检查连接
-            self.client.list()
-            return True
-        except:
+            response = self.client.get('/api/tags', timeout=min(self.timeout, 5.0))
+            response.raise_for_status()
+        except Exception:
+            self.breaker.record_failure()
+            self._available = False
+            self._checked_at = time.monotonic()
             return False
+        
+        self._mark_available()
+        return True
+    
+    def _build_payload(self, prompt: str, stream: bool = False) -> Dict[str, Any]:
+        """构建 /api/generate 请求体"""
+        return {
+            "model": self.model_name,
+            "prompt": prompt,
+            "stream": stream,
+            "raw": True,  # 使用原始模式，禁用思考
+            "options": {
+                "temperature": 0.1,
+                "top_p": 0.9,
+                "num_predict": 256,
+            }
+        }
+    
+    def _check_status(self, response, body: str = '') -> None:
+        """检查响应状态，记录服务是否可用
+        
+        Raises:
+            RuntimeError: 服务端返回错误状态
+        """
+        if response.status_code >= 500:
+            self._mark_failed()
+            raise RuntimeError(f"Ollama HTTP 请求失败: {response.status_code} {body[:200]}")
+        # 4xx（如模型不存在）说明服务本身可用
+        self._mark_available()
+        if response.status_code >= 400:
+            raise RuntimeError(f"Ollama HTTP 请求失败: {response.status_code} {body[:200]}")
+    
+    @staticmethod
+    def _response_text(result: Dict[str, Any]) -> str:
+        """提取响应（或流式响应的一行）中的生成文本"""
+        # qwen3:30b 模型会把内容放在 'thinking' 字段而不是 'response' 字段
+        generated_text: str = result.get('response', '')
+        if not generated_text and 'thinking' in result:
+            generated_text = result.get('thinking', '')
+        return generated_text
+    
+    def _handle_response(self, response, text: str) -> Suggestion:
+        """检查响应状态并解析生成结果
+        
+        Raises:
+            RuntimeError: 服务端返回错误状态
+        """
+        self._check_status(response, response.text)
+        return self._parse_result(self._response_text(response.json()), text)
     
     def generate(self, text: str, context: Context) -> Suggestion:
         """使用 Ollama 生成命令
@@ -262,53 +647,131 @@ class OllamaProvider(AIProvider):
             
         Returns:
             Suggestion: 生成的建议
+            
+        Raises:
+            RuntimeError: 服务熔断或请求失败时
         """
-        if not self.is_available():
+        if not self.breaker.allow():
             raise RuntimeError("Ollama 服务不可用")
         
         prompt = self._build_prompt(text, context)
         
-        # 使用 HTTP 请求而不是客户端库
-        import requests
-        import json
-        
         try:
-            print(f"[DEBUG] 发送提示词: {prompt}")
-            
-            response = requests.post(
-                f"{self.base_url}/api/generate",
-                json={
-                    "model": self.model_name,
-                    "prompt": prompt,
-                    "stream": False,
-                    "raw": True,  # 使用原始模式，禁用思考
-                    "options": {
-                        "temperature": 0.1,
-                        "top_p": 0.9,
-                        "num_predict": 256,
-                    }
-                },
-                timeout=30
-            )
-            response.raise_for_status()
-            result = response.json()
+            response = self.client.post('/api/generate', json=self._build_payload(prompt))
+        except Exception as e:
+            self._mark_failed()
+            raise RuntimeError(f"Ollama HTTP 请求失败: {e}")
+        
+        return self._handle_response(response, text)
+    
+    async def agenerate(self, text: str, context: Context) -> Suggestion:
+        """异步使用 Ollama 生成命令
+        
+        等待模型响应期间不占用线程，多个请求可以在同一个事件循环中并发执行。
+        
+        Args:
+            text: 用户输入
+            context: 上下文
             
-            print(f"[DEBUG] 完整响应: {result}")
+        Returns:
+            Suggestion: 生成的建议
             
-            # qwen3:30b 模型会把内容放在 'thinking' 字段而不是 'response' 字段
-            generated_text = result.get('response', '')
-            if not generated_text and 'thinking' in result:
-                generated_text = result.get('thinking', '')
-                print(f"[DEBUG] 使用 thinking 字段")
+        Raises:
+            RuntimeError: 服务熔断或请求失败时
+        """
+        if not self.breaker.allow():
+            raise RuntimeError("Ollama 服务不可用")
+        
+        prompt = self._build_prompt(text, context)
+        
+        try:
+            client = await self._async_client()
+            response = await client.post('/api/generate', json=self._build_payload(prompt))
+        except Exception as e:
+            self._mark_failed()
+            raise RuntimeError(f"Ollama HTTP 请求失败: {e}")
+        
+        return self._handle_response(response, text)
+    
+    def stream(self, text: str, context: Context) -> Generator[str, None, None]:
+        """流式生成命令文本
+        
+        使用 Ollama 的流式接口逐段返回生成的文本。提前关闭迭代器时断开连接，
+        Ollama 随即停止生成并释放模型槽位。
+        
+        Args:
+            text: 用户输入
+            context: 上下文
             
-            print(f"[DEBUG] 提取的文本: '{generated_text[:200]}'")
-            print(f"[DEBUG] 文本长度: {len(generated_text)}")
+        Yields:
+            str: 模型输出的文本片段
             
+        Raises:
+            RuntimeError: 服务熔断或请求失败时
+        """
+        if not self.breaker.allow():
+            raise RuntimeError("Ollama 服务不可用")
+        
+        prompt = self._build_prompt(text, context)
+        
+        try:
+            with self.client.stream('POST', '/api/generate', json=self._build_payload(prompt, stream=True)) as response:
+                if response.status_code >= 400:
+                    response.read()
+                self._check_status(response, response.text if response.is_stream_consumed else '')
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    result = json.loads(line)
+                    chunk = self._response_text(result)
+                    if chunk:
+                        yield chunk
+                    if result.get('done'):
+                        break
+        except RuntimeError:
+            raise
         except Exception as e:
-            print(f"[DEBUG] HTTP 请求失败: {e}")
+            self._mark_failed()
             raise RuntimeError(f"Ollama HTTP 请求失败: {e}")
+    
+    async def astream(self, text: str, context: Context) -> AsyncGenerator[str, None]:
+        """异步流式生成命令文本，行为与 stream 相同
         
-        return self._parse_result(generated_text, text)
+        Args:
+            text: 用户输入
+            context: 上下文
+            
+        Yields:
+            str: 模型输出的文本片段
+            
+        Raises:
+            RuntimeError: 服务熔断或请求失败时
+        """
+        if not self.breaker.allow():
+            raise RuntimeError("Ollama 服务不可用")
+        
+        prompt = self._build_prompt(text, context)
+        
+        try:
+            client = await self._async_client()
+            async with client.stream('POST', '/api/generate', json=self._build_payload(prompt, stream=True)) as response:
+                if response.status_code >= 400:
+                    await response.aread()
+                self._check_status(response, response.text if response.is_stream_consumed else '')
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    result = json.loads(line)
+                    chunk = self._response_text(result)
+                    if chunk:
+                        yield chunk
+                    if result.get('done'):
+                        break
+        except RuntimeError:
+            raise
+        except Exception as e:
+            self._mark_failed()
+            raise RuntimeError(f"Ollama HTTP 请求失败: {e}")
 
 
 class MockProvider(AIProvider):
@@ -0,0 +1,186 @@
+"""
+预编译规则匹配器
+
+为 NaturalLanguageTranslator 的翻译规则提供快速匹配：
+- 所有规则在构建时一次性编译
+- 从每条规则的正则中提取必须出现的字面关键词（如中文关键词）
+- 按关键词首字符建立倒排索引，只对候选规则执行正则匹配
+- 保持与逐条匹配完全相同的"首个匹配生效"语义
+"""
+
+import re
+import sys
+from typing import Dict, List, Optional, Tuple, FrozenSet, Any
+
+if sys.version_info >= (3, 11):
+    from re import _parser as sre_parse
+else:  # pragma: no cover
+    import sre_parse
+
+
+# 需求：一组候选字面量，文本中至少包含其中之一
+Requirement = FrozenSet[str]
+
+_REPEAT_OPS = tuple(
+    op for op in (
+        getattr(sre_parse, 'MAX_REPEAT', None),
+        getattr(sre_parse, 'MIN_REPEAT', None),
+        getattr(sre_parse, 'POSSESSIVE_REPEAT', None),
+    ) if op is not None
+)
+
+
+def _is_uncased(char: str) -> bool:
+    """判断字符是否不区分大小写
+
+    只有不区分大小写的字符（中文、数字、标点等）才作为预过滤字面量，
+    这样在 IGNORECASE 模式下预过滤结果与正则匹配结果保持一致。
+    """
+    return char.lower() == char.upper()
+
+
+def _extract_requirements(parsed) -> List[Requirement]:
+    """从解析后的正则序列中提取必须满足的字面量需求
+
+    Args:
+        parsed: sre_parse 解析得到的子模式序列
+
+    Returns:
+        List[Requirement]: 需求列表，所有需求都必须满足正则才可能匹配
+    """
+    requirements: List[Requirement] = []
+    run: List[str] = []
+
+    def flush():
+        if run:
+            requirements.append(frozenset([''.join(run)]))
+            run.clear()
+
+    for op, av in parsed:
+        if op is sre_parse.LITERAL and _is_uncased(chr(av)):
+            run.append(chr(av))
+            continue
+
+        flush()
+
+        if op is sre_parse.SUBPATTERN:
+            requirements.extend(_extract_requirements(av[-1]))
+        elif op is sre_parse.BRANCH:
+            alternatives: List[str] = []
+            for branch in av[1]:
+                branch_literals = [
+                    next(iter(req)) for req in _extract_requirements(branch) if len(req) == 1
+                ]
+                if not branch_literals:
+                    alternatives = []
+                    break
+                alternatives.append(max(branch_literals, key=len))
+            if alternatives:
+                requirements.append(frozenset(alternatives))
+        elif op in _REPEAT_OPS:
+            min_count, _, item = av
+            if min_count >= 1:
+                requirements.extend(_extract_requirements(item))
+
+    flush()
+    return requirements
+
+
+class CompiledRuleMatcher:
+    """预编译规则匹配器
+
+    规则按原始顺序编号，候选规则按编号顺序求值，保证首个匹配生效。
+    不包含可提取关键词的规则（如 ^pwd$）始终作为候选规则。
+    """
+
+    def __init__(self, rules: Dict[str, Tuple[Any, ...]], flags: int = re.IGNORECASE):
+        """构建匹配器
+
+        Args:
+            rules: 规则字典，键为正则表达式，值为规则数据
+            flags: 正则编译标志
+        """
+        self.source = rules
+        self.rule_count = len(rules)
+        self._entries: List[Tuple[re.Pattern, Tuple[Tuple[str, ...], ...], Tuple[Any, ...]]] = []
+        # 倒排索引：字符 -> 规则位图（第 n 位表示第 n 条规则）
+        self._index: Dict[str, int] = {}
+        self._always = 0
+
+        for position, (pattern, value) in enumerate(rules.items()):
+            compiled = re.compile(pattern, flags)
+            try:
+                requirements = _extract_requirements(sre_parse.parse(pattern, flags))
+            except Exception:
+                requirements = []
+            self._entries.append((compiled, tuple(tuple(req) for req in requirements), value))
+
+            if not requirements:
+                self._always |= 1 << position
+                continue
+
+            # 选择最具区分度的需求（候选字面量最短者最长）作为索引键
+            key_requirement = max(requirements, key=lambda req: min(len(lit) for lit in req))
+            for first_char in {literal[0] for literal in key_requirement}:
+                self._index[first_char] = self._index.get(first_char, 0) | (1 << position)
+
+    def is_stale(self, rules: Dict[str, Tuple[Any, ...]]) -> bool:
+        """判断规则是否已被替换或修改，需要重新构建"""
+        return rules is not self.source or len(rules) != self.rule_count
+
+    def _candidate_mask(self, text: str) -> int:
+        """计算候选规则位图"""
+        mask = self._always
+        index = self._index
+        for char in set(text):
+            bits = index.get(char)
+            if bits:
+                mask |= bits
+        return mask
+
+    def candidates(self, text: str) -> List[int]:
+        """获取可能匹配文本的候选规则编号（按原始顺序）
+
+        Args:
+            text: 用户输入文本
+
+        Returns:
+            List[int]: 候选规则编号
+        """
+        mask = self._candidate_mask(text)
+        positions = []
+        while mask:
+            lowest = mask & -mask
+            positions.append(lowest.bit_length() - 1)
+            mask ^= lowest
+        return positions
+
+    def match(self, text: str) -> Optional[Tuple[re.Match, Tuple[Any, ...]]]:
+        """匹配首个命中的规则
+
+        候选规则按编号从小到大逐个求值，命中即返回，不会展开全部候选。
+
+        Args:
+            text: 用户输入文本
+
+        Returns:
+            Optional[Tuple]: (匹配对象, 规则数据) 或 None
+        """
+        mask = self._candidate_mask(text)
+        entries = self._entries
+        while mask:
+            lowest = mask & -mask
+            mask ^= lowest
+            compiled, requirements, value = entries[lowest.bit_length() - 1]
+            for literals in requirements:
+                for literal in literals:
+                    if literal in text:
+                        break
+                else:
+                    # 缺少必需的关键词，跳过正则匹配
+                    break
+            else:
+                match = compiled.search(text)
+                if match:
+                    return match, value
+        return None
@@ -5,9 +5,18 @@
 使用规则匹配和 AI 模型的混合策略。
 """
 
+import asyncio
 import re
-from typing import Dict, List, Optional, Tuple
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
 from ..interfaces.base import Suggestion, Context
+from .rule_matcher import CompiledRuleMatcher
+from .normalization import chinese_to_int
+
+if TYPE_CHECKING:
+    from .providers import AIProvider
 
 
 class NaturalLanguageTranslator:
@@ -25,10 +34,15 @@ class NaturalLanguageTranslator:
         self.config = config or {}
         self.rules = self._load_rules()
         self.command_templates = self._load_command_templates()
-        self._ai_provider = None
+        self._rule_matcher = CompiledRuleMatcher(self.rules)
+        self._ai_provider: Optional['AIProvider'] = None
+        # 延迟预算模式：推测执行 AI 调用的线程池（懒加载）和统计
+        self._speculation_executor: Optional[ThreadPoolExecutor] = None
+        self._speculation_lock = threading.Lock()
+        self._speculation_stats = {'started': 0, 'ai_in_time': 0, 'deadline_expired': 0}
     
     @property
-    def ai_provider(self):
+    def ai_provider(self) -> Optional['AIProvider']:
         """懒加载 AI 提供商"""
         if self._ai_provider is None and self.config.get('use_ai_provider', False):
             from .providers import get_provider
@@ -36,16 +50,23 @@ class NaturalLanguageTranslator:
             self._ai_provider = get_provider(provider_name, self.config)
         return self._ai_provider
     
-    def translate(self, text: str, context: Context) -> Suggestion:
+    def translate(
+        self,
+        text: str,
+        context: Context,
+        on_partial: Optional[Callable[[str], None]] = None
+    ) -> Suggestion:
         """翻译自然语言到 PowerShell 命令
         
         Args:
             text: 用户输入的自然语言
             context: 当前上下文
+            on_partial: 部分命令回调，设置后 AI 模型使用流式生成
             
         Returns:
             Suggestion: 翻译建议
         """
+        started = time.monotonic()
         text = text.strip()
         
         # 检查是否是重新生成请求（带有反馈）
@@ -62,23 +83,73 @@ class NaturalLanguageTranslator:
             return self._regenerate_with_feedback(text, context)
         
         # 1. 尝试规则匹配（快速路径）
-        rule_result = self._match_rules(text)
-        if rule_result:
-            command, explanation, confidence = rule_result
-            print(f"[规则匹配] 命令: {command}, 置信度: {confidence}")
-            return Suggestion(
-                original_input=text,
-                generated_command=command,
-                confidence_score=confidence,
-                explanation=explanation,
-                alternatives=self._generate_alternatives(text, command)
+        rule_suggestion = self.translate_with_rules(text)
+        
+        deadline = self.translate_deadline
+        if deadline > 0 and self.ai_provider and not self._is_confident(rule_suggestion):
+            return self._translate_with_deadline(
+                text, context, rule_suggestion, started + deadline, on_partial
+            )
+        
+        if rule_suggestion:
+            return rule_suggestion
+        
+        # 2. 尝试使用 AI 模型（慢速路径）
+        if self.ai_provider:
+            try:
+                print(f"[AI 翻译] 输入: {text}")
+                return self._generate(text, context, on_partial)
+            except Exception as e:
+                # AI 生成失败，记录错误并回退到基本翻译
+                print(f"[AI 翻译失败] {e}")
+        
+        # 3. 回退到基本翻译
+        return self._fallback_translation(text)
+    
+    async def atranslate(
+        self,
+        text: str,
+        context: Context,
+        on_partial: Optional[Callable[[str], None]] = None
+    ) -> Suggestion:
+        """异步翻译自然语言到 PowerShell 命令
+        
+        与 translate 使用相同的策略，AI 模型通过 agenerate 调用，
+        等待模型响应时不阻塞事件循环。
+        
+        Args:
+            text: 用户输入的自然语言
+            context: 当前上下文
+            on_partial: 部分命令回调，设置后 AI 模型使用流式生成
+            
+        Returns:
+            Suggestion: 翻译建议
+        """
+        started = time.monotonic()
+        text = text.strip()
+        
+        is_regeneration = context.feedback is not None and context.feedback.get('feedback') == 'incorrect'
+        if is_regeneration:
+            # 重新生成路径较少使用，在线程池中执行同步实现
+            return await asyncio.to_thread(self._regenerate_with_feedback, text, context)
+        
+        # 1. 尝试规则匹配（快速路径）
+        rule_suggestion = self.translate_with_rules(text)
+        
+        deadline = self.translate_deadline
+        if deadline > 0 and self.ai_provider and not self._is_confident(rule_suggestion):
+            return await self._atranslate_with_deadline(
+                text, context, rule_suggestion, started + deadline, on_partial
             )
         
+        if rule_suggestion:
+            return rule_suggestion
+        
         # 2. 尝试使用 AI 模型（慢速路径）
         if self.ai_provider:
             try:
                 print(f"[AI 翻译] 输入: {text}")
-                return self.ai_provider.generate(text, context)
+                return await self._agenerate(text, context, on_partial)
             except Exception as e:
                 # AI 生成失败，记录错误并回退到基本翻译
                 print(f"[AI 翻译失败] {e}")
@@ -86,6 +157,210 @@ class NaturalLanguageTranslator:
         # 3. 回退到基本翻译
         return self._fallback_translation(text)
     
+    @property
+    def translate_deadline(self) -> float:
+        """翻译延迟预算（秒），0 表示不限制"""
+        return float(self.config.get('translate_deadline') or 0)
+    
+    def _is_confident(self, rule_suggestion: Optional[Suggestion]) -> bool:
+        """规则匹配结果的置信度是否足够高，无需再调用 AI 模型"""
+        if rule_suggestion is None:
+            return False
+        threshold = float(self.config.get('speculative_confidence', 0.9))
+        return rule_suggestion.confidence_score >= threshold
+    
+    def _generate(
+        self,
+        text: str,
+        context: Context,
+        on_partial: Optional[Callable[[str], None]] = None
+    ) -> Suggestion:
+        """调用 AI 模型生成建议，设置 on_partial 时使用流式生成"""
+        if on_partial:
+            return self.ai_provider.generate_streaming(text, context, on_partial)
+        return self.ai_provider.generate(text, context)
+    
+    async def _agenerate(
+        self,
+        text: str,
+        context: Context,
+        on_partial: Optional[Callable[[str], None]] = None
+    ) -> Suggestion:
+        """异步调用 AI 模型生成建议，设置 on_partial 时使用流式生成"""
+        if on_partial:
+            return await self.ai_provider.agenerate_streaming(text, context, on_partial)
+        return await self.ai_provider.agenerate(text, context)
+    
+    def _record_speculation(self, key: str) -> None:
+        """累加推测执行统计"""
+        with self._speculation_lock:
+            self._speculation_stats[key] += 1
+    
+    def get_speculation_stats(self) -> Dict[str, int]:
+        """获取延迟预算模式的统计信息
+        
+        Returns:
+            Dict[str, int]: started（推测调用 AI 的次数）、ai_in_time（AI 在预算内
+                返回的次数）、deadline_expired（超出预算而放弃 AI 结果的次数）
+        """
+        with self._speculation_lock:
+            return dict(self._speculation_stats)
+    
+    def close(self) -> None:
+        """关闭 AI 提供商的连接和推测执行线程池"""
+        with self._speculation_lock:
+            executor, self._speculation_executor = self._speculation_executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        if self._ai_provider is not None:
+            self._ai_provider.close()
+    
+    def _get_speculation_executor(self) -> ThreadPoolExecutor:
+        """获取推测执行线程池
+        
+        线程数与 Ollama 连接池大小一致，超出预算的调用仍占用线程直到模型返回，
+        排队中尚未开始的调用在超出预算时直接取消。
+        """
+        with self._speculation_lock:
+            if self._speculation_executor is None:
+                self._speculation_executor = ThreadPoolExecutor(
+                    max_workers=int(self.config.get('ollama_max_connections', 10)),
+                    thread_name_prefix="speculative-translate"
+                )
+            return self._speculation_executor
+    
+    def _deadline_result(
+        self,
+        text: str,
+        rule_suggestion: Optional[Suggestion]
+    ) -> Suggestion:
+        """AI 模型未能在预算内给出结果时的最佳可用建议
+        
+        结果在元数据中标记 deadline_fallback，调用方不应缓存这类降级结果。
+        """
+        suggestion = rule_suggestion or self._fallback_translation(text)
+        suggestion.metadata['deadline_fallback'] = True
+        return suggestion
+    
+    def _translate_with_deadline(
+        self,
+        text: str,
+        context: Context,
+        rule_suggestion: Optional[Suggestion],
+        deadline_at: float,
+        on_partial: Optional[Callable[[str], None]] = None
+    ) -> Suggestion:
+        """在延迟预算内翻译
+        
+        规则匹配置信度不足时推测性地在线程池中调用 AI 模型，预算到期前
+        返回则使用 AI 结果，否则返回规则匹配结果或回退翻译（标记为
+        deadline_fallback），迟到的结果被丢弃。
+        
+        Args:
+            text: 用户输入
+            context: 当前上下文
+            rule_suggestion: 规则匹配结果（可能为 None）
+            deadline_at: 预算到期时间（time.monotonic()）
+            on_partial: 部分命令回调，预算到期后不再调用
+            
+        Returns:
+            Suggestion: 翻译建议
+        """
+        expired = threading.Event()
+        
+        def guarded_partial(preview: str) -> None:
+            if not expired.is_set():
+                on_partial(preview)
+        
+        print(f"[AI 翻译] 输入: {text}, 预算: {self.translate_deadline}s")
+        self._record_speculation('started')
+        future = self._get_speculation_executor().submit(
+            self._generate, text, context, guarded_partial if on_partial else None
+        )
+        done, _ = wait([future], timeout=max(0.0, deadline_at - time.monotonic()))
+        
+        if not done:
+            expired.set()
+            # 尚未开始的调用直接取消，已开始的调用结果被丢弃
+            future.cancel()
+            self._record_speculation('deadline_expired')
+            print(f"[AI 翻译超时] 超出延迟预算，使用{'规则匹配' if rule_suggestion else '回退翻译'}结果")
+            return self._deadline_result(text, rule_suggestion)
+        
+        try:
+            suggestion = future.result()
+        except Exception as e:
+            print(f"[AI 翻译失败] {e}")
+            return self._deadline_result(text, rule_suggestion)
+        
+        self._record_speculation('ai_in_time')
+        return suggestion
+    
+    async def _atranslate_with_deadline(
+        self,
+        text: str,
+        context: Context,
+        rule_suggestion: Optional[Suggestion],
+        deadline_at: float,
+        on_partial: Optional[Callable[[str], None]] = None
+    ) -> Suggestion:
+        """在延迟预算内异步翻译
+        
+        与 _translate_with_deadline 相同，预算到期时取消 AI 调用（关闭模型连接）。
+        
+        Args:
+            text: 用户输入
+            context: 当前上下文
+            rule_suggestion: 规则匹配结果（可能为 None）
+            deadline_at: 预算到期时间（time.monotonic()）
+            on_partial: 部分命令回调
+            
+        Returns:
+            Suggestion: 翻译建议
+        """
+        print(f"[AI 翻译] 输入: {text}, 预算: {self.translate_deadline}s")
+        self._record_speculation('started')
+        task = asyncio.ensure_future(self._agenerate(text, context, on_partial))
+        done, _ = await asyncio.wait({task}, timeout=max(0.0, deadline_at - time.monotonic()))
+        
+        if not done:
+            task.cancel()
+            self._record_speculation('deadline_expired')
+            print(f"[AI 翻译超时] 超出延迟预算，使用{'规则匹配' if rule_suggestion else '回退翻译'}结果")
+            return self._deadline_result(text, rule_suggestion)
+        
+        try:
+            suggestion = task.result()
+        except Exception as e:
+            print(f"[AI 翻译失败] {e}")
+            return self._deadline_result(text, rule_suggestion)
+        
+        self._record_speculation('ai_in_time')
+        return suggestion
+    
+    def translate_with_rules(self, text: str) -> Optional[Suggestion]:
+        """使用规则匹配生成建议
+        
+        Args:
+            text: 用户输入
+            
+        Returns:
+            Optional[Suggestion]: 规则匹配成功时的建议，否则为 None
+        """
+        rule_result = self._match_rules(text)
+        if not rule_result:
+            return None
+        
+        command, explanation, confidence = rule_result
+        print(f"[规则匹配] 命令: {command}, 置信度: {confidence}")
+        return Suggestion(
+            original_input=text,
+            generated_command=command,
+            confidence_score=confidence,
+            explanation=explanation,
+            alternatives=self._generate_alternatives(text, command)
+        )
+    
     def explain_command(self, command: str) -> str:
         """解释 PowerShell 命令
         
@@ -952,12 +1227,16 @@ class NaturalLanguageTranslator:
         Returns:
             Optional[Tuple]: (命令, 解释, 置信度) 或 None
         """
-        for pattern, (command_template, explanation, confidence) in self.rules.items():
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                # 提取参数
-                command = self._fill_template(command_template, match, text)
-                return command, explanation, confidence
+        # 规则被替换或修改后重新构建匹配器
+        if self._rule_matcher.is_stale(self.rules):
+            self._rule_matcher = CompiledRuleMatcher(self.rules)
+        
+        result = self._rule_matcher.match(text)
+        if result:
+            match, (command_template, explanation, confidence) = result
+            # 提取参数
+            command = self._fill_template(command_template, match, text)
+            return command, explanation, confidence
         
         return None
     
@@ -1125,9 +1404,7 @@ class NaturalLanguageTranslator:
             if count_str:
                 print(f"[调试] 从匹配组提取的数量字符串: {count_str}")
                 # 转换中文数字
-                chinese_nums = {'一': 1, '二': 2, '两': 2, '三': 3, '四': 4, '五': 5, 
-                              '六': 6, '七': 7, '八': 8, '九': 9, '十': 10}
-                count = chinese_nums.get(count_str, int(count_str) if count_str.isdigit() else 1)
+                count = chinese_to_int(count_str) or 1
                 print(f"[调试] 转换后的数量: {count}")
         
         # 如果没有从匹配组提取到，再尝试从整个文本中搜索
@@ -1136,9 +1413,7 @@ class NaturalLanguageTranslator:
             if count_match:
                 count_str = count_match.group(1)
                 print(f"[调试] 从文本搜索提取的数量字符串: {count_str}")
-                chinese_nums = {'一': 1, '二': 2, '两': 2, '三': 3, '四': 4, '五': 5, 
-                              '六': 6, '七': 7, '八': 8, '九': 9, '十': 10}
-                count = chinese_nums.get(count_str, int(count_str) if count_str.isdigit() else 1)
+                count = chinese_to_int(count_str) or 1
                 print(f"[调试] 转换后的数量: {count}")
             else:
                 print(f"[调试] 未找到数量，默认为1")
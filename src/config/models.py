@@ -23,6 +23,26 @@ class AIConfig(BaseModel):
         default="http://localhost:11434",
         description="Ollama 服务地址"
     )
+    ollama_timeout: float = Field(
+        default=30.0,
+        gt=0,
+        description="Ollama 请求超时时间（秒）"
+    )
+    ollama_max_connections: int = Field(
+        default=10,
+        ge=1,
+        description="Ollama HTTP 连接池的最大连接数"
+    )
+    ollama_availability_ttl: float = Field(
+        default=30.0,
+        ge=0,
+        description="Ollama 可用性检查结果的缓存时间，也是熔断后的冷却时间（秒）"
+    )
+    ollama_failure_threshold: int = Field(
+        default=3,
+        ge=1,
+        description="连续失败多少次后熔断 Ollama 请求"
+    )
     use_ai_provider: bool = Field(
         default=False,
         description="是否启用 AI 提供商"
@@ -48,6 +68,34 @@ class AIConfig(BaseModel):
         ge=0,
         description="缓存大小"
     )
+    cache_normalize: bool = Field(
+        default=True,
+        description="是否在查询翻译缓存前规范化输入（全半角、繁简体、标点空白、中文数字）"
+    )
+    cache_persist: bool = Field(
+        default=False,
+        description="是否将翻译缓存快照保存到存储缓存目录，重启后预热缓存"
+    )
+    coalesce_requests: bool = Field(
+        default=True,
+        description="是否合并同时进行的相同翻译请求，只调用一次模型"
+    )
+    batch_concurrency: int = Field(
+        default=2,
+        ge=1,
+        description="批量翻译时同时调用 AI 模型的最大数量"
+    )
+    translate_deadline: float = Field(
+        default=0.0,
+        ge=0.0,
+        description="翻译延迟预算（秒），超出后放弃 AI 结果，0 表示不限制"
+    )
+    speculative_confidence: float = Field(
+        default=0.9,
+        ge=0.0,
+        le=1.0,
+        description="设置延迟预算时，规则匹配置信度低于该值则同时调用 AI 模型"
+    )
     
     @field_validator('provider')
     @classmethod
@@ -70,6 +118,32 @@ class SecurityConfig(BaseModel):
         default=True,
         description="是否仅对高危命令使用沙箱（True=仅高危命令，False=所有命令）"
     )
+    sandbox_pool_enabled: bool = Field(
+        default=False,
+        description="是否使用预热的沙箱容器池，通过 exec 在常驻容器中执行命令"
+    )
+    sandbox_pool_min_size: int = Field(
+        default=1,
+        ge=0,
+        le=16,
+        description="沙箱容器池保持预热的最少容器数"
+    )
+    sandbox_pool_max_size: int = Field(
+        default=4,
+        ge=1,
+        le=16,
+        description="沙箱容器池最多同时存在的容器数"
+    )
+    sandbox_pool_idle_timeout: int = Field(
+        default=300,
+        ge=0,
+        description="超过最少数量的空闲容器在该时间（秒）后回收"
+    )
+    sandbox_pool_max_uses: int = Field(
+        default=50,
+        ge=0,
+        description="单个沙箱容器复用的最大次数，0 表示不限制"
+    )
     require_confirmation: bool = Field(
         default=True,
         description="是否需要用户确认"
@@ -99,6 +173,11 @@ class SecurityConfig(BaseModel):
         default_factory=list,
         description="自定义安全规则"
     )
+    verdict_cache_size: int = Field(
+        default=512,
+        ge=0,
+        description="缓存的命令验证结果数量，0 表示不缓存"
+    )
     
     @field_validator('whitelist_mode')
     @classmethod
@@ -135,6 +214,62 @@ class ExecutionConfig(BaseModel):
         default=True,
         description="是否自动检测 PowerShell"
     )
+    host_pool_enabled: bool = Field(
+        default=False,
+        description="是否使用常驻 PowerShell 宿主进程池执行命令"
+    )
+    host_pool_size: int = Field(
+        default=2,
+        ge=1,
+        le=16,
+        description="宿主进程池最大进程数"
+    )
+    host_pool_max_commands: int = Field(
+        default=100,
+        ge=0,
+        description="单个宿主进程执行多少条命令后回收（0 表示不限制）"
+    )
+    host_pool_max_memory_mb: int = Field(
+        default=512,
+        ge=0,
+        description="单个宿主进程内存超过该值（MB）后回收（0 表示不限制）"
+    )
+    stream_memory_limit: int = Field(
+        default=1000000,
+        ge=1024,
+        description="流式执行时每个输出流在内存中保留的最大字符数，超出部分写入临时文件"
+    )
+    stream_chunk_size: int = Field(
+        default=4096,
+        ge=256,
+        description="流式执行时每次从进程管道读取的最大字节数"
+    )
+    stream_max_pending_chunks: int = Field(
+        default=64,
+        ge=1,
+        description="流式执行时尚未被消费的输出块上限，达到后暂停读取进程输出"
+    )
+    max_concurrent: int = Field(
+        default=4,
+        ge=1,
+        le=64,
+        description="执行调度器同时运行的最大命令数"
+    )
+    max_concurrent_per_session: int = Field(
+        default=2,
+        ge=0,
+        description="每个会话同时运行的最大命令数（0 表示只受全局限制）"
+    )
+    max_queue_size: int = Field(
+        default=64,
+        ge=0,
+        description="执行调度器等待队列的最大长度，队列已满时拒绝新命令"
+    )
+    max_queue_wait: float = Field(
+        default=60.0,
+        ge=0.0,
+        description="命令最长排队时间（秒），超过后返回超时结果，0 表示不限制"
+    )
     
     @field_validator('platform')
     @classmethod
@@ -200,6 +335,10 @@ class LoggingConfig(BaseModel):
 class StorageConfig(BaseModel):
     """存储配置"""
     
+    backend: str = Field(
+        default="file",
+        description="存储后端: file, memory, database"
+    )
     base_path: str = Field(
         default="~/.ai-powershell",
         description="存储基础路径"
@@ -221,6 +360,41 @@ class StorageConfig(BaseModel):
         ge=0,
         description="最大历史记录数量"
     )
+    history_fsync: str = Field(
+        default="interval",
+        description="历史记录 fsync 策略: always, interval, never"
+    )
+    history_fsync_interval: float = Field(
+        default=1.0,
+        ge=0,
+        description="interval 策略下两次 fsync 的最小间隔（秒）"
+    )
+    db_file: str = Field(
+        default="storage.db",
+        description="数据库存储（SQLite）的数据库文件名"
+    )
+    memory_dump_path: Optional[str] = Field(
+        default=None,
+        description="内存存储的转储文件路径（为空表示不持久化）"
+    )
+    
+    @field_validator('backend')
+    @classmethod
+    def validate_backend(cls, v: str) -> str:
+        """验证存储后端"""
+        allowed = ['file', 'memory', 'database']
+        if v not in allowed:
+            raise ValueError(f"backend 必须是以下之一: {', '.join(allowed)}")
+        return v
+    
+    @field_validator('history_fsync')
+    @classmethod
+    def validate_history_fsync(cls, v: str) -> str:
+        """验证 fsync 策略"""
+        allowed = ['always', 'interval', 'never']
+        if v not in allowed:
+            raise ValueError(f"history_fsync 必须是以下之一: {', '.join(allowed)}")
+        return v
 
 
 class ContextConfig(BaseModel):
@@ -241,6 +415,16 @@ class ContextConfig(BaseModel):
         default=True,
         description="是否启用学习功能"
     )
+    session_flush_interval: float = Field(
+        default=0.0,
+        ge=0.0,
+        description="会话增量的合并写入间隔（秒），0 表示每次修改立即写入"
+    )
+    session_checkpoint_interval: int = Field(
+        default=50,
+        ge=1,
+        description="会话日志累计多少条记录后保存完整会话检查点"
+    )
 
 
 class AppConfig(BaseModel):
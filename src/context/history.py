@@ -3,11 +3,18 @@
 
 本模块实现命令历史记录管理功能，支持历史查询、搜索、过滤和统计分析。
 提供丰富的历史记录操作接口，帮助用户快速查找和重用历史命令。
+
+历史记录保存在按时间顺序排列、以 command_id 为键的有界缓冲区中：
+- 按 ID 查找和删除为 O(1)，超过 max_history 时从最旧的一端淘汰
+- 按状态建立二级索引，按时间戳建立有序索引（二分查找日期范围）
+- 持久化是增量的：添加只追加新记录，删除只删除对应记录
 """
 
-from typing import List, Optional, Dict, Any, Callable
+from typing import List, Optional, Dict, Any, Callable, Tuple
 from datetime import datetime, timedelta
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
+import bisect
+import itertools
 import logging
 
 from .models import CommandEntry, Session, CommandStatus
@@ -22,6 +29,9 @@ class HistoryManager:
     
     负责管理命令历史记录，提供查询、搜索、过滤和统计功能。
     支持跨会话的历史记录管理和持久化。
+    
+    索引按添加时的状态和时间戳建立。条目加入后应通过 update_status 修改状态；
+    直接修改 entry.status 的条目在查询其原状态时被跳过并移到新状态下。
     """
     
     def __init__(self, storage: Optional[StorageInterface] = None, max_history: int = 1000):
@@ -33,13 +43,28 @@ class HistoryManager:
         """
         self.storage = storage
         self.max_history = max_history
-        self.history_cache: List[CommandEntry] = []
+        
+        # command_id -> 条目，按添加顺序排列
+        self._entries: 'OrderedDict[str, CommandEntry]' = OrderedDict()
+        # 状态 -> {command_id: 条目}，保持添加顺序
+        self._status_index: Dict[CommandStatus, Dict[str, CommandEntry]] = defaultdict(dict)
+        # command_id -> 建立索引时的状态
+        self._indexed_status: Dict[str, CommandStatus] = {}
+        # (时间戳, 序号, command_id) 的有序列表
+        self._date_index: List[Tuple[datetime, int, str]] = []
+        self._date_keys: Dict[str, Tuple[datetime, int, str]] = {}
+        self._sequence = itertools.count()
         
         # 加载历史记录
         self._load_history()
         
         logger.info(f"HistoryManager initialized with max_history={max_history}")
     
+    @property
+    def history_cache(self) -> List[CommandEntry]:
+        """按时间顺序排列的历史记录列表（副本）"""
+        return list(self._entries.values())
+    
     # ========================================================================
     # 基础操作
     # ========================================================================
@@ -50,17 +75,17 @@ class HistoryManager:
         Args:
             entry: 命令条目对象
         """
-        self.history_cache.append(entry)
-        
-        # 限制历史记录数量
-        if len(self.history_cache) > self.max_history:
-            self.history_cache = self.history_cache[-self.max_history:]
+        self._index_entry(entry)
+        self._evict()
         
         logger.debug(f"Added history entry: {entry.command_id}")
         
-        # 持久化
+        # 持久化：只追加新记录，存储按自身的上限淘汰旧记录
         if self.storage:
-            self._save_history()
+            try:
+                self.storage.save_history(entry.to_dict())
+            except Exception as e:
+                logger.error(f"Failed to save history entry: {e}")
     
     def get_all(self, limit: Optional[int] = None) -> List[CommandEntry]:
         """获取所有历史记录
@@ -71,9 +96,11 @@ class HistoryManager:
         Returns:
             List[CommandEntry]: 历史记录列表
         """
-        if limit is None:
-            return self.history_cache.copy()
-        return self.history_cache[-limit:]
+        if not limit:
+            return list(self._entries.values())
+        newest = list(itertools.islice(reversed(self._entries.values()), limit))
+        newest.reverse()
+        return newest
     
     def get_by_id(self, command_id: str) -> Optional[CommandEntry]:
         """根据 ID 获取历史记录
@@ -84,18 +111,18 @@ class HistoryManager:
         Returns:
             Optional[CommandEntry]: 命令条目对象
         """
-        for entry in self.history_cache:
-            if entry.command_id == command_id:
-                return entry
-        return None
+        return self._entries.get(command_id)
     
     def clear(self):
         """清空历史记录"""
-        self.history_cache.clear()
+        self._reset_indexes()
         logger.info("Cleared all history")
         
         if self.storage:
-            self._save_history()
+            try:
+                self.storage.clear_history()
+            except Exception as e:
+                logger.error(f"Failed to clear history: {e}")
     
     def remove_entry(self, command_id: str) -> bool:
         """删除指定历史记录
@@ -106,17 +133,36 @@ class HistoryManager:
         Returns:
             bool: 删除是否成功
         """
-        for i, entry in enumerate(self.history_cache):
-            if entry.command_id == command_id:
-                del self.history_cache[i]
-                logger.debug(f"Removed history entry: {command_id}")
-                
-                if self.storage:
-                    self._save_history()
-                
-                return True
-        
-        return False
+        if self._unindex_entry(command_id) is None:
+            return False
+        
+        logger.debug(f"Removed history entry: {command_id}")
+        
+        if self.storage:
+            try:
+                self.storage.delete_history([command_id])
+            except Exception as e:
+                logger.error(f"Failed to delete history entry: {e}")
+        
+        return True
+    
+    def update_status(self, command_id: str, status: CommandStatus) -> bool:
+        """更新历史记录的状态并重建其状态索引
+        
+        Args:
+            command_id: 命令 ID
+            status: 新状态
+            
+        Returns:
+            bool: 是否找到该记录
+        """
+        entry = self._entries.get(command_id)
+        if entry is None:
+            return False
+        
+        entry.status = status
+        self._reindex_status(entry)
+        return True
     
     # ========================================================================
     # 查询和搜索
@@ -135,7 +181,7 @@ class HistoryManager:
         query_lower = query.lower()
         results = []
         
-        for entry in self.history_cache:
+        for entry in self._entries.values():
             match = False
             
             if search_in in ["all", "input"]:
@@ -165,7 +211,19 @@ class HistoryManager:
         Returns:
             List[CommandEntry]: 匹配的历史记录列表
         """
-        return [entry for entry in self.history_cache if entry.status == status]
+        bucket = self._status_index.get(status)
+        if not bucket:
+            return []
+        
+        # 跳过状态被直接修改过的条目，并把它们移到当前状态下
+        stale = [entry for entry in bucket.values() if entry.status != status]
+        for entry in stale:
+            self._reindex_status(entry)
+        
+        # 重新索引的条目位于末尾，按添加顺序排列
+        results = list(self._status_index.get(status, {}).values())
+        results.sort(key=lambda entry: self._date_keys[entry.command_id][1])
+        return results
     
     def filter_by_date_range(self, start_date: datetime, 
                             end_date: Optional[datetime] = None) -> List[CommandEntry]:
@@ -181,10 +239,10 @@ class HistoryManager:
         if end_date is None:
             end_date = datetime.now()
         
-        return [
-            entry for entry in self.history_cache
-            if start_date <= entry.timestamp <= end_date
-        ]
+        # 序号为 -1 和 inf 的边界键分别排在同一时间戳的所有记录之前和之后
+        low = bisect.bisect_left(self._date_index, (start_date, -1))
+        high = bisect.bisect_right(self._date_index, (end_date, float('inf')))
+        return [self._entries[key[2]] for key in self._date_index[low:high]]
     
     def filter_by_success(self, successful: bool = True) -> List[CommandEntry]:
         """按执行结果过滤历史记录
@@ -196,9 +254,9 @@ class HistoryManager:
             List[CommandEntry]: 匹配的历史记录列表
         """
         if successful:
-            return [entry for entry in self.history_cache if entry.is_successful]
+            return [entry for entry in self._entries.values() if entry.is_successful]
         else:
-            return [entry for entry in self.history_cache if entry.has_error]
+            return [entry for entry in self._entries.values() if entry.has_error]
     
     def filter_by_confidence(self, min_confidence: float = 0.0, 
                             max_confidence: float = 1.0) -> List[CommandEntry]:
@@ -212,7 +270,7 @@ class HistoryManager:
             List[CommandEntry]: 匹配的历史记录列表
         """
         return [
-            entry for entry in self.history_cache
+            entry for entry in self._entries.values()
             if min_confidence <= entry.confidence_score <= max_confidence
         ]
     
@@ -225,7 +283,7 @@ class HistoryManager:
         Returns:
             List[CommandEntry]: 匹配的历史记录列表
         """
-        return [entry for entry in self.history_cache if predicate(entry)]
+        return [entry for entry in self._entries.values() if predicate(entry)]
     
     # ========================================================================
     # 统计分析
@@ -237,7 +295,8 @@ class HistoryManager:
         Returns:
             Dict[str, Any]: 统计信息字典
         """
-        if not self.history_cache:
+        entries = self.history_cache
+        if not entries:
             return {
                 "total_commands": 0,
                 "successful_commands": 0,
@@ -246,12 +305,12 @@ class HistoryManager:
                 "average_execution_time": 0.0
             }
         
-        total = len(self.history_cache)
-        successful = sum(1 for entry in self.history_cache if entry.is_successful)
-        failed = sum(1 for entry in self.history_cache if entry.has_error)
+        total = len(entries)
+        successful = sum(1 for entry in entries if entry.is_successful)
+        failed = sum(1 for entry in entries if entry.has_error)
         
-        avg_confidence = sum(entry.confidence_score for entry in self.history_cache) / total
-        avg_execution_time = sum(entry.execution_time for entry in self.history_cache) / total
+        avg_confidence = sum(entry.confidence_score for entry in entries) / total
+        avg_execution_time = sum(entry.execution_time for entry in entries) / total
         
         return {
             "total_commands": total,
@@ -260,8 +319,8 @@ class HistoryManager:
             "success_rate": successful / total if total > 0 else 0.0,
             "average_confidence": avg_confidence,
             "average_execution_time": avg_execution_time,
-            "oldest_entry": self.history_cache[0].timestamp.isoformat() if self.history_cache else None,
-            "newest_entry": self.history_cache[-1].timestamp.isoformat() if self.history_cache else None
+            "oldest_entry": entries[0].timestamp.isoformat(),
+            "newest_entry": entries[-1].timestamp.isoformat()
         }
     
     def get_most_used_commands(self, limit: int = 10) -> List[Dict[str, Any]]:
@@ -276,7 +335,7 @@ class HistoryManager:
         command_counts = defaultdict(int)
         command_examples = {}
         
-        for entry in self.history_cache:
+        for entry in self._entries.values():
             cmd = entry.translated_command
             command_counts[cmd] += 1
             if cmd not in command_examples:
@@ -307,7 +366,7 @@ class HistoryManager:
         """
         patterns = defaultdict(int)
         
-        for entry in self.history_cache:
+        for entry in self._entries.values():
             # 提取命令的第一个单词（通常是 cmdlet 名称）
             cmd = entry.translated_command.strip()
             if cmd:
@@ -324,7 +383,7 @@ class HistoryManager:
         """
         distribution = defaultdict(int)
         
-        for entry in self.history_cache:
+        for entry in self._entries.values():
             hour = entry.timestamp.hour
             distribution[f"{hour:02d}:00"] += 1
         
@@ -360,7 +419,7 @@ class HistoryManager:
         
         return {
             "total_errors": len(failed_entries),
-            "error_rate": len(failed_entries) / len(self.history_cache) if self.history_cache else 0.0,
+            "error_rate": len(failed_entries) / len(self._entries) if self._entries else 0.0,
             "common_errors": [
                 {"error": error, "count": count}
                 for error, count in common_errors
@@ -382,7 +441,7 @@ class HistoryManager:
         from pathlib import Path
         
         if format == "json":
-            data = [entry.to_dict() for entry in self.history_cache]
+            data = [entry.to_dict() for entry in self._entries.values()]
             with open(filepath, 'w', encoding='utf-8') as f:
                 json.dump(data, f, indent=2, ensure_ascii=False)
         
@@ -394,7 +453,7 @@ class HistoryManager:
                     "Timestamp", "User Input", "Command", "Status",
                     "Return Code", "Execution Time", "Confidence"
                 ])
-                for entry in self.history_cache:
+                for entry in self._entries.values():
                     writer.writerow([
                         entry.timestamp.isoformat(),
                         entry.user_input,
@@ -421,12 +480,8 @@ class HistoryManager:
                 data = json.load(f)
             
             for entry_data in data:
-                entry = CommandEntry.from_dict(entry_data)
-                self.history_cache.append(entry)
-            
-            # 限制历史记录数量
-            if len(self.history_cache) > self.max_history:
-                self.history_cache = self.history_cache[-self.max_history:]
+                self._index_entry(CommandEntry.from_dict(entry_data))
+            self._evict()
             
             logger.info(f"Imported {len(data)} entries from {filepath}")
             
@@ -446,20 +501,81 @@ class HistoryManager:
         try:
             history_data = self.storage.load_history(limit=self.max_history)
             if history_data:
-                self.history_cache = [
-                    CommandEntry.from_dict(entry) for entry in history_data
-                ]
-                logger.info(f"Loaded {len(self.history_cache)} history entries")
+                self._reset_indexes()
+                for entry in history_data:
+                    self._index_entry(CommandEntry.from_dict(entry))
+                self._evict()
+                logger.info(f"Loaded {len(self._entries)} history entries")
         except Exception as e:
             logger.error(f"Failed to load history: {e}")
     
+    def _index_entry(self, entry: CommandEntry):
+        """将条目加入缓冲区和各索引，已存在的同 ID 条目被替换并移到末尾"""
+        self._unindex_entry(entry.command_id)
+        
+        self._entries[entry.command_id] = entry
+        self._status_index[entry.status][entry.command_id] = entry
+        self._indexed_status[entry.command_id] = entry.status
+        
+        key = (entry.timestamp, next(self._sequence), entry.command_id)
+        if not self._date_index or self._date_index[-1] <= key:
+            # 通常按时间顺序添加，直接追加
+            self._date_index.append(key)
+        else:
+            bisect.insort(self._date_index, key)
+        self._date_keys[entry.command_id] = key
+    
+    def _unindex_entry(self, command_id: str) -> Optional[CommandEntry]:
+        """从缓冲区和各索引中移除条目，返回被移除的条目"""
+        entry = self._entries.pop(command_id, None)
+        if entry is None:
+            return None
+        
+        self._remove_from_status_index(command_id)
+        
+        key = self._date_keys.pop(command_id)
+        position = bisect.bisect_left(self._date_index, key)
+        del self._date_index[position]
+        return entry
+    
+    def _remove_from_status_index(self, command_id: str):
+        """按建立索引时的状态从状态索引中移除条目"""
+        status = self._indexed_status.pop(command_id, None)
+        by_status = self._status_index.get(status) if status is not None else None
+        if by_status is not None:
+            by_status.pop(command_id, None)
+            if not by_status:
+                del self._status_index[status]
+    
+    def _reindex_status(self, entry: CommandEntry):
+        """把条目移到其当前状态的索引下"""
+        if self._indexed_status.get(entry.command_id) == entry.status:
+            return
+        self._remove_from_status_index(entry.command_id)
+        self._status_index[entry.status][entry.command_id] = entry
+        self._indexed_status[entry.command_id] = entry.status
+    
+    def _evict(self):
+        """淘汰超过 max_history 的最旧条目"""
+        while len(self._entries) > max(0, self.max_history):
+            oldest = next(iter(self._entries))
+            self._unindex_entry(oldest)
+    
+    def _reset_indexes(self):
+        """清空缓冲区和各索引"""
+        self._entries.clear()
+        self._status_index.clear()
+        self._indexed_status.clear()
+        self._date_index.clear()
+        self._date_keys.clear()
+    
     def _save_history(self):
-        """保存历史记录到存储"""
+        """保存全部历史记录到存储（覆盖存储中的记录）"""
         if not self.storage:
             return
         
         try:
-            history_data = [entry.to_dict() for entry in self.history_cache]
+            history_data = [entry.to_dict() for entry in self._entries.values()]
             self.storage.save_history_batch(history_data)
         except Exception as e:
             logger.error(f"Failed to save history: {e}")
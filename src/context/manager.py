@@ -3,11 +3,19 @@
 
 本模块实现上下文管理器，负责会话管理、上下文维护和状态跟踪。
 支持多会话管理、上下文快照和会话恢复功能。
+
+会话采用"检查点 + 日志"的方式持久化，每条命令的写入量不随会话长度增长：
+- 添加命令和更新命令状态只向会话日志追加增量记录
+- 日志累计 checkpoint_interval 条后保存完整会话（检查点）并清空日志
+- 加载会话时在检查点上重放日志
+- flush_interval 大于 0 时合并该时间内的增量后统一写入
 """
 
 from typing import Optional, List, Dict, Any
 from datetime import datetime, timedelta
+import atexit
 import logging
+import threading
 from pathlib import Path
 
 from .models import (
@@ -32,17 +40,31 @@ class ContextManager:
     提供会话生命周期管理、上下文查询和历史记录功能。
     """
     
-    def __init__(self, storage: Optional[StorageInterface] = None):
+    def __init__(self, storage: Optional[StorageInterface] = None,
+                 flush_interval: float = 0.0, checkpoint_interval: int = 50):
         """初始化上下文管理器
         
         Args:
             storage: 存储接口实例，用于持久化会话数据
+            flush_interval: 会话增量的合并写入间隔（秒），0 表示每次修改立即写入
+            checkpoint_interval: 会话日志累计多少条记录后保存检查点
         """
         self.storage = storage
+        self.flush_interval = flush_interval
+        self.checkpoint_interval = max(1, checkpoint_interval)
         self.current_session: Optional[Session] = None
         self.sessions: Dict[str, Session] = {}  # 会话缓存
         self.user_preferences: Dict[str, UserPreferences] = {}  # 用户偏好缓存
         
+        # 会话持久化状态
+        self._journal_lock = threading.RLock()
+        self._pending_records: Dict[str, List[Dict[str, Any]]] = {}  # 尚未写入的增量
+        self._journal_sizes: Dict[str, int] = {}  # 检查点之后已写入日志的记录数
+        self._flush_timer: Optional[threading.Timer] = None
+        if self.storage is not None and self.flush_interval > 0:
+            # 合并写入时，进程退出前写入尚未持久化的增量
+            atexit.register(self.close)
+        
         logger.info("ContextManager initialized")
     
     # ========================================================================
@@ -74,9 +96,9 @@ class ContextManager:
         
         logger.info(f"Started new session: {session.session_id}")
         
-        # 持久化会话
+        # 持久化会话（新会话的第一个检查点）
         if self.storage:
-            self._save_session(session)
+            self._checkpoint(session)
         
         return session
     
@@ -93,12 +115,16 @@ class ContextManager:
         if session_id in self.sessions:
             return self.sessions[session_id]
         
-        # 从存储加载
+        # 从存储加载：检查点 + 日志
         if self.storage:
             session_data = self.storage.load_session(session_id)
             if session_data:
                 session = Session.from_dict(session_data)
+                journal = self.storage.load_session_journal(session_id)
+                self._replay_journal(session, journal)
                 self.sessions[session_id] = session
+                with self._journal_lock:
+                    self._journal_sizes[session_id] = len(journal)
                 return session
         
         return None
@@ -144,9 +170,9 @@ class ContextManager:
             session.terminate()
             logger.info(f"Terminated session: {session.session_id}")
             
-            # 持久化会话
+            # 持久化会话（合并尚未写入的增量）
             if self.storage:
-                self._save_session(session)
+                self._checkpoint(session)
             
             # 如果是当前会话，清除引用
             if self.current_session and self.current_session.session_id == session.session_id:
@@ -211,9 +237,12 @@ class ContextManager:
         
         logger.debug(f"Added command to session: {command_entry.command_id}")
         
-        # 持久化会话
-        if self.storage:
-            self._save_session(self.current_session)
+        # 持久化增量
+        self._record(self.current_session, {
+            "op": "add_command",
+            "command": command_entry.to_dict(),
+            "last_activity": self.current_session.last_activity.isoformat()
+        })
         
         return command_entry
     
@@ -234,6 +263,7 @@ class ContextManager:
         for cmd in self.current_session.command_history:
             if cmd.command_id == command_id:
                 cmd.status = status
+                fields: Dict[str, Any] = {"status": status.value}
                 
                 # 更新执行结果
                 if result:
@@ -241,12 +271,21 @@ class ContextManager:
                     cmd.error = result.error
                     cmd.return_code = result.return_code
                     cmd.execution_time = result.execution_time
+                    fields.update({
+                        "output": cmd.output,
+                        "error": cmd.error,
+                        "return_code": cmd.return_code,
+                        "execution_time": cmd.execution_time
+                    })
                 
                 logger.debug(f"Updated command status: {command_id} -> {status.value}")
                 
-                # 持久化会话
-                if self.storage:
-                    self._save_session(self.current_session)
+                # 持久化增量
+                self._record(self.current_session, {
+                    "op": "update_command",
+                    "command_id": command_id,
+                    "fields": fields
+                })
                 
                 break
     
@@ -459,18 +498,165 @@ class ContextManager:
             "last_activity": self.current_session.last_activity.isoformat()
         }
     
+    # ========================================================================
+    # 会话持久化
+    # ========================================================================
+    
+    def flush(self, session_id: Optional[str] = None):
+        """立即写入尚未持久化的会话增量
+        
+        Args:
+            session_id: 会话 ID，None 表示写入所有会话
+        """
+        with self._journal_lock:
+            if session_id is None:
+                session_ids = list(self._pending_records)
+            else:
+                session_ids = [session_id]
+            
+            for sid in session_ids:
+                records = self._pending_records.pop(sid, None)
+                session = self.sessions.get(sid)
+                if not records or session is None:
+                    continue
+                
+                if not self.storage.append_session_journal(sid, records):
+                    # 存储不支持日志或追加失败，保存完整会话
+                    self._checkpoint(session)
+                    continue
+                
+                self._journal_sizes[sid] = self._journal_sizes.get(sid, 0) + len(records)
+                if self._journal_sizes[sid] >= self.checkpoint_interval:
+                    self._checkpoint(session)
+    
+    def close(self):
+        """写入全部尚未持久化的增量并停止合并写入定时器"""
+        with self._journal_lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+        if self.storage:
+            self.flush()
+    
+    def _record(self, session: Session, record: Dict[str, Any]):
+        """记录一条会话增量，按 flush_interval 立即或延迟写入
+        
+        同一命令尚未写入的增量会合并为一条记录。
+        
+        Args:
+            session: 会话对象
+            record: 增量记录
+        """
+        if not self.storage:
+            return
+        
+        with self._journal_lock:
+            pending = self._pending_records.setdefault(session.session_id, [])
+            if not self._merge_pending(pending, record):
+                pending.append(record)
+            
+            if self.flush_interval <= 0:
+                self.flush(session.session_id)
+            elif self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.flush_interval, self._on_flush_timer)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+    
+    @staticmethod
+    def _merge_pending(pending: List[Dict[str, Any]], record: Dict[str, Any]) -> bool:
+        """把命令状态更新合并到尚未写入的同一命令的记录中
+        
+        Returns:
+            bool: 是否已合并
+        """
+        if record["op"] != "update_command":
+            return False
+        
+        for previous in reversed(pending):
+            if previous["op"] == "add_command" and previous["command"]["command_id"] == record["command_id"]:
+                previous["command"].update(record["fields"])
+                return True
+            if previous["op"] == "update_command" and previous["command_id"] == record["command_id"]:
+                previous["fields"].update(record["fields"])
+                return True
+        return False
+    
+    def _on_flush_timer(self):
+        """合并写入定时器回调"""
+        with self._journal_lock:
+            self._flush_timer = None
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Failed to flush session journal: {e}")
+    
+    def _checkpoint(self, session: Session):
+        """保存完整会话作为检查点并清空会话日志
+        
+        Args:
+            session: 会话对象
+        """
+        with self._journal_lock:
+            # 检查点已包含尚未写入的增量
+            self._pending_records.pop(session.session_id, None)
+            if self._save_session(session):
+                try:
+                    self.storage.clear_session_journal(session.session_id)
+                    self._journal_sizes[session.session_id] = 0
+                except Exception as e:
+                    logger.error(f"Failed to clear session journal: {e}")
+    
+    @staticmethod
+    def _replay_journal(session: Session, journal: List[Dict[str, Any]]):
+        """在检查点上重放会话日志
+        
+        重放是幂等的：检查点之后未能清除的旧日志再次重放不会改变最终状态。
+        
+        Args:
+            session: 从检查点恢复的会话对象
+            journal: 增量记录列表
+        """
+        commands = {cmd.command_id: index for index, cmd in enumerate(session.command_history)}
+        
+        for record in journal:
+            op = record.get("op")
+            if op == "add_command":
+                entry = CommandEntry.from_dict(record["command"])
+                if entry.command_id in commands:
+                    session.command_history[commands[entry.command_id]] = entry
+                else:
+                    commands[entry.command_id] = len(session.command_history)
+                    session.command_history.append(entry)
+                if record.get("last_activity"):
+                    session.last_activity = datetime.fromisoformat(record["last_activity"])
+            elif op == "update_command":
+                index = commands.get(record.get("command_id"))
+                if index is None:
+                    continue
+                cmd = session.command_history[index]
+                for key, value in record.get("fields", {}).items():
+                    if key == "status":
+                        value = CommandStatus(value)
+                    setattr(cmd, key, value)
+            else:
+                logger.warning(f"Unknown session journal record: {op}")
+    
     # ========================================================================
     # 私有方法
     # ========================================================================
     
-    def _save_session(self, session: Session):
+    def _save_session(self, session: Session) -> bool:
         """保存会话到存储
         
         Args:
             session: 会话对象
+            
+        Returns:
+            bool: 保存是否成功
         """
         if self.storage:
             try:
-                self.storage.save_session(session.to_dict())
+                return self.storage.save_session(session.to_dict()) is not False
             except Exception as e:
                 logger.error(f"Failed to save session: {e}")
+        return False
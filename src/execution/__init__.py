@@ -5,14 +5,27 @@
 - 跨平台 PowerShell 检测和执行
 - 平台适配和命令转换
 - 输出格式化和编码处理
+- 常驻 PowerShell 宿主进程池
+- 流式命令输出
+- 带并发限制和排队的执行调度器
 """
 
 from .executor import CommandExecutor
 from .platform_adapter import PlatformAdapter
 from .output_formatter import OutputFormatter
+from .host_pool import PowerShellHostPool, HostPoolError
+from .output_stream import StreamingExecution, OutputChunk
+from .scheduler import ExecutionScheduler, SchedulerError, SchedulerQueueFull
 
 __all__ = [
     'CommandExecutor',
     'PlatformAdapter',
     'OutputFormatter',
+    'PowerShellHostPool',
+    'HostPoolError',
+    'StreamingExecution',
+    'OutputChunk',
+    'ExecutionScheduler',
+    'SchedulerError',
+    'SchedulerQueueFull',
 ]
@@ -6,6 +6,8 @@
 - 同步和异步命令执行
 - 超时控制和错误处理
 - 执行结果封装
+- 可选的常驻 PowerShell 宿主进程池
+- 流式执行：增量返回输出，超出内存上限的输出写入临时文件
 """
 
 import subprocess
@@ -22,6 +24,8 @@ from ..interfaces.base import (
     ExecutionStatus,
     Context
 )
+from .host_pool import PowerShellHostPool, HostPoolError, HostRequestLostError, HostTimeoutError
+from .output_stream import StreamingExecution
 
 
 class CommandExecutor(ExecutorInterface):
@@ -55,12 +59,41 @@ class CommandExecutor(ExecutorInterface):
         if self.sandbox_enabled:
             from ..security.sandbox import SandboxExecutor
             self._sandbox = SandboxExecutor(config)
+        
+        # 常驻宿主进程池（如果启用）
+        self.host_pool_enabled = config.get('host_pool_enabled', False)
+        self._host_pool = None
+        
+        if self.host_pool_enabled and self.powershell_cmd:
+            self._host_pool = PowerShellHostPool(
+                self.powershell_cmd,
+                size=config.get('host_pool_size', 2),
+                max_commands_per_host=config.get('host_pool_max_commands', 100),
+                max_memory_mb=config.get('host_pool_max_memory_mb', 512)
+            )
+        
+        # 流式执行的输出缓冲配置
+        self.stream_memory_limit = config.get('stream_memory_limit', 1000000)
+        self.stream_chunk_size = config.get('stream_chunk_size', 4096)
+        self.stream_max_pending_chunks = config.get('stream_max_pending_chunks', 64)
     
     @property
     def sandbox(self):
         """获取沙箱执行器"""
         return self._sandbox
     
+    @property
+    def host_pool(self):
+        """获取宿主进程池"""
+        return self._host_pool
+    
+    def close(self) -> None:
+        """释放执行器持有的资源（关闭宿主进程池和沙箱容器池）"""
+        if self._host_pool is not None:
+            self._host_pool.close()
+        if self._sandbox is not None:
+            self._sandbox.close()
+    
     def should_use_sandbox(self, command: str, risk_level=None) -> bool:
         """判断是否应该使用沙箱执行命令
         
@@ -188,6 +221,12 @@ class CommandExecutor(ExecutorInterface):
             result.metadata['executed_in_sandbox'] = True
             return result
         
+        # 使用常驻宿主进程池执行，宿主不可用时回退到独立进程
+        if self._host_pool is not None:
+            pooled_result = self._execute_in_pool(command, timeout, progress_callback)
+            if pooled_result is not None:
+                return pooled_result
+        
         # 正常执行（非沙箱）
         start_time = time.time()
         
@@ -269,6 +308,139 @@ class CommandExecutor(ExecutorInterface):
                 }
             )
     
+    def execute_stream(
+        self,
+        command: str,
+        timeout: Optional[int] = None,
+        risk_level=None
+    ) -> StreamingExecution:
+        """流式执行 PowerShell 命令
+        
+        返回的 StreamingExecution 在迭代时启动进程并逐块返回输出，迭代结束后
+        通过其 result 属性获取 ExecutionResult。每个输出流在内存中最多保留
+        stream_memory_limit 个字符，超出后完整输出写入临时文件（路径见结果元数据
+        output_file / error_file）。
+        
+        流式执行总是使用独立进程；需要沙箱执行的命令和 PowerShell 不可用时
+        退化为一次性返回完整输出。
+        
+        Args:
+            command: 要执行的 PowerShell 命令
+            timeout: 超时时间（秒），如果为 None 则使用默认超时时间
+            risk_level: 命令的风险等级，用于决定是否使用沙箱
+            
+        Returns:
+            StreamingExecution: 可迭代的流式执行对象
+        """
+        if timeout is None:
+            timeout = self.default_timeout
+        
+        if not self.is_available() or self.should_use_sandbox(command, risk_level):
+            return StreamingExecution.from_result(
+                self.execute(command, timeout=timeout, risk_level=risk_level)
+            )
+        
+        return StreamingExecution(
+            [self.powershell_cmd, '-Command', command],
+            command,
+            timeout=timeout,
+            encoding=self.encoding,
+            memory_limit=self.stream_memory_limit,
+            chunk_size=self.stream_chunk_size,
+            max_pending_chunks=self.stream_max_pending_chunks,
+            metadata={
+                'powershell_version': self.powershell_cmd,
+                'platform': self.platform_name,
+                'encoding': self.encoding,
+                'executed_in_sandbox': False
+            }
+        )
+    
+    def _execute_in_pool(
+        self,
+        command: str,
+        timeout: int,
+        progress_callback=None
+    ) -> Optional[ExecutionResult]:
+        """在常驻宿主进程中执行命令
+        
+        Args:
+            command: 要执行的 PowerShell 命令
+            timeout: 超时时间（秒）
+            progress_callback: 进度回调函数
+            
+        Returns:
+            ExecutionResult: 执行结果；命令发送前宿主进程不可用时返回 None，由调用方回退到独立进程执行
+        """
+        start_time = time.time()
+        
+        if progress_callback:
+            progress_callback("执行 PowerShell 命令...")
+        
+        try:
+            pooled = self._host_pool.execute(command, timeout)
+        except HostTimeoutError:
+            return ExecutionResult(
+                success=False,
+                command=command,
+                output="",
+                error=f"命令执行超时 ({timeout} 秒)",
+                return_code=-1,
+                execution_time=time.time() - start_time,
+                status=ExecutionStatus.TIMEOUT,
+                timestamp=datetime.now(),
+                metadata={
+                    'powershell_version': self.powershell_cmd,
+                    'platform': self.platform_name,
+                    'timeout': timeout,
+                    'host_pool': True
+                }
+            )
+        except HostRequestLostError as e:
+            # 命令可能已经执行，不能再交给独立进程重试
+            return ExecutionResult(
+                success=False,
+                command=command,
+                output="",
+                error=f"执行错误: {str(e)}",
+                return_code=-1,
+                execution_time=time.time() - start_time,
+                status=ExecutionStatus.FAILED,
+                timestamp=datetime.now(),
+                metadata={
+                    'powershell_version': self.powershell_cmd,
+                    'platform': self.platform_name,
+                    'host_pool': True
+                }
+            )
+        except HostPoolError:
+            return None
+        
+        execution_time = time.time() - start_time
+        
+        if progress_callback:
+            progress_callback("命令执行完成")
+        
+        return ExecutionResult(
+            success=pooled['return_code'] == 0,
+            command=command,
+            output=pooled['output'],
+            error=pooled['error'],
+            return_code=pooled['return_code'],
+            execution_time=execution_time,
+            status=ExecutionStatus.SUCCESS if pooled['return_code'] == 0 else ExecutionStatus.FAILED,
+            timestamp=datetime.now(),
+            metadata={
+                'powershell_version': self.powershell_cmd,
+                'platform': self.platform_name,
+                'encoding': 'utf-8',
+                'executed_in_sandbox': False,
+                'host_pool': True,
+                'host_pid': pooled['host_pid'],
+                'host_commands': pooled['host_commands']
+            }
+        )
+    
     async def execute_async(self, command: str, timeout: Optional[int] = None) -> ExecutionResult:
         """异步执行 PowerShell 命令
         
@@ -311,6 +483,11 @@ class CommandExecutor(ExecutorInterface):
                     process.communicate(),
                     timeout=timeout
                 )
+            except asyncio.CancelledError:
+                # 调用方取消时终止进程，避免遗留孤儿进程
+                process.kill()
+                await process.wait()
+                raise
             except asyncio.TimeoutError:
                 process.kill()
                 await process.wait()
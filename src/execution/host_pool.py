@@ -0,0 +1,571 @@
+"""
+PowerShell 常驻宿主进程池模块
+
+本模块维护一组长期运行的 PowerShell 进程，避免每条命令都承担 pwsh 的启动开销：
+- 基于 stdin/stdout 的分帧请求/响应协议
+- 每次调用使用独立 Runspace，命令之间互不影响
+- 复用前进行健康检查
+- 执行次数或内存占用超过阈值后自动回收宿主进程
+"""
+
+import base64
+import json
+import queue
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import Optional, List, Dict, Any, Deque
+
+
+# 宿主进程响应帧前缀，不带该前缀的输出行视为命令直接写入控制台的内容
+FRAME_PREFIX = "@@AIPS-FRAME@@"
+
+# 宿主进程引导脚本：逐行读取 JSON 请求，在新 Runspace 中执行后输出一行响应帧
+HOST_BOOTSTRAP_SCRIPT = r"""
+$ErrorActionPreference = 'Continue'
+[Console]::OutputEncoding = [System.Text.Encoding]::UTF8
+$prefix = '@@AIPS-FRAME@@'
+while ($true) {
+    $line = [Console]::In.ReadLine()
+    if ($null -eq $line) { break }
+    if ($line.Trim().Length -eq 0) { continue }
+    $req = $line | ConvertFrom-Json
+    $output = ''
+    $errorText = ''
+    $ok = $true
+    $exitCode = $null
+    $ps = $null
+    try {
+        $cmd = [System.Text.Encoding]::UTF8.GetString([Convert]::FromBase64String($req.command))
+        $ps = [PowerShell]::Create([System.Management.Automation.RunspaceMode]::NewRunspace)
+        [void]$ps.AddScript($cmd).AddCommand('Out-String')
+        $output = -join $ps.Invoke()
+        if ($ps.HadErrors) {
+            $ok = $false
+            $errorText = ($ps.Streams.Error | Out-String)
+        }
+    } catch {
+        $ok = $false
+        $errorText = $_.Exception.Message
+    } finally {
+        if ($null -ne $ps) {
+            if ($null -ne $ps.Runspace) {
+                # 原生命令的退出码和 exit N 都记录在 $LASTEXITCODE 中
+                try { $exitCode = $ps.Runspace.SessionStateProxy.GetVariable('LASTEXITCODE') } catch { }
+                $ps.Runspace.Dispose()
+            }
+            $ps.Dispose()
+        }
+    }
+    $proc = [System.Diagnostics.Process]::GetCurrentProcess()
+    $proc.Refresh()
+    $resp = @{
+        id = $req.id
+        ok = $ok
+        exit_code = $exitCode
+        output = $output
+        error = $errorText
+        memory = $proc.WorkingSet64
+    } | ConvertTo-Json -Compress
+    # stderr 上的结束标记：此前写入 stderr 的内容（原生命令的错误输出）属于本次请求
+    [Console]::Error.WriteLine($prefix + $req.id)
+    [Console]::Error.Flush()
+    [Console]::Out.WriteLine($prefix + $resp)
+    [Console]::Out.Flush()
+}
+"""
+
+
+class HostPoolError(Exception):
+    """宿主进程池错误（宿主无法启动、意外退出或协议错误）"""
+    pass
+
+
+class HostTimeoutError(HostPoolError):
+    """宿主进程执行命令超时"""
+    pass
+
+
+class HostRequestLostError(HostPoolError):
+    """请求已发送给宿主进程，但宿主在返回结果前失败（命令可能已经执行，不能重试）"""
+    pass
+
+
+def build_host_args(powershell_cmd: str, bootstrap_script: str = HOST_BOOTSTRAP_SCRIPT) -> List[str]:
+    """构建启动常驻宿主进程的命令行参数
+
+    引导脚本使用 -EncodedCommand 传入，避免不同平台下的引号转义问题。
+
+    Args:
+        powershell_cmd: PowerShell 命令名称（'pwsh' 或 'powershell'）
+        bootstrap_script: 引导脚本，须遵循相同的分帧协议
+
+    Returns:
+        List[str]: 进程启动参数
+    """
+    encoded = base64.b64encode(bootstrap_script.encode('utf-16-le')).decode('ascii')
+    return [powershell_cmd, '-NoLogo', '-NoProfile', '-NonInteractive', '-EncodedCommand', encoded]
+
+
+class PowerShellHost:
+    """单个常驻 PowerShell 宿主进程
+
+    通过后台线程读取 stdout 和 stderr，将响应帧、普通输出行和错误输出行放入队列，
+    使请求方可以按超时时间等待响应。
+    """
+
+    def __init__(self, args: List[str]):
+        """初始化宿主进程（不会立即启动）
+
+        Args:
+            args: 进程启动参数
+        """
+        self.args = args
+        self.process: Optional[subprocess.Popen] = None
+        self.commands_executed = 0
+        self.memory_bytes = 0
+        self.created_at = time.time()
+        self.last_used = self.created_at
+        self._next_id = 0
+        self._lines: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._error_lines: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._reader: Optional[threading.Thread] = None
+        self._error_reader: Optional[threading.Thread] = None
+
+    @property
+    def pid(self) -> Optional[int]:
+        """宿主进程 PID"""
+        return self.process.pid if self.process else None
+
+    def start(self) -> None:
+        """启动宿主进程
+
+        Raises:
+            HostPoolError: 进程无法启动时
+        """
+        try:
+            self.process = subprocess.Popen(
+                self.args,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                encoding='utf-8',
+                errors='ignore',
+                bufsize=1
+            )
+        except (OSError, ValueError) as e:
+            raise HostPoolError(f"无法启动 PowerShell 宿主进程: {e}")
+
+        self._reader = threading.Thread(
+            target=self._read_pipe, args=(self.process.stdout, self._lines), daemon=True
+        )
+        self._reader.start()
+        self._error_reader = threading.Thread(
+            target=self._read_pipe, args=(self.process.stderr, self._error_lines), daemon=True
+        )
+        self._error_reader.start()
+
+    @staticmethod
+    def _read_pipe(pipe, lines: "queue.Queue[Optional[str]]") -> None:
+        """后台读取宿主进程的一个输出管道，进程退出时放入 None 作为结束标记"""
+        try:
+            for line in pipe:
+                lines.put(line)
+        except (OSError, ValueError):
+            pass
+        finally:
+            lines.put(None)
+
+    def is_alive(self) -> bool:
+        """检查宿主进程是否仍在运行"""
+        return self.process is not None and self.process.poll() is None
+
+    def request(self, command: str, timeout: float) -> Dict[str, Any]:
+        """在宿主进程中执行一条命令
+
+        Args:
+            command: PowerShell 命令
+            timeout: 超时时间（秒）
+
+        Returns:
+            Dict[str, Any]: 响应，包含 ok、exit_code、output、error、memory
+
+        Raises:
+            HostTimeoutError: 超时未收到响应
+            HostRequestLostError: 请求发送后宿主进程退出或响应无法解析
+            HostPoolError: 宿主进程未运行或请求无法发送
+        """
+        if not self.is_alive():
+            raise HostPoolError("PowerShell 宿主进程未运行")
+
+        self._next_id += 1
+        request_id = self._next_id
+        payload = json.dumps({
+            'id': request_id,
+            'command': base64.b64encode(command.encode('utf-8')).decode('ascii')
+        })
+
+        try:
+            self.process.stdin.write(payload + '\n')
+            self.process.stdin.flush()
+        except (OSError, ValueError) as e:
+            raise HostPoolError(f"向 PowerShell 宿主进程写入请求失败: {e}")
+
+        deadline = time.monotonic() + timeout
+        stray_lines = []
+
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise HostTimeoutError(f"命令执行超时 ({timeout} 秒)")
+            try:
+                line = self._lines.get(timeout=remaining)
+            except queue.Empty:
+                raise HostTimeoutError(f"命令执行超时 ({timeout} 秒)")
+
+            if line is None:
+                raise HostRequestLostError("PowerShell 宿主进程在返回结果前意外退出")
+
+            if not line.startswith(FRAME_PREFIX):
+                # 命令绕过管道直接写入控制台的内容
+                stray_lines.append(line)
+                continue
+
+            try:
+                response = json.loads(line[len(FRAME_PREFIX):])
+            except json.JSONDecodeError as e:
+                raise HostRequestLostError(f"无法解析宿主进程响应: {e}")
+
+            if response.get('id') != request_id:
+                # 之前超时请求的迟到响应，丢弃
+                stray_lines.clear()
+                continue
+
+            break
+
+        self.commands_executed += 1
+        self.last_used = time.time()
+        self.memory_bytes = int(response.get('memory') or 0)
+
+        output = response.get('output') or ''
+        if stray_lines:
+            output = ''.join(stray_lines) + output
+
+        error = response.get('error') or ''
+        native_error = self._collect_stderr(request_id, deadline)
+        if native_error:
+            error = native_error + error
+
+        exit_code = response.get('exit_code')
+
+        return {
+            'ok': bool(response.get('ok')),
+            'exit_code': int(exit_code) if isinstance(exit_code, (int, float)) else None,
+            'output': output,
+            'error': error,
+            'memory': self.memory_bytes
+        }
+
+    def _collect_stderr(self, request_id: int, deadline: float) -> str:
+        """收集本次请求期间写入 stderr 的内容（直到宿主写出该请求的结束标记）
+
+        Args:
+            request_id: 请求 ID
+            deadline: 等待结束标记的截止时间（time.monotonic）
+
+        Returns:
+            str: 错误输出，等待超时或宿主退出时返回已收到的部分
+        """
+        marker = f"{FRAME_PREFIX}{request_id}"
+        collected: List[str] = []
+
+        while True:
+            try:
+                line = self._error_lines.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+
+            if line is None:
+                # 保留结束标记，后续请求同样能发现宿主已退出
+                self._error_lines.put(None)
+                break
+
+            if line.startswith(FRAME_PREFIX):
+                if line.rstrip('\r\n') == marker:
+                    break
+                # 之前超时请求的结束标记，之前的内容不属于本次请求
+                collected.clear()
+                continue
+
+            collected.append(line)
+
+        return ''.join(collected)
+
+    def ping(self, timeout: float = 5) -> bool:
+        """健康检查：执行一条空命令并确认宿主进程能正常响应
+
+        Args:
+            timeout: 超时时间（秒）
+
+        Returns:
+            bool: 宿主进程是否健康
+        """
+        try:
+            return bool(self.request('$true', timeout)['ok'])
+        except HostPoolError:
+            return False
+
+    def close(self) -> None:
+        """关闭宿主进程"""
+        if self.process is None:
+            return
+
+        try:
+            if self.process.stdin:
+                self.process.stdin.close()
+        except (OSError, ValueError):
+            pass
+
+        if self.process.poll() is None:
+            try:
+                self.process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                try:
+                    self.process.wait(timeout=2)
+                except subprocess.TimeoutExpired:
+                    pass
+
+
+class PowerShellHostPool:
+    """常驻 PowerShell 宿主进程池
+
+    线程安全。宿主进程按需创建，最多同时存在 size 个；
+    调用方通过 execute 借用空闲宿主执行命令，完成后自动归还或回收。
+    """
+
+    def __init__(
+        self,
+        powershell_cmd: str,
+        size: int = 2,
+        max_commands_per_host: int = 100,
+        max_memory_mb: int = 512,
+        health_check_interval: float = 60,
+        host_args: Optional[List[str]] = None
+    ):
+        """初始化宿主进程池
+
+        Args:
+            powershell_cmd: PowerShell 命令名称（'pwsh' 或 'powershell'）
+            size: 最大宿主进程数量
+            max_commands_per_host: 单个宿主执行多少条命令后回收（0 表示不限制）
+            max_memory_mb: 单个宿主内存占用超过该值（MB）后回收（0 表示不限制）
+            health_check_interval: 宿主空闲超过该时间（秒）后，复用前先执行健康检查
+            host_args: 自定义宿主启动参数，默认使用内置引导脚本
+        """
+        self.powershell_cmd = powershell_cmd
+        self.size = max(1, size)
+        self.max_commands_per_host = max_commands_per_host
+        self.max_memory_mb = max_memory_mb
+        self.health_check_interval = health_check_interval
+        self.host_args = host_args or build_host_args(powershell_cmd)
+
+        self._idle: Deque[PowerShellHost] = deque()
+        self._live_count = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self._stats = {
+            'hosts_started': 0,
+            'hosts_recycled': 0,
+            'hosts_failed': 0,
+            'reuses': 0,
+            'health_checks': 0,
+            'commands': 0,
+            'timeouts': 0,
+        }
+
+    def _count(self, key: str) -> None:
+        """线程安全地递增统计计数"""
+        with self._cond:
+            self._stats[key] += 1
+
+    def _spawn(self) -> PowerShellHost:
+        """创建并启动一个新的宿主进程"""
+        host = PowerShellHost(self.host_args)
+        host.start()
+        self._count('hosts_started')
+        return host
+
+    def _is_healthy(self, host: PowerShellHost) -> bool:
+        """判断空闲宿主是否可以复用"""
+        if not host.is_alive():
+            return False
+        if time.time() - host.last_used < self.health_check_interval:
+            return True
+        self._count('health_checks')
+        return host.ping()
+
+    def _should_recycle(self, host: PowerShellHost) -> bool:
+        """判断宿主是否达到回收条件"""
+        if self.max_commands_per_host and host.commands_executed >= self.max_commands_per_host:
+            return True
+        if self.max_memory_mb and host.memory_bytes > self.max_memory_mb * 1024 * 1024:
+            return True
+        return False
+
+    def _discard(self, host: PowerShellHost) -> None:
+        """关闭宿主并释放其占用的名额"""
+        host.close()
+        with self._cond:
+            self._live_count -= 1
+            self._cond.notify()
+
+    def acquire(self, timeout: float = 30) -> PowerShellHost:
+        """借用一个健康的宿主进程
+
+        Args:
+            timeout: 等待空闲宿主的超时时间（秒）
+
+        Returns:
+            PowerShellHost: 可用的宿主进程
+
+        Raises:
+            HostPoolError: 进程池已关闭、等待超时或宿主无法启动
+        """
+        deadline = time.monotonic() + timeout
+
+        while True:
+            candidate = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise HostPoolError("PowerShell 宿主进程池已关闭")
+                    if self._idle:
+                        candidate = self._idle.popleft()
+                        break
+                    if self._live_count < self.size:
+                        self._live_count += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise HostPoolError("等待空闲 PowerShell 宿主进程超时")
+                    self._cond.wait(remaining)
+
+            if candidate is None:
+                try:
+                    return self._spawn()
+                except HostPoolError:
+                    with self._cond:
+                        self._live_count -= 1
+                        self._count('hosts_failed')
+                        self._cond.notify()
+                    raise
+
+            if self._is_healthy(candidate):
+                self._count('reuses')
+                return candidate
+
+            self._count('hosts_failed')
+            self._discard(candidate)
+
+    def release(self, host: PowerShellHost, discard: bool = False) -> None:
+        """归还宿主进程
+
+        Args:
+            host: 宿主进程
+            discard: 是否直接丢弃（例如执行超时后宿主状态未知）
+        """
+        if discard or self._closed or not host.is_alive():
+            self._discard(host)
+            return
+
+        if self._should_recycle(host):
+            self._count('hosts_recycled')
+            self._discard(host)
+            return
+
+        with self._cond:
+            self._idle.append(host)
+            self._cond.notify()
+
+    def execute(self, command: str, timeout: float) -> Dict[str, Any]:
+        """借用宿主执行一条命令
+
+        Args:
+            command: PowerShell 命令
+            timeout: 超时时间（秒），包括等待空闲宿主的时间
+
+        Returns:
+            Dict[str, Any]: 执行结果，包含 output、error、return_code、host_pid、host_commands
+
+        Raises:
+            HostTimeoutError: 执行超时（对应宿主会被终止）
+            HostRequestLostError: 命令已发送但宿主在返回结果前失败
+            HostPoolError: 没有可用宿主或请求无法发送
+        """
+        deadline = time.monotonic() + timeout
+        host = self.acquire(timeout)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            # 命令尚未发送，宿主仍然可以复用
+            self.release(host)
+            self._count('timeouts')
+            raise HostTimeoutError(f"等待 PowerShell 宿主进程用完了全部超时时间 ({timeout} 秒)")
+
+        discard = False
+        try:
+            response = host.request(command, remaining)
+        except HostTimeoutError:
+            self._count('timeouts')
+            discard = True
+            if host.process is not None:
+                host.process.kill()
+            raise
+        except HostPoolError:
+            self._count('hosts_failed')
+            discard = True
+            raise
+        finally:
+            self.release(host, discard=discard)
+
+        self._count('commands')
+
+        # 与 pwsh -Command 一致：优先使用 $LASTEXITCODE，否则按是否出错返回 1/0
+        return_code = response['exit_code']
+        if not return_code:
+            return_code = 0 if response['ok'] else 1
+
+        return {
+            'output': response['output'],
+            'error': response['error'],
+            'return_code': return_code,
+            'host_pid': host.pid,
+            'host_commands': host.commands_executed
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取进程池统计信息
+
+        Returns:
+            Dict[str, Any]: 统计信息
+        """
+        with self._cond:
+            stats = dict(self._stats)
+            stats['size'] = self.size
+            stats['live_hosts'] = self._live_count
+            stats['idle_hosts'] = len(self._idle)
+        return stats
+
+    def close(self) -> None:
+        """关闭进程池及所有空闲宿主进程"""
+        with self._cond:
+            self._closed = True
+            hosts = list(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+
+        for host in hosts:
+            self._discard(host)
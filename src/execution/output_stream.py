@@ -0,0 +1,358 @@
+"""
+流式命令输出模块
+
+本模块实现命令输出的增量读取，避免长时间运行、输出量很大的命令
+（如 Get-ChildItem -Recurse）在进程退出前把全部输出缓存在内存中：
+- 后台线程按块读取 stdout/stderr，调用方通过迭代逐块获得输出
+- 有界队列提供反压：调用方消费变慢时读取线程阻塞，子进程随之在管道写满后阻塞
+- 每个输出流在内存中最多保留 memory_limit 个字符，超出部分写入临时文件
+"""
+
+import codecs
+import os
+import queue
+import subprocess
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import IO, Any, Dict, Iterator, List, Optional
+
+from ..interfaces.base import ExecutionResult, ExecutionStatus
+
+
+@dataclass
+class OutputChunk:
+    """一块命令输出"""
+    stream: str     # 输出流: stdout 或 stderr
+    text: str       # 输出文本
+    sequence: int   # 在本次执行中的序号（按调用方收到的顺序）
+
+
+class SpillBuffer:
+    """溢出到临时文件的输出缓冲区
+    
+    内存中最多保留前 memory_limit 个字符；超出后把全部内容写入临时文件，
+    后续输出只追加到文件中。
+    """
+    
+    def __init__(self, memory_limit: int, prefix: str = "aips-output-"):
+        """
+        Args:
+            memory_limit: 内存中保留的最大字符数
+            prefix: 临时文件名前缀
+        """
+        self.memory_limit = memory_limit
+        self.prefix = prefix
+        self.size = 0
+        self._parts: List[str] = []
+        self._memory_size = 0
+        self._file: Optional[IO[str]] = None
+        self.path: Optional[str] = None
+    
+    @property
+    def spilled(self) -> bool:
+        """是否已溢出到临时文件"""
+        return self.path is not None
+    
+    def write(self, text: str) -> None:
+        """追加输出
+        
+        Args:
+            text: 输出文本
+        """
+        self.size += len(text)
+        
+        if self._file is None and self._memory_size + len(text) > self.memory_limit:
+            self._file = tempfile.NamedTemporaryFile(
+                mode='w', encoding='utf-8', prefix=self.prefix, suffix='.log', delete=False
+            )
+            self.path = self._file.name
+            for part in self._parts:
+                self._file.write(part)
+        
+        if self._file is not None:
+            self._file.write(text)
+        
+        # 内存中只保留开头部分
+        room = self.memory_limit - self._memory_size
+        if room > 0:
+            kept = text[:room]
+            self._parts.append(kept)
+            self._memory_size += len(kept)
+    
+    def getvalue(self) -> str:
+        """获取内存中保留的内容（溢出时为开头部分）"""
+        return ''.join(self._parts)
+    
+    def close(self) -> None:
+        """关闭临时文件（文件本身保留）"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+    
+    def remove(self) -> None:
+        """关闭并删除临时文件"""
+        self.close()
+        if self.path is not None:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+class StreamingExecution:
+    """一次流式执行
+    
+    迭代时启动子进程并逐块返回 OutputChunk，迭代结束后可通过 result 获取
+    ExecutionResult。只能迭代一次；提前停止迭代（break 或关闭迭代器）会终止子进程。
+    
+    Example:
+        stream = executor.execute_stream("Get-ChildItem -Recurse")
+        for chunk in stream:
+            print(chunk.text, end='')
+        print(stream.result.return_code)
+    """
+    
+    def __init__(
+        self,
+        args: List[str],
+        command: str,
+        timeout: float,
+        encoding: str = 'utf-8',
+        memory_limit: int = 1000000,
+        chunk_size: int = 4096,
+        max_pending_chunks: int = 64,
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Args:
+            args: 子进程参数
+            command: 原始命令（用于结果）
+            timeout: 超时时间（秒）
+            encoding: 子进程输出编码
+            memory_limit: 每个输出流在内存中保留的最大字符数
+            chunk_size: 每次从管道读取的最大字节数
+            max_pending_chunks: 尚未被消费的输出块上限，达到后暂停读取
+            metadata: 附加到结果中的元数据
+        """
+        self.args = args
+        self.command = command
+        self.timeout = timeout
+        self.encoding = encoding
+        self.chunk_size = chunk_size
+        self.metadata = dict(metadata or {})
+        
+        self.stdout = SpillBuffer(memory_limit, prefix="aips-stdout-")
+        self.stderr = SpillBuffer(memory_limit, prefix="aips-stderr-")
+        self.result: Optional[ExecutionResult] = None
+        
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, max_pending_chunks))
+        self._stopped = threading.Event()
+        self._cancelled = threading.Event()
+        self._started = False
+        self._process: Optional[subprocess.Popen] = None
+        self._readers: List[threading.Thread] = []
+    
+    @classmethod
+    def from_result(cls, result: ExecutionResult) -> 'StreamingExecution':
+        """用已完成的执行结果构造流（用于沙箱等不支持增量输出的执行方式）
+        
+        迭代时依次返回完整的 stdout 和 stderr 各一块。
+        """
+        stream = cls([], result.command, timeout=0)
+        stream.result = result
+        return stream
+    
+    @property
+    def cancelled(self) -> bool:
+        """是否已被取消"""
+        return self._cancelled.is_set()
+    
+    def cancel(self) -> None:
+        """取消执行（线程安全），正在进行的迭代会在下一次检查时结束"""
+        self._cancelled.set()
+    
+    def _put(self, item) -> None:
+        """放入输出队列，队列已满时等待（反压），停止后丢弃"""
+        while not self._stopped.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+    
+    def _pump(self, pipe, name: str) -> None:
+        """读取线程：按块读取管道并增量解码"""
+        decoder = codecs.getincrementaldecoder(self.encoding)(errors='ignore')
+        try:
+            while not self._stopped.is_set():
+                data = pipe.read1(self.chunk_size)
+                if not data:
+                    break
+                text = decoder.decode(data)
+                if text:
+                    self._put((name, text))
+            tail = decoder.decode(b'', final=True)
+            if tail:
+                self._put((name, tail))
+        except (OSError, ValueError):
+            pass
+        finally:
+            self._put(None)
+    
+    def _start(self) -> None:
+        """启动子进程和读取线程"""
+        self._process = subprocess.Popen(
+            self.args,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+        for pipe, name in ((self._process.stdout, 'stdout'), (self._process.stderr, 'stderr')):
+            reader = threading.Thread(target=self._pump, args=(pipe, name), daemon=True)
+            reader.start()
+            self._readers.append(reader)
+    
+    def __iter__(self) -> Iterator[OutputChunk]:
+        if self._started:
+            raise RuntimeError("StreamingExecution 只能迭代一次")
+        self._started = True
+        
+        if self.result is not None:
+            yield from self._replay()
+            return
+        
+        start_time = time.time()
+        sequence = 0
+        open_streams = 2
+        status = None
+        
+        try:
+            self._start()
+        except Exception as e:
+            self.result = self._build_result(
+                ExecutionStatus.FAILED, -1, start_time, error=f"执行错误: {str(e)}",
+                extra={'exception': type(e).__name__}
+            )
+            return
+        
+        try:
+            deadline = start_time + self.timeout
+            while open_streams:
+                if self._cancelled.is_set():
+                    status = ExecutionStatus.CANCELLED
+                    break
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    status = ExecutionStatus.TIMEOUT
+                    break
+                try:
+                    item = self._queue.get(timeout=min(remaining, 0.1))
+                except queue.Empty:
+                    continue
+                if item is None:
+                    open_streams -= 1
+                    continue
+                
+                name, text = item
+                (self.stdout if name == 'stdout' else self.stderr).write(text)
+                yield OutputChunk(stream=name, text=text, sequence=sequence)
+                sequence += 1
+        except GeneratorExit:
+            status = ExecutionStatus.CANCELLED
+            raise
+        finally:
+            self._finish(status, start_time)
+    
+    def _replay(self) -> Iterator[OutputChunk]:
+        """迭代预先完成的结果"""
+        sequence = 0
+        for name, text in (('stdout', self.result.output), ('stderr', self.result.error)):
+            if text:
+                yield OutputChunk(stream=name, text=text, sequence=sequence)
+                sequence += 1
+    
+    def _finish(self, status: Optional[ExecutionStatus], start_time: float) -> None:
+        """结束子进程并构建结果"""
+        process = self._process
+        if status is not None and process.poll() is None:
+            process.kill()
+        
+        try:
+            return_code = process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            return_code = process.wait()
+        
+        self._stopped.set()
+        for reader in self._readers:
+            reader.join(timeout=1)
+        for pipe in (process.stdout, process.stderr):
+            try:
+                pipe.close()
+            except Exception:
+                pass
+        self.stdout.close()
+        self.stderr.close()
+        
+        if status == ExecutionStatus.TIMEOUT:
+            self.result = self._build_result(
+                status, -1, start_time, error=f"命令执行超时 ({self.timeout} 秒)",
+                extra={'timeout': self.timeout}
+            )
+        elif status == ExecutionStatus.CANCELLED:
+            self.result = self._build_result(status, -1, start_time, error="命令执行已取消")
+        else:
+            status = ExecutionStatus.SUCCESS if return_code == 0 else ExecutionStatus.FAILED
+            self.result = self._build_result(status, return_code, start_time)
+    
+    def _build_result(
+        self,
+        status: ExecutionStatus,
+        return_code: int,
+        start_time: float,
+        error: Optional[str] = None,
+        extra: Optional[Dict[str, Any]] = None
+    ) -> ExecutionResult:
+        """构建执行结果，溢出的输出在元数据中给出临时文件路径"""
+        metadata = dict(self.metadata)
+        metadata.update({
+            'streamed': True,
+            'output_size': self.stdout.size,
+            'error_size': self.stderr.size,
+            'output_truncated': self.stdout.spilled,
+            'error_truncated': self.stderr.spilled,
+            'output_file': self.stdout.path,
+            'error_file': self.stderr.path
+        })
+        metadata.update(extra or {})
+        
+        stderr_text = self.stderr.getvalue()
+        if error:
+            stderr_text = f"{stderr_text}\n{error}" if stderr_text else error
+        
+        return ExecutionResult(
+            success=status == ExecutionStatus.SUCCESS,
+            command=self.command,
+            output=self.stdout.getvalue(),
+            error=stderr_text,
+            return_code=return_code,
+            execution_time=time.time() - start_time,
+            status=status,
+            timestamp=datetime.now(),
+            metadata=metadata
+        )
+    
+    def wait(self) -> ExecutionResult:
+        """消费全部输出并返回执行结果"""
+        if not self._started:
+            for _ in self:
+                pass
+        return self.result
+    
+    def remove_spill_files(self) -> None:
+        """删除溢出的临时文件（调用方已经通过迭代拿到全部输出时使用）"""
+        self.stdout.remove()
+        self.stderr.remove()
@@ -0,0 +1,525 @@
+"""
+命令执行调度器模块
+
+在 CommandExecutor 之上限制同时运行的 PowerShell 命令数量：
+- 全局并发上限和每个会话的并发上限
+- 有界优先级队列（同优先级先进先出），队列已满时拒绝新请求
+- 排队等待时间写入 ExecutionResult.metadata
+- 支持取消排队中或正在执行的命令
+- 流式执行等自定义任务也可以通过 submit_call 占用执行槽位
+
+调度器在独立线程的事件循环中运行，同步调用方（如 Web 请求处理线程）和
+异步调用方都可以提交命令。使用宿主进程池或沙箱的命令通过同步接口在
+调度器自己的线程池中执行，其余命令使用 execute_async。
+"""
+
+import asyncio
+import concurrent.futures
+import heapq
+import itertools
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from ..interfaces.base import ExecutionResult, ExecutionStatus
+
+
+class SchedulerError(Exception):
+    """调度器错误（调度器已关闭）"""
+    pass
+
+
+class SchedulerQueueFull(SchedulerError):
+    """等待队列已满"""
+    pass
+
+
+class ScheduledExecution:
+    """一条已提交的命令"""
+    
+    def __init__(
+        self,
+        execution_id: str,
+        command: str,
+        session_id: Optional[str],
+        timeout: Optional[int],
+        risk_level,
+        priority: int,
+        func: Optional[Callable[[], ExecutionResult]] = None,
+        on_cancel: Optional[Callable[[], None]] = None
+    ):
+        self.id = execution_id
+        self.command = command
+        self.session_id = session_id
+        self.timeout = timeout
+        self.risk_level = risk_level
+        self.priority = priority
+        self.func = func  # 自定义任务（submit_call），None 表示执行 command
+        self.on_cancel = on_cancel
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.state = 'queued'  # queued / running / done
+        self.future: "concurrent.futures.Future[ExecutionResult]" = concurrent.futures.Future()
+        self.task: Optional[asyncio.Task] = None
+        self.cancel_requested = False
+    
+    @property
+    def queue_wait(self) -> float:
+        """排队等待时间（秒）"""
+        return (self.started_at or time.time()) - self.submitted_at
+    
+    def result(self, timeout: Optional[float] = None) -> ExecutionResult:
+        """等待并获取执行结果
+        
+        Args:
+            timeout: 最长等待时间（秒），None 表示一直等待
+        """
+        return self.future.result(timeout)
+
+
+class ExecutionScheduler:
+    """命令执行调度器
+    
+    同时运行的命令不超过 max_concurrent 条，同一会话不超过 max_per_session 条；
+    其余命令按优先级（数值大者优先）和提交顺序排队。某个会话已达上限时，
+    排在其后的其他会话的命令可以先执行。
+    """
+    
+    def __init__(
+        self,
+        executor,
+        max_concurrent: int = 4,
+        max_per_session: int = 2,
+        max_queue_size: int = 64,
+        max_queue_wait: float = 0
+    ):
+        """初始化调度器（事件循环线程在首次提交时启动）
+        
+        Args:
+            executor: CommandExecutor 实例
+            max_concurrent: 全局最大并发执行数
+            max_per_session: 每个会话的最大并发执行数（0 表示只受全局限制）
+            max_queue_size: 等待队列的最大长度
+            max_queue_wait: 最长排队时间（秒），超过后放弃执行并返回超时结果，0 表示不限制
+        """
+        self.executor = executor
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_per_session = max(0, int(max_per_session))
+        self.max_queue_size = max(0, int(max_queue_size))
+        self.max_queue_wait = max(0.0, float(max_queue_wait))
+        
+        self._lock = threading.Lock()
+        self._queue: List = []  # 堆：(-priority, 序号, ScheduledExecution)
+        self._counter = itertools.count()
+        self._jobs: Dict[str, ScheduledExecution] = {}
+        self._running_per_session: Dict[Optional[str], int] = {}
+        self._running = 0
+        self._closed = False
+        
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        # 同步执行的线程池：每个执行槽位一个线程
+        self._pool: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        
+        self._stats = {
+            'submitted': 0,
+            'completed': 0,
+            'cancelled': 0,
+            'rejected': 0,
+            'queue_timeouts': 0,
+            'queued_total': 0,
+            'total_queue_wait': 0.0,
+            'max_queue_wait': 0.0,
+        }
+    
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """启动调度器的事件循环线程（调用方持有锁）"""
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(
+                target=self._loop.run_forever, name="execution-scheduler", daemon=True
+            )
+            self._thread.start()
+            self._pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.max_concurrent, thread_name_prefix="scheduled-execution"
+            )
+        return self._loop
+    
+    def set_executor(self, executor) -> None:
+        """切换执行器（配置变更后重建执行器时调用）
+        
+        之后启动的命令使用新的执行器，已经在执行的命令不受影响。
+        
+        Args:
+            executor: 新的 CommandExecutor 实例
+        """
+        with self._lock:
+            self.executor = executor
+    
+    def submit(
+        self,
+        command: str,
+        session_id: Optional[str] = None,
+        timeout: Optional[int] = None,
+        risk_level=None,
+        priority: int = 0
+    ) -> ScheduledExecution:
+        """提交命令（线程安全，立即返回）
+        
+        Args:
+            command: 要执行的 PowerShell 命令
+            session_id: 会话 ID，用于每会话并发限制
+            timeout: 执行超时时间（秒），不包括排队时间
+            risk_level: 命令的风险等级，用于决定是否使用沙箱
+            priority: 优先级，数值大者优先
+            
+        Returns:
+            ScheduledExecution: 已提交的命令，通过 result() 获取结果
+            
+        Raises:
+            SchedulerQueueFull: 等待队列已满
+            SchedulerError: 调度器已关闭
+        """
+        return self._enqueue(command, session_id, timeout, risk_level, priority)
+    
+    def submit_call(
+        self,
+        func: Callable[[], ExecutionResult],
+        command: str = "",
+        session_id: Optional[str] = None,
+        priority: int = 0,
+        on_cancel: Optional[Callable[[], None]] = None
+    ) -> ScheduledExecution:
+        """提交自定义任务（如流式执行），与普通命令共用并发限制和等待队列
+        
+        任务在调度器的线程池中运行。取消正在运行的任务时调用 on_cancel，
+        由任务自行尽快结束；任务结束后才释放执行槽位。
+        
+        Args:
+            func: 无参数函数，返回 ExecutionResult
+            command: 任务对应的命令（用于结果和日志）
+            session_id: 会话 ID，用于每会话并发限制
+            priority: 优先级，数值大者优先
+            on_cancel: 取消正在运行的任务时调用（在事件循环线程中）
+            
+        Returns:
+            ScheduledExecution: 已提交的任务，通过 result() 获取结果
+            
+        Raises:
+            SchedulerQueueFull: 等待队列已满
+            SchedulerError: 调度器已关闭
+        """
+        return self._enqueue(command, session_id, None, None, priority, func, on_cancel)
+    
+    def _enqueue(
+        self,
+        command: str,
+        session_id: Optional[str],
+        timeout: Optional[int],
+        risk_level,
+        priority: int,
+        func: Optional[Callable[[], ExecutionResult]] = None,
+        on_cancel: Optional[Callable[[], None]] = None
+    ) -> ScheduledExecution:
+        """加入等待队列并触发调度"""
+        with self._lock:
+            if self._closed:
+                raise SchedulerError("执行调度器已关闭")
+            
+            # 队列中包括因会话上限而无法启动的命令，不论是否有空闲槽位都按长度限制
+            if len(self._queue) >= self.max_queue_size:
+                self._stats['rejected'] += 1
+                raise SchedulerQueueFull(
+                    f"执行队列已满（{self.max_queue_size} 条命令等待中），请稍后重试"
+                )
+            
+            job = ScheduledExecution(
+                f"exec_{next(self._counter)}", command, session_id, timeout, risk_level, priority,
+                func=func, on_cancel=on_cancel
+            )
+            heapq.heappush(self._queue, (-priority, next(self._counter), job))
+            self._jobs[job.id] = job
+            self._stats['submitted'] += 1
+            loop = self._ensure_loop()
+        
+        loop.call_soon_threadsafe(self._dispatch)
+        if self.max_queue_wait:
+            loop.call_soon_threadsafe(loop.call_later, self.max_queue_wait, self._dispatch)
+        return job
+    
+    def execute(
+        self,
+        command: str,
+        session_id: Optional[str] = None,
+        timeout: Optional[int] = None,
+        risk_level=None,
+        priority: int = 0
+    ) -> ExecutionResult:
+        """提交命令并阻塞等待结果（参数同 submit）
+        
+        Raises:
+            SchedulerQueueFull: 等待队列已满
+        """
+        return self.submit(command, session_id, timeout, risk_level, priority).result()
+    
+    async def execute_async(
+        self,
+        command: str,
+        session_id: Optional[str] = None,
+        timeout: Optional[int] = None,
+        risk_level=None,
+        priority: int = 0
+    ) -> ExecutionResult:
+        """提交命令并异步等待结果（参数同 submit）
+        
+        Raises:
+            SchedulerQueueFull: 等待队列已满
+        """
+        job = self.submit(command, session_id, timeout, risk_level, priority)
+        return await asyncio.wrap_future(job.future)
+    
+    def _session_has_room(self, session_id: Optional[str]) -> bool:
+        """会话是否还能启动新的执行（调用方持有锁）"""
+        if not self.max_per_session or session_id is None:
+            return True
+        return self._running_per_session.get(session_id, 0) < self.max_per_session
+    
+    def _dispatch(self) -> None:
+        """在事件循环线程中启动可以执行的命令，并处理排队超时"""
+        expired = []
+        with self._lock:
+            if self.max_queue_wait:
+                now = time.time()
+                kept = []
+                for entry in self._queue:
+                    if now - entry[2].submitted_at >= self.max_queue_wait:
+                        expired.append(entry[2])
+                    else:
+                        kept.append(entry)
+                if expired:
+                    self._queue = kept
+                    heapq.heapify(self._queue)
+                    self._stats['queue_timeouts'] += len(expired)
+            
+            started = []
+            if self._running < self.max_concurrent and self._queue:
+                for entry in sorted(self._queue):
+                    if self._running >= self.max_concurrent:
+                        break
+                    job = entry[2]
+                    if not self._session_has_room(job.session_id):
+                        continue
+                    started.append(entry)
+                    self._running += 1
+                    self._running_per_session[job.session_id] = \
+                        self._running_per_session.get(job.session_id, 0) + 1
+                    job.state = 'running'
+                    job.started_at = time.time()
+                if started:
+                    for entry in started:
+                        self._queue.remove(entry)
+                    heapq.heapify(self._queue)
+        
+        for job in expired:
+            self._finish(job, self._build_result(
+                job, ExecutionStatus.TIMEOUT,
+                f"排队超时：等待 {self.max_queue_wait} 秒后仍没有可用的执行槽位"
+            ))
+        
+        for entry in started:
+            job = entry[2]
+            job.task = self._loop.create_task(self._run(job))
+    
+    async def _run(self, job: ScheduledExecution) -> None:
+        """执行一条命令，结束后释放槽位并继续调度"""
+        error: Optional[BaseException] = None
+        result = None
+        try:
+            if job.cancel_requested:
+                raise asyncio.CancelledError()
+            executor = self.executor
+            if job.func is not None:
+                result = await self._run_in_thread(job, job.func)
+            elif getattr(executor, 'host_pool', None) is not None or \
+                    executor.should_use_sandbox(job.command, job.risk_level):
+                # 宿主进程池和沙箱只有同步接口
+                result = await self._run_in_thread(
+                    job,
+                    lambda: executor.execute(job.command, timeout=job.timeout, risk_level=job.risk_level)
+                )
+            else:
+                result = await executor.execute_async(job.command, timeout=job.timeout)
+        except asyncio.CancelledError:
+            result = self._build_result(job, ExecutionStatus.CANCELLED, "命令执行已取消")
+        except Exception as e:
+            # 执行器本身会把执行失败转换为结果，这里的异常交给调用方处理
+            error = e
+        
+        with self._lock:
+            self._running -= 1
+            remaining = self._running_per_session.get(job.session_id, 1) - 1
+            if remaining > 0:
+                self._running_per_session[job.session_id] = remaining
+            else:
+                self._running_per_session.pop(job.session_id, None)
+        
+        self._finish(job, result, error)
+        self._dispatch()
+    
+    async def _run_in_thread(self, job: ScheduledExecution, func: Callable[[], ExecutionResult]) -> ExecutionResult:
+        """在线程池中运行同步任务
+        
+        线程无法被中断：取消时调用 job.on_cancel 并等待线程结束，
+        保证取消后执行槽位仍然被占用到任务真正结束。
+        """
+        future = self._loop.run_in_executor(self._pool, func)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if job.on_cancel is not None:
+                try:
+                    job.on_cancel()
+                except Exception:
+                    pass
+            await asyncio.wait([future])
+            raise
+    
+    def _build_result(self, job: ScheduledExecution, status: ExecutionStatus, error: str) -> ExecutionResult:
+        """构建未能正常执行的命令的结果"""
+        return ExecutionResult(
+            success=False,
+            command=job.command,
+            output="",
+            error=error,
+            return_code=-1,
+            status=status,
+            timestamp=datetime.now()
+        )
+    
+    def _finish(
+        self,
+        job: ScheduledExecution,
+        result: Optional[ExecutionResult],
+        error: Optional[BaseException] = None
+    ) -> None:
+        """记录排队信息并交付结果（或执行时抛出的异常）"""
+        queue_wait = job.queue_wait
+        if result is not None:
+            if result.metadata is None:
+                result.metadata = {}
+            result.metadata['scheduled'] = True
+            result.metadata['execution_id'] = job.id
+            result.metadata['session_id'] = job.session_id
+            result.metadata['queue_wait'] = queue_wait
+        
+        with self._lock:
+            job.state = 'done'
+            self._jobs.pop(job.id, None)
+            if result is not None and result.status == ExecutionStatus.CANCELLED:
+                self._stats['cancelled'] += 1
+            else:
+                self._stats['completed'] += 1
+            if job.started_at is not None:
+                self._stats['queued_total'] += 1
+                self._stats['total_queue_wait'] += queue_wait
+                self._stats['max_queue_wait'] = max(self._stats['max_queue_wait'], queue_wait)
+        
+        if not job.future.done():
+            if error is not None:
+                job.future.set_exception(error)
+            else:
+                job.future.set_result(result)
+    
+    def cancel(self, execution_id: str) -> bool:
+        """取消排队中或正在执行的命令
+        
+        execute_async 启动的进程会被终止；线程池中的同步执行无法中断，
+        只会调用 on_cancel（如果有），结果在执行结束后交付。
+        
+        Args:
+            execution_id: submit 返回的 ScheduledExecution.id
+            
+        Returns:
+            bool: 是否找到该命令
+        """
+        with self._lock:
+            job = self._jobs.get(execution_id)
+            if job is None:
+                return False
+            
+            queued = job.state == 'queued'
+            if queued:
+                self._queue = [entry for entry in self._queue if entry[2] is not job]
+                heapq.heapify(self._queue)
+            # 已出队但任务尚未创建时，由 _run 在开始前检查
+            job.cancel_requested = True
+            task = job.task
+        
+        if queued:
+            self._finish(job, self._build_result(job, ExecutionStatus.CANCELLED, "命令已在排队时取消"))
+        elif task is not None:
+            self._loop.call_soon_threadsafe(task.cancel)
+        return True
+    
+    def cancel_session(self, session_id: str) -> int:
+        """取消某个会话的全部命令
+        
+        Returns:
+            int: 取消的命令数量
+        """
+        with self._lock:
+            ids = [job.id for job in self._jobs.values() if job.session_id == session_id]
+        return sum(1 for execution_id in ids if self.cancel(execution_id))
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取调度器统计信息
+        
+        Returns:
+            Dict[str, Any]: 统计信息
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['running'] = self._running
+            stats['queued'] = len(self._queue)
+            stats['max_concurrent'] = self.max_concurrent
+            stats['max_per_session'] = self.max_per_session
+            stats['max_queue_size'] = self.max_queue_size
+        stats['avg_queue_wait'] = (
+            stats['total_queue_wait'] / stats['queued_total'] if stats['queued_total'] else 0.0
+        )
+        return stats
+    
+    def close(self) -> None:
+        """取消全部命令并停止事件循环"""
+        with self._lock:
+            self._closed = True
+            queued = [job.id for job in self._jobs.values() if job.state == 'queued']
+        for execution_id in queued:
+            self.cancel(execution_id)
+        
+        loop, thread = self._loop, self._thread
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._cancel_running(), loop).result(timeout=10)
+        except Exception:
+            pass
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        if not loop.is_running():
+            loop.close()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+    
+    async def _cancel_running(self) -> None:
+        """取消正在执行的命令并等待其结束（终止对应进程）"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            job.cancel_requested = True
+        tasks = [job.task for job in jobs if job.task is not None]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
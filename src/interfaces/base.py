@@ -46,6 +46,7 @@ class Suggestion:
     explanation: str                         # 命令解释说明
     alternatives: List[str] = field(default_factory=list)  # 备选命令列表
     timestamp: datetime = field(default_factory=datetime.now)  # 生成时间
+    metadata: Dict[str, Any] = field(default_factory=dict)  # 额外元数据
     
     def __post_init__(self):
         """验证数据有效性"""
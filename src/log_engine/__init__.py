@@ -7,6 +7,7 @@
 from .engine import LogEngine
 from .decorators import log_function_call, log_performance
 from .filters import SensitiveDataFilter, LogLevelFilter
+from .log_reader import LogTailReader
 
 __all__ = [
     'LogEngine',
@@ -14,4 +15,5 @@ __all__ = [
     'log_performance',
     'SensitiveDataFilter',
     'LogLevelFilter',
+    'LogTailReader',
 ]
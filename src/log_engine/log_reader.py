@@ -0,0 +1,289 @@
+"""
+日志尾部读取器
+
+从日志文件末尾向前读取最近的日志记录，供 Web 日志接口使用：
+- 按块从文件末尾向前读取，内存占用与文件大小无关
+- 覆盖 RotatingFileHandler 生成的 .1 .. .N 轮转文件
+- since 查询按固定大小的块二分查找起始偏移，每块的探测结果缓存为稀疏的时间戳-偏移索引
+- 异常堆栈等多行消息合并到所属的日志记录中
+
+日志行格式与 LogEngine 默认格式一致：
+    2025-01-01 12:00:00 - name - LEVEL - message
+"""
+
+import os
+import re
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+# 日志行开头的时间戳（asctime，datefmt='%Y-%m-%d %H:%M:%S'）
+_TIMESTAMP_PATTERN = re.compile(rb'^\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}')
+_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# 单个日志文件最多探测的轮转序号
+_MAX_BACKUPS = 100
+
+# 稀疏索引最多缓存的文件数
+_MAX_CACHED_FILES = 64
+
+# 每个文件的稀疏索引最多缓存的块数
+_MAX_INDEX_ENTRIES_PER_FILE = 4096
+
+
+def parse_log_line(line: str) -> Optional[Dict[str, str]]:
+    """
+    解析一行日志
+    
+    Args:
+        line: 日志行（不含换行符）
+        
+    Returns:
+        Optional[Dict[str, str]]: 包含 timestamp、source、level、message 的字典，
+            不是日志记录开头的行（如异常堆栈的续行）返回 None
+    """
+    if not _TIMESTAMP_PATTERN.match(line.encode('utf-8', 'replace')[:19]):
+        return None
+    parts = line.split(' - ', 3)
+    if len(parts) < 4:
+        return None
+    timestamp, source, level, message = parts
+    return {
+        'timestamp': timestamp,
+        'level': level,
+        'message': message,
+        'source': source
+    }
+
+
+def normalize_since(since: str) -> str:
+    """
+    将 ISO 时间转换为可与日志时间戳直接比较的字符串
+    
+    带时区的时间（如前端传入的 ...Z）转换为本地时间，日志时间戳使用本地时间。
+    日志时间戳精确到秒，带小数秒的时间向上取整。
+    
+    Args:
+        since: ISO 格式时间
+        
+    Returns:
+        str: '%Y-%m-%d %H:%M:%S' 格式的时间
+        
+    Raises:
+        ValueError: 时间格式不正确
+    """
+    since_time = datetime.fromisoformat(since.strip().replace('Z', '+00:00'))
+    if since_time.tzinfo is not None:
+        since_time = since_time.astimezone().replace(tzinfo=None)
+    if since_time.microsecond:
+        since_time = since_time.replace(microsecond=0)
+        since_time = datetime.fromtimestamp(since_time.timestamp() + 1)
+    return since_time.strftime(_TIMESTAMP_FORMAT)
+
+
+class LogTailReader:
+    """日志尾部读取器"""
+    
+    def __init__(self, log_file: str, block_size: int = 64 * 1024):
+        """
+        初始化读取器
+        
+        Args:
+            log_file: 当前日志文件路径（轮转文件为 log_file.1 .. log_file.N）
+            block_size: 每次读取的块大小（字节）
+        """
+        self.log_file = Path(log_file)
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        # 稀疏索引：文件标识 -> {块号: (块内第一条记录的偏移, 时间戳)}
+        # 日志文件只追加，轮转只重命名，因此同一文件的探测结果始终有效
+        self._sparse_index: Dict[Tuple[int, int, bytes], Dict[int, Tuple[int, Optional[str]]]] = {}
+    
+    def log_files(self) -> List[Path]:
+        """
+        获取存在的日志文件，从新到旧排列
+        
+        Returns:
+            List[Path]: [log_file, log_file.1, ..., log_file.N]
+        """
+        files = [self.log_file] if self.log_file.exists() else []
+        for number in range(1, _MAX_BACKUPS + 1):
+            backup = self.log_file.with_name(f"{self.log_file.name}.{number}")
+            if not backup.exists():
+                break
+            files.append(backup)
+        return files
+    
+    def read(
+        self,
+        level: Optional[str] = None,
+        limit: int = 1000,
+        since: Optional[str] = None
+    ) -> List[Dict[str, str]]:
+        """
+        读取最近的日志记录
+        
+        Args:
+            level: 只返回该级别的日志
+            limit: 返回的最大记录数
+            since: 只返回该时间（ISO 格式）之后的日志；格式不正确时忽略
+            
+        Returns:
+            List[Dict[str, str]]: 日志记录，从新到旧排列
+        """
+        since_key = None
+        if since:
+            try:
+                since_key = normalize_since(since)
+            except ValueError:
+                since_key = None
+        
+        logs: List[Dict[str, str]] = []
+        if limit <= 0:
+            return logs
+        
+        for path in self.log_files():
+            try:
+                with open(path, 'rb') as f:
+                    size = os.fstat(f.fileno()).st_size
+                    stop = 0
+                    if since_key:
+                        stop = self._find_offset(f, size, since_key)
+                        if stop >= size:
+                            # 该文件及更早的文件都早于 since
+                            break
+                    
+                    for record in self._iter_records_reverse(f, size, stop):
+                        if level and record['level'] != level:
+                            continue
+                        logs.append(record)
+                        if len(logs) >= limit:
+                            return logs
+                    
+                    if stop > 0:
+                        # 起始位置之前的记录都早于 since
+                        break
+            except FileNotFoundError:
+                # 读取期间发生轮转
+                continue
+        
+        return logs
+    
+    def _iter_lines_reverse(self, f, end: int, stop: int = 0) -> Iterator[bytes]:
+        """从 end 向前按块读取到 stop，逐行返回（从后向前）"""
+        position = end
+        remainder = b''
+        while position > stop:
+            read_size = min(self.block_size, position - stop)
+            position -= read_size
+            f.seek(position)
+            block = f.read(read_size) + remainder
+            lines = block.split(b'\n')
+            # 第一段可能不完整，留到下一块拼接
+            remainder = lines[0]
+            for line in reversed(lines[1:]):
+                yield line
+        yield remainder
+    
+    def _iter_records_reverse(self, f, end: int, stop: int) -> Iterator[Dict[str, str]]:
+        """从后向前逐条返回日志记录，续行合并到所属记录的消息中"""
+        continuation: List[str] = []
+        for raw in self._iter_lines_reverse(f, end, stop):
+            line = raw.decode('utf-8', 'replace').rstrip('\r')
+            if not line.strip():
+                continue
+            record = parse_log_line(line)
+            if record is None:
+                continuation.append(line)
+                continue
+            if continuation:
+                record['message'] += '\n' + '\n'.join(reversed(continuation))
+                continuation = []
+            yield record
+    
+    def _probe(self, f, size: int, offset: int) -> Tuple[int, Optional[str]]:
+        """
+        获取 offset 之后第一条日志记录的偏移和时间戳
+        
+        Returns:
+            Tuple[int, Optional[str]]: (记录偏移, 时间戳)，没有记录时为 (size, None)
+        """
+        position = offset
+        f.seek(offset)
+        if offset > 0:
+            # 跳过被 offset 截断的行
+            f.seek(offset - 1)
+            position += len(f.readline()) - 1
+        while position < size:
+            line = f.readline()
+            if not line:
+                break
+            match = _TIMESTAMP_PATTERN.match(line)
+            if match and parse_log_line(line.decode('utf-8', 'replace').rstrip('\r\n')):
+                return position, match.group().decode('ascii').replace('T', ' ')
+            position += len(line)
+        return size, None
+    
+    def _probe_block(
+        self,
+        f,
+        size: int,
+        block: int,
+        sparse: Dict[int, Tuple[int, Optional[str]]]
+    ) -> Tuple[int, Optional[str]]:
+        """获取第 block 块开始之后第一条日志记录的偏移和时间戳（使用稀疏索引）"""
+        cached = sparse.get(block)
+        if cached is not None:
+            return cached
+        
+        result = self._probe(f, size, block * self.block_size)
+        # 文件仍可能继续追加，不缓存"没有记录"的结果
+        if result[1] is not None and len(sparse) < _MAX_INDEX_ENTRIES_PER_FILE:
+            sparse[block] = result
+        return result
+    
+    def _find_offset(self, f, size: int, since_key: str) -> int:
+        """
+        二分查找第一条时间戳不早于 since_key 的记录的偏移
+        
+        在块号上二分，探测点都是块的起始位置，因此文件增长后索引仍然命中。
+        
+        Returns:
+            int: 记录偏移；所有记录都早于 since_key 时返回 size
+        """
+        # 文件标识包含开头的字节，避免删除旧文件后 inode 被复用时误用缓存
+        stat = os.fstat(f.fileno())
+        f.seek(0)
+        identity = (stat.st_dev, stat.st_ino, f.read(64))
+        with self._lock:
+            if identity not in self._sparse_index and len(self._sparse_index) >= _MAX_CACHED_FILES:
+                self._sparse_index.clear()
+            sparse = self._sparse_index.setdefault(identity, {})
+        
+        # 找到第一个"块内第一条记录不早于 since_key（或没有记录）"的块
+        low, high = 0, (size + self.block_size - 1) // self.block_size
+        while low < high:
+            middle = (low + high) // 2
+            _, timestamp = self._probe_block(f, size, middle, sparse)
+            if timestamp is None or timestamp >= since_key:
+                high = middle
+            else:
+                low = middle + 1
+        
+        if low == 0:
+            offset, timestamp = self._probe_block(f, size, 0, sparse)
+            return offset if timestamp is not None else size
+        
+        # 目标记录在前一块的第一条记录之后，顺序查找（范围约为一个块）
+        offset, _ = self._probe_block(f, size, low - 1, sparse)
+        offset += 1
+        while offset < size:
+            record_offset, timestamp = self._probe(f, size, offset)
+            if timestamp is None:
+                return size
+            if timestamp >= since_key:
+                return record_offset
+            offset = record_offset + 1
+        return size
@@ -15,7 +15,7 @@ from pathlib import Path
 from src.interfaces.base import Context, Suggestion, ValidationResult, ExecutionResult
 from src.ai_engine import AIEngine
 from src.security import SecurityEngine
-from src.execution import CommandExecutor
+from src.execution import CommandExecutor, ExecutionScheduler
 from src.config import ConfigManager, AppConfig
 from src.log_engine import LogEngine
 from src.storage import StorageFactory
@@ -64,25 +64,28 @@ class PowerShellAssistant:
         
         # 3. 初始化存储引擎
         self.storage = StorageFactory.create_storage(
-            storage_type="file",  # 默认使用文件存储
+            storage_type=self.config.storage.backend,
             config=self.config.storage.model_dump()  # 转换为字典
         )
         
         # 4. 初始化上下文管理器
-        self.context_manager = ContextManager(storage=self.storage)
+        self.context_manager = ContextManager(
+            storage=self.storage,
+            flush_interval=self.config.context.session_flush_interval,
+            checkpoint_interval=self.config.context.session_checkpoint_interval
+        )
         
         # 5. 初始化 AI 引擎
-        self.ai_engine = AIEngine(self.config.ai.model_dump())  # 转换为字典
+        self.ai_engine = AIEngine(self.config.ai.model_dump(), storage=self.storage)  # 转换为字典
         
         # 6. 初始化安全引擎
         self.security_engine = SecurityEngine(self.config.security.model_dump())  # 转换为字典
         
         # 7. 初始化执行引擎
-        # 合并 execution 配置和沙箱相关配置
-        executor_config = self.config.execution.model_dump()
-        executor_config['sandbox_enabled'] = self.config.security.sandbox_enabled
-        executor_config['sandbox_for_high_risk_only'] = self.config.security.sandbox_for_high_risk_only
-        self.executor = CommandExecutor(executor_config)
+        self.executor = CommandExecutor(self._executor_config())
+        
+        # 执行调度器：限制并发执行的命令数量（供 Web UI 等并发调用方使用），首次访问时创建
+        self._scheduler: Optional[ExecutionScheduler] = None
         
         # 8. 初始化模板引擎
         try:
@@ -99,7 +102,8 @@ class PowerShellAssistant:
             if self.template_engine:
                 self.custom_template_manager = CustomTemplateManager(
                     templates_dir="templates",
-                    config_path="config/templates.yaml"
+                    config_path="config/templates.yaml",
+                    template_manager=self.template_engine.template_manager
                 )
             else:
                 self.custom_template_manager = None
@@ -141,6 +145,47 @@ class PowerShellAssistant:
         
         self.log_engine.info("PowerShell Assistant initialization complete")
     
+    def _executor_config(self) -> dict:
+        """合并 execution 配置和沙箱相关配置，作为执行引擎的配置"""
+        executor_config = self.config.execution.model_dump()
+        executor_config['sandbox_enabled'] = self.config.security.sandbox_enabled
+        executor_config['sandbox_for_high_risk_only'] = self.config.security.sandbox_for_high_risk_only
+        for key in ('sandbox_pool_enabled', 'sandbox_pool_min_size', 'sandbox_pool_max_size',
+                    'sandbox_pool_idle_timeout', 'sandbox_pool_max_uses'):
+            executor_config[key] = getattr(self.config.security, key)
+        return executor_config
+    
+    @property
+    def scheduler(self) -> ExecutionScheduler:
+        """获取执行调度器（首次访问时按当前配置创建）"""
+        if self._scheduler is None:
+            self._scheduler = ExecutionScheduler(
+                self.executor,
+                max_concurrent=self.config.execution.max_concurrent,
+                max_per_session=self.config.execution.max_concurrent_per_session,
+                max_queue_size=self.config.execution.max_queue_size,
+                max_queue_wait=self.config.execution.max_queue_wait
+            )
+        return self._scheduler
+    
+    def rebuild_executor(self) -> None:
+        """按当前配置重建执行引擎（配置变更后调用）
+        
+        执行调度器切换到新的执行引擎，旧执行引擎的宿主进程池和沙箱容器池被关闭。
+        """
+        old_executor = self.executor
+        self.executor = CommandExecutor(self._executor_config())
+        if self._scheduler is not None:
+            self._scheduler.set_executor(self.executor)
+        old_executor.close()
+    
+    def close(self) -> None:
+        """释放 AI 引擎的连接、执行调度器和执行引擎的常驻进程"""
+        self.ai_engine.close()
+        if self._scheduler is not None:
+            self._scheduler.close()
+        self.executor.close()
+    
     def process_request(self, user_input: str, auto_execute: bool = False) -> ExecutionResult:
         """
         处理用户请求的完整流程
@@ -1583,6 +1628,7 @@ def main():
     
     args = parser.parse_args()
     
+    assistant = None
     try:
         # 初始化助手
         assistant = PowerShellAssistant(config_path=args.config)
@@ -1678,6 +1724,9 @@ def main():
             traceback.print_exc()
         
         sys.exit(1)
+    finally:
+        if assistant is not None:
+            assistant.close()
 
 
 if __name__ == "__main__":
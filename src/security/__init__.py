@@ -11,10 +11,13 @@ from src.security.engine import SecurityEngine
 from src.security.whitelist import CommandWhitelist
 from src.security.permissions import PermissionChecker
 from src.security.sandbox import SandboxExecutor
+from src.security.risk_scanner import RiskScanner, RiskScan
 
 __all__ = [
     'SecurityEngine',
     'CommandWhitelist',
     'PermissionChecker',
-    'SandboxExecutor'
+    'SandboxExecutor',
+    'RiskScanner',
+    'RiskScan'
 ]
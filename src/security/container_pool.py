@@ -0,0 +1,418 @@
+"""
+沙箱容器池模块
+
+维护一组预先启动、禁用网络的沙箱容器，避免每条高危命令都承担容器创建和启动开销：
+- 容器以常驻进程启动，命令通过 exec 在容器内执行
+- 只读根文件系统的容器在每次使用后终止残留进程、清空临时目录并复用
+- 可写根文件系统的容器使用一次即回收，后台补充新的容器
+- 空闲超时的容器在 cleanup_containers 时回收，保留最少数量的预热容器
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+
+# 池中容器的标签，便于识别和清理
+POOL_LABEL = "ai-powershell.sandbox-pool"
+
+# 容器常驻进程：保持容器运行，命令通过 exec 执行
+KEEPALIVE_COMMAND = ['tail', '-f', '/dev/null']
+
+# 复用前终止除常驻进程（PID 1）以外的所有进程并清空可写的临时目录。
+# 上一条命令启动的后台进程（Start-Job、sh -c '... &' 等）会观察或篡改后续命令，
+# 因此重置后仍有进程存活（僵尸进程除外）时以非零状态退出，由调用方回收容器。
+RESET_SCRIPT = r'''
+self=$$
+is_live() {
+    [ -r "$1/stat" ] || return 1
+    read -r stat < "$1/stat" 2>/dev/null || return 1
+    case "$stat" in *") Z "*) return 1 ;; esac
+    return 0
+}
+for attempt in 1 2 3; do
+    found=0
+    for proc in /proc/[0-9]*; do
+        pid=${proc#/proc/}
+        [ "$pid" = 1 ] || [ "$pid" = "$self" ] && continue
+        is_live "$proc" || continue
+        found=1
+        kill -9 "$pid" 2>/dev/null
+    done
+    [ "$found" = 0 ] && break
+    sleep 0.1
+done
+rm -rf /tmp/* /tmp/.[!.]* 2>/dev/null
+for proc in /proc/[0-9]*; do
+    pid=${proc#/proc/}
+    [ "$pid" = 1 ] || [ "$pid" = "$self" ] && continue
+    is_live "$proc" && exit 1
+done
+exit 0
+'''
+RESET_COMMAND = ['sh', '-c', RESET_SCRIPT]
+
+
+class SandboxPoolError(Exception):
+    """沙箱容器池错误（容器无法启动或 exec 失败）"""
+    pass
+
+
+class SandboxPoolTimeout(SandboxPoolError):
+    """容器内命令执行超时"""
+    pass
+
+
+class PooledContainer:
+    """池中的单个沙箱容器"""
+    
+    def __init__(self, container: Any):
+        """
+        Args:
+            container: docker-py 容器对象
+        """
+        self.container = container
+        self.uses = 0
+        self.created_at = time.time()
+        self.last_used = self.created_at
+    
+    @property
+    def short_id(self) -> str:
+        """容器短 ID"""
+        return str(self.container.id)[:12]
+    
+    def is_running(self) -> bool:
+        """检查容器是否仍在运行"""
+        try:
+            self.container.reload()
+            return bool(self.container.status == 'running')
+        except Exception:
+            return False
+    
+    def remove(self) -> None:
+        """强制删除容器（会终止容器内仍在运行的命令）"""
+        try:
+            self.container.remove(force=True)
+        except Exception:
+            pass
+
+
+class SandboxContainerPool:
+    """沙箱容器池
+    
+    线程安全。最多同时存在 max_size 个容器，空闲时至少保留 min_size 个预热容器；
+    没有空闲容器且已达上限时 acquire 返回 None，调用方回退到一次性容器。
+    """
+    
+    def __init__(
+        self,
+        client: Any,
+        container_config: Dict[str, Any],
+        min_size: int = 1,
+        max_size: int = 4,
+        idle_timeout: float = 300,
+        max_uses: int = 50,
+        resettable: bool = False,
+        background: bool = True
+    ):
+        """初始化容器池（不会立即启动容器）
+        
+        Args:
+            client: docker-py 客户端
+            container_config: containers.run 的参数（不含 command）
+            min_size: 保持预热的最少容器数
+            max_size: 最多同时存在的容器数
+            idle_timeout: 超过 min_size 的容器空闲超过该时间（秒）后回收
+            max_uses: 单个容器执行多少条命令后回收（0 表示不限制），仅对可重置容器有效
+            resettable: 容器根文件系统只读，终止残留进程并清空临时目录后即可复用；否则使用一次即回收
+            background: 是否在后台线程中补充容器
+        """
+        self.client = client
+        self.container_config = dict(container_config)
+        self.max_size = max(1, max_size)
+        self.min_size = max(0, min(min_size, self.max_size))
+        self.idle_timeout = idle_timeout
+        self.max_uses = max_uses
+        self.resettable = resettable
+        self.background = background
+        self.logger = logging.getLogger(__name__)
+        
+        self._idle: Deque[PooledContainer] = deque()
+        self._live_count = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'containers_started': 0,
+            'containers_recycled': 0,
+            'containers_failed': 0,
+            'containers_reaped': 0,
+            'resets': 0,
+            'reset_time': 0.0,
+            'commands': 0,
+            'timeouts': 0,
+        }
+    
+    def _count(self, key: str, amount: float = 1) -> None:
+        """线程安全地累加统计"""
+        with self._lock:
+            self._stats[key] += amount
+    
+    def _start_container(self) -> PooledContainer:
+        """启动一个新的常驻容器
+        
+        Raises:
+            SandboxPoolError: 容器无法启动时
+        """
+        config = dict(self.container_config)
+        config['command'] = KEEPALIVE_COMMAND
+        labels = dict(config.get('labels') or {})
+        labels[POOL_LABEL] = 'true'
+        config['labels'] = labels
+        try:
+            container = self.client.containers.run(**config, detach=True)
+        except Exception as e:
+            self._count('containers_failed')
+            raise SandboxPoolError(f"无法启动沙箱容器: {e}")
+        self._count('containers_started')
+        return PooledContainer(container)
+    
+    def _discard(self, pooled: PooledContainer) -> None:
+        """删除容器并释放其占用的名额"""
+        pooled.remove()
+        with self._lock:
+            self._live_count -= 1
+    
+    def warm(self) -> int:
+        """启动容器直到达到 min_size
+        
+        Returns:
+            int: 新启动的容器数量
+        """
+        started = 0
+        while True:
+            with self._lock:
+                if self._closed or self._live_count >= self.min_size:
+                    return started
+                self._live_count += 1
+            try:
+                pooled = self._start_container()
+            except SandboxPoolError as e:
+                with self._lock:
+                    self._live_count -= 1
+                self.logger.warning(f"预热沙箱容器失败: {e}")
+                return started
+            with self._lock:
+                self._idle.append(pooled)
+            started += 1
+    
+    def _replenish(self) -> None:
+        """补充容器到 min_size"""
+        if self.background:
+            threading.Thread(target=self.warm, daemon=True).start()
+        else:
+            self.warm()
+    
+    def acquire(self) -> Optional[PooledContainer]:
+        """借用一个运行中的容器
+        
+        Returns:
+            Optional[PooledContainer]: 可用的容器；没有空闲容器且已达上限时返回 None
+            
+        Raises:
+            SandboxPoolError: 容器池已关闭或新容器无法启动
+        """
+        while True:
+            with self._lock:
+                if self._closed:
+                    raise SandboxPoolError("沙箱容器池已关闭")
+                candidate = self._idle.popleft() if self._idle else None
+                if candidate is None:
+                    self._stats['misses'] += 1
+                    if self._live_count >= self.max_size:
+                        return None
+                    self._live_count += 1
+            
+            if candidate is None:
+                try:
+                    return self._start_container()
+                except SandboxPoolError:
+                    with self._lock:
+                        self._live_count -= 1
+                    raise
+            
+            if candidate.is_running():
+                self._count('hits')
+                return candidate
+            
+            self._count('containers_failed')
+            self._discard(candidate)
+    
+    def _reset(self, pooled: PooledContainer) -> bool:
+        """终止容器内残留的进程并清空临时目录以便复用
+        
+        Returns:
+            bool: 是否重置成功（仍有进程无法终止时返回 False）
+        """
+        start = time.perf_counter()
+        try:
+            result = pooled.container.exec_run(RESET_COMMAND)
+            ok = getattr(result, 'exit_code', 0) == 0
+        except Exception as e:
+            self.logger.warning(f"重置沙箱容器 {pooled.short_id} 失败: {e}")
+            ok = False
+        with self._lock:
+            self._stats['resets'] += 1
+            self._stats['reset_time'] += time.perf_counter() - start
+        return ok
+    
+    def release(self, pooled: PooledContainer, discard: bool = False) -> None:
+        """归还容器
+        
+        可重置的容器终止残留进程、清空临时目录后放回空闲队列；重置失败的容器
+        和其他容器回收并在后台补充。
+        
+        Args:
+            pooled: 容器
+            discard: 是否直接丢弃（例如执行超时后容器状态未知）
+        """
+        reusable = (
+            not discard
+            and not self._closed
+            and self.resettable
+            and not (self.max_uses and pooled.uses >= self.max_uses)
+        )
+        if reusable and self._reset(pooled):
+            pooled.last_used = time.time()
+            with self._lock:
+                if not self._closed:
+                    self._idle.append(pooled)
+                    return
+        
+        if not discard:
+            self._count('containers_recycled')
+        self._discard(pooled)
+        if not self._closed:
+            self._replenish()
+    
+    def execute(self, command: List[str], timeout: float) -> Optional[Dict[str, Any]]:
+        """借用容器执行一条命令
+        
+        Args:
+            command: 容器内执行的命令参数
+            timeout: 超时时间（秒）
+            
+        Returns:
+            Optional[Dict[str, Any]]: 执行结果，包含 return_code、output、error、container_id；
+                没有可用容器时返回 None
+                
+        Raises:
+            SandboxPoolTimeout: 执行超时（对应容器会被删除）
+            SandboxPoolError: 容器无法启动或 exec 失败
+        """
+        pooled = self.acquire()
+        if pooled is None:
+            return None
+        
+        outcome: Dict[str, Any] = {}
+        
+        def run():
+            try:
+                outcome['result'] = pooled.container.exec_run(command, demux=True)
+            except Exception as e:
+                outcome['error'] = e
+        
+        worker = threading.Thread(target=run, daemon=True)
+        worker.start()
+        worker.join(timeout)
+        pooled.uses += 1
+        
+        if worker.is_alive():
+            # 删除容器会终止仍在运行的命令
+            self._count('timeouts')
+            self.release(pooled, discard=True)
+            raise SandboxPoolTimeout(f"命令执行超时 ({timeout} 秒)")
+        
+        if 'error' in outcome:
+            self.release(pooled, discard=True)
+            raise SandboxPoolError(f"在沙箱容器中执行命令失败: {outcome['error']}")
+        
+        self.release(pooled)
+        self._count('commands')
+        
+        exit_code, output = outcome['result']
+        stdout, stderr = output if isinstance(output, tuple) else (output, None)
+        return {
+            'return_code': exit_code if exit_code is not None else -1,
+            'output': (stdout or b'').decode('utf-8', errors='ignore'),
+            'error': (stderr or b'').decode('utf-8', errors='ignore'),
+            'container_id': pooled.short_id
+        }
+    
+    def reap_idle(self) -> int:
+        """回收空闲超时或已停止的容器，保留 min_size 个预热容器
+        
+        Returns:
+            int: 回收的容器数量
+        """
+        now = time.time()
+        reaped: List[PooledContainer] = []
+        with self._lock:
+            kept: Deque[PooledContainer] = deque()
+            while self._idle:
+                pooled = self._idle.popleft()
+                over_min = self._live_count - len(reaped) > self.min_size
+                if over_min and now - pooled.last_used > self.idle_timeout:
+                    reaped.append(pooled)
+                else:
+                    kept.append(pooled)
+            self._idle = kept
+        
+        # 已停止的容器也一并回收
+        for pooled in list(kept):
+            if not pooled.is_running():
+                with self._lock:
+                    try:
+                        self._idle.remove(pooled)
+                    except ValueError:
+                        continue
+                reaped.append(pooled)
+        
+        for pooled in reaped:
+            self._discard(pooled)
+        if reaped:
+            self._count('containers_reaped', len(reaped))
+            if not self._closed:
+                self._replenish()
+        return len(reaped)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取容器池统计信息
+        
+        Returns:
+            Dict[str, Any]: 统计信息
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['min_size'] = self.min_size
+            stats['max_size'] = self.max_size
+            stats['live_containers'] = self._live_count
+            stats['idle_containers'] = len(self._idle)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats['avg_reset_time'] = stats['reset_time'] / stats['resets'] if stats['resets'] else 0.0
+        return stats
+    
+    def close(self) -> None:
+        """关闭容器池并删除所有空闲容器"""
+        with self._lock:
+            self._closed = True
+            containers = list(self._idle)
+            self._idle.clear()
+        
+        for pooled in containers:
+            self._discard(pooled)
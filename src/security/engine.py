@@ -7,7 +7,10 @@
 3. 沙箱执行（可选）
 """
 
-from typing import Optional
+import copy
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
 from src.interfaces.base import (
     SecurityEngineInterface,
     ValidationResult,
@@ -45,6 +48,13 @@ class SecurityEngine(SecurityEngineInterface):
         
         # 配置选项
         self.require_confirmation = self.config.get('require_confirmation', True)
+        
+        # 验证结果缓存：(规范化命令, 规则版本) -> (白名单结果, 是否需要管理员权限)
+        self._verdict_cache: "OrderedDict[Tuple[str, int], Tuple[ValidationResult, bool]]" = OrderedDict()
+        self._verdict_cache_size = self.config.get('verdict_cache_size', 512)
+        self._verdict_lock = threading.Lock()
+        self._verdict_hits = 0
+        self._verdict_misses = 0
     
     def validate_command(self, command: str, context: Context) -> ValidationResult:
         """验证命令的安全性（三层验证）
@@ -63,13 +73,12 @@ class SecurityEngine(SecurityEngineInterface):
                 blocked_reasons=["命令为空"]
             )
         
-        # 第一层：白名单验证
-        whitelist_result = self.whitelist.validate(command)
+        # 第一层：白名单验证（与管理员权限需求一起缓存）
+        whitelist_result, requires_elevation = self._get_verdict(command)
         if not whitelist_result.is_valid:
             return whitelist_result
         
         # 第二层：权限检查
-        requires_elevation = self.permission_checker.requires_admin(command)
         has_permission = self.permission_checker.check_current_permissions()
         
         # 如果需要管理员权限但当前没有
@@ -93,6 +102,65 @@ class SecurityEngine(SecurityEngineInterface):
         
         return result
     
+    def _get_verdict(self, command: str) -> Tuple[ValidationResult, bool]:
+        """获取命令的白名单验证结果和管理员权限需求
+        
+        结果只取决于命令和规则，按规范化命令和规则版本缓存（LRU），
+        规则变化后旧结果自动失效。返回的验证结果是副本，调用方可以修改。
+        
+        Args:
+            command: PowerShell 命令
+            
+        Returns:
+            Tuple[ValidationResult, bool]: (白名单验证结果, 是否需要管理员权限)
+        """
+        # 白名单和权限检查都会先去除首尾空白，其余差异（如大小写）可能影响结果
+        key = (command.strip(), self.whitelist.ruleset_version)
+        
+        with self._verdict_lock:
+            cached = self._verdict_cache.get(key)
+            if cached is not None:
+                self._verdict_cache.move_to_end(key)
+                self._verdict_hits += 1
+                return copy.deepcopy(cached[0]), cached[1]
+            self._verdict_misses += 1
+        
+        whitelist_result = self.whitelist.validate(command)
+        requires_elevation = (
+            whitelist_result.is_valid and self.permission_checker.requires_admin(command)
+        )
+        
+        if self._verdict_cache_size > 0:
+            with self._verdict_lock:
+                self._verdict_cache[key] = (copy.deepcopy(whitelist_result), requires_elevation)
+                self._verdict_cache.move_to_end(key)
+                while len(self._verdict_cache) > self._verdict_cache_size:
+                    self._verdict_cache.popitem(last=False)
+        
+        return whitelist_result, requires_elevation
+    
+    def clear_verdict_cache(self):
+        """清空验证结果缓存"""
+        with self._verdict_lock:
+            self._verdict_cache.clear()
+    
+    def get_verdict_cache_stats(self) -> Dict[str, Any]:
+        """获取验证结果缓存统计信息
+        
+        Returns:
+            Dict[str, Any]: 缓存统计信息
+        """
+        with self._verdict_lock:
+            total = self._verdict_hits + self._verdict_misses
+            return {
+                'size': len(self._verdict_cache),
+                'max_size': self._verdict_cache_size,
+                'hits': self._verdict_hits,
+                'misses': self._verdict_misses,
+                'hit_rate': self._verdict_hits / total if total > 0 else 0.0,
+                'ruleset_version': self.whitelist.ruleset_version
+            }
+    
     def check_permissions(self, command: str) -> bool:
         """检查命令所需的权限
         
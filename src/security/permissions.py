@@ -6,12 +6,14 @@
 
 import os
 import sys
-import re
 import platform
 import ctypes
-from typing import List, Tuple
+import threading
+from typing import List, Optional, Tuple
 import logging
 
+from src.security.risk_scanner import RiskScanner
+
 
 class PermissionChecker:
     """权限检查器
@@ -82,16 +84,17 @@ class PermissionChecker:
         r"Set-ItemProperty.*C:\\Windows",
     ]
     
+    # 当前进程的管理员权限在进程生命周期内不变，只检测一次
+    _process_is_admin: Optional[bool] = None
+    _process_lock = threading.Lock()
+    
     def __init__(self):
         """初始化权限检查器"""
         self.logger = logging.getLogger(__name__)
         self.platform = platform.system()
         
-        # 编译正则表达式
-        self._compiled_patterns = [
-            re.compile(pattern, re.IGNORECASE)
-            for pattern in self.ADMIN_REQUIRED_PATTERNS
-        ]
+        # 预编译为扫描器，每条命令只需扫描一遍
+        self._scanner = RiskScanner(admin_patterns=self.ADMIN_REQUIRED_PATTERNS)
     
     def requires_admin(self, command: str) -> bool:
         """检查命令是否需要管理员权限
@@ -105,16 +108,35 @@ class PermissionChecker:
         command = command.strip()
         
         # 检查是否匹配需要管理员权限的模式
-        for pattern in self._compiled_patterns:
-            if pattern.search(command):
-                self.logger.info(f"命令需要管理员权限: {command}")
-                return True
+        if self._scanner.requires_admin(command):
+            self.logger.info(f"命令需要管理员权限: {command}")
+            return True
         
         return False
     
     def check_current_permissions(self) -> bool:
         """检查当前进程是否有管理员权限
         
+        检测结果在进程内缓存，后续调用直接返回。
+        
+        Returns:
+            bool: 当前是否为管理员权限
+        """
+        if PermissionChecker._process_is_admin is None:
+            with PermissionChecker._process_lock:
+                if PermissionChecker._process_is_admin is None:
+                    PermissionChecker._process_is_admin = self._detect_current_permissions()
+        return PermissionChecker._process_is_admin
+    
+    @classmethod
+    def reset_permission_cache(cls):
+        """清除进程权限缓存，下次检查时重新检测"""
+        with cls._process_lock:
+            cls._process_is_admin = None
+    
+    def _detect_current_permissions(self) -> bool:
+        """检测当前进程是否有管理员权限
+        
         Returns:
             bool: 当前是否为管理员权限
         """
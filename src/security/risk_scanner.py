@@ -0,0 +1,347 @@
+"""
+预编译风险扫描器
+
+为 CommandWhitelist 和 PermissionChecker 提供一次扫描完成的命令分类：
+- 从每条正则规则中提取必须出现的字面关键词（如 Remove-Item、HKLM:）
+- 所有关键词合并为一个正则，对命令只扫描一遍即可得到出现的全部关键词，
+  只对关键词命中的候选规则执行完整的正则匹配
+- 管道危险命令、安全前缀和需要确认的前缀各自合并为一次前缀匹配
+- 候选规则按添加顺序求值，保持与逐条匹配完全相同的"首个匹配生效"语义
+"""
+
+import re
+import sys
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.interfaces.base import RiskLevel
+
+if sys.version_info >= (3, 11):
+    from re import _parser as sre_parse
+else:  # pragma: no cover
+    import sre_parse
+
+
+_REPEAT_OPS = tuple(
+    op for op in (
+        getattr(sre_parse, 'MAX_REPEAT', None),
+        getattr(sre_parse, 'MIN_REPEAT', None),
+        getattr(sre_parse, 'POSSESSIVE_REPEAT', None),
+    ) if op is not None
+)
+
+
+def _required_literals(parsed) -> List[str]:
+    """从解析后的正则序列中提取匹配时必须出现的连续字面量
+    
+    Args:
+        parsed: sre_parse 解析得到的子模式序列
+        
+    Returns:
+        List[str]: 字面量列表，正则匹配的文本中一定包含其中每一个
+    """
+    literals: List[str] = []
+    run: List[str] = []
+    
+    def flush():
+        if run:
+            literals.append(''.join(run))
+            run.clear()
+    
+    for op, av in parsed:
+        if op is sre_parse.LITERAL:
+            run.append(chr(av))
+            continue
+        
+        flush()
+        
+        if op is sre_parse.SUBPATTERN:
+            literals.extend(_required_literals(av[-1]))
+        elif op in _REPEAT_OPS:
+            min_count, _, item = av
+            if min_count >= 1:
+                literals.extend(_required_literals(item))
+    
+    flush()
+    return literals
+
+
+def extract_keyword(pattern: str, flags: int = re.IGNORECASE) -> Optional[str]:
+    """提取正则规则的索引关键词
+    
+    Args:
+        pattern: 正则表达式
+        flags: 正则编译标志
+        
+    Returns:
+        Optional[str]: 最长的必需字面量，无法提取时返回 None
+    """
+    try:
+        literals = _required_literals(sre_parse.parse(pattern, flags))
+    except Exception:
+        return None
+    # 只使用 ASCII 字面量：忽略大小写时可以直接转为小写比较
+    literals = [literal for literal in literals if literal.isascii()]
+    return max(literals, key=len) if literals else None
+
+
+def _trie_pattern(words: List[str]) -> str:
+    """将一组小写关键词构建为前缀树形式的正则
+    
+    共享前缀只匹配一次，且每个位置优先匹配最长的关键词。
+    """
+    root: Dict[str, dict] = {}
+    for word in words:
+        node = root
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    
+    def build(node: Dict[str, dict]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            # 关键词在此结束，更长的关键词优先（贪婪）
+            body = (body if len(branches) == 1 and len(body) == 1 else f'(?:{body})') + '?'
+        return body
+    
+    return build(root)
+
+
+# 忽略大小写时与 ASCII 字母等价的非 ASCII 字符（如 ſ、K）-> 对应的小写字母
+_ASCII_FOLDS: Dict[str, str] = {}
+
+
+def _fold_ascii(text: str, flags: int) -> str:
+    """将关键词正则匹配到的文本转为小写 ASCII 关键词"""
+    if text.isascii():
+        return text.lower()
+    chars = []
+    for char in text:
+        if char.isascii():
+            chars.append(char.lower())
+            continue
+        folded = _ASCII_FOLDS.get(char)
+        if folded is None:
+            folded = next(
+                (letter for letter in 'abcdefghijklmnopqrstuvwxyz'
+                 if re.fullmatch(re.escape(char), letter, flags)),
+                char
+            )
+            _ASCII_FOLDS[char] = folded
+        chars.append(folded)
+    return ''.join(chars)
+
+
+@dataclass
+class RiskScan:
+    """命令风险扫描结果"""
+    danger: Optional[Tuple[str, RiskLevel]] = None  # 首个命中的危险规则 (描述, 风险等级)
+    requires_admin: bool = False                    # 是否命中需要管理员权限的规则
+    pipeline_command: Optional[str] = None          # 管道中首个危险命令
+    safe_prefix: bool = False                       # 是否以安全前缀开头（不考虑管道）
+    confirmation_prefix: bool = False               # 是否以需要确认的前缀开头
+
+
+class RiskScanner:
+    """预编译风险扫描器
+    
+    危险规则和管理员权限规则共用一个关键词索引：关键词 -> (危险规则位图,
+    管理员规则位图)，第 n 位表示该类第 n 条规则。不包含可提取关键词的规则
+    （如自定义的 ^\\w+$）始终作为候选规则。
+    """
+    
+    def __init__(
+        self,
+        dangerous_rules: Iterable[Tuple[str, str, RiskLevel]] = (),
+        admin_patterns: Iterable[str] = (),
+        pipeline_commands: Iterable[str] = (),
+        safe_prefixes: Iterable[str] = (),
+        confirmation_prefixes: Iterable[str] = (),
+        flags: int = re.IGNORECASE
+    ):
+        """构建扫描器
+        
+        Args:
+            dangerous_rules: 危险规则 (正则, 描述, 风险等级)，按优先级排列
+            admin_patterns: 需要管理员权限的命令正则
+            pipeline_commands: 管道中出现即视为危险的命令前缀（区分大小写）
+            safe_prefixes: 安全命令前缀（区分大小写）
+            confirmation_prefixes: 需要确认的命令前缀（区分大小写）
+            flags: 规则正则的编译标志
+            
+        Raises:
+            re.error: 规则正则无法编译
+        """
+        self.flags = flags
+        self._dangerous: List[Tuple[re.Pattern, str, RiskLevel]] = []
+        self._admin: List[re.Pattern] = []
+        self._keywords: Dict[str, List[int]] = {}
+        self._always = [0, 0]
+        # (关键词正则, 小写关键词 -> 该关键词及其前缀关键词的规则位图)，
+        # 整体替换以便扫描时无需加锁
+        self._keyword_index: Tuple[Optional[re.Pattern], Dict[str, Tuple[int, int]]] = (None, {})
+        
+        for pattern, description, risk_level in dangerous_rules:
+            self._add(0, pattern, (description, risk_level))
+        for pattern in admin_patterns:
+            self._add(1, pattern, None)
+        self._build_keyword_pattern()
+        
+        self.pipeline_commands = tuple(pipeline_commands)
+        self.safe_prefixes = tuple(safe_prefixes)
+        self.confirmation_prefixes = tuple(confirmation_prefixes)
+        # 管道各段以危险命令开头：同一位置按列表顺序尝试，与逐段逐条检查的结果一致
+        self._pipeline_pattern = re.compile(
+            r'(?:^|\|)\s*(' + '|'.join(map(re.escape, self.pipeline_commands)) + ')'
+        ) if self.pipeline_commands else None
+    
+    @property
+    def rule_count(self) -> int:
+        """正则规则总数"""
+        return len(self._dangerous) + len(self._admin)
+    
+    def _add(self, kind: int, pattern: str, payload: Optional[Tuple[str, RiskLevel]]) -> None:
+        """编译一条规则并加入关键词索引（不重建关键词正则）"""
+        compiled = re.compile(pattern, self.flags)
+        if kind == 0:
+            position = len(self._dangerous)
+            self._dangerous.append((compiled, payload[0], payload[1]))
+        else:
+            position = len(self._admin)
+            self._admin.append(compiled)
+        
+        keyword = extract_keyword(pattern, self.flags)
+        if keyword is None:
+            self._always[kind] |= 1 << position
+        else:
+            masks = self._keywords.setdefault(keyword.lower(), [0, 0])
+            masks[kind] |= 1 << position
+    
+    def _build_keyword_pattern(self) -> None:
+        """将全部关键词合并为一个前缀树正则
+        
+        在每个位置用前瞻匹配最长的关键词，同一位置出现的较短关键词必然是它的
+        前缀，其规则位图预先合并到长关键词上，因此一次扫描即可得到全部候选规则。
+        """
+        keywords = sorted(self._keywords)
+        if not keywords:
+            self._keyword_index = (None, {})
+            return
+        
+        pattern = re.compile('(?=(' + _trie_pattern(keywords) + '))', self.flags)
+        masks = {}
+        for keyword in keywords:
+            danger_mask, admin_mask = 0, 0
+            for other in keywords:
+                if keyword.startswith(other):
+                    danger_mask |= self._keywords[other][0]
+                    admin_mask |= self._keywords[other][1]
+            masks[keyword] = (danger_mask, admin_mask)
+        self._keyword_index = (pattern, masks)
+    
+    def add_dangerous_rule(self, pattern: str, description: str, risk_level: RiskLevel) -> None:
+        """添加危险规则（优先级最低）
+        
+        Args:
+            pattern: 正则表达式
+            description: 规则描述
+            risk_level: 风险等级
+            
+        Raises:
+            re.error: 正则无法编译
+        """
+        self._add(0, pattern, (description, risk_level))
+        self._build_keyword_pattern()
+    
+    def _candidate_masks(self, command: str) -> Tuple[int, int]:
+        """扫描一遍命令，计算危险规则和管理员规则的候选位图"""
+        danger_mask, admin_mask = self._always
+        pattern, keyword_masks = self._keyword_index
+        if pattern is None:
+            return danger_mask, admin_mask
+        
+        for match in pattern.finditer(command):
+            masks = keyword_masks[_fold_ascii(match.group(1), self.flags)]
+            danger_mask |= masks[0]
+            admin_mask |= masks[1]
+        return danger_mask, admin_mask
+    
+    def _first_danger(self, command: str, mask: int) -> Optional[Tuple[str, RiskLevel]]:
+        """按规则顺序求值候选危险规则"""
+        while mask:
+            lowest = mask & -mask
+            mask ^= lowest
+            compiled, description, risk_level = self._dangerous[lowest.bit_length() - 1]
+            if compiled.search(command):
+                return description, risk_level
+        return None
+    
+    def _any_admin(self, command: str, mask: int) -> bool:
+        """求值候选管理员权限规则"""
+        while mask:
+            lowest = mask & -mask
+            mask ^= lowest
+            if self._admin[lowest.bit_length() - 1].search(command):
+                return True
+        return False
+    
+    def pipeline_command(self, command: str) -> Optional[str]:
+        """获取管道中首个危险命令
+        
+        与逐段检查一致，只有命令包含管道时才检查（包括第一段）。
+        
+        Args:
+            command: PowerShell 命令
+            
+        Returns:
+            Optional[str]: 危险命令前缀，没有时返回 None
+        """
+        if self._pipeline_pattern is None or '|' not in command:
+            return None
+        match = self._pipeline_pattern.search(command)
+        return match.group(1) if match else None
+    
+    def first_danger(self, command: str) -> Optional[Tuple[str, RiskLevel]]:
+        """获取首个命中的危险规则
+        
+        Args:
+            command: PowerShell 命令
+            
+        Returns:
+            Optional[Tuple[str, RiskLevel]]: (描述, 风险等级)，未命中时返回 None
+        """
+        danger_mask, _ = self._candidate_masks(command)
+        return self._first_danger(command, danger_mask)
+    
+    def requires_admin(self, command: str) -> bool:
+        """判断命令是否命中需要管理员权限的规则
+        
+        Args:
+            command: PowerShell 命令
+            
+        Returns:
+            bool: 是否需要管理员权限
+        """
+        _, admin_mask = self._candidate_masks(command)
+        return self._any_admin(command, admin_mask)
+    
+    def scan(self, command: str) -> RiskScan:
+        """对命令执行全部规则集的分类
+        
+        Args:
+            command: PowerShell 命令
+            
+        Returns:
+            RiskScan: 扫描结果
+        """
+        danger_mask, admin_mask = self._candidate_masks(command)
+        return RiskScan(
+            danger=self._first_danger(command, danger_mask),
+            requires_admin=self._any_admin(command, admin_mask),
+            pipeline_command=self.pipeline_command(command),
+            safe_prefix=command.startswith(self.safe_prefixes),
+            confirmation_prefix=command.startswith(self.confirmation_prefixes)
+        )
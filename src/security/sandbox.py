@@ -6,9 +6,11 @@
 
 import logging
 import platform
+import threading
 import time
 from typing import Optional, Dict, Any
 from src.interfaces.base import ExecutionResult, ExecutionStatus
+from src.security.container_pool import SandboxContainerPool, SandboxPoolError, SandboxPoolTimeout
 
 
 class SandboxExecutor:
@@ -28,6 +30,11 @@ class SandboxExecutor:
                 - timeout: 超时时间（秒）
                 - network_disabled: 是否禁用网络
                 - read_only: 是否只读文件系统
+                - sandbox_pool_enabled: 是否使用预热容器池
+                - sandbox_pool_min_size: 保持预热的最少容器数
+                - sandbox_pool_max_size: 最多同时存在的池容器数
+                - sandbox_pool_idle_timeout: 多余容器的空闲回收时间（秒）
+                - sandbox_pool_max_uses: 单个容器复用的最大次数
         """
         self.config = config or {}
         self.logger = logging.getLogger(__name__)
@@ -40,9 +47,18 @@ class SandboxExecutor:
         self.network_disabled = self.config.get('network_disabled', True)
         self.read_only = self.config.get('read_only', False)  # 默认改为 False 以支持文件操作
         
+        # 预热容器池
+        self.pool_enabled = self.config.get('sandbox_pool_enabled', False)
+        self.pool_min_size = self.config.get('sandbox_pool_min_size', 1)
+        self.pool_max_size = self.config.get('sandbox_pool_max_size', 4)
+        self.pool_idle_timeout = self.config.get('sandbox_pool_idle_timeout', 300)
+        self.pool_max_uses = self.config.get('sandbox_pool_max_uses', 50)
+        
         # Docker 客户端（延迟初始化）
         self._docker_client = None
         self._docker_available = None
+        self._pool: Optional[SandboxContainerPool] = None
+        self._pool_lock = threading.Lock()
         
         # 检测是否是 Windows 系统
         self.is_windows = platform.system() == 'Windows'
@@ -65,6 +81,34 @@ class SandboxExecutor:
         
         return self._docker_client
     
+    @property
+    def pool(self) -> Optional[SandboxContainerPool]:
+        """获取预热容器池（首次使用时创建并预热）"""
+        if not self.pool_enabled or not self.is_available():
+            return None
+        
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = SandboxContainerPool(
+                    self.docker_client,
+                    self._build_pool_container_config(),
+                    min_size=self.pool_min_size,
+                    max_size=self.pool_max_size,
+                    idle_timeout=self.pool_idle_timeout,
+                    max_uses=self.pool_max_uses,
+                    # 只读根文件系统的容器只需清空 /tmp 即可复用
+                    resettable=self.read_only and not self.is_windows
+                )
+                self._pool.warm()
+        return self._pool
+    
+    def close(self) -> None:
+        """关闭预热容器池"""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.close()
+    
     def is_available(self) -> bool:
         """检查沙箱是否可用
         
@@ -107,6 +151,24 @@ class SandboxExecutor:
                 command = self._convert_windows_path_to_container(command)
                 self.logger.info(f"路径转换: {original_command} -> {command}")
             
+            # 优先使用预热容器池
+            pool = self.pool
+            if pool is not None:
+                try:
+                    pooled = pool.execute(['pwsh', '-Command', command], timeout)
+                except SandboxPoolTimeout:
+                    raise
+                except SandboxPoolError as e:
+                    # 容器池异常时回退到一次性容器
+                    self.logger.warning(f"沙箱容器池执行失败，改用一次性容器: {e}")
+                    pooled = None
+                if pooled is not None:
+                    self.logger.info(f"在预热沙箱容器中执行命令: {command}")
+                    return self._build_result(
+                        original_command, command, pooled['output'], pooled['error'],
+                        pooled['return_code'], pooled['container_id'], start_time, pooled=True
+                    )
+            
             # 构建 Docker 运行参数
             container_config = self._build_container_config(command)
             
@@ -126,44 +188,9 @@ class SandboxExecutor:
                 output = container.logs(stdout=True, stderr=False).decode('utf-8', errors='ignore')
                 error = container.logs(stdout=False, stderr=True).decode('utf-8', errors='ignore')
                 
-                execution_time = time.time() - start_time
-                return_code = result.get('StatusCode', -1)
-                
-                # 构建详细的输出信息
-                detailed_output = output
-                if not output and not error:
-                    # 如果没有输出，添加沙箱执行说明
-                    if return_code == 0:
-                        detailed_output = f"[沙箱执行成功]\n" \
-                            f"容器ID: {container.id[:12]}\n" \
-                            f"镜像: {self.docker_image}\n" \
-                            f"执行时间: {execution_time:.3f}s\n" \
-                            f"注意: 命令在隔离容器中执行，不会影响宿主机文件系统。"
-                    else:
-                        detailed_output = f"[沙箱执行完成，返回码: {return_code}]"
-                elif return_code != 0 and error:
-                    # 如果有错误，添加错误说明
-                    error_lower = error.lower()
-                    if "permission denied" in error_lower or "access" in error_lower and "denied" in error_lower:
-                        error = f"[沙箱保护] 操作被拒绝 - 文件系统为只读模式\n" \
-                            f"原始错误: {error}\n" \
-                            f"说明: 沙箱模式保护了您的系统，文件未被修改。\n" \
-                            f"如果确实需要执行此操作，请关闭沙箱模式后重试。"
-                
-                return ExecutionResult(
-                    success=(return_code == 0),
-                    command=original_command,  # 返回原始命令
-                    output=detailed_output,
-                    error=error,
-                    return_code=return_code,
-                    execution_time=execution_time,
-                    status=ExecutionStatus.SUCCESS if return_code == 0 else ExecutionStatus.FAILED,
-                    metadata={
-                        'sandbox': True,
-                        'container_id': container.id[:12],
-                        'image': self.docker_image,
-                        'converted_command': command if command != original_command else None
-                    }
+                return self._build_result(
+                    original_command, command, output, error,
+                    result.get('StatusCode', -1), container.id[:12], start_time
                 )
             
             finally:
@@ -174,7 +201,7 @@ class SandboxExecutor:
                     self.logger.warning(f"清理容器失败: {e}")
         
         except Exception as e:
-            if "timeout" in str(e).lower():
+            if isinstance(e, SandboxPoolTimeout) or "timeout" in str(e).lower():
                 self.logger.error(f"沙箱执行超时: {original_command}")
                 return ExecutionResult(
                     success=False,
@@ -193,6 +220,82 @@ class SandboxExecutor:
                     status=ExecutionStatus.FAILED
                 )
     
+    def _build_result(
+        self,
+        original_command: str,
+        command: str,
+        output: str,
+        error: str,
+        return_code: int,
+        container_id: str,
+        start_time: float,
+        pooled: bool = False
+    ) -> ExecutionResult:
+        """根据容器输出构建执行结果
+        
+        Args:
+            original_command: 原始命令
+            command: 路径转换后实际执行的命令
+            output: 标准输出
+            error: 标准错误
+            return_code: 返回码
+            container_id: 容器短 ID
+            start_time: 开始执行的时间戳
+            pooled: 是否在预热容器中执行
+            
+        Returns:
+            ExecutionResult: 执行结果
+        """
+        execution_time = time.time() - start_time
+        
+        # 构建详细的输出信息
+        detailed_output = output
+        if not output and not error:
+            # 如果没有输出，添加沙箱执行说明
+            if return_code == 0:
+                detailed_output = f"[沙箱执行成功]\n" \
+                    f"容器ID: {container_id}\n" \
+                    f"镜像: {self.docker_image}\n" \
+                    f"执行时间: {execution_time:.3f}s\n" \
+                    f"注意: 命令在隔离容器中执行，不会影响宿主机文件系统。"
+            else:
+                detailed_output = f"[沙箱执行完成，返回码: {return_code}]"
+        elif return_code != 0 and error:
+            # 如果有错误，添加错误说明
+            error_lower = error.lower()
+            if "permission denied" in error_lower or "access" in error_lower and "denied" in error_lower:
+                error = f"[沙箱保护] 操作被拒绝 - 文件系统为只读模式\n" \
+                    f"原始错误: {error}\n" \
+                    f"说明: 沙箱模式保护了您的系统，文件未被修改。\n" \
+                    f"如果确实需要执行此操作，请关闭沙箱模式后重试。"
+        
+        return ExecutionResult(
+            success=(return_code == 0),
+            command=original_command,  # 返回原始命令
+            output=detailed_output,
+            error=error,
+            return_code=return_code,
+            execution_time=execution_time,
+            status=ExecutionStatus.SUCCESS if return_code == 0 else ExecutionStatus.FAILED,
+            metadata={
+                'sandbox': True,
+                'container_id': container_id,
+                'image': self.docker_image,
+                'converted_command': command if command != original_command else None,
+                'pooled': pooled
+            }
+        )
+    
+    def _build_pool_container_config(self) -> Dict[str, Any]:
+        """构建预热容器的配置（不含命令，命令通过 exec 执行）
+        
+        Returns:
+            dict: Docker 容器配置
+        """
+        config = self._build_container_config('')
+        config.pop('command', None)
+        return config
+    
     def _build_container_config(self, command: str) -> Dict[str, Any]:
         """构建容器配置
         
@@ -320,11 +423,12 @@ class SandboxExecutor:
             'timeout': self.timeout,
             'network_disabled': self.network_disabled,
             'read_only': self.read_only,
-            'is_windows': self.is_windows
+            'is_windows': self.is_windows,
+            'pool': self._pool.get_stats() if self._pool is not None else None
         }
     
     def cleanup_containers(self) -> int:
-        """清理所有停止的容器
+        """清理所有停止的容器，并回收预热容器池中空闲超时的容器
         
         Returns:
             int: 清理的容器数量
@@ -332,6 +436,8 @@ class SandboxExecutor:
         if not self.is_available():
             return 0
         
+        reaped = self._pool.reap_idle() if self._pool is not None else 0
+        
         try:
             containers = self.docker_client.containers.list(
                 all=True,
@@ -346,9 +452,9 @@ class SandboxExecutor:
                 except Exception as e:
                     self.logger.warning(f"清理容器 {container.id[:12]} 失败: {e}")
             
-            self.logger.info(f"清理了 {count} 个停止的容器")
-            return count
+            self.logger.info(f"清理了 {count} 个停止的容器，回收了 {reaped} 个空闲的预热容器")
+            return count + reaped
         
         except Exception as e:
             self.logger.error(f"清理容器失败: {e}")
-            return 0
+            return reaped
@@ -7,6 +7,7 @@
 import re
 from typing import List, Dict, Set
 from src.interfaces.base import ValidationResult, RiskLevel
+from src.security.risk_scanner import RiskScanner
 
 
 class CommandWhitelist:
@@ -118,28 +119,32 @@ class CommandWhitelist:
         if 'dangerous_patterns' in self.config:
             self.custom_dangerous_patterns.extend(self.config['dangerous_patterns'])
         self.custom_safe_commands = set(self.config.get('custom_safe_commands', []))
+        # 规则版本：自定义规则或安全命令变化时递增，用于使缓存的验证结果失效
+        self.ruleset_version = 0
         # 加载自定义安全前缀
         self.custom_safe_prefixes = self.config.get('safe_prefixes', [])
         
-        # 编译正则表达式以提高性能
-        self._compiled_patterns = [
-            (re.compile(pattern, re.IGNORECASE), desc, risk)
-            for pattern, desc, risk in self.DANGEROUS_PATTERNS
-        ]
+        # 所有规则集预编译为一个扫描器，每条命令只需扫描一遍
+        dangerous_rules = list(self.DANGEROUS_PATTERNS)
         
         # 添加自定义危险模式
         for pattern in self.custom_dangerous_patterns:
             if isinstance(pattern, str):
                 try:
                     # 处理转义序列问题
-                    compiled_pattern = re.compile(pattern, re.IGNORECASE)
-                    self._compiled_patterns.append(
-                        (compiled_pattern, "自定义危险模式", RiskLevel.HIGH)
-                    )
+                    re.compile(pattern, re.IGNORECASE)
+                    dangerous_rules.append((pattern, "自定义危险模式", RiskLevel.HIGH))
                 except re.error as e:
                     # 如果正则表达式编译失败，跳过该模式
                     import logging
                     logging.warning(f"自定义危险模式编译失败: {pattern}, 错误: {e}")
+        
+        self._scanner = RiskScanner(
+            dangerous_rules=dangerous_rules,
+            pipeline_commands=self.PIPELINE_DANGEROUS_COMMANDS,
+            safe_prefixes=list(self.SAFE_PREFIXES) + list(self.custom_safe_prefixes),
+            confirmation_prefixes=self.CONFIRMATION_PREFIXES
+        )
     
     def validate(self, command: str) -> ValidationResult:
         """验证命令是否安全
@@ -160,32 +165,29 @@ class CommandWhitelist:
                 requires_confirmation=False
             )
         
+        scan = self._scanner.scan(command)
+        
         # 检查危险模式
-        for pattern, description, risk_level in self._compiled_patterns:
-            if pattern.search(command):
-                return ValidationResult(
-                    is_valid=False,
-                    risk_level=risk_level,
-                    blocked_reasons=[f"检测到危险命令: {description}"],
-                    requires_confirmation=False
-                )
+        if scan.danger:
+            description, risk_level = scan.danger
+            return ValidationResult(
+                is_valid=False,
+                risk_level=risk_level,
+                blocked_reasons=[f"检测到危险命令: {description}"],
+                requires_confirmation=False
+            )
         
         # 检查管道中是否有危险命令
-        if '|' in command:
-            parts = command.split('|')
-            for part in parts:
-                part = part.strip()
-                for dangerous_cmd in self.PIPELINE_DANGEROUS_COMMANDS:
-                    if part.startswith(dangerous_cmd):
-                        return ValidationResult(
-                            is_valid=True,
-                            risk_level=RiskLevel.HIGH,
-                            requires_confirmation=True,
-                            warnings=[f"管道中包含危险命令: {dangerous_cmd}"]
-                        )
+        if scan.pipeline_command:
+            return ValidationResult(
+                is_valid=True,
+                risk_level=RiskLevel.HIGH,
+                requires_confirmation=True,
+                warnings=[f"管道中包含危险命令: {scan.pipeline_command}"]
+            )
         
         # 检查安全前缀
-        if self._starts_with_safe_prefix(command):
+        if scan.safe_prefix:
             return ValidationResult(
                 is_valid=True,
                 risk_level=RiskLevel.SAFE,
@@ -193,7 +195,7 @@ class CommandWhitelist:
             )
         
         # 检查需要确认的前缀
-        if self._starts_with_confirmation_prefix(command):
+        if scan.confirmation_prefix:
             return ValidationResult(
                 is_valid=True,
                 risk_level=RiskLevel.MEDIUM,
@@ -226,10 +228,8 @@ class CommandWhitelist:
         Returns:
             bool: 是否为危险命令
         """
-        for pattern, _, risk_level in self._compiled_patterns:
-            if pattern.search(command):
-                return risk_level in [RiskLevel.HIGH, RiskLevel.CRITICAL]
-        return False
+        danger = self._scanner.first_danger(command)
+        return danger is not None and danger[1] in [RiskLevel.HIGH, RiskLevel.CRITICAL]
     
     def get_risk_level(self, command: str) -> RiskLevel:
         """获取命令的风险等级
@@ -240,17 +240,18 @@ class CommandWhitelist:
         Returns:
             RiskLevel: 风险等级
         """
+        scan = self._scanner.scan(command)
+        
         # 检查危险模式
-        for pattern, _, risk_level in self._compiled_patterns:
-            if pattern.search(command):
-                return risk_level
+        if scan.danger:
+            return scan.danger[1]
         
-        # 检查安全前缀
-        if self._starts_with_safe_prefix(command):
+        # 检查安全前缀（管道后有危险命令时不是安全的）
+        if scan.safe_prefix and not scan.pipeline_command:
             return RiskLevel.SAFE
         
         # 检查需要确认的前缀
-        if self._starts_with_confirmation_prefix(command):
+        if scan.confirmation_prefix:
             return RiskLevel.MEDIUM
         
         # 默认为低风险
@@ -264,8 +265,8 @@ class CommandWhitelist:
             description: 模式描述
             risk_level: 风险等级
         """
-        compiled = re.compile(pattern, re.IGNORECASE)
-        self._compiled_patterns.append((compiled, description or "自定义规则", risk_level))
+        self._scanner.add_dangerous_rule(pattern, description or "自定义规则", risk_level)
+        self.ruleset_version += 1
     
     def add_safe_command(self, command: str):
         """添加自定义安全命令
@@ -274,6 +275,7 @@ class CommandWhitelist:
             command: 安全命令
         """
         self.custom_safe_commands.add(command)
+        self.ruleset_version += 1
     
     def _starts_with_safe_prefix(self, command: str) -> bool:
         """检查命令是否以安全前缀开头
@@ -284,24 +286,10 @@ class CommandWhitelist:
         Returns:
             bool: 是否以安全前缀开头
         """
-        # 首先检查管道后是否有危险命令
-        if '|' in command:
-            # 分割管道，检查每个部分
-            parts = command.split('|')
-            for part in parts:
-                part = part.strip()
-                # 检查管道后的命令是否是危险的
-                for dangerous_cmd in self.PIPELINE_DANGEROUS_COMMANDS:
-                    if part.startswith(dangerous_cmd):
-                        return False  # 管道后有危险命令，不是安全的
-        
-        # 检查硬编码的安全前缀
-        if any(command.startswith(prefix) for prefix in self.SAFE_PREFIXES):
-            return True
-        # 检查配置文件中定义的安全前缀
-        if any(command.startswith(prefix) for prefix in self.custom_safe_prefixes):
-            return True
-        return False
+        # 管道后有危险命令时不是安全的
+        if self._scanner.pipeline_command(command):
+            return False
+        return command.startswith(self._scanner.safe_prefixes)
     
     def _starts_with_confirmation_prefix(self, command: str) -> bool:
         """检查命令是否以需要确认的前缀开头
@@ -312,4 +300,4 @@ class CommandWhitelist:
         Returns:
             bool: 是否以需要确认的前缀开头
         """
-        return any(command.startswith(prefix) for prefix in self.CONFIRMATION_PREFIXES)
+        return command.startswith(self._scanner.confirmation_prefixes)
@@ -6,10 +6,14 @@
 
 from .interfaces import StorageInterface
 from .file_storage import FileStorage
+from .memory_storage import MemoryStorage
+from .sqlite_storage import SQLiteStorage
 from .factory import StorageFactory
 
 __all__ = [
     'StorageInterface',
     'FileStorage',
+    'MemoryStorage',
+    'SQLiteStorage',
     'StorageFactory',
 ]
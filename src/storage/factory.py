@@ -4,11 +4,14 @@
 提供统一的存储实例创建接口，支持不同的存储后端。
 """
 
+import os
 from typing import Optional, Dict, Any
 from enum import Enum
 
 from .interfaces import StorageInterface
 from .file_storage import FileStorage
+from .memory_storage import MemoryStorage
+from .sqlite_storage import SQLiteStorage
 
 
 class StorageType(Enum):
@@ -53,6 +56,7 @@ class StorageFactory:
             return cls._instances[cache_key]
         
         # 根据类型创建实例
+        instance: StorageInterface
         if storage_type == StorageType.FILE.value:
             instance = cls._create_file_storage(config)
         elif storage_type == StorageType.MEMORY.value:
@@ -73,45 +77,55 @@ class StorageFactory:
         创建文件存储实例
         
         Args:
-            config: 配置字典，可包含 base_path
+            config: 配置字典，可包含 base_path、max_history_size、
+                history_fsync 和 history_fsync_interval
             
         Returns:
             FileStorage: 文件存储实例
         """
         base_path = config.get("base_path")
-        return FileStorage(base_path=base_path)
+        return FileStorage(
+            base_path=base_path,
+            max_history_size=config.get("max_history_size"),
+            history_fsync=config.get("history_fsync", "interval"),
+            history_fsync_interval=config.get("history_fsync_interval", 1.0)
+        )
     
     @classmethod
-    def _create_memory_storage(cls, config: Dict[str, Any]) -> StorageInterface:
+    def _create_memory_storage(cls, config: Dict[str, Any]) -> MemoryStorage:
         """
-        创建内存存储实例（未实现）
+        创建内存存储实例
         
         Args:
-            config: 配置字典
+            config: 配置字典，可包含 max_history_size 和 memory_dump_path
             
         Returns:
-            StorageInterface: 内存存储实例
-            
-        Raises:
-            NotImplementedError: 内存存储尚未实现
+            MemoryStorage: 内存存储实例
         """
-        raise NotImplementedError("内存存储尚未实现")
+        return MemoryStorage(
+            max_history_size=config.get("max_history_size"),
+            dump_path=config.get("memory_dump_path")
+        )
     
     @classmethod
-    def _create_database_storage(cls, config: Dict[str, Any]) -> StorageInterface:
+    def _create_database_storage(cls, config: Dict[str, Any]) -> SQLiteStorage:
         """
-        创建数据库存储实例（未实现）
+        创建数据库存储实例（SQLite）
         
         Args:
-            config: 配置字典
+            config: 配置字典，可包含 base_path、db_file、max_history_size
+                和 busy_timeout
             
         Returns:
-            StorageInterface: 数据库存储实例
-            
-        Raises:
-            NotImplementedError: 数据库存储尚未实现
+            SQLiteStorage: SQLite 存储实例
         """
-        raise NotImplementedError("数据库存储尚未实现")
+        base_path = os.path.expanduser(config.get("base_path") or "~/.ai-powershell")
+        db_path = os.path.join(base_path, config.get("db_file", "storage.db"))
+        return SQLiteStorage(
+            db_path=db_path,
+            max_history_size=config.get("max_history_size"),
+            busy_timeout=config.get("busy_timeout", 30.0)
+        )
     
     @classmethod
     def get_default_storage(cls) -> StorageInterface:
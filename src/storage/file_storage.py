@@ -2,38 +2,88 @@
 文件存储实现
 
 基于文件系统的存储实现，支持历史记录、配置和缓存的持久化。
+
+历史记录使用只追加的 JSON Lines 文件（history.jsonl）保存，每条记录一行：
+- 保存时只追加一行，不读取、不重写已有记录
+- 追加和压缩通过锁文件在多个进程之间互斥
+- 超过 max_history_size 后压缩为最近的记录
+- 按条数加载时从文件末尾向前读取
 """
 
 import json
 import yaml
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, timedelta
 import os
+import sys
+import threading
+import time
+
+# 进程间的历史文件锁：Windows 使用 msvcrt，其他平台使用 fcntl
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
 
 from .interfaces import StorageInterface
 
 
+# 历史文件 fsync 策略
+FSYNC_POLICIES = ("always", "interval", "never")
+
+# 反向读取历史文件时的块大小
+_READ_BLOCK_SIZE = 64 * 1024
+
+
 class FileStorage(StorageInterface):
     """文件存储实现类"""
     
-    def __init__(self, base_path: Optional[str] = None):
+    def __init__(
+        self,
+        base_path: Optional[str] = None,
+        max_history_size: Optional[int] = None,
+        history_fsync: str = "interval",
+        history_fsync_interval: float = 1.0
+    ):
         """
         初始化文件存储
         
         Args:
             base_path: 存储基础路径，默认为 ~/.ai-powershell
+            max_history_size: 最大历史记录数，None 或 0 表示不限制
+            history_fsync: 历史文件 fsync 策略 ("always", "interval", "never")
+            history_fsync_interval: interval 策略下两次 fsync 的最小间隔（秒）
+            
+        Raises:
+            ValueError: 不支持的 fsync 策略
         """
         if base_path is None:
             base_path = os.path.expanduser("~/.ai-powershell")
+        if history_fsync not in FSYNC_POLICIES:
+            raise ValueError(f"history_fsync 必须是以下之一: {', '.join(FSYNC_POLICIES)}")
         
         self.base_path = Path(base_path)
-        self.history_file = self.base_path / "history.json"
+        self.history_file = self.base_path / "history.jsonl"
+        self.legacy_history_file = self.base_path / "history.json"
         self.config_file = self.base_path / "config.yaml"
         self.cache_dir = self.base_path / "cache"
         
+        self.max_history_size = max_history_size
+        self.history_fsync = history_fsync
+        self.history_fsync_interval = history_fsync_interval
+        
+        self._history_lock = threading.RLock()
+        self._history_lock_file = self.base_path / "history.jsonl.lock"
+        self._history_count: Optional[int] = None
+        self._history_size = 0
+        self._history_inode: Optional[int] = None
+        self._last_fsync = float("-inf")
+        
         # 确保目录存在
         self._ensure_directories()
+        self._migrate_legacy_history()
     
     def _ensure_directories(self) -> None:
         """确保所有必要的目录存在"""
@@ -44,6 +94,9 @@ class FileStorage(StorageInterface):
         """
         保存历史记录
         
+        以 JSON Lines 格式追加到历史文件末尾，单条记录只写入一行，
+        不需要读取或重写已有记录。超过 max_history_size 后自动压缩。
+        
         Args:
             entry: 历史记录条目
             
@@ -51,19 +104,31 @@ class FileStorage(StorageInterface):
             bool: 保存是否成功
         """
         try:
-            # 加载现有历史
-            history = self.load_history()
-            
             # 添加时间戳
             if "timestamp" not in entry:
                 entry["timestamp"] = datetime.now().isoformat()
             
-            # 添加新记录
-            history.append(entry)
-            
-            # 保存到文件
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(history, f, indent=2, ensure_ascii=False)
+            line = (json.dumps(entry, ensure_ascii=False) + "\n").encode('utf-8')
+            
+            with self._history_guard():
+                fd = os.open(
+                    self.history_file,
+                    os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, 'O_BINARY', 0),
+                    0o644
+                )
+                try:
+                    # 整行一次写入，O_APPEND 保证多个进程的追加不会互相覆盖
+                    written = 0
+                    while written < len(line):
+                        written += os.write(fd, line[written:])
+                    self._sync_history(fd)
+                    stat = os.fstat(fd)
+                finally:
+                    os.close(fd)
+                
+                self._track_append(stat.st_size, stat.st_ino)
+                if self._needs_compaction():
+                    self._compact_history()
             
             return True
         except Exception as e:
@@ -74,6 +139,9 @@ class FileStorage(StorageInterface):
         """
         加载历史记录
         
+        指定 limit 时从文件末尾按块向前读取，只解析最近的 limit 条记录。
+        无法解析的行（如写入中断留下的半行）会被跳过。
+        
         Args:
             limit: 返回的最大记录数
             
@@ -84,8 +152,24 @@ class FileStorage(StorageInterface):
             if not self.history_file.exists():
                 return []
             
-            with open(self.history_file, 'r', encoding='utf-8') as f:
-                history = json.load(f)
+            # 尚未压缩的多余记录不对外可见
+            if self.max_history_size and (limit is None or limit <= 0 or limit > self.max_history_size):
+                limit = self.max_history_size
+            
+            if limit is not None and limit > 0:
+                lines = self._read_tail_lines(limit)
+            else:
+                with open(self.history_file, 'rb') as f:
+                    lines = f.read().split(b"\n")
+            
+            history = []
+            for line in lines:
+                if not line.strip():
+                    continue
+                try:
+                    history.append(json.loads(line))
+                except ValueError:
+                    continue
             
             # 如果指定了限制，返回最近的记录
             if limit is not None and limit > 0:
@@ -96,6 +180,49 @@ class FileStorage(StorageInterface):
             print(f"加载历史记录失败: {e}")
             return []
     
+    def load_history_since(
+        self,
+        cursor: Optional[Any] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[Any], bool]:
+        """
+        增量加载历史记录
+        
+        游标为 (文件标识, 字节偏移)。历史文件只追加，因此只需读取偏移之后的新行；
+        文件被压缩、批量重写或清除后文件标识改变，此时返回全部记录并要求重建。
+        末尾不完整的行留到下次读取。
+        
+        Args:
+            cursor: 上次调用返回的游标，None 表示从头加载
+            
+        Returns:
+            Tuple[List[Dict[str, Any]], Optional[Any], bool]: (记录列表, 新游标, 是否需要重建)
+        """
+        try:
+            with open(self.history_file, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                identity = (stat.st_dev, stat.st_ino)
+                reset = cursor is None or cursor[0] != identity or cursor[1] > stat.st_size
+                offset = 0 if reset else cursor[1]
+                f.seek(offset)
+                data = f.read(stat.st_size - offset)
+        except FileNotFoundError:
+            return [], None, True
+        except Exception as e:
+            print(f"加载历史记录失败: {e}")
+            return [], None, True
+        
+        end = data.rfind(b"\n") + 1
+        entries = []
+        for line in data[:end].split(b"\n"):
+            if not line.strip():
+                continue
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+        
+        return entries, (identity, offset + end), reset
+    
     def clear_history(self) -> bool:
         """
         清除所有历史记录
@@ -104,13 +231,197 @@ class FileStorage(StorageInterface):
             bool: 清除是否成功
         """
         try:
-            if self.history_file.exists():
-                self.history_file.unlink()
+            with self._history_guard():
+                if self.history_file.exists():
+                    self.history_file.unlink()
+                if self.legacy_history_file.exists():
+                    self.legacy_history_file.unlink()
+                self._history_count = 0
+                self._history_size = 0
+                self._history_inode = None
             return True
         except Exception as e:
             print(f"清除历史记录失败: {e}")
             return False
     
+    def delete_history(self, command_ids: List[str]) -> bool:
+        """
+        删除指定 command_id 的历史记录
+        
+        在历史文件锁内过滤并原子地重写历史文件，没有匹配的记录时不重写。
+        
+        Args:
+            command_ids: 要删除的命令 ID 列表
+            
+        Returns:
+            bool: 删除是否成功
+        """
+        ids = set(command_ids)
+        if not ids:
+            return True
+        try:
+            with self._history_guard():
+                if not self.history_file.exists():
+                    return True
+                with open(self.history_file, 'rb') as f:
+                    lines = [line for line in f.read().split(b"\n") if line.strip()]
+                
+                kept = []
+                for line in lines:
+                    try:
+                        command_id = json.loads(line).get("command_id")
+                    except (ValueError, AttributeError):
+                        command_id = None
+                    if command_id not in ids:
+                        kept.append(line)
+                
+                if len(kept) != len(lines):
+                    self._write_history_lines(kept)
+            return True
+        except Exception as e:
+            print(f"删除历史记录失败: {e}")
+            return False
+    
+    @contextmanager
+    def _history_guard(self):
+        """历史文件写锁：进程内使用线程锁，进程间使用锁文件"""
+        with self._history_lock:
+            with open(self._history_lock_file, 'a+b') as lock_fp:
+                if sys.platform == "win32":
+                    lock_fp.seek(0)
+                    msvcrt.locking(lock_fp.fileno(), msvcrt.LK_LOCK, 1)
+                else:
+                    fcntl.flock(lock_fp.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if sys.platform == "win32":
+                        lock_fp.seek(0)
+                        msvcrt.locking(lock_fp.fileno(), msvcrt.LK_UNLCK, 1)
+                    else:
+                        fcntl.flock(lock_fp.fileno(), fcntl.LOCK_UN)
+    
+    def _sync_history(self, fd: int) -> None:
+        """按 fsync 策略将追加的数据刷到磁盘"""
+        if self.history_fsync == "always":
+            os.fsync(fd)
+        elif self.history_fsync == "interval":
+            now = time.monotonic()
+            if now - self._last_fsync >= self.history_fsync_interval:
+                os.fsync(fd)
+                self._last_fsync = now
+    
+    def _track_append(self, size: int, inode: int) -> None:
+        """更新记录数计数
+        
+        只统计上次记录位置之后新增的字节中的行数（包括其他进程追加的行）；
+        文件被替换（压缩）或变小时才重新统计全部行数。
+        """
+        if (self._history_count is None or inode != self._history_inode
+                or size < self._history_size):
+            self._history_count = self._count_history_lines()
+        else:
+            self._history_count += self._count_history_lines(self._history_size, size)
+        self._history_size = size
+        self._history_inode = inode
+    
+    def _count_history_lines(self, start: int = 0, end: Optional[int] = None) -> int:
+        """按块统计历史文件 [start, end) 范围内的行数"""
+        if not self.history_file.exists():
+            return 0
+        count = 0
+        with open(self.history_file, 'rb') as f:
+            f.seek(start)
+            remaining = end - start if end is not None else None
+            while remaining is None or remaining > 0:
+                size = _READ_BLOCK_SIZE if remaining is None else min(_READ_BLOCK_SIZE, remaining)
+                block = f.read(size)
+                if not block:
+                    break
+                count += block.count(b"\n")
+                if remaining is not None:
+                    remaining -= len(block)
+        return count
+    
+    def _needs_compaction(self) -> bool:
+        """超过上限一定余量后才压缩，避免每次追加都重写文件"""
+        if not self.max_history_size or self._history_count is None:
+            return False
+        slack = max(1, self.max_history_size // 10)
+        return self._history_count > self.max_history_size + slack
+    
+    def _compact_history(self) -> None:
+        """只保留最近 max_history_size 条记录（调用方需持有历史文件锁）"""
+        lines = [line for line in self._read_tail_lines(self.max_history_size) if line.strip()]
+        lines = lines[-self.max_history_size:]
+        self._write_history_lines(lines)
+    
+    def _write_history_lines(self, lines: List[bytes]) -> None:
+        """原子地重写历史文件（调用方需持有历史文件锁）"""
+        tmp_file = self.history_file.with_name(self.history_file.name + ".tmp")
+        with open(tmp_file, 'wb') as f:
+            for line in lines:
+                f.write(line.rstrip(b"\r\n") + b"\n")
+            f.flush()
+            if self.history_fsync != "never":
+                os.fsync(f.fileno())
+        os.replace(tmp_file, self.history_file)
+        stat = self.history_file.stat()
+        self._history_count = len(lines)
+        self._history_size = stat.st_size
+        self._history_inode = stat.st_ino
+    
+    def _read_tail_lines(self, count: int) -> List[bytes]:
+        """从文件末尾按块向前读取，返回最后 count 行（按时间顺序）"""
+        with open(self.history_file, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            chunks = []
+            newlines = 0
+            # 多读一个换行符，保证最早的一行是完整的
+            while position > 0 and newlines <= count:
+                read_size = min(_READ_BLOCK_SIZE, position)
+                position -= read_size
+                f.seek(position)
+                block = f.read(read_size)
+                chunks.append(block)
+                newlines += block.count(b"\n")
+        
+        lines = b"".join(reversed(chunks)).split(b"\n")
+        if position > 0:
+            # 第一段可能是被截断的行
+            lines = lines[1:]
+        lines = [line for line in lines if line.strip()]
+        return lines[-count:]
+    
+    def _migrate_legacy_history(self) -> None:
+        """将旧版 history.json（JSON 数组）一次性迁移为 JSON Lines 格式
+        
+        迁移完成后旧文件重命名为 history.json.migrated。
+        """
+        if not self.legacy_history_file.exists():
+            return
+        
+        try:
+            with self._history_guard():
+                if not self.legacy_history_file.exists():
+                    return
+                if not self.history_file.exists():
+                    with open(self.legacy_history_file, 'r', encoding='utf-8') as f:
+                        history = json.load(f)
+                    if not isinstance(history, list):
+                        raise ValueError("历史文件格式不正确")
+                    self._write_history_lines([
+                        json.dumps(entry, ensure_ascii=False).encode('utf-8')
+                        for entry in history
+                    ])
+                os.replace(
+                    self.legacy_history_file,
+                    self.legacy_history_file.with_name(self.legacy_history_file.name + ".migrated")
+                )
+        except Exception as e:
+            print(f"迁移历史记录失败: {e}")
+    
     def save_config(self, config: Dict[str, Any]) -> bool:
         """
         保存配置
@@ -248,10 +559,12 @@ class FileStorage(StorageInterface):
         }
         
         try:
-            # 统计历史记录数
+            # 统计历史记录数（只数行，不解析）
             if self.history_file.exists():
-                history = self.load_history()
-                info["history_count"] = len(history)
+                count = self._count_history_lines()
+                if self.max_history_size:
+                    count = min(count, self.max_history_size)
+                info["history_count"] = count
                 info["total_size"] += self.history_file.stat().st_size
             
             # 统计配置文件大小
@@ -293,8 +606,11 @@ class FileStorage(StorageInterface):
             
             session_file = sessions_dir / f"{session_id}.json"
             
-            with open(session_file, 'w', encoding='utf-8') as f:
+            # 先写临时文件再替换，会话日志依赖完整的检查点
+            tmp_file = session_file.with_name(session_file.name + ".tmp")
+            with open(tmp_file, 'w', encoding='utf-8') as f:
                 json.dump(session_data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_file, session_file)
             
             return True
         except Exception as e:
@@ -326,6 +642,83 @@ class FileStorage(StorageInterface):
             print(f"加载会话失败: {e}")
             return None
     
+    def _session_journal_file(self, session_id: str) -> Path:
+        """会话日志文件路径"""
+        return self.base_path / "sessions" / f"{session_id}.journal.jsonl"
+    
+    def append_session_journal(self, session_id: str, records: List[Dict[str, Any]]) -> bool:
+        """
+        向会话日志追加增量记录
+        
+        每条记录一行追加到 sessions/<session_id>.journal.jsonl，不重写已有内容。
+        
+        Args:
+            session_id: 会话 ID
+            records: 增量记录列表
+            
+        Returns:
+            bool: 追加是否成功
+        """
+        if not session_id:
+            return False
+        try:
+            journal_file = self._session_journal_file(session_id)
+            journal_file.parent.mkdir(parents=True, exist_ok=True)
+            data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+            with open(journal_file, 'a', encoding='utf-8') as f:
+                f.write(data)
+            return True
+        except Exception as e:
+            print(f"追加会话日志失败: {e}")
+            return False
+    
+    def load_session_journal(self, session_id: str) -> List[Dict[str, Any]]:
+        """
+        加载会话日志
+        
+        跳过无法解析的行（例如写入中断留下的不完整末行）。
+        
+        Args:
+            session_id: 会话 ID
+            
+        Returns:
+            List[Dict[str, Any]]: 增量记录列表
+        """
+        journal_file = self._session_journal_file(session_id)
+        if not journal_file.exists():
+            return []
+        
+        records = []
+        try:
+            with open(journal_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except Exception as e:
+            print(f"加载会话日志失败: {e}")
+        return records
+    
+    def clear_session_journal(self, session_id: str) -> bool:
+        """
+        清除会话日志
+        
+        Args:
+            session_id: 会话 ID
+            
+        Returns:
+            bool: 清除是否成功
+        """
+        try:
+            self._session_journal_file(session_id).unlink(missing_ok=True)
+            return True
+        except Exception as e:
+            print(f"清除会话日志失败: {e}")
+            return False
+    
     def save_snapshot(self, snapshot_data: Dict[str, Any]) -> bool:
         """
         保存上下文快照
@@ -443,9 +836,14 @@ class FileStorage(StorageInterface):
             bool: 保存是否成功
         """
         try:
-            # 直接覆盖整个历史文件
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(history_data, f, indent=2, ensure_ascii=False)
+            lines = [
+                json.dumps(entry, ensure_ascii=False).encode('utf-8')
+                for entry in history_data
+            ]
+            
+            # 原子地覆盖整个历史文件
+            with self._history_guard():
+                self._write_history_lines(lines)
             
             return True
         except Exception as e:
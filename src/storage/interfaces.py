@@ -5,7 +5,7 @@
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 from pathlib import Path
 
@@ -39,6 +39,26 @@ class StorageInterface(ABC):
         """
         pass
     
+    def load_history_since(
+        self,
+        cursor: Optional[Any] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[Any], bool]:
+        """
+        增量加载历史记录
+        
+        返回上次调用之后新追加的记录，供调用方维护增量索引。
+        默认实现每次都返回全部历史记录并要求调用方重建。
+        
+        Args:
+            cursor: 上次调用返回的游标，None 表示从头加载
+            
+        Returns:
+            Tuple[List[Dict[str, Any]], Optional[Any], bool]:
+                (记录列表, 新游标, 是否需要重建)。需要重建时记录列表为全部历史记录，
+                否则只包含新追加的记录
+        """
+        return self.load_history(), None, True
+    
     @abstractmethod
     def clear_history(self) -> bool:
         """
@@ -49,6 +69,26 @@ class StorageInterface(ABC):
         """
         pass
     
+    def delete_history(self, command_ids: List[str]) -> bool:
+        """
+        删除指定 command_id 的历史记录
+        
+        默认实现加载全部历史记录，过滤后批量保存。
+        
+        Args:
+            command_ids: 要删除的命令 ID 列表
+            
+        Returns:
+            bool: 删除是否成功
+        """
+        ids = set(command_ids)
+        if not ids:
+            return True
+        history = self.load_history()
+        return self.save_history_batch([
+            entry for entry in history if entry.get("command_id") not in ids
+        ])
+    
     @abstractmethod
     def save_config(self, config: Dict[str, Any]) -> bool:
         """
@@ -150,6 +190,46 @@ class StorageInterface(ABC):
         """
         pass
     
+    def append_session_journal(self, session_id: str, records: List[Dict[str, Any]]) -> bool:
+        """
+        向会话日志追加增量记录
+        
+        会话日志保存上次 save_session（检查点）之后的增量修改，加载会话时由调用方
+        在检查点上依次重放。默认实现不支持日志，返回 False，调用方应改为保存完整会话。
+        
+        Args:
+            session_id: 会话 ID
+            records: 增量记录列表
+            
+        Returns:
+            bool: 追加是否成功
+        """
+        return False
+    
+    def load_session_journal(self, session_id: str) -> List[Dict[str, Any]]:
+        """
+        加载会话日志
+        
+        Args:
+            session_id: 会话 ID
+            
+        Returns:
+            List[Dict[str, Any]]: 按追加顺序排列的增量记录列表
+        """
+        return []
+    
+    def clear_session_journal(self, session_id: str) -> bool:
+        """
+        清除会话日志（在保存检查点之后调用）
+        
+        Args:
+            session_id: 会话 ID
+            
+        Returns:
+            bool: 清除是否成功
+        """
+        return True
+    
     @abstractmethod
     def save_snapshot(self, snapshot_data: Dict[str, Any]) -> bool:
         """
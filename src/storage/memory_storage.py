@@ -0,0 +1,514 @@
+"""
+内存存储实现
+
+将所有数据保存在进程内存中的存储实现，适用于测试、基准测试和不需要持久化的
+无状态 Web 副本：
+- 所有操作通过同一把可重入锁保证线程安全
+- 历史记录有上限，超出后自动丢弃最旧的记录
+- 缓存条目支持 TTL，过期条目在访问时清除
+- 保存和加载时复制数据，调用方修改返回值不会影响已保存的数据
+- 可选地在进程退出时将全部数据转储为 JSON 文件，并在下次启动时恢复
+"""
+
+import atexit
+import copy
+import json
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+from datetime import datetime
+
+from .interfaces import StorageInterface
+
+
+class MemoryStorage(StorageInterface):
+    """内存存储实现类"""
+    
+    def __init__(
+        self,
+        max_history_size: Optional[int] = None,
+        dump_path: Optional[str] = None
+    ):
+        """
+        初始化内存存储
+        
+        Args:
+            max_history_size: 最大历史记录数，None 或 0 表示不限制
+            dump_path: 转储文件路径；设置后启动时从该文件恢复数据，进程退出时写回
+        """
+        self.max_history_size = max_history_size
+        self.dump_path = Path(os.path.expanduser(dump_path)) if dump_path else None
+        
+        self._lock = threading.RLock()
+        self._history: deque = deque(maxlen=max_history_size or None)
+        # 增量加载游标：历史记录被整体替换时 generation 加一，appended 为累计追加数
+        self._history_generation = 0
+        self._history_appended = 0
+        self._config: Optional[Dict[str, Any]] = None
+        # 缓存: key -> (value, expire_at)，expire_at 为 None 表示永不过期
+        self._cache: Dict[str, Tuple[Any, Optional[float]]] = {}
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._session_journals: Dict[str, List[Dict[str, Any]]] = {}
+        self._snapshots: Dict[str, Dict[str, Any]] = {}
+        self._preferences: Dict[str, Dict[str, Any]] = {}
+        
+        if self.dump_path is not None:
+            self.restore()
+            atexit.register(self.dump)
+    
+    # ========================================================================
+    # 历史记录
+    # ========================================================================
+    
+    def save_history(self, entry: Dict[str, Any]) -> bool:
+        """
+        保存历史记录
+        
+        Args:
+            entry: 历史记录条目
+            
+        Returns:
+            bool: 保存是否成功
+        """
+        try:
+            # 添加时间戳
+            if "timestamp" not in entry:
+                entry["timestamp"] = datetime.now().isoformat()
+            
+            record = copy.deepcopy(entry)
+            with self._lock:
+                self._history.append(record)
+                self._history_appended += 1
+            return True
+        except Exception as e:
+            print(f"保存历史记录失败: {e}")
+            return False
+    
+    def load_history(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        加载历史记录
+        
+        Args:
+            limit: 返回的最大记录数
+            
+        Returns:
+            List[Dict[str, Any]]: 历史记录列表
+        """
+        with self._lock:
+            if limit is not None and limit > 0:
+                start = max(0, len(self._history) - limit)
+                records = [self._history[i] for i in range(start, len(self._history))]
+            else:
+                records = list(self._history)
+        return copy.deepcopy(records)
+    
+    def load_history_since(
+        self,
+        cursor: Optional[Any] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[Any], bool]:
+        """
+        增量加载历史记录
+        
+        游标为 (generation, 累计追加数)，批量保存、清除或恢复后 generation 改变，
+        此时返回全部记录并要求重建。
+        
+        Args:
+            cursor: 上次调用返回的游标，None 表示从头加载
+            
+        Returns:
+            Tuple[List[Dict[str, Any]], Optional[Any], bool]: (记录列表, 新游标, 是否需要重建)
+        """
+        with self._lock:
+            new_cursor = (self._history_generation, self._history_appended)
+            if cursor is not None and cursor[0] == self._history_generation:
+                count = self._history_appended - cursor[1]
+                if 0 <= count <= len(self._history):
+                    start = len(self._history) - count
+                    records = [self._history[i] for i in range(start, len(self._history))]
+                    return copy.deepcopy(records), new_cursor, False
+            records = list(self._history)
+        return copy.deepcopy(records), new_cursor, True
+    
+    def clear_history(self) -> bool:
+        """
+        清除所有历史记录
+        
+        Returns:
+            bool: 清除是否成功
+        """
+        with self._lock:
+            self._history.clear()
+            self._history_generation += 1
+        return True
+    
+    def delete_history(self, command_ids: List[str]) -> bool:
+        """
+        删除指定 command_id 的历史记录
+        
+        Args:
+            command_ids: 要删除的命令 ID 列表
+            
+        Returns:
+            bool: 删除是否成功
+        """
+        ids = set(command_ids)
+        with self._lock:
+            kept = [entry for entry in self._history if entry.get("command_id") not in ids]
+            if len(kept) != len(self._history):
+                self._history.clear()
+                self._history.extend(kept)
+                self._history_generation += 1
+        return True
+    
+    def save_history_batch(self, history_data: List[Dict[str, Any]]) -> bool:
+        """
+        批量保存历史记录（替换全部历史记录）
+        
+        Args:
+            history_data: 历史记录列表
+            
+        Returns:
+            bool: 保存是否成功
+        """
+        try:
+            records = copy.deepcopy(history_data)
+            with self._lock:
+                self._history.clear()
+                self._history.extend(records)
+                self._history_generation += 1
+            return True
+        except Exception as e:
+            print(f"批量保存历史记录失败: {e}")
+            return False
+    
+    # ========================================================================
+    # 配置和缓存
+    # ========================================================================
+    
+    def save_config(self, config: Dict[str, Any]) -> bool:
+        """
+        保存配置
+        
+        Args:
+            config: 配置字典
+            
+        Returns:
+            bool: 保存是否成功
+        """
+        config = copy.deepcopy(config)
+        with self._lock:
+            self._config = config
+        return True
+    
+    def load_config(self) -> Optional[Dict[str, Any]]:
+        """
+        加载配置
+        
+        Returns:
+            Optional[Dict[str, Any]]: 配置字典
+        """
+        with self._lock:
+            return copy.deepcopy(self._config)
+    
+    def save_cache(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
+        """
+        保存缓存数据
+        
+        Args:
+            key: 缓存键
+            value: 缓存值
+            ttl: 过期时间（秒）
+            
+        Returns:
+            bool: 保存是否成功
+        """
+        expire_at = time.time() + ttl if ttl is not None else None
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._cache[key] = (value, expire_at)
+        return True
+    
+    def load_cache(self, key: str) -> Optional[Any]:
+        """
+        加载缓存数据
+        
+        Args:
+            key: 缓存键
+            
+        Returns:
+            Optional[Any]: 缓存值
+        """
+        with self._lock:
+            item = self._cache.get(key)
+            if item is None:
+                return None
+            
+            value, expire_at = item
+            # 检查是否过期
+            if expire_at is not None and time.time() > expire_at:
+                del self._cache[key]
+                return None
+            
+            return copy.deepcopy(value)
+    
+    def clear_cache(self) -> bool:
+        """
+        清除所有缓存
+        
+        Returns:
+            bool: 清除是否成功
+        """
+        with self._lock:
+            self._cache.clear()
+        return True
+    
+    def _purge_expired_cache(self) -> None:
+        """清除所有已过期的缓存（调用方需持有锁）"""
+        now = time.time()
+        expired = [
+            key for key, (_, expire_at) in self._cache.items()
+            if expire_at is not None and now > expire_at
+        ]
+        for key in expired:
+            del self._cache[key]
+    
+    def get_storage_info(self) -> Dict[str, Any]:
+        """
+        获取存储信息
+        
+        Returns:
+            Dict[str, Any]: 存储信息
+        """
+        with self._lock:
+            self._purge_expired_cache()
+            return {
+                "backend": "memory",
+                "dump_path": str(self.dump_path) if self.dump_path else None,
+                "history_exists": len(self._history) > 0,
+                "config_exists": self._config is not None,
+                "history_count": len(self._history),
+                "max_history_size": self.max_history_size,
+                "cache_count": len(self._cache),
+                "session_count": len(self._sessions),
+                "snapshot_count": len(self._snapshots),
+                "preferences_count": len(self._preferences),
+                "total_size": 0
+            }
+    
+    # ========================================================================
+    # 上下文管理相关方法
+    # ========================================================================
+    
+    def _save_record(self, table: Dict[str, Dict[str, Any]], key: Optional[str], data: Dict[str, Any]) -> bool:
+        """按键保存一条记录的副本"""
+        if not key:
+            return False
+        record = copy.deepcopy(data)
+        with self._lock:
+            table[key] = record
+        return True
+    
+    def _load_record(self, table: Dict[str, Dict[str, Any]], key: str) -> Optional[Dict[str, Any]]:
+        """按键加载一条记录的副本"""
+        with self._lock:
+            return copy.deepcopy(table.get(key))
+    
+    def save_session(self, session_data: Dict[str, Any]) -> bool:
+        """
+        保存会话数据
+        
+        Args:
+            session_data: 会话数据字典
+            
+        Returns:
+            bool: 保存是否成功
+        """
+        return self._save_record(self._sessions, session_data.get("session_id"), session_data)
+    
+    def load_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        加载会话数据
+        
+        Args:
+            session_id: 会话 ID
+            
+        Returns:
+            Optional[Dict[str, Any]]: 会话数据字典
+        """
+        return self._load_record(self._sessions, session_id)
+    
+    def append_session_journal(self, session_id: str, records: List[Dict[str, Any]]) -> bool:
+        """
+        向会话日志追加增量记录
+        
+        Args:
+            session_id: 会话 ID
+            records: 增量记录列表
+            
+        Returns:
+            bool: 追加是否成功
+        """
+        if not session_id:
+            return False
+        copied = copy.deepcopy(records)
+        with self._lock:
+            self._session_journals.setdefault(session_id, []).extend(copied)
+        return True
+    
+    def load_session_journal(self, session_id: str) -> List[Dict[str, Any]]:
+        """
+        加载会话日志
+        
+        Args:
+            session_id: 会话 ID
+            
+        Returns:
+            List[Dict[str, Any]]: 增量记录列表
+        """
+        with self._lock:
+            return copy.deepcopy(self._session_journals.get(session_id, []))
+    
+    def clear_session_journal(self, session_id: str) -> bool:
+        """
+        清除会话日志
+        
+        Args:
+            session_id: 会话 ID
+            
+        Returns:
+            bool: 清除是否成功
+        """
+        with self._lock:
+            self._session_journals.pop(session_id, None)
+        return True
+    
+    def save_snapshot(self, snapshot_data: Dict[str, Any]) -> bool:
+        """
+        保存上下文快照
+        
+        Args:
+            snapshot_data: 快照数据字典
+            
+        Returns:
+            bool: 保存是否成功
+        """
+        return self._save_record(self._snapshots, snapshot_data.get("snapshot_id"), snapshot_data)
+    
+    def load_snapshot(self, snapshot_id: str) -> Optional[Dict[str, Any]]:
+        """
+        加载上下文快照
+        
+        Args:
+            snapshot_id: 快照 ID
+            
+        Returns:
+            Optional[Dict[str, Any]]: 快照数据字典
+        """
+        return self._load_record(self._snapshots, snapshot_id)
+    
+    def save_user_preferences(self, preferences_data: Dict[str, Any]) -> bool:
+        """
+        保存用户偏好设置
+        
+        Args:
+            preferences_data: 用户偏好数据字典
+            
+        Returns:
+            bool: 保存是否成功
+        """
+        return self._save_record(self._preferences, preferences_data.get("user_id"), preferences_data)
+    
+    def load_user_preferences(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """
+        加载用户偏好设置
+        
+        Args:
+            user_id: 用户 ID
+            
+        Returns:
+            Optional[Dict[str, Any]]: 用户偏好数据字典
+        """
+        return self._load_record(self._preferences, user_id)
+    
+    # ========================================================================
+    # 转储和恢复
+    # ========================================================================
+    
+    def dump(self, path: Optional[str] = None) -> bool:
+        """
+        将全部数据转储为 JSON 文件
+        
+        Args:
+            path: 转储文件路径，默认为 dump_path
+            
+        Returns:
+            bool: 转储是否成功
+        """
+        target = Path(path) if path else self.dump_path
+        if target is None:
+            return False
+        
+        try:
+            with self._lock:
+                self._purge_expired_cache()
+                data = {
+                    "history": list(self._history),
+                    "config": self._config,
+                    "cache": {
+                        key: {"value": value, "expire_at": expire_at}
+                        for key, (value, expire_at) in self._cache.items()
+                    },
+                    "sessions": self._sessions,
+                    "session_journals": self._session_journals,
+                    "snapshots": self._snapshots,
+                    "preferences": self._preferences
+                }
+                payload = json.dumps(data, ensure_ascii=False)
+            
+            # 先写临时文件再替换，避免转储中断留下不完整的文件
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = target.with_name(target.name + ".tmp")
+            tmp_file.write_text(payload, encoding='utf-8')
+            os.replace(tmp_file, target)
+            return True
+        except Exception as e:
+            print(f"转储内存存储失败: {e}")
+            return False
+    
+    def restore(self, path: Optional[str] = None) -> bool:
+        """
+        从 JSON 转储文件恢复数据（替换当前数据）
+        
+        Args:
+            path: 转储文件路径，默认为 dump_path
+            
+        Returns:
+            bool: 恢复是否成功，文件不存在时返回 False
+        """
+        source = Path(path) if path else self.dump_path
+        if source is None or not source.exists():
+            return False
+        
+        try:
+            data = json.loads(source.read_text(encoding='utf-8'))
+            with self._lock:
+                self._history.clear()
+                self._history.extend(data.get("history", []))
+                self._history_generation += 1
+                self._config = data.get("config")
+                self._cache = {
+                    key: (item["value"], item.get("expire_at"))
+                    for key, item in data.get("cache", {}).items()
+                }
+                self._purge_expired_cache()
+                self._sessions = data.get("sessions", {})
+                self._session_journals = data.get("session_journals", {})
+                self._snapshots = data.get("snapshots", {})
+                self._preferences = data.get("preferences", {})
+            return True
+        except Exception as e:
+            print(f"恢复内存存储失败: {e}")
+            return False
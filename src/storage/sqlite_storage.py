@@ -0,0 +1,781 @@
+"""
+SQLite 存储实现
+
+基于标准库 sqlite3 的存储实现，适用于多个 Web 工作进程共享同一份数据：
+- 使用 WAL 日志模式，读操作不会阻塞写操作
+- 写操作使用 BEGIN IMMEDIATE 事务并设置 busy_timeout，多个进程并发写入时排队而不是报错
+- 每个线程（以及 fork 后的每个进程）使用独立的连接
+- 历史记录在 timestamp、success、session_id 上建立索引，支持分页和条件查询
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+from datetime import datetime
+
+from .interfaces import StorageInterface
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    success INTEGER,
+    session_id TEXT,
+    user_input TEXT NOT NULL DEFAULT '',
+    command TEXT NOT NULL DEFAULT '',
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_history_timestamp ON history (timestamp);
+CREATE INDEX IF NOT EXISTS idx_history_success ON history (success, timestamp);
+CREATE INDEX IF NOT EXISTS idx_history_session ON history (session_id, timestamp);
+
+-- 历史记录被删除、清除或整体替换时递增，供增量读取方判断是否需要重建
+CREATE TABLE IF NOT EXISTS history_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    generation INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO history_state (id, generation) VALUES (1, 0);
+
+CREATE TABLE IF NOT EXISTS config (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    data TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    expire_at REAL
+);
+
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS session_journal (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_session_journal_session ON session_journal (session_id, id);
+
+CREATE TABLE IF NOT EXISTS snapshots (
+    snapshot_id TEXT PRIMARY KEY,
+    session_id TEXT,
+    data TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_session ON snapshots (session_id);
+
+CREATE TABLE IF NOT EXISTS preferences (
+    user_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+"""
+
+
+class SQLiteStorage(StorageInterface):
+    """SQLite 存储实现类"""
+    
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        max_history_size: Optional[int] = None,
+        busy_timeout: float = 30.0
+    ):
+        """
+        初始化 SQLite 存储
+        
+        Args:
+            db_path: 数据库文件路径，默认为 ~/.ai-powershell/storage.db
+            max_history_size: 最大历史记录数，None 或 0 表示不限制
+            busy_timeout: 等待其他进程释放写锁的最长时间（秒）
+        """
+        if db_path is None:
+            db_path = os.path.join(os.path.expanduser("~/.ai-powershell"), "storage.db")
+        
+        self.db_path = Path(db_path)
+        self.max_history_size = max_history_size
+        self.busy_timeout = busy_timeout
+        
+        self._local = threading.local()
+        
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # executescript 自带事务提交，不能放在 _write 中执行
+        self._connection().executescript(_SCHEMA)
+    
+    # ========================================================================
+    # 连接管理
+    # ========================================================================
+    
+    def _connection(self) -> sqlite3.Connection:
+        """获取当前线程的连接
+        
+        连接按线程缓存；fork 之后的子进程（如 gunicorn 工作进程）会重新建立连接，
+        不会复用父进程的连接。
+        """
+        conn: Optional[sqlite3.Connection] = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        
+        conn = sqlite3.connect(
+            str(self.db_path),
+            timeout=self.busy_timeout,
+            isolation_level=None  # 由 _write 显式控制事务
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout * 1000)}")
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+    
+    @contextmanager
+    def _write(self):
+        """写事务：BEGIN IMMEDIATE 立即获取写锁，避免并发事务升级锁时死锁"""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+    
+    def close(self) -> None:
+        """关闭当前线程的连接"""
+        conn: Optional[sqlite3.Connection] = getattr(self._local, "conn", None)
+        if conn is not None:
+            if self._local.pid == os.getpid():
+                conn.close()
+            self._local.conn = None
+    
+    @staticmethod
+    def _row_data(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        """解析行中 data 列的 JSON，行不存在时返回 None"""
+        if row is None:
+            return None
+        data: Dict[str, Any] = json.loads(row["data"])
+        return data
+    
+    # ========================================================================
+    # 历史记录
+    # ========================================================================
+    
+    @staticmethod
+    def _history_row(entry: Dict[str, Any]) -> Tuple[Any, ...]:
+        """将历史记录条目转换为表行"""
+        success = entry.get("success")
+        return (
+            entry["timestamp"],
+            None if success is None else int(bool(success)),
+            entry.get("session_id"),
+            entry.get("user_input", entry.get("input", "")) or "",
+            entry.get("command", "") or "",
+            json.dumps(entry, ensure_ascii=False)
+        )
+    
+    def _trim_history(self, conn: sqlite3.Connection) -> None:
+        """删除超出 max_history_size 的最旧记录"""
+        if not self.max_history_size:
+            return
+        conn.execute(
+            "DELETE FROM history WHERE id < ("
+            "SELECT id FROM history ORDER BY id DESC LIMIT 1 OFFSET ?)",
+            (self.max_history_size - 1,)
+        )
+    
+    @staticmethod
+    def _bump_history_generation(conn: sqlite3.Connection) -> None:
+        """标记历史记录发生了非追加修改（在写事务内调用）"""
+        conn.execute("UPDATE history_state SET generation = generation + 1 WHERE id = 1")
+    
+    def save_history(self, entry: Dict[str, Any]) -> bool:
+        """
+        保存历史记录
+        
+        Args:
+            entry: 历史记录条目
+            
+        Returns:
+            bool: 保存是否成功
+        """
+        try:
+            # 添加时间戳
+            if "timestamp" not in entry:
+                entry["timestamp"] = datetime.now().isoformat()
+            
+            with self._write() as conn:
+                conn.execute(
+                    "INSERT INTO history (timestamp, success, session_id, user_input, command, data) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    self._history_row(entry)
+                )
+                self._trim_history(conn)
+            
+            return True
+        except Exception as e:
+            print(f"保存历史记录失败: {e}")
+            return False
+    
+    def load_history(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        加载历史记录
+        
+        Args:
+            limit: 返回的最大记录数
+            
+        Returns:
+            List[Dict[str, Any]]: 历史记录列表（按保存顺序）
+        """
+        try:
+            conn = self._connection()
+            if limit is not None and limit > 0:
+                rows = conn.execute(
+                    "SELECT data FROM (SELECT id, data FROM history ORDER BY id DESC LIMIT ?) "
+                    "ORDER BY id",
+                    (limit,)
+                ).fetchall()
+            else:
+                rows = conn.execute("SELECT data FROM history ORDER BY id").fetchall()
+            
+            return [json.loads(row["data"]) for row in rows]
+        except Exception as e:
+            print(f"加载历史记录失败: {e}")
+            return []
+    
+    def load_history_since(
+        self,
+        cursor: Optional[Any] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[Any], bool]:
+        """
+        增量加载历史记录
+        
+        游标为 (generation, 最后读取的行 ID)。行 ID 自增且不会复用，因此只需读取
+        ID 更大的行；删除、清除或批量替换后 generation 改变，此时返回全部记录并要求重建。
+        超出 max_history_size 被删除的最旧记录不改变 generation，由调用方按上限淘汰。
+        
+        Args:
+            cursor: 上次调用返回的游标，None 表示从头加载
+            
+        Returns:
+            Tuple[List[Dict[str, Any]], Optional[Any], bool]: (记录列表, 新游标, 是否需要重建)
+        """
+        try:
+            conn = self._connection()
+            # 在同一个读事务中读取 generation 和新记录，保证两者一致
+            conn.execute("BEGIN")
+            try:
+                generation = conn.execute(
+                    "SELECT generation FROM history_state WHERE id = 1"
+                ).fetchone()[0]
+                reset = cursor is None or cursor[0] != generation
+                last_id = 0 if reset else cursor[1]
+                rows = conn.execute(
+                    "SELECT id, data FROM history WHERE id > ? ORDER BY id", (last_id,)
+                ).fetchall()
+            finally:
+                conn.execute("COMMIT")
+        except Exception as e:
+            print(f"加载历史记录失败: {e}")
+            return [], None, True
+        
+        if rows:
+            last_id = rows[-1]["id"]
+        return [json.loads(row["data"]) for row in rows], (generation, last_id), reset
+    
+    def query_history(
+        self,
+        offset: int = 0,
+        limit: Optional[int] = 20,
+        search: Optional[str] = None,
+        success: Optional[bool] = None,
+        session_id: Optional[str] = None,
+        start_time: Optional[str] = None,
+        end_time: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        按条件分页查询历史记录（按时间倒序）
+        
+        success、session_id 和时间范围条件使用索引；search 对用户输入和命令做
+        不区分大小写的子串匹配。
+        
+        Args:
+            offset: 跳过的记录数
+            limit: 返回的最大记录数，None 表示不限制
+            search: 搜索关键词
+            success: 只返回成功或失败的记录
+            session_id: 只返回指定会话的记录
+            start_time: 起始时间（ISO 格式，包含）
+            end_time: 结束时间（ISO 格式，不包含）
+            
+        Returns:
+            Tuple[List[Dict[str, Any]], int]: (当前页记录, 满足条件的总数)
+        """
+        conditions = []
+        params: List[Any] = []
+        
+        if success is not None:
+            conditions.append("success = ?")
+            params.append(int(bool(success)))
+        if session_id is not None:
+            conditions.append("session_id = ?")
+            params.append(session_id)
+        if start_time:
+            conditions.append("timestamp >= ?")
+            params.append(start_time)
+        if end_time:
+            conditions.append("timestamp < ?")
+            params.append(end_time)
+        if search:
+            pattern = "%" + search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            conditions.append("(user_input LIKE ? ESCAPE '\\' OR command LIKE ? ESCAPE '\\')")
+            params.extend([pattern, pattern])
+        
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        
+        try:
+            conn = self._connection()
+            total = conn.execute(f"SELECT COUNT(*) FROM history{where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT data FROM history{where} ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?",
+                params + [-1 if limit is None else limit, max(0, offset)]
+            ).fetchall()
+            return [json.loads(row["data"]) for row in rows], total
+        except Exception as e:
+            print(f"查询历史记录失败: {e}")
+            return [], 0
+    
+    def clear_history(self) -> bool:
+        """
+        清除所有历史记录
+        
+        Returns:
+            bool: 清除是否成功
+        """
+        try:
+            with self._write() as conn:
+                conn.execute("DELETE FROM history")
+                self._bump_history_generation(conn)
+            return True
+        except Exception as e:
+            print(f"清除历史记录失败: {e}")
+            return False
+    
+    def delete_history(self, command_ids: List[str]) -> bool:
+        """
+        删除指定 command_id 的历史记录
+        
+        Args:
+            command_ids: 要删除的命令 ID 列表
+            
+        Returns:
+            bool: 删除是否成功
+        """
+        if not command_ids:
+            return True
+        try:
+            with self._write() as conn:
+                conn.executemany(
+                    "DELETE FROM history WHERE json_extract(data, '$.command_id') = ?",
+                    [(command_id,) for command_id in command_ids]
+                )
+                self._bump_history_generation(conn)
+            return True
+        except Exception as e:
+            print(f"删除历史记录失败: {e}")
+            return False
+    
+    def save_history_batch(self, history_data: List[Dict[str, Any]]) -> bool:
+        """
+        批量保存历史记录（在一个事务内替换全部历史记录）
+        
+        Args:
+            history_data: 历史记录列表
+            
+        Returns:
+            bool: 保存是否成功
+        """
+        try:
+            now = datetime.now().isoformat()
+            rows = []
+            for entry in history_data:
+                if "timestamp" not in entry:
+                    entry = dict(entry, timestamp=now)
+                rows.append(self._history_row(entry))
+            
+            with self._write() as conn:
+                conn.execute("DELETE FROM history")
+                self._bump_history_generation(conn)
+                conn.executemany(
+                    "INSERT INTO history (timestamp, success, session_id, user_input, command, data) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+            
+            return True
+        except Exception as e:
+            print(f"批量保存历史记录失败: {e}")
+            return False
+    
+    # ========================================================================
+    # 配置和缓存
+    # ========================================================================
+    
+    def save_config(self, config: Dict[str, Any]) -> bool:
+        """
+        保存配置
+        
+        Args:
+            config: 配置字典
+            
+        Returns:
+            bool: 保存是否成功
+        """
+        try:
+            with self._write() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO config (id, data, updated_at) VALUES (1, ?, ?)",
+                    (json.dumps(config, ensure_ascii=False), datetime.now().isoformat())
+                )
+            return True
+        except Exception as e:
+            print(f"保存配置失败: {e}")
+            return False
+    
+    def load_config(self) -> Optional[Dict[str, Any]]:
+        """
+        加载配置
+        
+        Returns:
+            Optional[Dict[str, Any]]: 配置字典
+        """
+        try:
+            row = self._connection().execute("SELECT data FROM config WHERE id = 1").fetchone()
+            return self._row_data(row)
+        except Exception as e:
+            print(f"加载配置失败: {e}")
+            return None
+    
+    def save_cache(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
+        """
+        保存缓存数据
+        
+        Args:
+            key: 缓存键
+            value: 缓存值
+            ttl: 过期时间（秒）
+            
+        Returns:
+            bool: 保存是否成功
+        """
+        try:
+            expire_at = time.time() + ttl if ttl is not None else None
+            with self._write() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, created_at, expire_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), datetime.now().isoformat(), expire_at)
+                )
+            return True
+        except Exception as e:
+            print(f"保存缓存失败: {e}")
+            return False
+    
+    def load_cache(self, key: str) -> Optional[Any]:
+        """
+        加载缓存数据
+        
+        Args:
+            key: 缓存键
+            
+        Returns:
+            Optional[Any]: 缓存值
+        """
+        try:
+            row = self._connection().execute(
+                "SELECT value, expire_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            
+            # 检查是否过期
+            if row["expire_at"] is not None and time.time() > row["expire_at"]:
+                with self._write() as conn:
+                    conn.execute(
+                        "DELETE FROM cache WHERE key = ? AND expire_at IS NOT NULL AND expire_at < ?",
+                        (key, time.time())
+                    )
+                return None
+            
+            return json.loads(row["value"])
+        except Exception as e:
+            print(f"加载缓存失败: {e}")
+            return None
+    
+    def clear_cache(self) -> bool:
+        """
+        清除所有缓存
+        
+        Returns:
+            bool: 清除是否成功
+        """
+        try:
+            with self._write() as conn:
+                conn.execute("DELETE FROM cache")
+            return True
+        except Exception as e:
+            print(f"清除缓存失败: {e}")
+            return False
+    
+    def get_storage_info(self) -> Dict[str, Any]:
+        """
+        获取存储信息
+        
+        Returns:
+            Dict[str, Any]: 存储信息
+        """
+        info: Dict[str, Any] = {
+            "backend": "sqlite",
+            "db_path": str(self.db_path),
+            "history_exists": False,
+            "config_exists": False,
+            "history_count": 0,
+            "cache_count": 0,
+            "session_count": 0,
+            "snapshot_count": 0,
+            "total_size": 0
+        }
+        
+        try:
+            conn = self._connection()
+            info["history_count"] = conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+            info["history_exists"] = info["history_count"] > 0
+            info["config_exists"] = conn.execute("SELECT COUNT(*) FROM config").fetchone()[0] > 0
+            info["cache_count"] = conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+            info["session_count"] = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+            info["snapshot_count"] = conn.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0]
+            
+            # 数据库文件及 WAL 文件大小
+            for suffix in ("", "-wal", "-shm"):
+                path = Path(str(self.db_path) + suffix)
+                if path.exists():
+                    info["total_size"] += path.stat().st_size
+        except Exception as e:
+            print(f"获取存储信息失败: {e}")
+        
+        return info
+    
+    # ========================================================================
+    # 上下文管理相关方法
+    # ========================================================================
+    
+    def save_session(self, session_data: Dict[str, Any]) -> bool:
+        """
+        保存会话数据
+        
+        Args:
+            session_data: 会话数据字典
+            
+        Returns:
+            bool: 保存是否成功
+        """
+        try:
+            session_id = session_data.get("session_id")
+            if not session_id:
+                return False
+            
+            with self._write() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO sessions (session_id, data, updated_at) VALUES (?, ?, ?)",
+                    (session_id, json.dumps(session_data, ensure_ascii=False), datetime.now().isoformat())
+                )
+            return True
+        except Exception as e:
+            print(f"保存会话失败: {e}")
+            return False
+    
+    def load_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        加载会话数据
+        
+        Args:
+            session_id: 会话 ID
+            
+        Returns:
+            Optional[Dict[str, Any]]: 会话数据字典
+        """
+        try:
+            row = self._connection().execute(
+                "SELECT data FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            return self._row_data(row)
+        except Exception as e:
+            print(f"加载会话失败: {e}")
+            return None
+    
+    def append_session_journal(self, session_id: str, records: List[Dict[str, Any]]) -> bool:
+        """
+        向会话日志追加增量记录
+        
+        Args:
+            session_id: 会话 ID
+            records: 增量记录列表
+            
+        Returns:
+            bool: 追加是否成功
+        """
+        if not session_id:
+            return False
+        try:
+            with self._write() as conn:
+                conn.executemany(
+                    "INSERT INTO session_journal (session_id, data) VALUES (?, ?)",
+                    [(session_id, json.dumps(record, ensure_ascii=False)) for record in records]
+                )
+            return True
+        except Exception as e:
+            print(f"追加会话日志失败: {e}")
+            return False
+    
+    def load_session_journal(self, session_id: str) -> List[Dict[str, Any]]:
+        """
+        加载会话日志
+        
+        Args:
+            session_id: 会话 ID
+            
+        Returns:
+            List[Dict[str, Any]]: 增量记录列表
+        """
+        try:
+            rows = self._connection().execute(
+                "SELECT data FROM session_journal WHERE session_id = ? ORDER BY id", (session_id,)
+            ).fetchall()
+            return [json.loads(row["data"]) for row in rows]
+        except Exception as e:
+            print(f"加载会话日志失败: {e}")
+            return []
+    
+    def clear_session_journal(self, session_id: str) -> bool:
+        """
+        清除会话日志
+        
+        Args:
+            session_id: 会话 ID
+            
+        Returns:
+            bool: 清除是否成功
+        """
+        try:
+            with self._write() as conn:
+                conn.execute("DELETE FROM session_journal WHERE session_id = ?", (session_id,))
+            return True
+        except Exception as e:
+            print(f"清除会话日志失败: {e}")
+            return False
+    
+    def save_snapshot(self, snapshot_data: Dict[str, Any]) -> bool:
+        """
+        保存上下文快照
+        
+        Args:
+            snapshot_data: 快照数据字典
+            
+        Returns:
+            bool: 保存是否成功
+        """
+        try:
+            snapshot_id = snapshot_data.get("snapshot_id")
+            if not snapshot_id:
+                return False
+            
+            with self._write() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO snapshots (snapshot_id, session_id, data, created_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (
+                        snapshot_id,
+                        snapshot_data.get("session_id"),
+                        json.dumps(snapshot_data, ensure_ascii=False),
+                        datetime.now().isoformat()
+                    )
+                )
+            return True
+        except Exception as e:
+            print(f"保存快照失败: {e}")
+            return False
+    
+    def load_snapshot(self, snapshot_id: str) -> Optional[Dict[str, Any]]:
+        """
+        加载上下文快照
+        
+        Args:
+            snapshot_id: 快照 ID
+            
+        Returns:
+            Optional[Dict[str, Any]]: 快照数据字典
+        """
+        try:
+            row = self._connection().execute(
+                "SELECT data FROM snapshots WHERE snapshot_id = ?", (snapshot_id,)
+            ).fetchone()
+            return self._row_data(row)
+        except Exception as e:
+            print(f"加载快照失败: {e}")
+            return None
+    
+    def save_user_preferences(self, preferences_data: Dict[str, Any]) -> bool:
+        """
+        保存用户偏好设置
+        
+        Args:
+            preferences_data: 用户偏好数据字典
+            
+        Returns:
+            bool: 保存是否成功
+        """
+        try:
+            user_id = preferences_data.get("user_id")
+            if not user_id:
+                return False
+            
+            with self._write() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO preferences (user_id, data, updated_at) VALUES (?, ?, ?)",
+                    (user_id, json.dumps(preferences_data, ensure_ascii=False), datetime.now().isoformat())
+                )
+            return True
+        except Exception as e:
+            print(f"保存用户偏好失败: {e}")
+            return False
+    
+    def load_user_preferences(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """
+        加载用户偏好设置
+        
+        Args:
+            user_id: 用户 ID
+            
+        Returns:
+            Optional[Dict[str, Any]]: 用户偏好数据字典
+        """
+        try:
+            row = self._connection().execute(
+                "SELECT data FROM preferences WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            return self._row_data(row)
+        except Exception as e:
+            print(f"加载用户偏好失败: {e}")
+            return None
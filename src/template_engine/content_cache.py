@@ -0,0 +1,199 @@
+"""
+模板内容缓存
+
+进程内共享的模板文件内容缓存：
+- 以文件绝对路径为键，每次读取前用 (mtime, size) 校验，文件在磁盘上被修改后自动重新读取
+- 缓存内容的 SHA-256 摘要，列表接口只需返回摘要（可作为 ETag），不必传输内容
+- 按 LRU 淘汰，缓存内容的总字符数不超过 max_size
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+
+# 默认缓存的最大总字符数
+DEFAULT_MAX_SIZE = 8 * 1024 * 1024
+
+
+def content_hash(content: str) -> str:
+    """
+    计算模板内容的摘要
+    
+    Args:
+        content: 模板内容
+        
+    Returns:
+        SHA-256 十六进制摘要
+    """
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+@dataclass
+class CachedContent:
+    """缓存的模板文件内容"""
+    path: str
+    content: str
+    content_hash: str
+    mtime_ns: int       # 读取时文件的修改时间（纳秒）
+    file_size: int      # 读取时文件的字节数
+    
+    @property
+    def size(self) -> int:
+        """内容字符数"""
+        return len(self.content)
+    
+    @property
+    def mtime(self) -> float:
+        """读取时文件的修改时间（秒）"""
+        return self.mtime_ns / 1e9
+
+
+class TemplateContentCache:
+    """模板内容缓存（线程安全）"""
+    
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE):
+        """
+        初始化缓存
+        
+        Args:
+            max_size: 缓存内容的最大总字符数，超过后淘汰最久未使用的条目
+        """
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, CachedContent]" = OrderedDict()
+        self._total_size = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'reloads': 0,
+            'evictions': 0
+        }
+    
+    def get(self, path: str) -> str:
+        """
+        获取模板文件内容
+        
+        Args:
+            path: 模板文件路径
+            
+        Returns:
+            文件内容
+            
+        Raises:
+            OSError: 文件不存在或无法读取
+        """
+        return self.get_entry(path).content
+    
+    def get_entry(self, path: str) -> CachedContent:
+        """
+        获取模板文件内容及其摘要
+        
+        缓存的条目与文件当前的 (mtime, size) 一致时直接返回，否则重新读取。
+        
+        Args:
+            path: 模板文件路径
+            
+        Returns:
+            CachedContent 对象
+            
+        Raises:
+            OSError: 文件不存在或无法读取
+        """
+        key = os.path.abspath(path)
+        stat = os.stat(key)
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.mtime_ns == stat.st_mtime_ns and entry.file_size == stat.st_size:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return entry
+                self._discard(key)
+                self._stats['reloads'] += 1
+            else:
+                self._stats['misses'] += 1
+        
+        # 在锁外读取文件，读取后再校验一次，避免缓存读取期间被修改的内容
+        with open(key, 'r', encoding='utf-8') as f:
+            content = f.read()
+        after = os.stat(key)
+        entry = CachedContent(
+            path=key,
+            content=content,
+            content_hash=content_hash(content),
+            mtime_ns=stat.st_mtime_ns,
+            file_size=stat.st_size
+        )
+        if (after.st_mtime_ns, after.st_size) != (stat.st_mtime_ns, stat.st_size):
+            return entry
+        
+        with self._lock:
+            if entry.size <= self.max_size:
+                self._discard(key)
+                self._entries[key] = entry
+                self._total_size += entry.size
+                while self._total_size > self.max_size:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._total_size -= evicted.size
+                    self._stats['evictions'] += 1
+        return entry
+    
+    def invalidate(self, path: Optional[str] = None):
+        """
+        使缓存失效
+        
+        写入模板文件的代码应在写入后调用，以免修改时间精度不足时读到旧内容。
+        
+        Args:
+            path: 模板文件路径，None 表示清空全部缓存
+        """
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self._total_size = 0
+            else:
+                self._discard(os.path.abspath(path))
+    
+    def _discard(self, key: str):
+        """删除条目（调用方持有锁）"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_size -= entry.size
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def __contains__(self, path: str) -> bool:
+        return os.path.abspath(path) in self._entries
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计信息
+        
+        Returns:
+            统计信息字典
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['total_size'] = self._total_size
+            stats['max_size'] = self.max_size
+        return stats
+
+
+_content_cache = TemplateContentCache()
+
+
+def get_content_cache() -> TemplateContentCache:
+    """
+    获取进程内共享的模板内容缓存
+    
+    Returns:
+        TemplateContentCache 实例
+    """
+    return _content_cache
@@ -35,7 +35,8 @@ class CustomTemplateManager:
     def __init__(
         self,
         templates_dir: str = "templates",
-        config_path: str = "config/templates.yaml"
+        config_path: str = "config/templates.yaml",
+        template_manager=None
     ):
         """
         初始化自定义模板管理器
@@ -43,8 +44,10 @@ class CustomTemplateManager:
         Args:
             templates_dir: 模板根目录
             config_path: 配置文件路径
+            template_manager: 可选的 TemplateManager 实例，模板增删改时同步更新其模板索引
         """
         self.templates_dir = Path(templates_dir)
+        self.template_manager = template_manager
         self.custom_templates_dir = self.templates_dir / "custom"
         self.config_path = config_path
         
@@ -194,6 +197,8 @@ class CustomTemplateManager:
                 details={'template_id': template_id}
             )
         
+        self._sync_template_manager(template_id, category, config_data)
+        
         return template
     
     def edit_template(
@@ -260,6 +265,8 @@ class CustomTemplateManager:
             config=config_data
         )
         
+        self._sync_template_manager(template_id, category, config_data)
+        
         return template
     
     def delete_template(
@@ -321,6 +328,8 @@ class CustomTemplateManager:
             # 配置移除失败，但文件已删除，记录警告
             print(f"警告: 配置移除失败: {str(e)}")
         
+        self._sync_template_manager(template_id, category)
+        
         return True
     
     def list_custom_templates(
@@ -699,6 +708,7 @@ class CustomTemplateManager:
                         )
                     except Exception as e:
                         print(f"警告: 移除模板配置失败 {template_id}: {str(e)}")
+                    self._sync_template_manager(template_id, category_name)
             
             return True
             
@@ -818,8 +828,39 @@ class CustomTemplateManager:
                 }
             )
         
+        self._sync_template_manager(template_id, from_category)
+        self._sync_template_manager(template_id, to_category, config_data)
+        
         return template
     
+    def _sync_template_manager(
+        self,
+        template_id: str,
+        category: str,
+        config: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        同步 TemplateManager 中的模板及其索引
+        
+        TemplateManager 只从配置的 custom 分类加载自定义模板，这里保持一致，
+        只同步该分类的模板。
+        
+        Args:
+            template_id: 模板 ID
+            category: 模板分类
+            config: 模板配置，None 表示模板已删除
+        """
+        if self.template_manager is None or category != 'custom':
+            return
+        
+        try:
+            if config is None:
+                self.template_manager.remove_template(template_id)
+            else:
+                self.template_manager.add_custom_template(template_id, config)
+        except Exception as e:
+            print(f"警告: 同步模板索引失败 {template_id}: {str(e)}")
+    
     def _template_to_config(self, template: CustomTemplate) -> Dict[str, Any]:
         """将模板对象转换为配置字典"""
         config = {
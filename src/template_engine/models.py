@@ -7,6 +7,8 @@ from typing import Dict, List, Optional, Any
 from datetime import datetime
 from enum import Enum
 
+from .content_cache import content_hash, get_content_cache
+
 
 class TemplateCategory(Enum):
     """模板分类"""
@@ -41,11 +43,31 @@ class Template:
     content: Optional[str] = None
     
     def load_content(self) -> str:
-        """加载模板内容"""
-        if self.content is None:
-            with open(self.file_path, 'r', encoding='utf-8') as f:
-                self.content = f.read()
-        return self.content
+        """
+        加载模板内容
+        
+        显式设置的 content 优先；否则通过共享的内容缓存读取模板文件，
+        文件在磁盘上被修改后会读到新内容。
+        """
+        if self.content is not None:
+            return self.content
+        return get_content_cache().get(self.file_path)
+    
+    def content_info(self) -> Dict[str, Any]:
+        """
+        获取模板内容的摘要信息（不返回内容本身）
+        
+        Returns:
+            包含 hash（SHA-256）、size（字符数）和 mtime（文件修改时间，
+            内容未来自文件时为 None）的字典
+            
+        Raises:
+            OSError: 模板文件不存在或无法读取
+        """
+        if self.content is not None:
+            return {'hash': content_hash(self.content), 'size': len(self.content), 'mtime': None}
+        entry = get_content_cache().get_entry(self.file_path)
+        return {'hash': entry.content_hash, 'size': entry.size, 'mtime': entry.mtime}
 
 
 @dataclass
@@ -0,0 +1,303 @@
+"""
+PowerShell 语法检查器
+
+在一个常驻的 PowerShell 解析宿主进程中批量检查脚本语法：
+- 宿主进程只调用 [Parser]::ParseInput 解析脚本，不执行任何代码
+- 一次请求携带多个脚本，验证大量模板时只承担一次进程启动开销
+- 按内容摘要缓存解析结果，未修改的脚本再次验证时不需要访问宿主进程
+"""
+
+import atexit
+import base64
+import shutil
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..execution.host_pool import (
+    FRAME_PREFIX,
+    HostPoolError,
+    HostTimeoutError,
+    PowerShellHost,
+    build_host_args
+)
+from .content_cache import content_hash
+
+
+# 解析宿主引导脚本：请求的 command 是以逗号分隔的多个 Base64 编码脚本，
+# 响应的 output 每行一个语法错误，格式为 "脚本序号<TAB>行号<TAB>错误信息"
+PARSER_BOOTSTRAP_SCRIPT = r"""
+$ErrorActionPreference = 'Continue'
+[Console]::OutputEncoding = [System.Text.Encoding]::UTF8
+$prefix = '%s'
+while ($true) {
+    $line = [Console]::In.ReadLine()
+    if ($null -eq $line) { break }
+    if ($line.Trim().Length -eq 0) { continue }
+    $req = $line | ConvertFrom-Json
+    $lines = New-Object System.Collections.Generic.List[string]
+    $ok = $true
+    $errorText = ''
+    try {
+        $batch = [System.Text.Encoding]::UTF8.GetString([Convert]::FromBase64String($req.command))
+        $scripts = $batch.Split(',')
+        for ($i = 0; $i -lt $scripts.Length; $i++) {
+            $content = [System.Text.Encoding]::UTF8.GetString([Convert]::FromBase64String($scripts[$i]))
+            $tokens = $null
+            $errors = $null
+            [void][System.Management.Automation.Language.Parser]::ParseInput($content, [ref]$tokens, [ref]$errors)
+            foreach ($e in $errors) {
+                $message = $e.Message -replace '\s+', ' '
+                $lines.Add("$i`t$($e.Extent.StartLineNumber)`t$message")
+            }
+        }
+    } catch {
+        $ok = $false
+        $errorText = $_.Exception.Message
+    }
+    $proc = [System.Diagnostics.Process]::GetCurrentProcess()
+    $proc.Refresh()
+    $resp = @{
+        id = $req.id
+        ok = $ok
+        output = ($lines -join "`n")
+        error = $errorText
+        memory = $proc.WorkingSet64
+    } | ConvertTo-Json -Compress
+    [Console]::Out.WriteLine($prefix + $resp)
+    [Console]::Out.Flush()
+}
+""" % FRAME_PREFIX
+
+
+class SyntaxCheckError(Exception):
+    """语法检查无法完成（未找到 PowerShell、宿主进程失败或超时）"""
+    pass
+
+
+def detect_powershell() -> Optional[str]:
+    """
+    检测可用的 PowerShell 命令
+    
+    Returns:
+        'pwsh' 或 'powershell'，都不可用时返回 None
+    """
+    for command in ('pwsh', 'powershell'):
+        if shutil.which(command):
+            return command
+    return None
+
+
+class PowerShellSyntaxChecker:
+    """
+    PowerShell 语法检查器（线程安全）
+    
+    解析宿主进程在首次检查时启动，之后一直复用，直到 close() 或进程退出。
+    """
+    
+    def __init__(
+        self,
+        powershell_cmd: Optional[str] = None,
+        batch_size: int = 50,
+        timeout: float = 30,
+        cache_size: int = 1024,
+        host_args: Optional[List[str]] = None
+    ):
+        """
+        初始化语法检查器
+        
+        Args:
+            powershell_cmd: PowerShell 命令名称，默认自动检测（优先 pwsh）
+            batch_size: 每次请求最多携带的脚本数量
+            timeout: 每次请求的超时时间（秒），包括宿主进程首次启动的时间
+            cache_size: 缓存的解析结果数量上限
+            host_args: 自定义宿主启动参数，默认使用内置解析引导脚本
+        """
+        self.powershell_cmd = powershell_cmd or detect_powershell()
+        self.batch_size = max(1, batch_size)
+        self.timeout = timeout
+        self.cache_size = cache_size
+        if host_args is not None:
+            self.host_args = host_args
+        elif self.powershell_cmd:
+            self.host_args = build_host_args(self.powershell_cmd, PARSER_BOOTSTRAP_SCRIPT)
+        else:
+            self.host_args = None
+        
+        self._host: Optional[PowerShellHost] = None
+        self._lock = threading.Lock()
+        # 内容摘要 -> 语法错误元组
+        self._cache: "OrderedDict[str, Tuple[str, ...]]" = OrderedDict()
+        self._stats = {
+            'checked': 0,
+            'cache_hits': 0,
+            'requests': 0,
+            'hosts_started': 0
+        }
+    
+    def check(self, script_content: str) -> List[str]:
+        """
+        检查单个脚本的语法
+        
+        Args:
+            script_content: PowerShell 脚本内容
+            
+        Returns:
+            语法错误列表，格式为 "第 N 行: 错误信息"，没有错误时为空列表
+            
+        Raises:
+            SyntaxCheckError: 语法检查无法完成
+        """
+        return self.check_batch([script_content])[0]
+    
+    def check_batch(self, scripts: List[str]) -> List[List[str]]:
+        """
+        批量检查脚本语法
+        
+        已缓存的脚本和空脚本不发送给宿主进程，其余脚本按 batch_size 分批发送。
+        
+        Args:
+            scripts: PowerShell 脚本内容列表
+            
+        Returns:
+            与 scripts 一一对应的语法错误列表
+            
+        Raises:
+            SyntaxCheckError: 语法检查无法完成
+        """
+        results: List[Optional[List[str]]] = [None] * len(scripts)
+        # 内容摘要 -> 需要该结果的脚本序号（相同内容只解析一次）
+        pending: "OrderedDict[str, List[int]]" = OrderedDict()
+        
+        with self._lock:
+            self._stats['checked'] += len(scripts)
+            for i, script in enumerate(scripts):
+                if not script or not script.strip():
+                    results[i] = []
+                    continue
+                key = content_hash(script)
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    self._stats['cache_hits'] += 1
+                    results[i] = list(cached)
+                else:
+                    pending.setdefault(key, []).append(i)
+        
+        if pending:
+            keys = list(pending)
+            with self._lock:
+                for start in range(0, len(keys), self.batch_size):
+                    chunk = keys[start:start + self.batch_size]
+                    parsed = self._parse([scripts[pending[key][0]] for key in chunk])
+                    for key, errors in zip(chunk, parsed):
+                        self._remember(key, errors)
+                        for i in pending[key]:
+                            results[i] = list(errors)
+        
+        return results
+    
+    def _parse(self, scripts: List[str]) -> List[Tuple[str, ...]]:
+        """在宿主进程中解析一批脚本（调用方持有锁）"""
+        host = self._ensure_host()
+        command = ','.join(
+            base64.b64encode(script.encode('utf-8')).decode('ascii') for script in scripts
+        )
+        self._stats['requests'] += 1
+        
+        try:
+            response = host.request(command, self.timeout)
+        except HostTimeoutError:
+            self._discard_host()
+            raise SyntaxCheckError("PowerShell 语法验证超时")
+        except HostPoolError as e:
+            self._discard_host()
+            raise SyntaxCheckError(f"PowerShell 语法验证失败: {e}")
+        
+        if not response['ok']:
+            raise SyntaxCheckError(f"PowerShell 语法验证失败: {response['error'].strip()}")
+        
+        errors: List[List[str]] = [[] for _ in scripts]
+        for line in response['output'].splitlines():
+            parts = line.split('\t', 2)
+            if len(parts) != 3 or not parts[0].isdigit():
+                continue
+            index, line_number, message = parts
+            if int(index) < len(errors):
+                errors[int(index)].append(f"第 {line_number} 行: {message.strip()}")
+        return [tuple(item) for item in errors]
+    
+    def _ensure_host(self) -> PowerShellHost:
+        """获取运行中的解析宿主进程，必要时启动（调用方持有锁）"""
+        if self.host_args is None:
+            raise SyntaxCheckError("未找到 PowerShell。请确保 PowerShell 已安装并在 PATH 中")
+        
+        if self._host is None or not self._host.is_alive():
+            self._discard_host()
+            host = PowerShellHost(self.host_args)
+            try:
+                host.start()
+            except HostPoolError as e:
+                raise SyntaxCheckError(str(e))
+            self._host = host
+            self._stats['hosts_started'] += 1
+        return self._host
+    
+    def _discard_host(self):
+        """终止当前宿主进程（调用方持有锁）"""
+        host, self._host = self._host, None
+        if host is not None:
+            if host.process is not None and host.process.poll() is None:
+                host.process.kill()
+            host.close()
+    
+    def _remember(self, key: str, errors: Tuple[str, ...]):
+        """缓存解析结果（调用方持有锁）"""
+        if self.cache_size <= 0:
+            return
+        self._cache[key] = errors
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+    
+    def clear_cache(self):
+        """清空解析结果缓存"""
+        with self._lock:
+            self._cache.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取统计信息
+        
+        Returns:
+            统计信息字典
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['cached_results'] = len(self._cache)
+            stats['host_running'] = self._host is not None and self._host.is_alive()
+        return stats
+    
+    def close(self):
+        """关闭解析宿主进程（之后再检查会重新启动）"""
+        with self._lock:
+            self._discard_host()
+
+
+_syntax_checker: Optional[PowerShellSyntaxChecker] = None
+_syntax_checker_lock = threading.Lock()
+
+
+def get_syntax_checker() -> PowerShellSyntaxChecker:
+    """
+    获取进程内共享的语法检查器，进程退出时关闭其宿主进程
+    
+    Returns:
+        PowerShellSyntaxChecker 实例
+    """
+    global _syntax_checker
+    with _syntax_checker_lock:
+        if _syntax_checker is None:
+            _syntax_checker = PowerShellSyntaxChecker()
+            atexit.register(_syntax_checker.close)
+        return _syntax_checker
@@ -9,6 +9,7 @@ import os
 from typing import List, Tuple, Dict, Optional
 from pathlib import Path
 
+from .content_cache import get_content_cache
 from .custom_models import ParameterInfo
 from .exceptions import TemplateIOError, TemplateSyntaxError
 
@@ -539,6 +540,7 @@ class TemplateCreator:
             # 写入文件
             with open(file_path, 'w', encoding='utf-8') as f:
                 f.write(template_content)
+            get_content_cache().invalidate(file_path)
             
             return True
         
@@ -9,6 +9,7 @@ from pathlib import Path
 from typing import Dict, Any, Optional
 from datetime import datetime
 
+from .content_cache import get_content_cache
 from .models import Template, TemplateParameter
 from .custom_models import CustomTemplate, ValidationResult
 from .exceptions import (
@@ -223,6 +224,7 @@ class TemplateEditor:
             
             with open(file_path, 'w', encoding='utf-8') as f:
                 f.write(new_content)
+            get_content_cache().invalidate(str(file_path))
         
         except IOError as e:
             raise TemplateIOError(
@@ -294,6 +296,7 @@ class TemplateEditor:
             if current_content != new_content:
                 with open(file_path, 'w', encoding='utf-8') as f:
                     f.write(new_content)
+                get_content_cache().invalidate(str(file_path))
             
             # 如果提供了配置数据，写入配置文件
             if config_data is not None:
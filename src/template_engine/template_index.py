@@ -0,0 +1,210 @@
+"""
+模板索引
+
+为模板搜索和匹配预先建立的倒排索引：
+- 预先计算关键词、名称、描述和标签的小写形式，搜索和打分时不再重复转换
+- 以字符 n-gram（单字和二元组）为词项建立倒排表，子串搜索只需校验候选模板
+- 模板新增、修改和删除时增量更新，不需要重建整个索引
+"""
+
+import itertools
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set
+
+from .models import Template
+from .custom_models import CustomTemplate
+
+
+# 建立倒排表的 n-gram 长度：单字用于单字符查询，二元组用于更长的查询
+NGRAM_SIZES = (1, 2)
+
+
+@dataclass
+class IndexedTemplate:
+    """索引中的模板及其预先计算的小写字段"""
+    template: Template
+    order: int                                   # 加入索引的顺序，搜索结果按此排序
+    keywords: List[str]                          # 小写关键词（与 template.keywords 一一对应）
+    keyword_set: FrozenSet[str]                  # 原始关键词集合（用于精确匹配）
+    name: str                                    # 小写名称
+    description: str                             # 小写描述
+    tags: List[str] = field(default_factory=list)  # 小写标签（仅自定义模板）
+    
+    @property
+    def fields(self) -> List[str]:
+        """参与搜索的全部小写字段"""
+        return self.keywords + [self.name, self.description] + self.tags
+    
+    def contains(self, text: str) -> bool:
+        """
+        判断小写文本是否是任一字段的子串
+        
+        Args:
+            text: 小写查询文本
+            
+        Returns:
+            是否匹配
+        """
+        return (
+            any(text in keyword for keyword in self.keywords)
+            or text in self.name
+            or text in self.description
+            or any(text in tag for tag in self.tags)
+        )
+
+
+def _ngrams(text: str) -> Set[str]:
+    """文本的全部单字和二元组"""
+    grams: Set[str] = set()
+    for size in NGRAM_SIZES:
+        grams.update(text[i:i + size] for i in range(len(text) - size + 1))
+    return grams
+
+
+class TemplateIndex:
+    """模板倒排索引"""
+    
+    def __init__(self):
+        """初始化空索引"""
+        self._entries: Dict[str, IndexedTemplate] = {}
+        # n-gram -> 模板 ID 集合
+        self._postings: Dict[str, Set[str]] = defaultdict(set)
+        # 模板 ID -> 该模板的 n-gram 集合（删除时使用）
+        self._template_grams: Dict[str, Set[str]] = {}
+        self._order = itertools.count()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def __contains__(self, template_id: str) -> bool:
+        return template_id in self._entries
+    
+    def get(self, template_id: str) -> Optional[IndexedTemplate]:
+        """
+        获取索引中的模板
+        
+        Args:
+            template_id: 模板ID
+            
+        Returns:
+            IndexedTemplate 对象，如果不存在则返回None
+        """
+        return self._entries.get(template_id)
+    
+    def rebuild(self, templates: Iterable[Template]):
+        """
+        清空并重建索引
+        
+        Args:
+            templates: 全部模板，搜索结果按此顺序排列
+        """
+        self._entries.clear()
+        self._postings.clear()
+        self._template_grams.clear()
+        self._order = itertools.count()
+        for template in templates:
+            self.add(template)
+    
+    def add(self, template: Template):
+        """
+        加入或更新模板
+        
+        更新已有模板时保持其原来的顺序。
+        
+        Args:
+            template: 模板对象
+        """
+        previous = self._entries.get(template.id)
+        if previous is not None:
+            self._remove_postings(template.id)
+            order = previous.order
+        else:
+            order = next(self._order)
+        
+        entry = IndexedTemplate(
+            template=template,
+            order=order,
+            keywords=[str(keyword).lower() for keyword in template.keywords or []],
+            keyword_set=frozenset(template.keywords or []),
+            name=(template.name or "").lower(),
+            description=(template.description or "").lower(),
+            tags=[
+                str(tag).lower() for tag in template.tags or []
+            ] if isinstance(template, CustomTemplate) else []
+        )
+        self._entries[template.id] = entry
+        
+        grams: Set[str] = set()
+        for text in entry.fields:
+            grams.update(_ngrams(text))
+        for gram in grams:
+            self._postings[gram].add(template.id)
+        self._template_grams[template.id] = grams
+    
+    def remove(self, template_id: str) -> bool:
+        """
+        从索引中删除模板
+        
+        Args:
+            template_id: 模板ID
+            
+        Returns:
+            是否删除成功
+        """
+        if template_id not in self._entries:
+            return False
+        self._remove_postings(template_id)
+        del self._entries[template_id]
+        return True
+    
+    def search(self, keywords: List[str]) -> List[Template]:
+        """
+        搜索任一字段包含任一关键词（不区分大小写的子串匹配）的模板
+        
+        Args:
+            keywords: 关键词列表
+            
+        Returns:
+            匹配的模板列表（按加入索引的顺序）
+        """
+        matched: Set[str] = set()
+        for keyword in keywords:
+            if keyword is None:
+                continue
+            text = str(keyword).lower()
+            for template_id in self._candidates(text) - matched:
+                if self._entries[template_id].contains(text):
+                    matched.add(template_id)
+        
+        entries = sorted((self._entries[template_id] for template_id in matched), key=lambda e: e.order)
+        return [entry.template for entry in entries]
+    
+    def _candidates(self, text: str) -> Set[str]:
+        """用倒排表求可能包含 text 的模板（结果需要再校验）"""
+        if not text:
+            return set(self._entries)
+        
+        if len(text) < max(NGRAM_SIZES):
+            grams = {text}
+        else:
+            size = max(NGRAM_SIZES)
+            grams = {text[i:i + size] for i in range(len(text) - size + 1)}
+        
+        # 从最短的倒排表开始求交集
+        postings = sorted((self._postings.get(gram, set()) for gram in grams), key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            if not candidates:
+                break
+            candidates &= posting
+        return candidates
+    
+    def _remove_postings(self, template_id: str):
+        """从倒排表中删除模板"""
+        for gram in self._template_grams.pop(template_id, set()):
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(template_id)
+                if not posting:
+                    del self._postings[gram]
@@ -1,7 +1,8 @@
 """
 模板管理器
 
-负责加载、管理和查询脚本模板。
+负责加载、管理和查询脚本模板。搜索使用预先建立的倒排索引（见 template_index），
+模板增删改时通过 add_template / add_custom_template / remove_template 增量更新。
 """
 
 import os
@@ -11,6 +12,7 @@ from pathlib import Path
 
 from .models import Template, TemplateCategory, TemplateParameter
 from .custom_models import CustomTemplate
+from .template_index import TemplateIndex
 
 
 class TemplateManager:
@@ -26,6 +28,7 @@ class TemplateManager:
         self.config_path = config_path
         self.templates: Dict[str, Template] = {}
         self.config = {}
+        self.index = TemplateIndex()
         
         # 确定项目根目录
         # 如果配置路径是相对路径，则基于当前文件位置推断项目根目录
@@ -40,6 +43,7 @@ class TemplateManager:
         
         self._load_config()
         self._load_templates()
+        self.index.rebuild(self.templates.values())
     
     def _load_config(self):
         """加载配置文件"""
@@ -224,6 +228,46 @@ class TemplateManager:
         """
         return self.templates.get(template_id)
     
+    def add_template(self, template: Template):
+        """
+        加入或替换模板并更新索引
+        
+        Args:
+            template: 模板对象
+        """
+        self.templates[template.id] = template
+        self.index.add(template)
+    
+    def add_custom_template(self, template_id: str, config: Dict) -> CustomTemplate:
+        """
+        按配置加入或替换自定义模板（与从配置文件加载的结果一致）
+        
+        Args:
+            template_id: 模板ID
+            config: 模板配置（templates.custom 下的条目）
+            
+        Returns:
+            CustomTemplate对象
+        """
+        template = self._create_custom_template(template_id, config)
+        self.add_template(template)
+        return template
+    
+    def remove_template(self, template_id: str) -> bool:
+        """
+        删除模板并更新索引
+        
+        Args:
+            template_id: 模板ID
+            
+        Returns:
+            是否删除成功
+        """
+        if self.templates.pop(template_id, None) is None:
+            return False
+        self.index.remove(template_id)
+        return True
+    
     def list_templates(
         self,
         category: Optional[TemplateCategory] = None,
@@ -255,41 +299,15 @@ class TemplateManager:
         """
         搜索模板（包括系统模板和自定义模板）
         
+        匹配关键词、名称、描述以及自定义模板的标签（不区分大小写的子串匹配）。
+        
         Args:
             keywords: 关键词列表
             
         Returns:
             匹配的模板列表
         """
-        results = []
-        
-        for template in self.templates.values():
-            # 检查关键词匹配
-            for keyword in keywords:
-                keyword_lower = keyword.lower()
-                
-                # 检查模板关键词
-                if any(keyword_lower in k.lower() for k in template.keywords):
-                    results.append(template)
-                    break
-                
-                # 检查模板名称
-                if keyword_lower in template.name.lower():
-                    results.append(template)
-                    break
-                
-                # 检查模板描述
-                if keyword_lower in template.description.lower():
-                    results.append(template)
-                    break
-                
-                # 对于自定义模板，还要检查标签
-                if isinstance(template, CustomTemplate):
-                    if any(keyword_lower in tag.lower() for tag in template.tags):
-                        results.append(template)
-                        break
-        
-        return results
+        return self.index.search(keywords)
     
     def get_template_by_category(
         self,
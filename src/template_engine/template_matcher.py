@@ -1,12 +1,13 @@
 """
 模板匹配器
 
-根据用户意图匹配最合适的脚本模板。
+根据用户意图匹配最合适的脚本模板。打分使用模板索引中预先计算的小写关键词和标签。
 """
 
 from typing import List, Optional
 from .models import Intent, Template, TemplateMatch, TemplateCategory
 from .custom_models import CustomTemplate
+from .template_index import IndexedTemplate, TemplateIndex
 
 
 class TemplateMatcher:
@@ -49,9 +50,10 @@ class TemplateMatcher:
             return None
         
         # 计算每个候选模板的匹配分数
+        intent_text = intent.raw_input.lower()
         matches = []
         for template in candidates:
-            score, matched_keywords = self._calculate_score(intent, template)
+            score, matched_keywords = self._calculate_score(intent, template, intent_text)
             
             if score > 0:
                 matches.append(TemplateMatch(
@@ -85,27 +87,44 @@ class TemplateMatcher:
         
         return candidates
     
+    def _indexed(self, template: Template) -> IndexedTemplate:
+        """获取模板的索引项，模板不在索引中（或管理器没有索引）时临时计算"""
+        index = getattr(self.template_manager, 'index', None)
+        entry: Optional[IndexedTemplate] = index.get(template.id) if index is not None else None
+        if entry is None or entry.template is not template:
+            scratch = TemplateIndex()
+            scratch.add(template)
+            entry = scratch.get(template.id)
+        return entry
+    
     def _calculate_score(
         self,
         intent: Intent,
-        template: Template
+        template: Template,
+        intent_text: Optional[str] = None
     ) -> tuple[float, List[str]]:
         """
         计算匹配分数（支持系统模板和自定义模板）
         
+        Args:
+            intent: 用户意图
+            template: 候选模板
+            intent_text: 小写的用户输入，None 时由 intent.raw_input 计算
+        
         Returns:
             (分数, 匹配的关键词列表)
         """
         score = 0.0
         matched_keywords = []
+        indexed = self._indexed(template)
         
         # 1. 操作类型匹配 (权重: 10)
-        if intent.action in template.keywords:
+        if intent.action in indexed.keyword_set:
             score += 10
             matched_keywords.append(intent.action)
         
         # 2. 目标对象匹配 (权重: 5)
-        if intent.target in template.keywords:
+        if intent.target in indexed.keyword_set:
             score += 5
             matched_keywords.append(intent.target)
         
@@ -116,17 +135,18 @@ class TemplateMatcher:
                 matched_keywords.append(param_name)
         
         # 4. 关键词部分匹配 (权重: 2)
-        intent_text = intent.raw_input.lower()
-        for keyword in template.keywords:
-            if keyword.lower() in intent_text:
+        if intent_text is None:
+            intent_text = intent.raw_input.lower()
+        for keyword, keyword_lower in zip(template.keywords, indexed.keywords):
+            if keyword_lower in intent_text:
                 score += 2
                 if keyword not in matched_keywords:
                     matched_keywords.append(keyword)
         
         # 5. 对于自定义模板，检查标签匹配 (权重: 2)
         if isinstance(template, CustomTemplate):
-            for tag in template.tags:
-                if tag.lower() in intent_text:
+            for tag, tag_lower in zip(template.tags, indexed.tags):
+                if tag_lower in intent_text:
                     score += 2
                     if tag not in matched_keywords:
                         matched_keywords.append(tag)
@@ -149,9 +169,10 @@ class TemplateMatcher:
         """
         candidates = self._get_candidates(intent)
         
+        intent_text = intent.raw_input.lower()
         matches = []
         for template in candidates:
-            score, matched_keywords = self._calculate_score(intent, template)
+            score, matched_keywords = self._calculate_score(intent, template, intent_text)
             
             if score > 0:
                 matches.append(TemplateMatch(
@@ -5,16 +5,14 @@
 """
 
 import re
-import subprocess
-import tempfile
-import os
-from typing import Dict, List, Set, Any
+from typing import Dict, List, Optional, Set, Any
 from pathlib import Path
 
 from .models import Template, TemplateParameter
 from .custom_models import ValidationResult, CustomTemplate
 from .exceptions import TemplateValidationError, TemplateSyntaxError
 from .security_checker import SecurityChecker
+from .syntax_checker import PowerShellSyntaxChecker, SyntaxCheckError, get_syntax_checker
 
 
 class TemplateValidator:
@@ -24,12 +22,17 @@ class TemplateValidator:
     提供全面的模板验证功能，确保模板在使用前是有效和安全的。
     """
     
-    def __init__(self, enable_security_checks: bool = True):
+    def __init__(
+        self,
+        enable_security_checks: bool = True,
+        syntax_checker: Optional[PowerShellSyntaxChecker] = None
+    ):
         """
         初始化验证器
         
         Args:
             enable_security_checks: 是否启用安全检查（默认启用）
+            syntax_checker: PowerShell 语法检查器，默认使用进程内共享的检查器
         """
         self.placeholder_pattern = re.compile(r'\{\{(\w+)\}\}')
         self.param_block_pattern = re.compile(
@@ -38,6 +41,7 @@ class TemplateValidator:
         )
         self.enable_security_checks = enable_security_checks
         self.security_checker = SecurityChecker() if enable_security_checks else None
+        self.syntax_checker = syntax_checker or get_syntax_checker()
     
     def validate_template(self, template: Template) -> ValidationResult:
         """
@@ -60,8 +64,45 @@ class TemplateValidator:
             result.add_error(f"无法加载模板内容: {str(e)}")
             return result
         
+        return self._validate_loaded_template(template, content, self.validate_powershell_syntax(content))
+    
+    def validate_templates(self, templates: List[Template]) -> Dict[str, ValidationResult]:
+        """
+        批量验证模板
+        
+        所有模板的语法检查合并为批量请求，由同一个 PowerShell 解析进程完成。
+        
+        Args:
+            templates: 要验证的模板列表
+        
+        Returns:
+            Dict[str, ValidationResult]: 模板 ID 到验证结果的映射
+        """
+        results: Dict[str, ValidationResult] = {}
+        loaded = []
+        for template in templates:
+            try:
+                loaded.append((template, template.load_content()))
+            except Exception as e:
+                result = ValidationResult(is_valid=True)
+                result.add_error(f"无法加载模板内容: {str(e)}")
+                results[template.id] = result
+        
+        syntax_results = self.validate_syntax_batch([content for _, content in loaded])
+        for (template, content), syntax_result in zip(loaded, syntax_results):
+            results[template.id] = self._validate_loaded_template(template, content, syntax_result)
+        return results
+    
+    def _validate_loaded_template(
+        self,
+        template: Template,
+        content: str,
+        syntax_result: ValidationResult
+    ) -> ValidationResult:
+        """根据已加载的内容和语法检查结果完成其余验证"""
+        result = ValidationResult(is_valid=True)
+        
         # 1. 验证 PowerShell 语法
-        syntax_result = self.validate_powershell_syntax(content)
         if not syntax_result.is_valid:
             result.is_valid = False
             result.errors.extend(syntax_result.errors)
@@ -96,7 +137,7 @@ class TemplateValidator:
         """
         验证 PowerShell 脚本语法
         
-        使用 PowerShell 的 -Syntax 参数进行语法检查。
+        使用 PowerShell 的 AST 解析器（Parser::ParseInput）检查语法，结果按内容缓存。
         
         Args:
             script_content: PowerShell 脚本内容
@@ -104,90 +145,37 @@ class TemplateValidator:
         Returns:
             ValidationResult: 语法验证结果
         """
-        result = ValidationResult(is_valid=True)
+        return self.validate_syntax_batch([script_content])[0]
+    
+    def validate_syntax_batch(self, scripts: List[str]) -> List[ValidationResult]:
+        """
+        批量验证 PowerShell 脚本语法
         
-        # 空脚本是有效的
-        if not script_content or not script_content.strip():
-            return result
+        Args:
+            scripts: PowerShell 脚本内容列表
         
-        # 创建临时文件
-        temp_file = None
+        Returns:
+            List[ValidationResult]: 与 scripts 一一对应的语法验证结果
+        """
         try:
-            with tempfile.NamedTemporaryFile(
-                mode='w',
-                suffix='.ps1',
-                delete=False,
-                encoding='utf-8'
-            ) as f:
-                f.write(script_content)
-                temp_file = f.name
-            
-            # 使用 PowerShell 的 AST 解析器检查语法
-            # 这比 PSParser 更准确，能捕获更多语法错误
-            ps_command = f'''
-$ErrorActionPreference = 'Stop'
-try {{
-    $content = Get-Content -Path "{temp_file}" -Raw -ErrorAction Stop
-    $tokens = $null
-    $errors = $null
-    $ast = [System.Management.Automation.Language.Parser]::ParseInput($content, [ref]$tokens, [ref]$errors)
-    if ($errors.Count -gt 0) {{
-        $errors | ForEach-Object {{ Write-Error $_.Message }}
-        exit 1
-    }}
-    exit 0
-}} catch {{
-    Write-Error $_.Exception.Message
-    exit 1
-}}
-'''
-            
-            process_result = subprocess.run(
-                ['powershell', '-NoProfile', '-NonInteractive', '-Command', ps_command],
-                capture_output=True,
-                text=True,
-                timeout=10,
-                encoding='utf-8',
-                errors='replace'
-            )
-            
-            if process_result.returncode != 0:
-                error_output = process_result.stderr.strip()
-                if error_output:
-                    # 清理错误信息，移除 PowerShell 的额外输出
-                    lines = error_output.split('\n')
-                    error_lines = [line for line in lines if line.strip() and not line.startswith('+') and 'CategoryInfo' not in line and 'FullyQualifiedErrorId' not in line]
-                    if error_lines:
-                        result.add_error(f"PowerShell 语法错误: {' '.join(error_lines)}")
-                    else:
-                        result.add_error("PowerShell 语法验证失败")
-                else:
-                    result.add_error("PowerShell 语法验证失败")
-            
-            # 检查警告
-            if process_result.stdout:
-                warnings = process_result.stdout.strip()
-                if warnings and "WARNING" in warnings.upper():
-                    result.add_warning(f"PowerShell 警告: {warnings}")
-        
-        except subprocess.TimeoutExpired:
-            result.add_error("PowerShell 语法验证超时")
-        
-        except FileNotFoundError:
-            result.add_error("未找到 PowerShell。请确保 PowerShell 已安装并在 PATH 中")
-        
-        except Exception as e:
-            result.add_error(f"语法验证过程中发生错误: {str(e)}")
-        
-        finally:
-            # 清理临时文件
-            if temp_file and os.path.exists(temp_file):
-                try:
-                    os.unlink(temp_file)
-                except:
-                    pass
-        
-        return result
+            checked = self.syntax_checker.check_batch(scripts)
+        except SyntaxCheckError as e:
+            failures = []
+            for script in scripts:
+                result = ValidationResult(is_valid=True)
+                # 空脚本是有效的
+                if script and script.strip():
+                    result.add_error(str(e))
+                failures.append(result)
+            return failures
+        
+        results = []
+        for errors in checked:
+            result = ValidationResult(is_valid=True)
+            for error in errors:
+                result.add_error(f"PowerShell 语法错误: {error}")
+            results.append(result)
+        return results
     
     def validate_parameters(self, template: Template) -> ValidationResult:
         """
@@ -2,19 +2,41 @@
 模板版本控制模块
 
 提供模板的版本管理功能，包括版本创建、列表、恢复和清理。
+
+每个模板的历史目录包含：
+- manifest.json：版本清单（版本号、时间、描述、配置和内容摘要），列出版本只需读取这一个文件
+- objects/<sha256>.json：按内容摘要寻址的内容对象，相同内容只保存一份；
+  与上一版本相比只改动少量行时保存为基于上一版本内容的行级增量
 """
 
+import difflib
 import os
 import json
 import shutil
+import threading
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import Callable, List, Optional, Dict, Any, Set, TypedDict
 from dataclasses import dataclass, asdict
 
+from .content_cache import content_hash
 from .exceptions import TemplateError, TemplateNotFoundError
 
 
+# 版本清单文件名和内容对象目录名
+MANIFEST_FILENAME = "manifest.json"
+OBJECTS_DIRNAME = "objects"
+
+# 增量链的最大长度，超过后保存完整内容，限制读取一个版本时需要应用的增量数
+MAX_DELTA_CHAIN = 8
+
+
+class _Manifest(TypedDict):
+    """版本清单"""
+    next_version: int
+    versions: List[Dict[str, Any]]
+
+
 @dataclass
 class TemplateVersion:
     """模板版本信息"""
@@ -24,6 +46,7 @@ class TemplateVersion:
     content: str
     config: Dict[str, Any]
     change_description: str = ""
+    content_hash: str = ""
     
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典"""
@@ -39,6 +62,25 @@ class TemplateVersion:
         return cls(**data)
 
 
+class _LazyTemplateVersion(TemplateVersion):
+    """内容在首次访问时才从内容对象中读取的版本"""
+    
+    def __init__(self, content_loader: Callable[[], str], **kwargs):
+        self._content: Optional[str] = None
+        self._content_loader = content_loader
+        super().__init__(content=None, **kwargs)
+    
+    @property
+    def content(self) -> str:
+        if self._content is None:
+            self._content = self._content_loader()
+        return self._content
+    
+    @content.setter
+    def content(self, value: Optional[str]):
+        self._content = value
+
+
 class TemplateVersionControl:
     """模板版本控制器"""
     
@@ -52,6 +94,7 @@ class TemplateVersionControl:
         """
         self.history_dir = Path(history_dir)
         self.max_versions = max_versions
+        self._lock = threading.RLock()
         self._ensure_history_dir()
     
     def _ensure_history_dir(self) -> None:
@@ -66,15 +109,233 @@ class TemplateVersionControl:
     
     def _get_next_version_number(self, template_id: str) -> int:
         """获取下一个版本号"""
-        versions = self.list_versions(template_id)
-        if not versions:
-            return 1
-        return max(v.version_number for v in versions) + 1
+        return self._load_manifest(template_id)['next_version']
+    
+    def _load_manifest(self, template_id: str) -> _Manifest:
+        """
+        读取模板的版本清单
+        
+        旧格式的 v*.json 版本文件会在首次读取时迁移到清单和内容对象中。
+        """
+        template_dir = self._get_template_history_dir(template_id)
+        manifest_file = template_dir / MANIFEST_FILENAME
+        
+        if not manifest_file.exists():
+            if any(template_dir.glob("v*.json")):
+                return self._migrate_legacy_versions(template_id)
+            return {'next_version': 1, 'versions': []}
+        
+        try:
+            with open(manifest_file, 'r', encoding='utf-8') as f:
+                manifest: _Manifest = json.load(f)
+            manifest.setdefault('versions', [])
+            manifest.setdefault('next_version', max(
+                (entry['version_number'] for entry in manifest['versions']), default=0
+            ) + 1)
+            return manifest
+        except Exception as e:
+            print(f"警告: 无法读取版本清单 {manifest_file}: {str(e)}")
+            return {'next_version': 1, 'versions': []}
+    
+    def _save_manifest(self, template_id: str, manifest: _Manifest) -> None:
+        """原子地写入版本清单"""
+        manifest_file = self._get_template_history_dir(template_id) / MANIFEST_FILENAME
+        temp_file = manifest_file.with_suffix('.tmp')
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(temp_file, manifest_file)
+    
+    def _migrate_legacy_versions(self, template_id: str) -> _Manifest:
+        """把旧格式的 v*.json 版本文件迁移到清单和内容对象中"""
+        template_dir = self._get_template_history_dir(template_id)
+        legacy_files = []
+        versions = []
+        
+        for version_file in template_dir.glob("v*.json"):
+            try:
+                with open(version_file, 'r', encoding='utf-8') as f:
+                    versions.append(TemplateVersion.from_dict(json.load(f)))
+                legacy_files.append(version_file)
+            except Exception as e:
+                # 跳过损坏的版本文件
+                print(f"警告: 无法读取版本文件 {version_file}: {str(e)}")
+        
+        versions.sort(key=lambda v: v.version_number)
+        manifest: _Manifest = {'next_version': 1, 'versions': []}
+        previous_hash = None
+        for version in versions:
+            digest = self._store_content(template_id, version.content, previous_hash)
+            manifest['versions'].append(self._manifest_entry(version, digest))
+            manifest['next_version'] = version.version_number + 1
+            previous_hash = digest
+        
+        self._save_manifest(template_id, manifest)
+        for version_file in legacy_files:
+            version_file.unlink()
+        return manifest
+    
+    def _manifest_entry(self, version: TemplateVersion, digest: str) -> Dict[str, Any]:
+        """版本清单中的一条记录"""
+        return {
+            'version_number': version.version_number,
+            'timestamp': version.timestamp.isoformat(),
+            'change_description': version.change_description,
+            'config': version.config,
+            'content_hash': digest
+        }
+    
+    def _version_from_entry(self, template_id: str, entry: Dict[str, Any]) -> TemplateVersion:
+        """由清单记录创建版本对象（内容按需读取）"""
+        digest = entry['content_hash']
+        return _LazyTemplateVersion(
+            content_loader=lambda: self._load_content(template_id, digest),
+            template_id=template_id,
+            version_number=entry['version_number'],
+            timestamp=datetime.fromisoformat(entry['timestamp']),
+            config=entry.get('config', {}),
+            change_description=entry.get('change_description', ""),
+            content_hash=digest
+        )
+    
+    def _find_entry(self, template_id: str, version_number: int) -> Optional[Dict[str, Any]]:
+        """在版本清单中查找版本记录"""
+        for entry in self._load_manifest(template_id)['versions']:
+            if entry['version_number'] == version_number:
+                return entry
+        return None
+    
+    def _object_path(self, template_id: str, digest: str) -> Path:
+        """内容对象文件路径"""
+        return self._get_template_history_dir(template_id) / OBJECTS_DIRNAME / f"{digest}.json"
+    
+    def _read_object(self, template_id: str, digest: str) -> Dict[str, Any]:
+        """读取内容对象"""
+        path = self._object_path(template_id, digest)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                obj = json.load(f)
+        except Exception as e:
+            raise TemplateError(f"无法读取版本内容 {template_id}/{digest}: {str(e)}")
+        
+        if not isinstance(obj, dict) or not ('content' in obj or ('base' in obj and 'ops' in obj)):
+            raise TemplateError(f"无法读取版本内容 {template_id}/{digest}: 格式无效")
+        return obj
     
-    def _get_version_filename(self, version_number: int, timestamp: datetime) -> str:
-        """生成版本文件名"""
-        timestamp_str = timestamp.strftime("%Y%m%d_%H%M%S")
-        return f"v{version_number}_{timestamp_str}.json"
+    def _store_content(self, template_id: str, content: str, base_hash: Optional[str] = None) -> str:
+        """
+        保存内容对象
+        
+        内容已存在时直接复用；否则在增量比完整内容小时保存为基于 base_hash 的增量。
+        
+        Args:
+            template_id: 模板ID
+            content: 版本内容
+            base_hash: 上一版本的内容摘要
+            
+        Returns:
+            内容摘要
+        """
+        digest = content_hash(content)
+        path = self._object_path(template_id, digest)
+        if path.exists():
+            return digest
+        
+        obj: Dict[str, Any] = {'depth': 0, 'content': content}
+        if base_hash and base_hash != digest:
+            try:
+                base = self._read_object(template_id, base_hash)
+                if base.get('depth', 0) < MAX_DELTA_CHAIN:
+                    ops = self._make_delta(self._load_content(template_id, base_hash), content)
+                    if len(json.dumps(ops, ensure_ascii=False)) < len(content):
+                        obj = {'depth': base.get('depth', 0) + 1, 'base': base_hash, 'ops': ops}
+            except TemplateError:
+                pass
+        
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_file = path.with_suffix('.tmp')
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(obj, f, ensure_ascii=False)
+        os.replace(temp_file, path)
+        return digest
+    
+    def _load_content(self, template_id: str, digest: str) -> str:
+        """
+        读取内容对象对应的完整内容，依次应用增量链
+        
+        Raises:
+            TemplateError: 内容对象缺失或损坏
+        """
+        chain = []
+        current = digest
+        while True:
+            obj = self._read_object(template_id, current)
+            if 'base' not in obj:
+                content: str = obj['content']
+                break
+            chain.append(obj['ops'])
+            current = obj['base']
+            if len(chain) > MAX_DELTA_CHAIN:
+                raise TemplateError(f"版本内容增量链过长: {template_id}/{digest}")
+        
+        for ops in reversed(chain):
+            content = self._apply_delta(content, ops)
+        
+        if content_hash(content) != digest:
+            raise TemplateError(f"版本内容校验失败: {template_id}/{digest}")
+        return content
+    
+    @staticmethod
+    def _make_delta(base: str, content: str) -> List[List[Any]]:
+        """
+        计算行级增量
+        
+        ["=", i, j] 表示复制基础内容的第 i 到 j 行，["+", lines] 表示插入新行。
+        """
+        base_lines = base.splitlines(keepends=True)
+        new_lines = content.splitlines(keepends=True)
+        matcher = difflib.SequenceMatcher(None, base_lines, new_lines, autojunk=False)
+        ops: List[List[Any]] = []
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == 'equal':
+                ops.append(['=', i1, i2])
+            elif j2 > j1:
+                ops.append(['+', new_lines[j1:j2]])
+        return ops
+    
+    @staticmethod
+    def _apply_delta(base: str, ops: List[List[Any]]) -> str:
+        """把行级增量应用到基础内容上"""
+        base_lines = base.splitlines(keepends=True)
+        parts: List[str] = []
+        for op in ops:
+            if op[0] == '=':
+                parts.extend(base_lines[op[1]:op[2]])
+            else:
+                parts.extend(op[1])
+        return ''.join(parts)
+    
+    def _collect_garbage(self, template_id: str, manifest: _Manifest) -> None:
+        """删除不再被任何版本（及其增量链）引用的内容对象"""
+        objects_dir = self._get_template_history_dir(template_id) / OBJECTS_DIRNAME
+        if not objects_dir.exists():
+            return
+        
+        reachable: Set[str] = set()
+        for entry in manifest['versions']:
+            current = entry['content_hash']
+            while current and current not in reachable:
+                reachable.add(current)
+                try:
+                    current = self._read_object(template_id, current).get('base')
+                except TemplateError:
+                    break
+        
+        for object_file in objects_dir.glob("*.json"):
+            if object_file.stem not in reachable:
+                try:
+                    object_file.unlink()
+                except Exception as e:
+                    print(f"警告: 无法删除版本内容 {object_file}: {str(e)}")
     
     def create_version(
         self,
@@ -99,27 +360,31 @@ class TemplateVersionControl:
             TemplateError: 创建版本失败
         """
         try:
-            template_dir = self._get_template_history_dir(template_id)
-            version_number = self._get_next_version_number(template_id)
-            timestamp = datetime.now()
-            
-            # 创建版本对象
-            version = TemplateVersion(
-                template_id=template_id,
-                version_number=version_number,
-                timestamp=timestamp,
-                content=content,
-                config=config,
-                change_description=change_description
-            )
-            
-            # 保存版本文件
-            version_file = template_dir / self._get_version_filename(version_number, timestamp)
-            with open(version_file, 'w', encoding='utf-8') as f:
-                json.dump(version.to_dict(), f, ensure_ascii=False, indent=2)
-            
-            # 清理旧版本
-            self.cleanup_old_versions(template_id)
+            with self._lock:
+                manifest = self._load_manifest(template_id)
+                version_number = manifest['next_version']
+                previous_hash = manifest['versions'][-1]['content_hash'] if manifest['versions'] else None
+                
+                # 保存内容对象
+                digest = self._store_content(template_id, content, previous_hash)
+                
+                # 创建版本对象
+                version = TemplateVersion(
+                    template_id=template_id,
+                    version_number=version_number,
+                    timestamp=datetime.now(),
+                    content=content,
+                    config=config,
+                    change_description=change_description,
+                    content_hash=digest
+                )
+                
+                manifest['versions'].append(self._manifest_entry(version, digest))
+                manifest['next_version'] = version_number + 1
+                self._save_manifest(template_id, manifest)
+                
+                # 清理旧版本
+                self.cleanup_old_versions(template_id)
             
             return version
             
@@ -130,26 +395,17 @@ class TemplateVersionControl:
         """
         列出模板的所有历史版本
         
+        只读取版本清单，版本内容在访问 content 时才读取。
+        
         Args:
             template_id: 模板ID
             
         Returns:
             版本列表，按版本号降序排列
         """
-        template_dir = self._get_template_history_dir(template_id)
-        versions = []
-        
-        # 读取所有版本文件
-        for version_file in template_dir.glob("v*.json"):
-            try:
-                with open(version_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    version = TemplateVersion.from_dict(data)
-                    versions.append(version)
-            except Exception as e:
-                # 跳过损坏的版本文件
-                print(f"警告: 无法读取版本文件 {version_file}: {str(e)}")
-                continue
+        with self._lock:
+            manifest = self._load_manifest(template_id)
+        versions = [self._version_from_entry(template_id, entry) for entry in manifest['versions']]
         
         # 按版本号降序排列
         versions.sort(key=lambda v: v.version_number, reverse=True)
@@ -166,11 +422,11 @@ class TemplateVersionControl:
         Returns:
             版本对象，如果不存在则返回None
         """
-        versions = self.list_versions(template_id)
-        for version in versions:
-            if version.version_number == version_number:
-                return version
-        return None
+        with self._lock:
+            entry = self._find_entry(template_id, version_number)
+        if entry is None:
+            return None
+        return self._version_from_entry(template_id, entry)
     
     def restore_version(
         self,
@@ -244,31 +500,27 @@ class TemplateVersionControl:
         """
         删除超过限制的旧版本
         
+        删除版本后，不再被保留版本（及其增量链）引用的内容对象也会被删除。
+        
         Args:
             template_id: 模板ID
             
         Returns:
             删除的版本数量
         """
-        versions = self.list_versions(template_id)
-        
-        if len(versions) <= self.max_versions:
-            return 0
-        
-        # 保留最新的 max_versions 个版本，删除其余的
-        versions_to_delete = versions[self.max_versions:]
-        deleted_count = 0
-        
-        template_dir = self._get_template_history_dir(template_id)
-        
-        for version in versions_to_delete:
-            # 查找并删除对应的文件
-            for version_file in template_dir.glob(f"v{version.version_number}_*.json"):
-                try:
-                    version_file.unlink()
-                    deleted_count += 1
-                except Exception as e:
-                    print(f"警告: 无法删除版本文件 {version_file}: {str(e)}")
+        with self._lock:
+            manifest = self._load_manifest(template_id)
+            
+            if len(manifest['versions']) <= self.max_versions:
+                return 0
+            
+            # 保留最新的 max_versions 个版本，删除其余的
+            manifest['versions'].sort(key=lambda entry: entry['version_number'])
+            deleted_count = len(manifest['versions']) - self.max_versions
+            manifest['versions'] = manifest['versions'][deleted_count:]
+            
+            self._save_manifest(template_id, manifest)
+            self._collect_garbage(template_id, manifest)
         
         return deleted_count
     
@@ -283,9 +535,10 @@ class TemplateVersionControl:
             是否成功删除
         """
         try:
-            template_dir = self._get_template_history_dir(template_id)
-            if template_dir.exists():
-                shutil.rmtree(template_dir)
+            with self._lock:
+                template_dir = self._get_template_history_dir(template_id)
+                if template_dir.exists():
+                    shutil.rmtree(template_dir)
             return True
         except Exception as e:
             print(f"警告: 无法删除历史目录 {template_dir}: {str(e)}")
@@ -295,18 +548,23 @@ class TemplateVersionControl:
         self,
         template_id: str,
         version1: int,
-        version2: int
+        version2: int,
+        context_lines: int = 3
     ) -> Optional[Dict[str, Any]]:
         """
         比较两个版本的差异
         
+        内容是否变化通过内容摘要判断，只有内容不同时才读取两个版本的内容并计算行级差异。
+        
         Args:
             template_id: 模板ID
             version1: 第一个版本号
             version2: 第二个版本号
+            context_lines: 统一差异格式中的上下文行数
             
         Returns:
-            差异信息字典，如果版本不存在则返回None
+            差异信息字典，如果版本不存在则返回None。diff 为统一差异格式的行列表，
+            lines_added 和 lines_removed 为新增和删除的行数
         """
         v1 = self.get_version(template_id, version1)
         v2 = self.get_version(template_id, version2)
@@ -314,13 +572,32 @@ class TemplateVersionControl:
         if not v1 or not v2:
             return None
         
+        content_changed = v1.content_hash != v2.content_hash
+        diff: List[str] = []
+        if content_changed:
+            diff = list(difflib.unified_diff(
+                v1.content.splitlines(),
+                v2.content.splitlines(),
+                fromfile=f"v{version1}",
+                tofile=f"v{version2}",
+                n=context_lines,
+                lineterm=""
+            ))
+        
         return {
             'version1': version1,
             'version2': version2,
-            'content_changed': v1.content != v2.content,
+            'content_changed': content_changed,
             'config_changed': v1.config != v2.config,
             'timestamp1': v1.timestamp.isoformat(),
             'timestamp2': v2.timestamp.isoformat(),
             'description1': v1.change_description,
-            'description2': v2.change_description
+            'description2': v2.change_description,
+            'diff': diff,
+            'lines_added': sum(
+                1 for line in diff if line.startswith('+') and not line.startswith('+++')
+            ),
+            'lines_removed': sum(
+                1 for line in diff if line.startswith('-') and not line.startswith('---')
+            )
         }
@@ -2,9 +2,14 @@
 AI 引擎主类测试
 """
 
+import asyncio
+import threading
+import time
 import pytest
 from datetime import datetime
+from unittest.mock import Mock, patch
 from src.ai_engine.engine import AIEngine, TranslationCache
+from src.storage.file_storage import FileStorage
 from src.interfaces.base import Suggestion, Context
 
 
@@ -56,6 +61,105 @@ class TestTranslationCache:
         # 缓存大小应该不超过 max_size
         assert cache.size() <= 2
     
+    def test_cache_lru_eviction(self):
+        """测试淘汰最久未使用的条目"""
+        cache = TranslationCache(max_size=2)
+        
+        for i in range(2):
+            cache.set(f"输入{i}", Suggestion(
+                original_input=f"输入{i}",
+                generated_command=f"命令{i}",
+                confidence_score=0.9,
+                explanation=f"解释{i}"
+            ))
+        
+        # 访问输入0后，输入1成为最久未使用的条目
+        assert cache.get("输入0") is not None
+        cache.set("输入2", Suggestion(
+            original_input="输入2",
+            generated_command="命令2",
+            confidence_score=0.9,
+            explanation="解释2"
+        ))
+        
+        assert cache.get("输入0") is not None
+        assert cache.get("输入1") is None
+        assert cache.get("输入2") is not None
+        assert cache.get_stats()['evictions'] == 1
+    
+    def test_cache_ttl_expiration(self):
+        """测试过期条目不会被返回"""
+        cache = TranslationCache(ttl_seconds=0)
+        cache.set("测试", Suggestion(
+            original_input="测试",
+            generated_command="Test",
+            confidence_score=0.9,
+            explanation="测试"
+        ))
+        
+        with patch('src.ai_engine.engine.time.time', return_value=time.time() + 1):
+            assert cache.get("测试") is None
+        
+        stats = cache.get_stats()
+        assert stats['expirations'] == 1
+        assert cache.size() == 0
+    
+    def test_cache_stats(self):
+        """测试命中和未命中计数"""
+        cache = TranslationCache()
+        cache.set("显示文件", Suggestion(
+            original_input="显示文件",
+            generated_command="Get-ChildItem",
+            confidence_score=0.95,
+            explanation="列出文件"
+        ))
+        
+        cache.get("显示文件")
+        cache.get("显示文件")
+        cache.get("不存在的键")
+        
+        stats = cache.get_stats()
+        assert stats['hits'] == 2
+        assert stats['misses'] == 1
+        assert stats['hit_rate'] == pytest.approx(2 / 3)
+    
+    def test_cache_snapshot_round_trip(self, tmp_path):
+        """测试快照保存到存储后可被新缓存实例加载"""
+        storage = FileStorage(base_path=str(tmp_path))
+        cache = TranslationCache(storage=storage, snapshot_interval=0)
+        cache.set("显示文件", Suggestion(
+            original_input="显示文件",
+            generated_command="Get-ChildItem",
+            confidence_score=0.95,
+            explanation="列出文件",
+            alternatives=["ls"]
+        ))
+        
+        assert cache.save_snapshot() is True
+        assert (tmp_path / "cache" / "translation_cache.json").exists()
+        
+        warm_cache = TranslationCache(storage=storage)
+        result = warm_cache.get("显示文件")
+        assert result is not None
+        assert result.generated_command == "Get-ChildItem"
+        assert result.alternatives == ["ls"]
+    
+    def test_cache_snapshot_interval(self, tmp_path):
+        """测试写入达到间隔后自动保存快照"""
+        storage = FileStorage(base_path=str(tmp_path))
+        cache = TranslationCache(storage=storage, snapshot_interval=2)
+        
+        for i in range(2):
+            cache.set(f"输入{i}", Suggestion(
+                original_input=f"输入{i}",
+                generated_command=f"命令{i}",
+                confidence_score=0.9,
+                explanation=f"解释{i}"
+            ))
+        
+        snapshot = storage.load_cache(TranslationCache.SNAPSHOT_KEY)
+        assert len(snapshot['entries']) == 2
+    
     def test_cache_clear(self):
         """测试清空缓存"""
         cache = TranslationCache()
@@ -112,6 +216,26 @@ class TestAIEngine:
         
         assert result1.generated_command == result2.generated_command
     
+    @pytest.mark.asyncio
+    async def test_atranslate_with_cache(self):
+        """测试异步翻译与同步翻译共享缓存"""
+        engine = AIEngine()
+        context = Context(session_id="test-session")
+        
+        result1 = await engine.atranslate_natural_language("显示文件", context)
+        result2 = engine.translate_natural_language("显示文件", context)
+        
+        assert result1.generated_command == result2.generated_command
+        assert engine.get_cache_stats()['hits'] == 1
+    
+    @pytest.mark.asyncio
+    async def test_atranslate_empty_input(self):
+        """测试异步翻译空输入"""
+        engine = AIEngine()
+        
+        with pytest.raises(ValueError, match="输入文本不能为空"):
+            await engine.atranslate_natural_language("  ", Context(session_id="test-session"))
+    
     def test_validate_command_valid(self):
         """测试有效命令验证"""
         engine = AIEngine()
@@ -155,3 +279,346 @@ class TestAIEngine:
         assert 'size' in stats
         assert 'max_size' in stats
         assert stats['size'] >= 0
+    
+    def test_get_cache_stats_counts_hits(self):
+        """测试缓存统计包含命中计数"""
+        engine = AIEngine()
+        context = Context(session_id="test-session")
+        
+        engine.translate_natural_language("显示文件", context)
+        engine.translate_natural_language("显示文件", context)
+        
+        stats = engine.get_cache_stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+        assert stats['persistent'] is False
+    
+    def test_normalized_cache_key(self):
+        """测试书写略有差异的输入共享缓存，并统计规范化命中"""
+        engine = AIEngine()
+        context = Context(session_id="test-session")
+        
+        first = engine.translate_natural_language("显示当前目录", context)
+        
+        with patch.object(engine.translator, 'translate') as mock_translate:
+            for variant in ["显示 当前目录", "显示当前目录。", "顯示當前目錄"]:
+                result = engine.translate_natural_language(variant, context)
+                assert result.generated_command == first.generated_command
+                assert result.original_input == variant
+            mock_translate.assert_not_called()
+        
+        stats = engine.get_cache_stats()
+        assert stats['normalized_hits'] == 3
+        assert stats['size'] == 1
+    
+    def test_normalization_disabled(self):
+        """测试关闭规范化后使用原始文本作为缓存键"""
+        engine = AIEngine({'cache_normalize': False})
+        context = Context(session_id="test-session")
+        
+        engine.translate_natural_language("显示当前目录", context)
+        engine.translate_natural_language("显示当前目录。", context)
+        
+        stats = engine.get_cache_stats()
+        assert stats['size'] == 2
+        assert stats['normalized_hits'] == 0
+    
+    def test_engine_cache_persist(self, tmp_path):
+        """测试启用 cache_persist 时使用存储引擎保存快照"""
+        storage = FileStorage(base_path=str(tmp_path))
+        engine = AIEngine({'cache_persist': True}, storage=storage)
+        context = Context(session_id="test-session")
+        
+        engine.translate_natural_language("显示文件", context)
+        assert engine.save_cache_snapshot() is True
+        
+        restarted = AIEngine({'cache_persist': True}, storage=storage)
+        assert restarted.cache.size() == 1
+
+
+class SlowTranslator:
+    """记录调用次数、每次翻译耗时固定的翻译器"""
+    
+    def __init__(self, delay: float = 0.2, error: Exception = None):
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+    
+    def translate_with_rules(self, text):
+        return None
+    
+    def translate(self, text, context, on_partial=None):
+        with self.lock:
+            self.calls += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            return self._translate(text)
+        finally:
+            with self.lock:
+                self.active -= 1
+    
+    def _translate(self, text):
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return Suggestion(
+            original_input=text,
+            generated_command="Get-Process",
+            confidence_score=0.8,
+            explanation="AI 生成的命令: Get-Process"
+        )
+    
+    async def atranslate(self, text, context, on_partial=None):
+        with self.lock:
+            self.calls += 1
+        await asyncio.sleep(self.delay)
+        return Suggestion(
+            original_input=text,
+            generated_command="Get-Process",
+            confidence_score=0.8,
+            explanation="AI 生成的命令: Get-Process"
+        )
+
+
+class TestRequestCoalescing:
+    """相同请求合并测试"""
+    
+    def run_concurrently(self, engine, texts, context=None):
+        """在多个线程中同时翻译，返回结果或异常"""
+        context = context or Context(session_id="test-session")
+        results = [None] * len(texts)
+        barrier = threading.Barrier(len(texts))
+        
+        def worker(index, text):
+            barrier.wait()
+            try:
+                results[index] = engine.translate_natural_language(text, context)
+            except Exception as e:
+                results[index] = e
+        
+        threads = [threading.Thread(target=worker, args=(i, t)) for i, t in enumerate(texts)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+    
+    def test_identical_requests_share_one_call(self):
+        """测试同时进行的相同请求只调用一次翻译器"""
+        engine = AIEngine()
+        engine._translator = SlowTranslator()
+        
+        results = self.run_concurrently(engine, ["显示进程"] * 8)
+        
+        assert engine._translator.calls == 1
+        assert all(r.generated_command == "Get-Process" for r in results)
+        stats = engine.get_cache_stats()
+        assert stats['coalesced_requests'] == 7
+        assert stats['inflight_requests'] == 0
+    
+    def test_normalized_requests_share_one_call(self):
+        """测试规范化后相同的请求也会合并，并保留各自的原始输入"""
+        engine = AIEngine()
+        engine._translator = SlowTranslator()
+        
+        results = self.run_concurrently(engine, ["显示进程", "显示 进程", "显示进程。"])
+        
+        assert engine._translator.calls == 1
+        assert sorted(r.original_input for r in results) == sorted(["显示进程", "显示 进程", "显示进程。"])
+    
+    def test_different_requests_not_coalesced(self):
+        """测试不同的请求各自翻译"""
+        engine = AIEngine()
+        engine._translator = SlowTranslator()
+        
+        self.run_concurrently(engine, ["显示进程", "显示服务"])
+        
+        assert engine._translator.calls == 2
+        assert engine.get_cache_stats()['coalesced_requests'] == 0
+    
+    def test_error_shared_with_waiters(self):
+        """测试翻译失败时等待的请求收到同样的错误，之后的请求重新翻译"""
+        engine = AIEngine()
+        engine._translator = SlowTranslator(error=RuntimeError("Ollama 服务不可用"))
+        
+        results = self.run_concurrently(engine, ["显示进程"] * 4)
+        
+        assert engine._translator.calls == 1
+        assert all(isinstance(r, RuntimeError) for r in results)
+        
+        engine._translator.error = None
+        engine._translator.delay = 0
+        assert engine.translate_natural_language("显示进程", Context(session_id="test")).generated_command == "Get-Process"
+        assert engine._translator.calls == 2
+    
+    def test_regeneration_not_coalesced(self):
+        """测试重新生成请求不参与合并"""
+        engine = AIEngine()
+        engine._translator = SlowTranslator()
+        context = Context(session_id="test-session", feedback={'feedback': 'incorrect'})
+        
+        self.run_concurrently(engine, ["显示进程"] * 3, context)
+        
+        assert engine._translator.calls == 3
+    
+    def test_coalescing_disabled(self):
+        """测试关闭合并后每个请求独立翻译"""
+        engine = AIEngine({'coalesce_requests': False})
+        engine._translator = SlowTranslator()
+        
+        self.run_concurrently(engine, ["显示进程"] * 3)
+        
+        assert engine._translator.calls == 3
+    
+    @pytest.mark.asyncio
+    async def test_async_requests_coalesced(self):
+        """测试异步翻译的相同请求合并"""
+        engine = AIEngine()
+        engine._translator = SlowTranslator()
+        context = Context(session_id="test-session")
+        
+        results = await asyncio.gather(*[
+            engine.atranslate_natural_language("显示进程", context) for _ in range(5)
+        ])
+        
+        assert engine._translator.calls == 1
+        assert all(r.generated_command == "Get-Process" for r in results)
+        assert engine.get_cache_stats()['coalesced_requests'] == 4
+
+
+class TestTranslateBatch:
+    """批量翻译测试"""
+    
+    def test_results_in_order(self):
+        """测试结果与输入顺序一致"""
+        engine = AIEngine()
+        context = Context(session_id="test-session")
+        texts = ["显示文件", "显示进程", "显示当前时间"]
+        
+        items = engine.translate_batch(texts, context)
+        
+        assert [item.index for item in items] == [0, 1, 2]
+        assert [item.input for item in items] == texts
+        assert all(item.success for item in items)
+        assert all(item.source == 'rule' for item in items)
+        for item, text in zip(items, texts):
+            assert item.suggestion.generated_command == engine.translate_natural_language(text, context).generated_command
+    
+    def test_cache_hits(self):
+        """测试缓存命中的输入直接返回"""
+        engine = AIEngine()
+        context = Context(session_id="test-session")
+        engine.translate_natural_language("显示文件", context)
+        
+        items = engine.translate_batch(["显示文件", "显示进程"], context)
+        
+        assert [item.source for item in items] == ['cache', 'rule']
+    
+    def test_duplicates_translated_once(self):
+        """测试规范化后相同的输入只翻译一次"""
+        engine = AIEngine()
+        engine._translator = SlowTranslator(delay=0)
+        context = Context(session_id="test-session")
+        
+        items = engine.translate_batch(["显示进程", "显示 进程", "显示进程"], context)
+        
+        assert engine._translator.calls == 1
+        assert [item.source for item in items] == ['translator', 'duplicate', 'duplicate']
+        assert [item.suggestion.original_input for item in items] == ["显示进程", "显示 进程", "显示进程"]
+    
+    def test_bounded_concurrency(self):
+        """测试调用翻译器的并发数不超过限制"""
+        engine = AIEngine()
+        engine._translator = SlowTranslator(delay=0.1)
+        context = Context(session_id="test-session")
+        texts = [f"任务 {i}" for i in range(6)]
+        
+        start = time.perf_counter()
+        items = engine.translate_batch(texts, context, max_concurrency=3)
+        elapsed = time.perf_counter() - start
+        
+        assert engine._translator.calls == 6
+        assert engine._translator.max_active == 3
+        assert all(item.source == 'translator' for item in items)
+        assert all(item.elapsed >= 0.1 for item in items)
+        # 串行需要 0.6 秒
+        assert elapsed < 0.5
+    
+    def test_errors_isolated(self):
+        """测试单条输入失败不影响其他输入"""
+        engine = AIEngine()
+        context = Context(session_id="test-session")
+        
+        items = engine.translate_batch(["显示文件", "  ", "显示进程"], context)
+        
+        assert items[0].success and items[2].success
+        assert items[1].success is False
+        assert items[1].error == "输入文本不能为空"
+    
+    def test_translator_error(self):
+        """测试翻译器异常记录在对应条目中"""
+        engine = AIEngine()
+        engine._translator = SlowTranslator(delay=0, error=RuntimeError("Ollama 服务不可用"))
+        
+        items = engine.translate_batch(["任务 1", "任务 1"], Context(session_id="test-session"))
+        
+        assert [item.error for item in items] == ["Ollama 服务不可用", "Ollama 服务不可用"]
+        assert not any(item.success for item in items)
+
+
+class TestDeadlineFallbackCaching:
+    """延迟预算降级结果的缓存测试"""
+    
+    def test_deadline_fallback_not_cached(self):
+        """测试超出延迟预算时的降级结果不写入缓存"""
+        engine = AIEngine()
+        engine._translator = SlowTranslator(delay=0)
+        context = Context(session_id="test-session")
+        
+        def degraded(text):
+            suggestion = Suggestion(
+                original_input=text,
+                generated_command="Get-Help",
+                confidence_score=0.3,
+                explanation="回退翻译"
+            )
+            suggestion.metadata['deadline_fallback'] = True
+            return suggestion
+        
+        engine._translator._translate = degraded
+        first = engine.translate_natural_language("任务 1", context)
+        assert first.generated_command == "Get-Help"
+        
+        # AI 模型恢复后重新翻译
+        del engine._translator._translate
+        second = engine.translate_natural_language("任务 1", context)
+        
+        assert second.generated_command == "Get-Process"
+        assert engine._translator.calls == 2
+        assert engine.translate_natural_language("任务 1", context).generated_command == "Get-Process"
+        assert engine._translator.calls == 2
+
+
+class TestEngineClose:
+    """AI 引擎资源释放测试"""
+    
+    def test_close_releases_provider(self):
+        """测试关闭引擎时关闭 AI 提供商的连接"""
+        engine = AIEngine()
+        engine.translator._ai_provider = Mock()
+        
+        engine.close()
+        
+        engine.translator._ai_provider.close.assert_called_once()
+    
+    def test_close_without_translator(self):
+        """测试翻译器未加载时关闭引擎"""
+        engine = AIEngine()
+        
+        engine.close()
+        
+        assert engine._translator is None
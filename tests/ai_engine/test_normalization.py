@@ -0,0 +1,79 @@
+"""
+输入文本规范化测试
+"""
+
+import pytest
+from src.ai_engine.normalization import normalize_text, chinese_to_int
+
+
+class TestNormalizeText:
+    """缓存键规范化测试"""
+    
+    def test_whitespace_and_punctuation(self):
+        """测试中文之间的空白和句末标点被去除"""
+        expected = normalize_text("显示当前目录")
+        
+        assert normalize_text("显示 当前目录") == expected
+        assert normalize_text("显示当前目录。") == expected
+        assert normalize_text("  显示，当前目录！ ") == expected
+        assert normalize_text("“显示当前目录”") == expected
+    
+    def test_full_width_to_half_width(self):
+        """测试全角字符转半角"""
+        assert normalize_text("ＰＷＤ") == "PWD"
+        assert normalize_text("显示Ｃ盘") == "显示C盘"
+    
+    def test_traditional_to_simplified(self):
+        """测试繁体转简体"""
+        assert normalize_text("顯示當前目錄") == "显示当前目录"
+        assert normalize_text("刪除檔案") == normalize_text("删除档案")
+    
+    def test_chinese_numerals(self):
+        """测试计数语境中的中文数字转阿拉伯数字"""
+        assert normalize_text("在桌面新建三个文件夹") == normalize_text("在桌面新建 3 个文件夹")
+        assert normalize_text("显示前十个进程") == "显示前10个进程"
+        # 非计数语境中的数字字符保持不变
+        assert normalize_text("显示一下文件") == "显示一下文件"
+    
+    def test_ascii_fragments_preserved(self):
+        """测试路径、IP、参数等 ASCII 片段保持不变"""
+        assert normalize_text("cd ..") == "cd .."
+        assert normalize_text("ls -la") == "ls -la"
+        assert normalize_text("打开./a") == "打开./a"
+        assert normalize_text("切换到 C:\\Users\\test") == "切换到C:\\Users\\test"
+        assert normalize_text("删除 a.txt。") == "删除a.txt"
+        assert normalize_text("测试连接 192.168.1.1") == "测试连接192.168.1.1"
+    
+    def test_quoted_arguments_preserved(self):
+        """测试引号中的参数原样保留"""
+        assert normalize_text('创建文件夹 “新 建”') != normalize_text("创建文件夹 新建")
+        assert normalize_text('写入 "你好，世界" 到 a.txt') != normalize_text('写入 "你好世界" 到 a.txt')
+        assert normalize_text('创建文件夹 “新 建”') == normalize_text('创建文件夹 "新 建"')
+    
+    def test_argument_tokens_preserved(self):
+        """测试不由指令词构成的参数词原样保留"""
+        assert normalize_text("写入 你好，世界 到 a.txt") == "写入 你好，世界 到a.txt"
+        assert normalize_text("写入 你好，世界 到 a.txt") != normalize_text("写入 你好世界 到 a.txt")
+        assert normalize_text("在桌面新建 3 个文件夹") == "在桌面新建3个文件夹"
+
+
+class TestChineseToInt:
+    """中文数字转换测试"""
+    
+    @pytest.mark.parametrize("text,expected", [
+        ("三", 3),
+        ("两", 2),
+        ("十", 10),
+        ("十二", 12),
+        ("二十", 20),
+        ("一百零五", 105),
+        ("12", 12),
+    ])
+    def test_convert(self, text, expected):
+        """测试中文数字转换"""
+        assert chinese_to_int(text) == expected
+    
+    def test_invalid(self):
+        """测试无法识别的文本"""
+        assert chinese_to_int("") is None
+        assert chinese_to_int("abc") is None
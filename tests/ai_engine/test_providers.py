@@ -2,13 +2,132 @@
 AI 提供商测试
 """
 
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
 import pytest
 from src.ai_engine.providers import (
-    AIProvider, MockProvider, get_provider
+    AIProvider, MockProvider, get_provider, OllamaProvider, CircuitBreaker
 )
 from src.interfaces.base import Context
 
 
+class StubOllamaServer:
+    """本地 Ollama 桩服务器
+    
+    实现 /api/tags 和 /api/generate，记录请求次数和使用过的客户端连接。
+    """
+    
+    def __init__(self, response: str = "Get-Process", delay: float = 0.0):
+        self.response = response
+        self.delay = delay
+        self.status = 200
+        # 流式响应：逐段返回的文本及每段之间的间隔
+        self.chunks = None
+        self.chunk_delay = 0.0
+        self.stream_completed = None
+        self.requests = []
+        self.connections = set()
+        self.lock = threading.Lock()
+        stub = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            
+            def log_message(self, *args):
+                pass
+            
+            def _reply(self, status, payload):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def do_GET(self):
+                with stub.lock:
+                    stub.requests.append(("GET", self.path, None))
+                    stub.connections.add(self.client_address)
+                if stub.status >= 500:
+                    self._reply(stub.status, {"error": "unavailable"})
+                else:
+                    self._reply(200, {"models": [{"name": "test-model"}]})
+            
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length))
+                with stub.lock:
+                    stub.requests.append(("POST", self.path, body))
+                    stub.connections.add(self.client_address)
+                if stub.delay:
+                    time.sleep(stub.delay)
+                if stub.status != 200:
+                    self._reply(stub.status, {"error": "failed"})
+                elif body.get("stream"):
+                    self._stream(body)
+                else:
+                    self._reply(200, {"model": body["model"], "response": stub.response, "done": True})
+            
+            def _stream(self, body):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                chunks = stub.chunks if stub.chunks is not None else [stub.response]
+                stub.stream_completed = False
+                try:
+                    for index, chunk in enumerate(chunks + [""]):
+                        line = json.dumps({
+                            "model": body["model"],
+                            "response": chunk,
+                            "done": index == len(chunks)
+                        }).encode("utf-8") + b"\n"
+                        self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                        self.wfile.flush()
+                        time.sleep(stub.chunk_delay)
+                    self.wfile.write(b"0\r\n\r\n")
+                    stub.stream_completed = True
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+        
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+    
+    def count(self, method, path):
+        with self.lock:
+            return sum(1 for m, p, _ in self.requests if m == method and p == path)
+    
+    def __enter__(self):
+        self.thread.start()
+        return self
+    
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub_server():
+    """启动本地 Ollama 桩服务器"""
+    with StubOllamaServer() as server:
+        yield server
+
+
+def unused_url():
+    """返回一个没有服务监听的地址"""
+    import socket
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+
 class TestMockProvider:
     """模拟提供商测试"""
     
@@ -137,3 +256,289 @@ class TestAIProviderBase:
         result = provider._parse_result("powershell Get-ChildItem", "显示文件")
         assert "Get-ChildItem" in result.generated_command
         assert "powershell" not in result.generated_command.lower() or result.generated_command == "Get-ChildItem"
+
+
+class TestCircuitBreaker:
+    """熔断器测试"""
+    
+    def test_opens_after_threshold(self):
+        """测试连续失败达到阈值后熔断"""
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        
+        breaker.record_failure()
+        assert breaker.allow() is True
+        
+        breaker.record_failure()
+        assert breaker.allow() is False
+        assert breaker.is_open is True
+    
+    def test_success_resets_failures(self):
+        """测试成功后重新计数"""
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        
+        assert breaker.allow() is True
+    
+    def test_half_open_after_reset_timeout(self):
+        """测试冷却时间过后放行试探请求"""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        
+        breaker.record_failure()
+        assert breaker.allow() is False
+        
+        time.sleep(0.06)
+        assert breaker.allow() is True
+        
+        # 试探失败立即重新熔断
+        breaker.record_failure()
+        assert breaker.allow() is False
+
+
+class TestOllamaProvider:
+    """Ollama 提供商测试（使用本地桩服务器）"""
+    
+    def make_provider(self, url, **config):
+        return OllamaProvider({'model_name': 'test-model', 'ollama_url': url, **config})
+    
+    def test_generate(self, stub_server):
+        """测试同步生成命令"""
+        provider = self.make_provider(stub_server.url)
+        
+        result = provider.generate("显示进程", Context(session_id="test"))
+        
+        assert result.generated_command == "Get-Process"
+        assert result.original_input == "显示进程"
+        method, path, body = stub_server.requests[-1]
+        assert (method, path) == ("POST", "/api/generate")
+        assert body["model"] == "test-model"
+        assert body["stream"] is False
+        provider.close()
+    
+    def test_generate_does_not_probe_availability(self, stub_server):
+        """测试生成前不再探测服务"""
+        provider = self.make_provider(stub_server.url)
+        context = Context(session_id="test")
+        
+        for _ in range(5):
+            provider.generate("显示进程", context)
+        
+        assert stub_server.count("GET", "/api/tags") == 0
+        assert stub_server.count("POST", "/api/generate") == 5
+        provider.close()
+    
+    def test_connection_reused(self, stub_server):
+        """测试连接池复用 keep-alive 连接"""
+        provider = self.make_provider(stub_server.url)
+        context = Context(session_id="test")
+        
+        for _ in range(5):
+            provider.generate("显示进程", context)
+        
+        assert len(stub_server.connections) == 1
+        provider.close()
+    
+    def test_availability_cached(self, stub_server):
+        """测试可用性检查结果在 TTL 内复用"""
+        provider = self.make_provider(stub_server.url, ollama_availability_ttl=60)
+        
+        assert provider.is_available() is True
+        assert provider.is_available() is True
+        
+        assert stub_server.count("GET", "/api/tags") == 1
+        provider.close()
+    
+    def test_availability_expires(self, stub_server):
+        """测试可用性检查结果过期后重新探测"""
+        provider = self.make_provider(stub_server.url, ollama_availability_ttl=0)
+        
+        provider.is_available()
+        provider.is_available()
+        
+        assert stub_server.count("GET", "/api/tags") == 2
+        provider.close()
+    
+    def test_unavailable_server(self):
+        """测试服务不可用"""
+        provider = self.make_provider(unused_url())
+        
+        assert provider.is_available() is False
+        with pytest.raises(RuntimeError, match="Ollama HTTP 请求失败"):
+            provider.generate("显示进程", Context(session_id="test"))
+        provider.close()
+    
+    def test_circuit_breaker_fails_fast(self):
+        """测试熔断后直接失败而不发起请求"""
+        provider = self.make_provider(unused_url(), ollama_failure_threshold=2, ollama_availability_ttl=60)
+        context = Context(session_id="test")
+        
+        for _ in range(2):
+            with pytest.raises(RuntimeError, match="HTTP 请求失败"):
+                provider.generate("显示进程", context)
+        
+        with pytest.raises(RuntimeError, match="Ollama 服务不可用"):
+            provider.generate("显示进程", context)
+        assert provider.is_available() is False
+        provider.close()
+    
+    def test_server_error_counts_as_failure(self, stub_server):
+        """测试服务端错误计入熔断，客户端错误不计入"""
+        provider = self.make_provider(stub_server.url, ollama_failure_threshold=1)
+        context = Context(session_id="test")
+        
+        stub_server.status = 404
+        with pytest.raises(RuntimeError, match="404"):
+            provider.generate("显示进程", context)
+        assert provider.breaker.allow() is True
+        
+        stub_server.status = 503
+        with pytest.raises(RuntimeError, match="503"):
+            provider.generate("显示进程", context)
+        assert provider.breaker.allow() is False
+        provider.close()
+    
+    @pytest.mark.asyncio
+    async def test_agenerate(self, stub_server):
+        """测试异步生成命令"""
+        provider = self.make_provider(stub_server.url)
+        
+        result = await provider.agenerate("显示进程", Context(session_id="test"))
+        
+        assert result.generated_command == "Get-Process"
+        await provider.aclose()
+    
+    @pytest.mark.asyncio
+    async def test_agenerate_concurrent(self):
+        """测试多个异步请求并发等待模型响应"""
+        with StubOllamaServer(delay=0.3) as server:
+            provider = self.make_provider(server.url)
+            context = Context(session_id="test")
+            
+            start = time.perf_counter()
+            results = await asyncio.gather(*[
+                provider.agenerate("显示进程", context) for _ in range(5)
+            ])
+            elapsed = time.perf_counter() - start
+            
+            assert all(r.generated_command == "Get-Process" for r in results)
+            # 串行执行需要 1.5 秒
+            assert elapsed < 1.0
+            await provider.aclose()
+    
+    def test_agenerate_separate_event_loops(self, stub_server):
+        """测试每个事件循环使用独立的异步客户端"""
+        provider = self.make_provider(stub_server.url)
+        context = Context(session_id="test")
+        
+        first = asyncio.run(provider.agenerate("显示进程", context))
+        second = asyncio.run(provider.agenerate("显示进程", context))
+        
+        assert first.generated_command == second.generated_command == "Get-Process"
+        # asyncio.run 关闭事件循环前关闭了各自的客户端
+        assert provider._async_clients == {}
+    
+    def test_close_releases_async_clients(self, stub_server):
+        """测试 close 关闭仍在运行的事件循环中的异步客户端"""
+        provider = self.make_provider(stub_server.url)
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(provider.agenerate("显示进程", Context(session_id="test")))
+            client = provider._async_clients[loop][0]
+            
+            provider.close()
+            
+            assert client.is_closed
+            assert provider._async_clients == {}
+        finally:
+            loop.close()
+    
+    def test_stream(self, stub_server):
+        """测试流式返回文本片段"""
+        stub_server.chunks = ["Get-", "Process", " | Sort-Object CPU"]
+        provider = self.make_provider(stub_server.url)
+        
+        chunks = list(provider.stream("显示进程", Context(session_id="test")))
+        
+        assert chunks == ["Get-", "Process", " | Sort-Object CPU"]
+        assert stub_server.requests[-1][2]["stream"] is True
+        provider.close()
+    
+    def test_generate_streaming_partials(self, stub_server):
+        """测试流式生成时推送命令预览"""
+        stub_server.chunks = ["```powershell\n", "Get-", "Process", "\n```"]
+        provider = self.make_provider(stub_server.url)
+        partials = []
+        
+        result = provider.generate_streaming("显示进程", Context(session_id="test"), partials.append)
+        
+        assert result.generated_command == "Get-Process"
+        assert partials[-1] == "Get-Process"
+        assert "Get-" in partials
+        provider.close()
+    
+    def test_generate_streaming_stops_early(self, stub_server):
+        """测试第一条完整命令到达后停止生成并断开连接"""
+        stub_server.chunks = ["Get-Process", "\n", "This command lists processes."] + ["x"] * 20
+        stub_server.chunk_delay = 0.05
+        provider = self.make_provider(stub_server.url)
+        
+        start = time.perf_counter()
+        result = provider.generate_streaming("显示进程", Context(session_id="test"))
+        elapsed = time.perf_counter() - start
+        
+        assert result.generated_command == "Get-Process"
+        # 完整生成需要 1 秒以上
+        assert elapsed < 0.5
+        
+        # 服务端在写入后续片段时发现连接已断开
+        deadline = time.time() + 2
+        while stub_server.stream_completed is not False and time.time() < deadline:
+            time.sleep(0.05)
+        time.sleep(0.2)
+        assert stub_server.stream_completed is False
+        provider.close()
+    
+    def test_generate_streaming_waits_for_thinking(self, stub_server):
+        """测试思考模式结束前不提前停止"""
+        stub_server.chunks = ["Thinking...\n", "Get-Date might work\n", "...done thinking.\n", "Get-Process\n"]
+        provider = self.make_provider(stub_server.url)
+        
+        result = provider.generate_streaming("显示进程", Context(session_id="test"))
+        
+        assert result.generated_command == "Get-Process"
+        provider.close()
+    
+    @pytest.mark.asyncio
+    async def test_agenerate_streaming(self, stub_server):
+        """测试异步流式生成"""
+        stub_server.chunks = ["Get-", "Process\n", "explanation"]
+        provider = self.make_provider(stub_server.url)
+        partials = []
+        
+        result = await provider.agenerate_streaming("显示进程", Context(session_id="test"), partials.append)
+        
+        assert result.generated_command == "Get-Process"
+        assert partials == ["Get-", "Get-Process"]
+        await provider.aclose()
+    
+    def test_default_stream_uses_generate(self):
+        """测试基类的 stream 默认一次性返回 generate 的结果"""
+        provider = MockProvider()
+        partials = []
+        
+        result = provider.generate_streaming("显示进程", Context(session_id="test"), partials.append)
+        
+        assert list(provider.stream("显示进程", Context(session_id="test"))) == ["Get-Process"]
+        assert result.generated_command == "Get-Process"
+        assert partials == ["Get-Process"]
+    
+    @pytest.mark.asyncio
+    async def test_default_agenerate_uses_generate(self):
+        """测试基类的 agenerate 默认在线程池中调用 generate"""
+        provider = MockProvider()
+        
+        result = await provider.agenerate("显示进程", Context(session_id="test"))
+        
+        assert result.generated_command == "Get-Process"
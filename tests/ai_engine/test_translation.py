@@ -2,9 +2,28 @@
 翻译逻辑测试
 """
 
+import asyncio
+import re
+import time
 import pytest
+from src.ai_engine.providers import AIProvider
 from src.ai_engine.translation import NaturalLanguageTranslator
-from src.interfaces.base import Context
+from src.ai_engine.rule_matcher import CompiledRuleMatcher
+from src.interfaces.base import Context, Suggestion
+
+
+# 规则匹配语料：取自本文件中的翻译用例，另加若干未命中规则的输入
+RULE_CORPUS = [
+    "显示文件", "列出文件", "查看目录", "ls 文件",
+    "显示当前目录", "查看当前位置", "pwd",
+    "显示时间", "获取日期", "现在几点",
+    "显示进程", "列出进程", "查看运行的程序",
+    "显示CPU最高的5个进程", "测试网络连接 google.com",
+    "测试连接 192.168.1.1", "切换到 C:\\Users\\test", "显示前10个进程",
+    "D盘有什么", "查看E盘文件", "在桌面新建三个文件夹", "在桌面创建文件夹",
+    "查看PowerShell版本", "清屏",
+    "这是一个完全未知的命令", "hello world", "",
+]
 
 
 class TestNaturalLanguageTranslator:
@@ -177,3 +196,221 @@ class TestNaturalLanguageTranslator:
         match = re.search(r'.*', "测试连接 google.com")
         host = translator._extract_host("测试连接 google.com", match)
         assert host == "google.com"
+
+
+class TestCompiledRuleMatcher:
+    """预编译规则匹配器测试"""
+    
+    @staticmethod
+    def _naive_match(rules, text):
+        """逐条 re.search 的参考实现"""
+        for pattern, value in rules.items():
+            match = re.search(pattern, text, re.IGNORECASE)
+            if match:
+                return pattern, match.groups(), value
+        return None
+    
+    @staticmethod
+    def _compiled_match(matcher, text):
+        result = matcher.match(text)
+        if result:
+            match, value = result
+            return match.re.pattern, match.groups(), value
+        return None
+    
+    def test_same_result_as_sequential_search(self):
+        """测试与逐条匹配结果一致（首个匹配生效）"""
+        translator = NaturalLanguageTranslator()
+        matcher = CompiledRuleMatcher(translator.rules)
+        
+        for text in RULE_CORPUS:
+            assert self._compiled_match(matcher, text) == self._naive_match(translator.rules, text), text
+    
+    def test_keyword_prefilter(self):
+        """测试中文关键词预过滤只保留候选规则"""
+        rules = {
+            r'(显示|查看).*进程': ('Get-Process', '列出进程', 0.9),
+            r'测试.*连接': ('Test-NetConnection', '测试连接', 0.9),
+            r'^pwd$': ('Get-Location', '显示当前目录', 0.95),
+        }
+        matcher = CompiledRuleMatcher(rules)
+        
+        assert matcher.candidates("查看进程") == [0, 2]
+        assert matcher.candidates("测试网络连接") == [1, 2]
+        assert matcher.match("查看进程")[1][0] == 'Get-Process'
+        assert matcher.match("PWD")[1][0] == 'Get-Location'
+        assert matcher.match("进程") is None
+    
+    def test_rules_modified_after_init(self):
+        """测试规则替换后匹配器自动重建"""
+        translator = NaturalLanguageTranslator()
+        translator.rules = {r'自定义规则': ('Get-Custom', '自定义', 0.9)}
+        
+        result = translator._match_rules("这是自定义规则")
+        assert result == ('Get-Custom', '自定义', 0.9)
+    
+    def test_benchmark_fast_path(self):
+        """基准测试：规则匹配快速路径相对逐条匹配的加速比"""
+        translator = NaturalLanguageTranslator()
+        matcher = CompiledRuleMatcher(translator.rules)
+        rounds = 50
+        
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for text in RULE_CORPUS:
+                self._naive_match(translator.rules, text)
+        naive_time = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for text in RULE_CORPUS:
+                matcher.match(text)
+        compiled_time = time.perf_counter() - start
+        
+        speedup = naive_time / compiled_time
+        print(f"\n规则数: {len(translator.rules)}, 语料: {len(RULE_CORPUS)} 条 x {rounds} 轮")
+        print(f"逐条匹配: {naive_time * 1000:.1f}ms, 预编译匹配: {compiled_time * 1000:.1f}ms, 加速比: {speedup:.1f}x")
+        
+        assert compiled_time < naive_time
+
+
+class SlowProvider(AIProvider):
+    """延迟固定时间后返回 Get-Service 的 AI 提供商"""
+    
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.calls = 0
+        self.cancelled = False
+    
+    def _suggestion(self, text: str) -> Suggestion:
+        return Suggestion(
+            original_input=text,
+            generated_command="Get-Service",
+            confidence_score=0.80,
+            explanation="AI 生成"
+        )
+    
+    def generate(self, text: str, context: Context) -> Suggestion:
+        self.calls += 1
+        time.sleep(self.delay)
+        return self._suggestion(text)
+    
+    async def agenerate(self, text: str, context: Context) -> Suggestion:
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return self._suggestion(text)
+    
+    def is_available(self) -> bool:
+        return True
+
+
+def make_deadline_translator(delay: float, deadline: float = 0.2) -> NaturalLanguageTranslator:
+    """创建使用 SlowProvider 并设置延迟预算的翻译器"""
+    translator = NaturalLanguageTranslator({
+        'translate_deadline': deadline,
+        'speculative_confidence': 0.9
+    })
+    translator._ai_provider = SlowProvider(delay)
+    return translator
+
+
+class TestTranslateDeadline:
+    """延迟预算模式测试"""
+    
+    def test_confident_rule_skips_ai(self):
+        """测试高置信度规则匹配不调用 AI 模型"""
+        translator = make_deadline_translator(delay=0.0)
+        translator.rules = {r'高置信度': ('Get-Location', '规则', 0.95)}
+        
+        result = translator.translate("高置信度", Context(session_id="test"))
+        
+        assert result.generated_command == 'Get-Location'
+        assert translator.ai_provider.calls == 0
+        assert translator.get_speculation_stats()['started'] == 0
+    
+    def test_ai_in_time_wins(self):
+        """测试 AI 在预算内返回时优先于低置信度规则结果"""
+        translator = make_deadline_translator(delay=0.01, deadline=2.0)
+        translator.rules = {r'低置信度': ('Get-Location', '规则', 0.6)}
+        
+        result = translator.translate("低置信度", Context(session_id="test"))
+        
+        assert result.generated_command == 'Get-Service'
+        assert 'deadline_fallback' not in result.metadata
+        assert translator.get_speculation_stats() == {
+            'started': 1, 'ai_in_time': 1, 'deadline_expired': 0
+        }
+    
+    def test_deadline_returns_rule_result(self):
+        """测试超出预算时返回低置信度规则结果"""
+        translator = make_deadline_translator(delay=1.0, deadline=0.1)
+        translator.rules = {r'低置信度': ('Get-Location', '规则', 0.6)}
+        
+        start = time.perf_counter()
+        result = translator.translate("低置信度", Context(session_id="test"))
+        elapsed = time.perf_counter() - start
+        
+        assert result.generated_command == 'Get-Location'
+        assert result.metadata['deadline_fallback'] is True
+        assert elapsed < 0.5
+        assert translator.get_speculation_stats()['deadline_expired'] == 1
+    
+    def test_deadline_without_rule_uses_fallback(self):
+        """测试没有规则匹配且超出预算时使用回退翻译"""
+        translator = make_deadline_translator(delay=1.0, deadline=0.1)
+        
+        result = translator.translate("这是一个完全未知的命令", Context(session_id="test"))
+        
+        assert result.generated_command == 'Get-Help'
+    
+    def test_late_partials_discarded(self):
+        """测试预算到期后不再转发部分命令"""
+        translator = make_deadline_translator(delay=0.0, deadline=0.1)
+        previews = []
+        
+        def slow_streaming(text, context, on_partial):
+            on_partial("Get-Ser")
+            time.sleep(0.3)
+            on_partial("Get-Service")
+            return translator.ai_provider._suggestion(text)
+        
+        translator.ai_provider.generate_streaming = slow_streaming
+        result = translator.translate("这是一个完全未知的命令", Context(session_id="test"), previews.append)
+        time.sleep(0.4)
+        
+        assert result.generated_command == 'Get-Help'
+        assert previews == ["Get-Ser"]
+    
+    def test_deadline_disabled(self):
+        """测试未设置预算时按顺序等待 AI 模型"""
+        translator = make_deadline_translator(delay=0.2, deadline=0)
+        
+        result = translator.translate("这是一个完全未知的命令", Context(session_id="test"))
+        
+        assert result.generated_command == 'Get-Service'
+        assert translator.get_speculation_stats()['started'] == 0
+    
+    @pytest.mark.asyncio
+    async def test_async_deadline_cancels_ai(self):
+        """测试异步翻译超出预算时取消 AI 调用"""
+        translator = make_deadline_translator(delay=1.0, deadline=0.1)
+        translator.rules = {r'低置信度': ('Get-Location', '规则', 0.6)}
+        
+        result = await translator.atranslate("低置信度", Context(session_id="test"))
+        await asyncio.sleep(0)
+        
+        assert result.generated_command == 'Get-Location'
+        assert translator.ai_provider.cancelled
+    
+    @pytest.mark.asyncio
+    async def test_async_ai_in_time(self):
+        """测试异步翻译在预算内使用 AI 结果"""
+        translator = make_deadline_translator(delay=0.01, deadline=2.0)
+        
+        result = await translator.atranslate("这是一个完全未知的命令", Context(session_id="test"))
+        
+        assert result.generated_command == 'Get-Service'
@@ -89,7 +89,9 @@ class TestBasicOperations:
         
         history_manager.add_entry(entry)
         
-        mock_storage.save_history_batch.assert_called_once()
+        # 只追加新记录，不重写全部历史
+        mock_storage.save_history.assert_called_once_with(entry.to_dict())
+        mock_storage.save_history_batch.assert_not_called()
     
     def test_add_entry_respects_max_history(self, history_manager_no_storage):
         """测试添加记录时遵守最大数量限制"""
@@ -149,7 +151,7 @@ class TestBasicOperations:
         
         assert len(history_manager.history_cache) == 0
     
-    def test_remove_entry(self, history_manager):
+    def test_remove_entry(self, history_manager, mock_storage):
         """测试删除指定记录"""
         entry = CommandEntry(user_input="test")
         history_manager.add_entry(entry)
@@ -160,6 +162,8 @@ class TestBasicOperations:
         
         assert success is True
         assert len(history_manager.history_cache) == 0
+        mock_storage.delete_history.assert_called_once_with([entry.command_id])
+        mock_storage.save_history_batch.assert_not_called()
     
     def test_remove_entry_not_found(self, history_manager):
         """测试删除不存在的记录"""
@@ -451,3 +455,107 @@ class TestExportImport:
             assert manager.history_cache[1].user_input == "test 2"
         finally:
             Path(filepath).unlink(missing_ok=True)
+
+
+class TestIndexes:
+    """测试 ID、状态和日期索引"""
+    
+    def test_eviction_updates_indexes(self, history_manager_no_storage):
+        """测试淘汰旧记录时同步更新索引"""
+        manager = history_manager_no_storage
+        manager.max_history = 3
+        entries = [CommandEntry(user_input=f"cmd {i}", status=CommandStatus.FAILED) for i in range(5)]
+        for entry in entries:
+            manager.add_entry(entry)
+        
+        assert manager.get_by_id(entries[0].command_id) is None
+        assert manager.get_by_id(entries[4].command_id) is entries[4]
+        assert manager.filter_by_status(CommandStatus.FAILED) == entries[2:]
+        assert manager.filter_by_date_range(datetime.min, datetime.max) == entries[2:]
+    
+    def test_status_index_after_remove(self, history_manager, sample_entries):
+        """测试删除记录后状态索引同步更新"""
+        for entry in sample_entries:
+            history_manager.add_entry(entry)
+        
+        history_manager.remove_entry(sample_entries[0].command_id)
+        
+        completed = history_manager.filter_by_status(CommandStatus.COMPLETED)
+        assert completed == sample_entries[2::2]
+        assert history_manager.filter_by_status(CommandStatus.CANCELLED) == []
+    
+    def test_date_range_out_of_order(self, history_manager):
+        """测试乱序添加时日期索引保持有序，边界包含在内"""
+        base = datetime(2024, 1, 1)
+        for day in [3, 1, 2, 1]:
+            entry = CommandEntry(user_input=f"day {day}")
+            entry.timestamp = base + timedelta(days=day)
+            history_manager.add_entry(entry)
+        
+        results = history_manager.filter_by_date_range(base + timedelta(days=1), base + timedelta(days=2))
+        
+        assert [entry.user_input for entry in results] == ["day 1", "day 1", "day 2"]
+    
+    def test_duplicate_id_replaces_entry(self, history_manager):
+        """测试重复 ID 替换旧记录并移到末尾"""
+        first = CommandEntry(command_id="same", user_input="first")
+        other = CommandEntry(user_input="other")
+        second = CommandEntry(command_id="same", user_input="second", status=CommandStatus.FAILED)
+        for entry in (first, other, second):
+            history_manager.add_entry(entry)
+        
+        assert history_manager.history_cache == [other, second]
+        assert history_manager.get_by_id("same") is second
+        assert history_manager.filter_by_status(CommandStatus.PENDING) == [other]
+    
+    def test_load_builds_indexes(self, mock_storage):
+        """测试从存储加载时建立索引"""
+        entries = [CommandEntry(user_input=f"cmd {i}") for i in range(3)]
+        mock_storage.load_history.return_value = [entry.to_dict() for entry in entries]
+        
+        manager = HistoryManager(storage=mock_storage, max_history=2)
+        
+        assert [entry.user_input for entry in manager.history_cache] == ["cmd 1", "cmd 2"]
+        assert manager.get_by_id(entries[2].command_id).user_input == "cmd 2"
+    
+    def test_clear_clears_storage(self, history_manager, mock_storage, sample_entries):
+        """测试清空时清除存储而不是重写"""
+        for entry in sample_entries:
+            history_manager.add_entry(entry)
+        
+        history_manager.clear()
+        
+        assert history_manager.filter_by_status(CommandStatus.COMPLETED) == []
+        assert history_manager.filter_by_date_range(datetime.min, datetime.max) == []
+        mock_storage.clear_history.assert_called_once()
+        mock_storage.save_history_batch.assert_not_called()
+    
+    def test_update_status_reindexes(self, history_manager_no_storage):
+        """测试 update_status 更新状态索引并保持添加顺序"""
+        manager = history_manager_no_storage
+        entries = [CommandEntry(user_input=f"cmd {i}", status=CommandStatus.COMPLETED) for i in range(3)]
+        entries[0].status = CommandStatus.PENDING
+        for entry in entries:
+            manager.add_entry(entry)
+        
+        assert manager.update_status(entries[0].command_id, CommandStatus.COMPLETED)
+        
+        assert manager.filter_by_status(CommandStatus.COMPLETED) == entries
+        assert manager.filter_by_status(CommandStatus.PENDING) == []
+        assert not manager.update_status("missing", CommandStatus.FAILED)
+    
+    def test_directly_modified_status(self, history_manager_no_storage):
+        """测试直接修改状态的条目不会留在原状态下，删除时按索引状态移除"""
+        manager = history_manager_no_storage
+        changed = CommandEntry(user_input="changed")
+        removed = CommandEntry(user_input="removed")
+        manager.add_entry(changed)
+        manager.add_entry(removed)
+        
+        changed.status = CommandStatus.COMPLETED
+        removed.status = CommandStatus.FAILED
+        manager.remove_entry(removed.command_id)
+        
+        assert manager.filter_by_status(CommandStatus.PENDING) == []
+        assert manager.filter_by_status(CommandStatus.COMPLETED) == [changed]
+        assert manager.filter_by_status(CommandStatus.FAILED) == []
@@ -3,6 +3,7 @@
 """
 
 import pytest
+import time
 from datetime import datetime, timedelta
 from unittest.mock import Mock, MagicMock
 
@@ -16,6 +17,7 @@ from src.context.models import (
     CommandStatus
 )
 from src.interfaces.base import Context, ExecutionResult, Suggestion
+from src.storage.memory_storage import MemoryStorage
 
 
 @pytest.fixture
@@ -476,3 +478,122 @@ class TestStatistics:
         stats = context_manager.get_session_stats()
         
         assert stats == {}
+
+
+class TestJournaledPersistence:
+    """测试会话日志持久化"""
+    
+    @staticmethod
+    def make_suggestion(command="Get-Date"):
+        return Suggestion(
+            original_input="test",
+            generated_command=command,
+            confidence_score=0.9,
+            explanation="test"
+        )
+    
+    def test_add_command_appends_journal(self):
+        """测试添加命令只追加增量，不重写会话"""
+        storage = MemoryStorage()
+        storage.save_session = Mock(wraps=storage.save_session)
+        manager = ContextManager(storage=storage)
+        session = manager.start_session()
+        
+        for i in range(3):
+            manager.add_command(f"cmd {i}", self.make_suggestion())
+        
+        storage.save_session.assert_called_once()
+        journal = storage.load_session_journal(session.session_id)
+        assert [record["op"] for record in journal] == ["add_command"] * 3
+        assert storage.load_session(session.session_id)["command_history"] == []
+    
+    def test_rebuild_from_checkpoint_and_journal(self):
+        """测试从检查点和日志重建会话"""
+        storage = MemoryStorage()
+        manager = ContextManager(storage=storage, checkpoint_interval=3)
+        session = manager.start_session()
+        entries = [manager.add_command(f"cmd {i}", self.make_suggestion()) for i in range(4)]
+        result = ExecutionResult(success=True, command="Get-Date", output="today", return_code=0)
+        manager.update_command_status(entries[3].command_id, CommandStatus.COMPLETED, result)
+        
+        # 第 3 条记录触发检查点，之后的增量仍在日志中
+        assert len(storage.load_session(session.session_id)["command_history"]) == 3
+        assert len(storage.load_session_journal(session.session_id)) == 2
+        
+        restored = ContextManager(storage=storage).get_session(session.session_id)
+        
+        assert [cmd.user_input for cmd in restored.command_history] == [f"cmd {i}" for i in range(4)]
+        assert restored.command_history[3].status == CommandStatus.COMPLETED
+        assert restored.command_history[3].output == "today"
+        assert restored.last_activity == session.last_activity
+    
+    def test_replay_is_idempotent(self):
+        """测试检查点之后未清除的日志重放不改变结果"""
+        storage = MemoryStorage()
+        manager = ContextManager(storage=storage)
+        session = manager.start_session()
+        entry = manager.add_command("cmd", self.make_suggestion())
+        manager.update_command_status(entry.command_id, CommandStatus.FAILED)
+        journal = storage.load_session_journal(session.session_id)
+        storage.save_session(session.to_dict())
+        
+        restored = Session.from_dict(storage.load_session(session.session_id))
+        ContextManager._replay_journal(restored, journal)
+        
+        assert len(restored.command_history) == 1
+        assert restored.command_history[0].status == CommandStatus.FAILED
+    
+    def test_flush_interval_coalesces(self):
+        """测试合并写入：同一命令的多次更新合并为一条记录"""
+        storage = MemoryStorage()
+        manager = ContextManager(storage=storage, flush_interval=60)
+        session = manager.start_session()
+        entry = manager.add_command("cmd", self.make_suggestion())
+        manager.update_command_status(entry.command_id, CommandStatus.EXECUTING)
+        manager.update_command_status(entry.command_id, CommandStatus.COMPLETED)
+        
+        assert storage.load_session_journal(session.session_id) == []
+        
+        manager.close()
+        
+        journal = storage.load_session_journal(session.session_id)
+        assert len(journal) == 1
+        assert journal[0]["command"]["status"] == CommandStatus.COMPLETED.value
+    
+    def test_flush_timer(self):
+        """测试合并写入定时器到期后写入"""
+        storage = MemoryStorage()
+        manager = ContextManager(storage=storage, flush_interval=0.05)
+        session = manager.start_session()
+        manager.add_command("cmd", self.make_suggestion())
+        
+        time.sleep(0.3)
+        
+        assert len(storage.load_session_journal(session.session_id)) == 1
+        manager.close()
+    
+    def test_terminate_checkpoints(self):
+        """测试终止会话时保存检查点并清空日志"""
+        storage = MemoryStorage()
+        manager = ContextManager(storage=storage, flush_interval=60)
+        session = manager.start_session()
+        manager.add_command("cmd", self.make_suggestion())
+        
+        manager.terminate_session()
+        
+        saved = storage.load_session(session.session_id)
+        assert saved["status"] == SessionStatus.TERMINATED.value
+        assert len(saved["command_history"]) == 1
+        assert storage.load_session_journal(session.session_id) == []
+        manager.close()
+    
+    def test_storage_without_journal(self, mock_storage):
+        """测试存储不支持日志时保存完整会话"""
+        mock_storage.append_session_journal = Mock(return_value=False)
+        manager = ContextManager(storage=mock_storage)
+        manager.start_session()
+        
+        manager.add_command("cmd", self.make_suggestion())
+        
+        assert mock_storage.save_session.call_count == 2
+        assert len(mock_storage.save_session.call_args[0][0]["command_history"]) == 1
@@ -0,0 +1,315 @@
+"""
+PowerShell 宿主进程池测试模块
+
+使用一个遵循相同分帧协议的 Python 脚本模拟 PowerShell 宿主，
+测试进程池的复用、回收、超时和执行器集成。
+"""
+
+import sys
+import threading
+import time
+import textwrap
+import pytest
+from unittest.mock import patch
+
+from src.execution.host_pool import (
+    PowerShellHostPool,
+    HostPoolError,
+    HostRequestLostError,
+    HostTimeoutError,
+    FRAME_PREFIX,
+    build_host_args
+)
+from src.execution.executor import CommandExecutor
+from src.interfaces.base import ExecutionStatus
+
+
+FAKE_HOST_SCRIPT = textwrap.dedent('''
+    import base64, json, os, sys, time
+
+    PREFIX = {prefix!r}
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        req = json.loads(line)
+        cmd = base64.b64decode(req['command']).decode('utf-8')
+        ok = True
+        exit_code = None
+        output = ''
+        error = ''
+        memory = 1024
+        if cmd.startswith('sleep:'):
+            time.sleep(float(cmd.split(':', 1)[1]))
+        elif cmd == 'exit':
+            sys.exit(0)
+        elif cmd.startswith('fail'):
+            ok = False
+            error = 'boom'
+        elif cmd.startswith('mem:'):
+            memory = int(cmd.split(':', 1)[1])
+        elif cmd.startswith('console:'):
+            sys.stdout.write(cmd.split(':', 1)[1] + '\\n')
+        elif cmd.startswith('native:'):
+            # 模拟原生命令：写入 stderr 并以指定退出码结束
+            code, text = cmd.split(':', 2)[1:]
+            sys.stderr.write(text + '\\n')
+            exit_code = int(code)
+        output = 'pid=%d cmd=%s\\n' % (os.getpid(), cmd) if ok else ''
+        resp = {{'id': req['id'], 'ok': ok, 'exit_code': exit_code, 'output': output,
+                 'error': error, 'memory': memory}}
+        sys.stderr.write(PREFIX + str(req['id']) + '\\n')
+        sys.stderr.flush()
+        sys.stdout.write(PREFIX + json.dumps(resp) + '\\n')
+        sys.stdout.flush()
+''').format(prefix=FRAME_PREFIX)
+
+
+@pytest.fixture
+def fake_host_args(tmp_path):
+    """生成模拟宿主的启动参数"""
+    script = tmp_path / "fake_host.py"
+    script.write_text(FAKE_HOST_SCRIPT, encoding='utf-8')
+    return [sys.executable, '-u', str(script)]
+
+
+@pytest.fixture
+def pool(fake_host_args):
+    """创建使用模拟宿主的进程池"""
+    host_pool = PowerShellHostPool('pwsh', size=2, host_args=fake_host_args)
+    yield host_pool
+    host_pool.close()
+
+
+class TestBuildHostArgs:
+    """宿主启动参数测试"""
+
+    def test_uses_encoded_command(self):
+        """测试引导脚本通过 -EncodedCommand 传入"""
+        args = build_host_args('pwsh')
+
+        assert args[0] == 'pwsh'
+        assert '-NoProfile' in args
+        assert args[-2] == '-EncodedCommand'
+
+
+class TestPowerShellHostPool:
+    """宿主进程池测试类"""
+
+    def test_execute_success(self, pool):
+        """测试执行成功的命令"""
+        result = pool.execute('Get-Date', timeout=5)
+
+        assert result['return_code'] == 0
+        assert 'cmd=Get-Date' in result['output']
+        assert result['host_pid'] is not None
+
+    def test_execute_failure(self, pool):
+        """测试执行失败的命令"""
+        result = pool.execute('fail', timeout=5)
+
+        assert result['return_code'] == 1
+        assert result['error'] == 'boom'
+
+    def test_unicode_round_trip(self, pool):
+        """测试中文命令的编码往返"""
+        result = pool.execute('Write-Output "你好"', timeout=5)
+
+        assert '你好' in result['output']
+
+    def test_host_reused(self, pool):
+        """测试宿主进程被复用"""
+        first = pool.execute('a', timeout=5)
+        second = pool.execute('b', timeout=5)
+
+        assert first['host_pid'] == second['host_pid']
+        assert second['host_commands'] == 2
+
+        stats = pool.get_stats()
+        assert stats['hosts_started'] == 1
+        assert stats['reuses'] == 1
+        assert stats['commands'] == 2
+
+    def test_console_output_included(self, pool):
+        """测试直接写入控制台的内容合并到输出中"""
+        result = pool.execute('console:direct', timeout=5)
+
+        assert result['output'].startswith('direct')
+
+    def test_native_exit_code_and_stderr(self, pool):
+        """测试原生命令的退出码和 stderr 输出"""
+        result = pool.execute('native:3:native failure', timeout=5)
+
+        assert result['return_code'] == 3
+        assert result['error'] == 'native failure\n'
+
+        result = pool.execute('a', timeout=5)
+        assert result['return_code'] == 0
+        assert result['error'] == ''
+
+    def test_recycle_after_max_commands(self, fake_host_args):
+        """测试达到命令数上限后回收宿主"""
+        host_pool = PowerShellHostPool('pwsh', size=1, max_commands_per_host=2, host_args=fake_host_args)
+        try:
+            first = host_pool.execute('a', timeout=5)
+            host_pool.execute('b', timeout=5)
+            third = host_pool.execute('c', timeout=5)
+
+            assert first['host_pid'] != third['host_pid']
+            assert host_pool.get_stats()['hosts_recycled'] == 1
+        finally:
+            host_pool.close()
+
+    def test_recycle_on_memory_growth(self, fake_host_args):
+        """测试内存超过阈值后回收宿主"""
+        host_pool = PowerShellHostPool('pwsh', size=1, max_memory_mb=1, host_args=fake_host_args)
+        try:
+            first = host_pool.execute('mem:%d' % (2 * 1024 * 1024), timeout=5)
+            second = host_pool.execute('a', timeout=5)
+
+            assert first['host_pid'] != second['host_pid']
+            assert host_pool.get_stats()['hosts_recycled'] == 1
+        finally:
+            host_pool.close()
+
+    def test_timeout_discards_host(self, pool):
+        """测试超时后宿主被终止且不再复用"""
+        with pytest.raises(HostTimeoutError):
+            pool.execute('sleep:5', timeout=0.3)
+
+        stats = pool.get_stats()
+        assert stats['timeouts'] == 1
+        assert stats['live_hosts'] == 0
+
+        result = pool.execute('a', timeout=5)
+        assert result['return_code'] == 0
+
+    def test_timeout_includes_acquire_wait(self, fake_host_args):
+        """测试等待空闲宿主的时间计入命令超时"""
+        host_pool = PowerShellHostPool('pwsh', size=1, host_args=fake_host_args)
+        try:
+            host = host_pool.acquire(timeout=5)
+            releaser = threading.Timer(0.4, host_pool.release, args=(host,))
+            releaser.start()
+
+            start = time.time()
+            with pytest.raises(HostTimeoutError):
+                host_pool.execute('sleep:5', timeout=0.6)
+            elapsed = time.time() - start
+            releaser.join()
+
+            assert 0.5 <= elapsed < 1.0
+        finally:
+            host_pool.close()
+
+    def test_dead_host_replaced(self, pool):
+        """测试宿主意外退出后创建新宿主"""
+        with pytest.raises(HostRequestLostError):
+            pool.execute('exit', timeout=5)
+
+        result = pool.execute('a', timeout=5)
+        assert result['return_code'] == 0
+        assert pool.get_stats()['hosts_started'] == 2
+
+    def test_health_check_on_idle_host(self, fake_host_args):
+        """测试空闲时间过长的宿主在复用前进行健康检查"""
+        host_pool = PowerShellHostPool('pwsh', size=1, health_check_interval=0, host_args=fake_host_args)
+        try:
+            host_pool.execute('a', timeout=5)
+            host_pool.execute('b', timeout=5)
+
+            assert host_pool.get_stats()['health_checks'] == 1
+        finally:
+            host_pool.close()
+
+    def test_start_failure(self):
+        """测试宿主无法启动"""
+        host_pool = PowerShellHostPool('pwsh', host_args=['/nonexistent/pwsh'])
+
+        with pytest.raises(HostPoolError):
+            host_pool.execute('a', timeout=1)
+        assert host_pool.get_stats()['live_hosts'] == 0
+
+    def test_closed_pool(self, pool):
+        """测试关闭后不能再借用宿主"""
+        pool.execute('a', timeout=5)
+        pool.close()
+
+        with pytest.raises(HostPoolError):
+            pool.acquire(timeout=1)
+
+    def test_acquire_waits_for_release(self, fake_host_args):
+        """测试宿主全部占用时等待超时"""
+        host_pool = PowerShellHostPool('pwsh', size=1, host_args=fake_host_args)
+        try:
+            host = host_pool.acquire(timeout=5)
+            start = time.time()
+            with pytest.raises(HostPoolError):
+                host_pool.acquire(timeout=0.2)
+            assert time.time() - start >= 0.2
+
+            host_pool.release(host)
+            assert host_pool.acquire(timeout=1) is host
+        finally:
+            host_pool.close()
+
+
+class TestCommandExecutorHostPool:
+    """执行器与宿主进程池集成测试"""
+
+    @pytest.fixture
+    def executor(self, fake_host_args):
+        """创建启用宿主进程池的执行器"""
+        with patch.object(CommandExecutor, '_detect_powershell', return_value='pwsh'):
+            executor = CommandExecutor({'host_pool_enabled': True, 'host_pool_size': 1})
+        executor.host_pool.host_args = fake_host_args
+        yield executor
+        executor.close()
+
+    def test_pool_disabled_by_default(self):
+        """测试默认不启用宿主进程池"""
+        with patch.object(CommandExecutor, '_detect_powershell', return_value='pwsh'):
+            executor = CommandExecutor()
+
+        assert executor.host_pool is None
+
+    def test_execute_via_pool(self, executor):
+        """测试通过宿主进程池执行命令"""
+        result = executor.execute('Get-Date')
+
+        assert result.success is True
+        assert result.status == ExecutionStatus.SUCCESS
+        assert 'cmd=Get-Date' in result.output
+        assert result.metadata['host_pool'] is True
+
+    def test_execute_via_pool_timeout(self, executor):
+        """测试宿主进程池执行超时"""
+        result = executor.execute('sleep:5', timeout=1)
+
+        assert result.success is False
+        assert result.status == ExecutionStatus.TIMEOUT
+        assert "超时" in result.error
+
+    def test_fallback_when_host_unavailable(self, executor):
+        """测试宿主无法启动时回退到独立进程执行"""
+        executor.host_pool.host_args = ['/nonexistent/pwsh']
+
+        with patch('subprocess.run') as mock_run:
+            mock_run.return_value.returncode = 0
+            mock_run.return_value.stdout = 'fallback'
+            mock_run.return_value.stderr = ''
+            result = executor.execute('Get-Date')
+
+        assert result.output == 'fallback'
+        assert 'host_pool' not in result.metadata
+
+    def test_no_fallback_after_request_sent(self, executor):
+        """测试命令发送后宿主退出时不再回退到独立进程重复执行"""
+        with patch('subprocess.run') as mock_run:
+            result = executor.execute('exit')
+
+        mock_run.assert_not_called()
+        assert result.success is False
+        assert result.status == ExecutionStatus.FAILED
+        assert result.metadata['host_pool'] is True
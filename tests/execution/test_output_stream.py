@@ -0,0 +1,254 @@
+"""
+流式命令输出测试模块
+
+使用 Python 子进程模拟长时间运行、输出量大的命令。
+"""
+
+import os
+import sys
+import time
+import textwrap
+from unittest.mock import patch
+
+import pytest
+
+from src.execution.executor import CommandExecutor
+from src.execution.output_stream import SpillBuffer, StreamingExecution
+from src.interfaces.base import ExecutionResult, ExecutionStatus
+
+
+def python_stream(script, timeout=10, **kwargs):
+    """创建运行 Python 脚本的流式执行"""
+    return StreamingExecution(
+        [sys.executable, '-c', textwrap.dedent(script)],
+        'test-command',
+        timeout=timeout,
+        **kwargs
+    )
+
+
+class TestSpillBuffer:
+    """溢出缓冲区测试类"""
+    
+    def test_in_memory(self):
+        """测试未超过上限时只保存在内存中"""
+        buffer = SpillBuffer(memory_limit=100)
+        buffer.write("hello ")
+        buffer.write("world")
+        
+        assert buffer.getvalue() == "hello world"
+        assert buffer.size == 11
+        assert not buffer.spilled
+    
+    def test_spill_to_file(self):
+        """测试超过上限后写入临时文件"""
+        buffer = SpillBuffer(memory_limit=10)
+        for index in range(10):
+            buffer.write(f"line {index}\n")
+        buffer.close()
+        
+        try:
+            assert buffer.spilled
+            assert buffer.getvalue() == "line 0\nlin"
+            with open(buffer.path, encoding='utf-8') as f:
+                assert f.read() == ''.join(f"line {index}\n" for index in range(10))
+        finally:
+            buffer.remove()
+        assert not os.path.exists(buffer.path)
+
+
+class TestStreamingExecution:
+    """流式执行测试类"""
+    
+    def test_chunks_arrive_before_exit(self):
+        """测试进程退出前即可收到输出"""
+        stream = python_stream('''
+            import sys, time
+            print("first", flush=True)
+            time.sleep(1)
+            print("second", flush=True)
+        ''')
+        start = time.time()
+        arrivals = []
+        
+        for chunk in stream:
+            arrivals.append((chunk.text, time.time() - start))
+        
+        assert arrivals[0][0].strip() == "first"
+        assert arrivals[0][1] < 0.9
+        assert stream.result.output.split() == ["first", "second"]
+        assert stream.result.status == ExecutionStatus.SUCCESS
+        assert stream.result.metadata['streamed'] is True
+    
+    def test_stdout_and_stderr(self):
+        """测试分别收集 stdout 和 stderr"""
+        stream = python_stream('''
+            import sys
+            sys.stdout.write("out")
+            sys.stderr.write("err")
+            sys.exit(3)
+        ''')
+        
+        chunks = list(stream)
+        
+        assert {chunk.stream for chunk in chunks} == {'stdout', 'stderr'}
+        assert [chunk.sequence for chunk in chunks] == list(range(len(chunks)))
+        assert stream.result.output == "out"
+        assert stream.result.error == "err"
+        assert stream.result.return_code == 3
+        assert stream.result.status == ExecutionStatus.FAILED
+    
+    def test_multibyte_split_across_chunks(self):
+        """测试多字节字符跨读取块时正确解码"""
+        stream = python_stream('''
+            import sys
+            sys.stdout.buffer.write("中文输出".encode("utf-8") * 50)
+        ''', chunk_size=7)
+        
+        text = ''.join(chunk.text for chunk in stream)
+        
+        assert text == "中文输出" * 50
+    
+    def test_large_output_spills(self):
+        """测试超出内存上限的输出写入临时文件"""
+        stream = python_stream('''
+            import sys
+            for i in range(20000):
+                sys.stdout.write(f"line {i}\\n")
+        ''', memory_limit=1000)
+        
+        total = sum(len(chunk.text) for chunk in stream)
+        result = stream.result
+        
+        try:
+            assert len(result.output) == 1000
+            assert result.metadata['output_truncated'] is True
+            assert result.metadata['output_size'] == total
+            with open(result.metadata['output_file'], encoding='utf-8') as f:
+                content = f.read()
+            assert len(content) == total
+            assert content.endswith("line 19999\n")
+        finally:
+            stream.remove_spill_files()
+    
+    def test_backpressure(self):
+        """测试消费方停止读取时进程被阻塞"""
+        stream = python_stream('''
+            import sys, time
+            for i in range(2000):
+                sys.stdout.write("x" * 1024 + "\\n")
+                sys.stdout.flush()
+            sys.stderr.write(f"done {time.time()}")
+        ''', chunk_size=1024, max_pending_chunks=2)
+        iterator = iter(stream)
+        
+        next(iterator)
+        paused_at = time.time()
+        time.sleep(0.5)
+        for _ in iterator:
+            pass
+        
+        # 子进程在消费方暂停期间无法写完全部输出
+        finished_at = float(stream.result.error.split()[1])
+        assert finished_at > paused_at + 0.4
+        assert stream.result.metadata['output_size'] == 2000 * 1025
+    
+    def test_timeout(self):
+        """测试超时后终止进程"""
+        stream = python_stream('''
+            import time
+            print("started", flush=True)
+            time.sleep(30)
+        ''', timeout=0.5)
+        start = time.time()
+        
+        chunks = list(stream)
+        
+        assert time.time() - start < 5
+        assert chunks[0].text.strip() == "started"
+        assert stream.result.status == ExecutionStatus.TIMEOUT
+        assert "超时" in stream.result.error
+    
+    def test_cancel(self):
+        """测试取消执行"""
+        stream = python_stream('''
+            import time
+            while True:
+                print("tick", flush=True)
+                time.sleep(0.05)
+        ''')
+        
+        for chunk in stream:
+            stream.cancel()
+        
+        assert stream.result.status == ExecutionStatus.CANCELLED
+    
+    def test_break_kills_process(self):
+        """测试提前停止迭代会终止进程"""
+        stream = python_stream('''
+            import time
+            while True:
+                print("tick", flush=True)
+                time.sleep(0.05)
+        ''')
+        
+        for chunk in stream:
+            break
+        
+        assert stream.result.status == ExecutionStatus.CANCELLED
+        assert stream._process.poll() is not None
+    
+    def test_iterate_once(self):
+        """测试只能迭代一次"""
+        stream = python_stream('print("x")')
+        result = stream.wait()
+        
+        assert result.success
+        with pytest.raises(RuntimeError):
+            list(stream)
+    
+    def test_start_failure(self):
+        """测试进程无法启动"""
+        stream = StreamingExecution(['/nonexistent/pwsh'], 'Get-Date', timeout=5)
+        
+        assert list(stream) == []
+        assert stream.result.status == ExecutionStatus.FAILED
+        assert "执行错误" in stream.result.error
+    
+    def test_from_result(self):
+        """测试由完整结果构造的流"""
+        result = ExecutionResult(success=True, command='Get-Date', output='today', error='')
+        stream = StreamingExecution.from_result(result)
+        
+        chunks = list(stream)
+        
+        assert [(chunk.stream, chunk.text) for chunk in chunks] == [('stdout', 'today')]
+        assert stream.result is result
+
+
+class TestExecutorStream:
+    """执行器流式执行测试类"""
+    
+    def test_execute_stream(self):
+        """测试执行器构造流式执行"""
+        with patch.object(CommandExecutor, '_detect_powershell', return_value=sys.executable):
+            executor = CommandExecutor({'encoding': 'utf-8', 'stream_memory_limit': 2048})
+        executor.powershell_cmd = sys.executable
+        
+        stream = executor.execute_stream('print("hi")', timeout=5)
+        
+        assert stream.args == [sys.executable, '-Command', 'print("hi")']
+        assert stream.stdout.memory_limit == 2048
+        assert stream.metadata['executed_in_sandbox'] is False
+    
+    def test_execute_stream_unavailable(self):
+        """测试 PowerShell 不可用时返回完整结果"""
+        with patch.object(CommandExecutor, '_detect_powershell', return_value=None):
+            executor = CommandExecutor()
+        
+        stream = executor.execute_stream('Get-Date')
+        chunks = list(stream)
+        
+        assert [chunk.stream for chunk in chunks] == ['stderr']
+        assert stream.result.success is False
+        assert "PowerShell 不可用" in stream.result.error
@@ -0,0 +1,363 @@
+"""
+命令执行调度器测试模块
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from src.execution.executor import CommandExecutor
+from src.execution.scheduler import ExecutionScheduler, SchedulerError, SchedulerQueueFull
+from src.interfaces.base import ExecutionResult, ExecutionStatus
+
+
+class FakeExecutor:
+    """模拟执行器：命令格式为 "sleep:秒数"，记录并发数"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.peak = 0
+        self.started = []
+        self.cancelled = []
+        self.sandboxed = []
+    
+    def should_use_sandbox(self, command, risk_level=None):
+        return command.startswith('sandbox')
+    
+    def execute(self, command, timeout=None, risk_level=None):
+        self.sandboxed.append(command)
+        return ExecutionResult(success=True, command=command, output='sandboxed')
+    
+    async def execute_async(self, command, timeout=None):
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            self.started.append(command)
+        try:
+            await asyncio.sleep(float(command.split(':')[1]))
+            return ExecutionResult(success=True, command=command, output=command)
+        except asyncio.CancelledError:
+            self.cancelled.append(command)
+            raise
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+@pytest.fixture
+def executor():
+    return FakeExecutor()
+
+
+@pytest.fixture
+def make_scheduler(executor):
+    schedulers = []
+    
+    def factory(**kwargs):
+        scheduler = ExecutionScheduler(executor, **kwargs)
+        schedulers.append(scheduler)
+        return scheduler
+    
+    yield factory
+    for scheduler in schedulers:
+        scheduler.close()
+
+
+class TestExecutionScheduler:
+    """执行调度器测试类"""
+    
+    def test_execute(self, make_scheduler):
+        """测试同步提交并等待结果"""
+        scheduler = make_scheduler()
+        
+        result = scheduler.execute('sleep:0', session_id='s1')
+        
+        assert result.success
+        assert result.output == 'sleep:0'
+        assert result.metadata['scheduled'] is True
+        assert result.metadata['session_id'] == 's1'
+        assert result.metadata['queue_wait'] >= 0
+    
+    def test_global_limit(self, make_scheduler, executor):
+        """测试全局并发上限"""
+        scheduler = make_scheduler(max_concurrent=2, max_per_session=0)
+        
+        jobs = [scheduler.submit('sleep:0.2') for _ in range(6)]
+        results = [job.result(timeout=5) for job in jobs]
+        
+        assert all(result.success for result in results)
+        assert executor.peak == 2
+        # 后提交的命令排队等待
+        waits = [result.metadata['queue_wait'] for result in results]
+        assert waits[0] < 0.1
+        assert waits[-1] > 0.3
+        
+        stats = scheduler.get_stats()
+        assert stats['completed'] == 6
+        assert stats['running'] == 0
+        assert stats['queued'] == 0
+        assert stats['avg_queue_wait'] > 0
+    
+    def test_per_session_limit(self, make_scheduler, executor):
+        """测试会话上限不阻塞其他会话"""
+        scheduler = make_scheduler(max_concurrent=4, max_per_session=1)
+        
+        busy = [scheduler.submit('sleep:0.3', session_id='busy') for _ in range(3)]
+        other = scheduler.submit('sleep:0', session_id='other')
+        other_result = other.result(timeout=5)
+        
+        assert other_result.metadata['queue_wait'] < 0.2
+        results = [job.result(timeout=5) for job in busy]
+        assert all(result.success for result in results)
+        assert executor.peak <= 2
+        assert results[2].metadata['queue_wait'] > 0.5
+    
+    def test_priority(self, make_scheduler, executor):
+        """测试高优先级命令先执行，同优先级先进先出"""
+        scheduler = make_scheduler(max_concurrent=1)
+        
+        blocker = scheduler.submit('sleep:0.2')
+        time.sleep(0.05)
+        low = [scheduler.submit(f'sleep:0.0{i}') for i in range(1, 3)]
+        high = scheduler.submit('sleep:0.09', priority=10)
+        for job in [blocker, high] + low:
+            job.result(timeout=5)
+        
+        assert executor.started == ['sleep:0.2', 'sleep:0.09', 'sleep:0.01', 'sleep:0.02']
+    
+    def test_queue_full(self, make_scheduler):
+        """测试队列已满时拒绝新命令"""
+        scheduler = make_scheduler(max_concurrent=1, max_queue_size=2)
+        
+        jobs = [scheduler.submit('sleep:0.3')]
+        time.sleep(0.05)
+        jobs += [scheduler.submit('sleep:0') for _ in range(2)]
+        
+        with pytest.raises(SchedulerQueueFull):
+            scheduler.submit('sleep:0')
+        
+        assert all(job.result(timeout=5).success for job in jobs)
+        assert scheduler.get_stats()['rejected'] == 1
+    
+    def test_queue_full_with_session_limit(self, make_scheduler, executor):
+        """测试会话已达上限时队列长度仍然受限"""
+        scheduler = make_scheduler(max_concurrent=4, max_per_session=1, max_queue_size=3)
+        
+        jobs = []
+        rejected = 0
+        for _ in range(50):
+            try:
+                jobs.append(scheduler.submit('sleep:0.05', session_id='s1'))
+            except SchedulerQueueFull:
+                rejected += 1
+        
+        assert len(jobs) <= 4
+        assert rejected == 50 - len(jobs)
+        assert scheduler.get_stats()['queued'] <= 3
+        assert all(job.result(timeout=5).success for job in jobs)
+        assert executor.peak == 1
+    
+    def test_queue_timeout(self, make_scheduler):
+        """测试排队超时"""
+        scheduler = make_scheduler(max_concurrent=1, max_queue_wait=0.1)
+        
+        blocker = scheduler.submit('sleep:0.5')
+        waiting = scheduler.submit('sleep:0')
+        result = waiting.result(timeout=5)
+        
+        assert result.status == ExecutionStatus.TIMEOUT
+        assert "排队超时" in result.error
+        assert result.metadata['queue_wait'] < 0.4
+        assert blocker.result(timeout=5).success
+        assert scheduler.get_stats()['queue_timeouts'] == 1
+    
+    def test_cancel_queued(self, make_scheduler, executor):
+        """测试取消排队中的命令"""
+        scheduler = make_scheduler(max_concurrent=1)
+        
+        blocker = scheduler.submit('sleep:0.3')
+        waiting = scheduler.submit('sleep:0')
+        
+        assert scheduler.cancel(waiting.id)
+        result = waiting.result(timeout=1)
+        
+        assert result.status == ExecutionStatus.CANCELLED
+        assert blocker.result(timeout=5).success
+        assert 'sleep:0' not in executor.started
+        assert not scheduler.cancel(waiting.id)
+    
+    def test_cancel_running(self, make_scheduler, executor):
+        """测试取消正在执行的命令"""
+        scheduler = make_scheduler()
+        
+        job = scheduler.submit('sleep:10')
+        time.sleep(0.1)
+        start = time.time()
+        assert scheduler.cancel(job.id)
+        result = job.result(timeout=5)
+        
+        assert time.time() - start < 1
+        assert result.status == ExecutionStatus.CANCELLED
+        assert executor.cancelled == ['sleep:10']
+        assert scheduler.get_stats()['cancelled'] == 1
+    
+    def test_cancel_session(self, make_scheduler):
+        """测试取消会话的全部命令"""
+        scheduler = make_scheduler(max_concurrent=1)
+        
+        jobs = [scheduler.submit('sleep:10', session_id='s1') for _ in range(3)]
+        other = scheduler.submit('sleep:0', session_id='s2')
+        time.sleep(0.05)
+        
+        assert scheduler.cancel_session('s1') == 3
+        assert all(job.result(timeout=5).status == ExecutionStatus.CANCELLED for job in jobs)
+        assert other.result(timeout=5).success
+    
+    def test_sandbox_commands(self, make_scheduler, executor):
+        """测试需要沙箱的命令使用同步执行接口"""
+        scheduler = make_scheduler()
+        
+        result = scheduler.execute('sandbox Remove-Item x')
+        
+        assert result.output == 'sandboxed'
+        assert executor.sandboxed == ['sandbox Remove-Item x']
+    
+    def test_host_pool_commands(self, make_scheduler, executor):
+        """测试启用宿主进程池时使用同步执行接口"""
+        executor.host_pool = object()
+        scheduler = make_scheduler()
+        
+        result = scheduler.execute('sleep:0')
+        
+        assert result.output == 'sandboxed'
+        assert executor.sandboxed == ['sleep:0']
+        assert executor.started == []
+    
+    def test_set_executor(self, make_scheduler, executor):
+        """测试切换执行器后新命令使用新执行器"""
+        scheduler = make_scheduler()
+        scheduler.execute('sleep:0')
+        
+        replacement = FakeExecutor()
+        scheduler.set_executor(replacement)
+        scheduler.execute('sleep:0.01')
+        
+        assert executor.started == ['sleep:0']
+        assert replacement.started == ['sleep:0.01']
+    
+    def test_submit_call_shares_limits(self, make_scheduler, executor):
+        """测试自定义任务与普通命令共用并发限制"""
+        scheduler = make_scheduler(max_concurrent=1)
+        release = threading.Event()
+        
+        def task():
+            release.wait(5)
+            return ExecutionResult(success=True, command='stream', output='streamed')
+        
+        call = scheduler.submit_call(task, command='stream', session_id='s1')
+        command = scheduler.submit('sleep:0')
+        time.sleep(0.1)
+        
+        assert executor.started == []
+        release.set()
+        assert call.result(timeout=5).output == 'streamed'
+        assert command.result(timeout=5).success
+        assert command.result().metadata['queue_wait'] >= 0.1
+    
+    def test_submit_call_cancel(self, make_scheduler):
+        """测试取消正在运行的自定义任务时调用 on_cancel，任务结束后才交付结果"""
+        scheduler = make_scheduler()
+        stop = threading.Event()
+        
+        def task():
+            stop.wait(5)
+            return ExecutionResult(success=False, command='stream', status=ExecutionStatus.CANCELLED)
+        
+        job = scheduler.submit_call(task, command='stream', on_cancel=stop.set)
+        time.sleep(0.05)
+        assert scheduler.cancel(job.id)
+        
+        assert job.result(timeout=2).status == ExecutionStatus.CANCELLED
+        assert stop.is_set()
+        assert scheduler.get_stats()['running'] == 0
+    
+    def test_executor_exception_propagates(self, make_scheduler):
+        """测试执行器抛出的异常交给调用方"""
+        scheduler = make_scheduler()
+        
+        def task():
+            raise ValueError("boom")
+        
+        with pytest.raises(ValueError):
+            scheduler.submit_call(task).result(timeout=5)
+        assert scheduler.get_stats()['running'] == 0
+    
+    def test_limits_coerced(self, executor):
+        """测试并发限制参数转换为数值"""
+        scheduler = ExecutionScheduler(executor, max_concurrent='2', max_per_session='1',
+                                       max_queue_size='8', max_queue_wait='0')
+        
+        assert scheduler.max_concurrent == 2
+        assert scheduler.max_per_session == 1
+        assert scheduler.max_queue_size == 8
+        assert scheduler.max_queue_wait == 0.0
+    
+    def test_execute_async(self, make_scheduler):
+        """测试异步调用方"""
+        scheduler = make_scheduler(max_concurrent=2)
+        
+        async def main():
+            return await asyncio.gather(*(scheduler.execute_async('sleep:0.05') for _ in range(4)))
+        
+        results = asyncio.run(main())
+        
+        assert all(result.success for result in results)
+    
+    def test_close(self, executor):
+        """测试关闭调度器取消全部命令"""
+        scheduler = ExecutionScheduler(executor, max_concurrent=1)
+        running = scheduler.submit('sleep:10')
+        queued = scheduler.submit('sleep:10')
+        time.sleep(0.05)
+        
+        scheduler.close()
+        
+        assert running.result(timeout=1).status == ExecutionStatus.CANCELLED
+        assert queued.result(timeout=1).status == ExecutionStatus.CANCELLED
+        with pytest.raises(SchedulerError):
+            scheduler.submit('sleep:0')
+
+
+class TestExecuteAsyncCancellation:
+    """execute_async 取消测试类"""
+    
+    def test_cancel_kills_process(self):
+        """测试取消 execute_async 时终止子进程"""
+        with patch.object(CommandExecutor, '_detect_powershell', return_value=sys.executable):
+            executor = CommandExecutor({'encoding': 'utf-8'})
+        executor.powershell_cmd = sys.executable
+        processes = []
+        original = asyncio.create_subprocess_exec
+        
+        async def spawn(*args, **kwargs):
+            # 用 Python 代替 pwsh 运行一个长时间的命令
+            process = await original(sys.executable, '-c', 'import time; time.sleep(30)', **kwargs)
+            processes.append(process)
+            return process
+        
+        async def main():
+            with patch('asyncio.create_subprocess_exec', side_effect=spawn):
+                task = asyncio.ensure_future(executor.execute_async('Start-Sleep 30', timeout=60))
+                await asyncio.sleep(0.3)
+                task.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await task
+        
+        asyncio.run(main())
+        
+        assert processes[0].returncode is not None
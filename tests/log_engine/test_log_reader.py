@@ -0,0 +1,288 @@
+"""
+日志尾部读取器测试
+"""
+
+import logging
+import logging.handlers
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.log_engine.log_reader import LogTailReader, normalize_since, parse_log_line
+
+
+BASE_TIME = datetime(2025, 1, 1, 12, 0, 0)
+LEVELS = ['DEBUG', 'INFO', 'WARNING', 'ERROR']
+
+
+def make_line(index: int, level: str = None, message: str = None) -> str:
+    """生成与 LogEngine 格式一致的日志行，每条记录间隔 1 秒"""
+    timestamp = (BASE_TIME + timedelta(seconds=index)).strftime('%Y-%m-%d %H:%M:%S')
+    level = level or LEVELS[index % len(LEVELS)]
+    message = message or f"message {index}"
+    return f"{timestamp} - test.module - {level} - {message}\n"
+
+
+def write_log(path, count: int) -> None:
+    """写入 count 条日志"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for index in range(count):
+            f.write(make_line(index))
+
+
+def linear_read(path, since_key: str):
+    """逐行扫描的参考实现，返回不早于 since_key 的记录消息（从新到旧）"""
+    messages = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            record = parse_log_line(line.rstrip('\n'))
+            if record and record['timestamp'] >= since_key:
+                messages.append(record['message'])
+    return messages[::-1]
+
+
+class TestParseLogLine:
+    """日志行解析测试类"""
+    
+    def test_parse_record(self):
+        """测试解析日志记录"""
+        record = parse_log_line("2025-01-01 12:00:00 - app - ERROR - failed - retrying")
+        
+        assert record == {
+            'timestamp': '2025-01-01 12:00:00',
+            'level': 'ERROR',
+            'message': 'failed - retrying',
+            'source': 'app'
+        }
+    
+    def test_continuation_line(self):
+        """测试异常堆栈等续行不是日志记录"""
+        assert parse_log_line('  File "main.py", line 1, in <module>') is None
+        assert parse_log_line("ValueError: bad - value - here - x") is None
+    
+    def test_normalize_since(self):
+        """测试 since 时间转换"""
+        assert normalize_since("2025-01-01T12:00:05") == "2025-01-01 12:00:05"
+        # 小数秒向上取整
+        assert normalize_since("2025-01-01T12:00:05.5") == "2025-01-01 12:00:06"
+        
+        # 带时区的时间转换为本地时间
+        utc_time = datetime(2025, 1, 1, 12, 0, 5, tzinfo=timezone.utc)
+        expected = utc_time.astimezone().strftime('%Y-%m-%d %H:%M:%S')
+        assert normalize_since("2025-01-01T12:00:05Z") == expected
+        
+        with pytest.raises(ValueError):
+            normalize_since("not a time")
+
+
+class TestLogTailReader:
+    """日志尾部读取器测试类"""
+    
+    def test_missing_file(self, tmp_path):
+        """测试日志文件不存在"""
+        reader = LogTailReader(str(tmp_path / "missing.log"))
+        
+        assert reader.read() == []
+    
+    def test_read_tail(self, tmp_path):
+        """测试从末尾读取最近的记录"""
+        log_file = tmp_path / "app.log"
+        write_log(log_file, 100)
+        reader = LogTailReader(str(log_file))
+        
+        logs = reader.read(limit=5)
+        
+        assert [log['message'] for log in logs] == [f"message {i}" for i in range(99, 94, -1)]
+    
+    def test_level_filter(self, tmp_path):
+        """测试按级别过滤"""
+        log_file = tmp_path / "app.log"
+        write_log(log_file, 100)
+        reader = LogTailReader(str(log_file))
+        
+        logs = reader.read(level='ERROR', limit=3)
+        
+        assert [log['message'] for log in logs] == ["message 99", "message 95", "message 91"]
+        assert all(log['level'] == 'ERROR' for log in logs)
+    
+    def test_small_blocks(self, tmp_path):
+        """测试记录跨越读取块边界"""
+        log_file = tmp_path / "app.log"
+        write_log(log_file, 200)
+        
+        expected = LogTailReader(str(log_file)).read(limit=200)
+        logs = LogTailReader(str(log_file), block_size=7).read(limit=200)
+        
+        assert logs == expected
+        assert len(logs) == 200
+    
+    def test_multiline_record(self, tmp_path):
+        """测试异常堆栈合并到所属记录"""
+        log_file = tmp_path / "app.log"
+        with open(log_file, 'w', encoding='utf-8') as f:
+            f.write(make_line(0, 'INFO', 'starting'))
+            f.write(make_line(1, 'ERROR', 'command failed'))
+            f.write("Traceback (most recent call last):\n")
+            f.write('  File "main.py", line 1, in <module>\n')
+            f.write("ValueError: bad value\n")
+            f.write(make_line(2, 'INFO', 'recovered'))
+        reader = LogTailReader(str(log_file), block_size=16)
+        
+        logs = reader.read()
+        
+        assert [log['level'] for log in logs] == ['INFO', 'ERROR', 'INFO']
+        assert logs[1]['message'] == (
+            "command failed\n"
+            "Traceback (most recent call last):\n"
+            '  File "main.py", line 1, in <module>\n'
+            "ValueError: bad value"
+        )
+    
+    def test_rotated_files(self, tmp_path):
+        """测试读取 RotatingFileHandler 生成的轮转文件"""
+        log_file = tmp_path / "app.log"
+        handler = logging.handlers.RotatingFileHandler(
+            str(log_file), maxBytes=2000, backupCount=5, encoding='utf-8'
+        )
+        handler.setFormatter(logging.Formatter(
+            '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        ))
+        logger = logging.getLogger("test_log_reader.rotation")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        logger.addHandler(handler)
+        try:
+            for index in range(100):
+                logger.info("entry %d", index)
+        finally:
+            logger.removeHandler(handler)
+            handler.close()
+        reader = LogTailReader(str(log_file))
+        
+        files = reader.log_files()
+        logs = reader.read(limit=1000)
+        
+        assert len(files) > 2
+        assert files[0] == log_file
+        # 所有轮转文件中的记录按从新到旧的顺序返回
+        messages = [log['message'] for log in logs]
+        assert messages[:3] == ["entry 99", "entry 98", "entry 97"]
+        numbers = [int(message.split()[1]) for message in messages]
+        assert numbers == sorted(numbers, reverse=True)
+        assert numbers == list(range(99, 99 - len(numbers), -1))
+    
+    def test_since(self, tmp_path):
+        """测试 since 过滤"""
+        log_file = tmp_path / "app.log"
+        write_log(log_file, 100)
+        reader = LogTailReader(str(log_file))
+        
+        logs = reader.read(limit=1000, since="2025-01-01T12:01:30")
+        
+        assert [log['message'] for log in logs] == [f"message {i}" for i in range(99, 89, -1)]
+        assert reader.read(since="2025-01-02T00:00:00") == []
+        assert len(reader.read(limit=1000, since="2024-12-31T00:00:00")) == 100
+    
+    def test_invalid_since_ignored(self, tmp_path):
+        """测试格式不正确的 since 被忽略"""
+        log_file = tmp_path / "app.log"
+        write_log(log_file, 10)
+        reader = LogTailReader(str(log_file))
+        
+        assert len(reader.read(since="yesterday")) == 10
+    
+    def test_since_matches_linear_scan(self, tmp_path):
+        """测试二分查找与逐行扫描结果一致"""
+        log_file = tmp_path / "app.log"
+        with open(log_file, 'w', encoding='utf-8') as f:
+            for index in range(2000):
+                # 同一秒多条记录，并穿插多行消息
+                f.write(make_line(index // 3))
+                if index % 17 == 0:
+                    f.write("    continuation line\n")
+        reader = LogTailReader(str(log_file), block_size=256)
+        
+        for seconds in (0, 1, 100, 333, 500, 666, 667, 1000):
+            since = BASE_TIME + timedelta(seconds=seconds)
+            since_key = since.strftime('%Y-%m-%d %H:%M:%S')
+            logs = reader.read(limit=10000, since=since.isoformat())
+            
+            messages = [log['message'].split('\n')[0] for log in logs]
+            assert messages == linear_read(log_file, since_key), seconds
+    
+    def test_since_after_append(self, tmp_path):
+        """测试文件追加后稀疏索引仍然有效"""
+        log_file = tmp_path / "app.log"
+        write_log(log_file, 50)
+        reader = LogTailReader(str(log_file), block_size=64)
+        since = (BASE_TIME + timedelta(seconds=40)).isoformat()
+        
+        assert len(reader.read(limit=1000, since=since)) == 10
+        
+        with open(log_file, 'a', encoding='utf-8') as f:
+            for index in range(50, 60):
+                f.write(make_line(index))
+        
+        assert len(reader.read(limit=1000, since=since)) == 20
+    
+    def test_sparse_index_keyed_by_block(self, tmp_path, monkeypatch):
+        """测试稀疏索引按块号缓存，文件增长后重复查询命中索引"""
+        log_file = tmp_path / "app.log"
+        write_log(log_file, 500)
+        reader = LogTailReader(str(log_file), block_size=256)
+        since = (BASE_TIME + timedelta(seconds=100)).isoformat()
+        reader.read(limit=1000, since=since)
+        
+        sparse = next(iter(reader._sparse_index.values()))
+        assert all(offset >= block * 256 for block, (offset, _) in sparse.items())
+        entries = len(sparse)
+        
+        with open(log_file, 'a', encoding='utf-8') as f:
+            f.write(make_line(500))
+        probes = []
+        original = reader._probe
+        monkeypatch.setattr(reader, '_probe', lambda f, size, offset: probes.append(offset) or original(f, size, offset))
+        
+        assert len(reader.read(limit=1000, since=since)) == 401
+        # 只有增长后新增的二分探测点和最后的顺序查找需要读文件
+        assert len(sparse) - entries <= 2
+        assert len([offset for offset in probes if offset % 256 == 0]) <= 2
+    
+    def test_sparse_index_bounded_per_file(self, tmp_path, monkeypatch):
+        """测试每个文件的稀疏索引条目数有上限"""
+        monkeypatch.setattr('src.log_engine.log_reader._MAX_INDEX_ENTRIES_PER_FILE', 5)
+        log_file = tmp_path / "app.log"
+        write_log(log_file, 2000)
+        reader = LogTailReader(str(log_file), block_size=128)
+        
+        for seconds in range(0, 2000, 50):
+            since = BASE_TIME + timedelta(seconds=seconds)
+            logs = reader.read(limit=10000, since=since.isoformat())
+            assert len(logs) == 2000 - seconds
+        
+        assert all(len(sparse) <= 5 for sparse in reader._sparse_index.values())
+    
+    @pytest.mark.slow
+    def test_large_file_performance(self, tmp_path):
+        """测试大文件的尾部读取不随文件大小变慢"""
+        log_file = tmp_path / "large.log"
+        with open(log_file, 'w', encoding='utf-8') as f:
+            for index in range(200000):
+                f.write(make_line(index, message=f"message {index} " + "x" * 80))
+        reader = LogTailReader(str(log_file))
+        
+        start = time.perf_counter()
+        logs = reader.read(limit=100)
+        tail_elapsed = time.perf_counter() - start
+        
+        since = (BASE_TIME + timedelta(seconds=199900)).isoformat()
+        start = time.perf_counter()
+        recent = reader.read(limit=1000, since=since)
+        since_elapsed = time.perf_counter() - start
+        
+        assert len(logs) == 100
+        assert len(recent) == 100
+        assert tail_elapsed < 0.5
+        assert since_elapsed < 0.5
@@ -0,0 +1,388 @@
+"""
+沙箱容器池测试（使用模拟的 Docker 客户端）
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+import pytest
+
+from src.interfaces.base import ExecutionStatus
+from src.security.container_pool import (
+    POOL_LABEL,
+    RESET_COMMAND,
+    SandboxContainerPool,
+    SandboxPoolError,
+    SandboxPoolTimeout,
+)
+from src.security.sandbox import SandboxExecutor
+
+
+ExecResult = namedtuple('ExecResult', ['exit_code', 'output'])
+
+
+class FakeContainer:
+    """模拟的 docker-py 容器"""
+    
+    def __init__(self, client, container_id, config):
+        self.client = client
+        self.id = container_id
+        self.config = config
+        self.status = 'running'
+        self.removed = False
+        self.execs = []
+    
+    def reload(self):
+        if self.removed:
+            raise RuntimeError("container removed")
+    
+    def exec_run(self, cmd, demux=False):
+        self.execs.append(cmd)
+        if cmd == RESET_COMMAND:
+            return ExecResult(self.client.reset_exit_code, b'')
+        if self.client.exec_delay:
+            time.sleep(self.client.exec_delay)
+        if self.client.exec_error:
+            raise RuntimeError(self.client.exec_error)
+        script = cmd[-1]
+        if script.startswith('fail'):
+            return ExecResult(1, (None, b'boom'))
+        return ExecResult(0, (f"ran {script}".encode(), None))
+    
+    def remove(self, force=False):
+        self.removed = True
+        self.status = 'removed'
+
+
+class FakeContainers:
+    """模拟的 client.containers"""
+    
+    def __init__(self, client):
+        self.client = client
+        self.created = []
+    
+    def run(self, **kwargs):
+        if self.client.run_error:
+            raise RuntimeError(self.client.run_error)
+        container = FakeContainer(self.client, f"{len(self.created):012x}" + "0" * 52, kwargs)
+        self.created.append(container)
+        return container
+    
+    def list(self, all=False, filters=None):
+        return []
+
+
+class FakeDockerClient:
+    """模拟的 docker-py 客户端"""
+    
+    def __init__(self):
+        self.exec_delay = 0
+        self.exec_error = None
+        self.run_error = None
+        # 重置命令的退出码，非零表示仍有进程无法终止
+        self.reset_exit_code = 0
+        self.containers = FakeContainers(self)
+    
+    def live(self):
+        return [c for c in self.containers.created if not c.removed]
+
+
+def make_pool(client, **kwargs):
+    """创建同步补充容器的容器池"""
+    options = {'min_size': 1, 'max_size': 2, 'background': False}
+    options.update(kwargs)
+    return SandboxContainerPool(client, {'image': 'pwsh', 'network_mode': 'none'}, **options)
+
+
+class TestSandboxContainerPool:
+    """沙箱容器池测试类"""
+    
+    def test_warm(self):
+        """测试预热到最少容器数"""
+        client = FakeDockerClient()
+        pool = make_pool(client, min_size=2, max_size=3)
+        
+        assert pool.warm() == 2
+        assert pool.warm() == 0
+        
+        config = client.containers.created[0].config
+        assert config['network_mode'] == 'none'
+        assert config['detach'] is True
+        assert config['labels'][POOL_LABEL] == 'true'
+        assert pool.get_stats()['idle_containers'] == 2
+    
+    def test_resettable_container_reused(self):
+        """测试可重置的容器在使用后重置并复用"""
+        client = FakeDockerClient()
+        pool = make_pool(client, resettable=True)
+        pool.warm()
+        
+        first = pool.execute(['pwsh', '-Command', 'Get-Date'], timeout=5)
+        second = pool.execute(['pwsh', '-Command', 'Get-Process'], timeout=5)
+        
+        assert first['output'] == 'ran Get-Date'
+        assert second['return_code'] == 0
+        assert first['container_id'] == second['container_id']
+        assert len(client.containers.created) == 1
+        
+        stats = pool.get_stats()
+        assert stats['hits'] == 2
+        assert stats['misses'] == 0
+        assert stats['hit_rate'] == 1.0
+        assert stats['resets'] == 2
+        assert stats['commands'] == 2
+        assert stats['avg_reset_time'] >= 0
+    
+    def test_reset_kills_background_processes(self):
+        """测试重置命令终止残留进程并检查是否还有进程存活"""
+        script = RESET_COMMAND[-1]
+        
+        assert 'kill -9' in script
+        assert '/proc/[0-9]*' in script
+        assert 'exit 1' in script
+    
+    def test_failed_reset_recycles_container(self):
+        """测试仍有残留进程时回收容器而不是复用"""
+        client = FakeDockerClient()
+        client.reset_exit_code = 1
+        pool = make_pool(client, resettable=True)
+        pool.warm()
+        
+        first = pool.execute(['pwsh', '-Command', 'Start-Job { sleep 100 }'], timeout=5)
+        second = pool.execute(['pwsh', '-Command', 'Get-Process'], timeout=5)
+        
+        assert first['container_id'] != second['container_id']
+        assert client.containers.created[0].removed
+        assert pool.get_stats()['containers_recycled'] == 2
+    
+    def test_writable_container_recycled(self):
+        """测试不可重置的容器使用一次即回收并补充"""
+        client = FakeDockerClient()
+        pool = make_pool(client)
+        pool.warm()
+        
+        first = pool.execute(['pwsh', '-Command', 'Get-Date'], timeout=5)
+        second = pool.execute(['pwsh', '-Command', 'Get-Date'], timeout=5)
+        
+        assert first['container_id'] != second['container_id']
+        assert len(client.containers.created) == 3
+        assert len(client.live()) == 1
+        
+        stats = pool.get_stats()
+        assert stats['containers_recycled'] == 2
+        assert stats['resets'] == 0
+        assert stats['hits'] == 2
+    
+    def test_max_uses(self):
+        """测试达到最大复用次数后回收"""
+        client = FakeDockerClient()
+        pool = make_pool(client, resettable=True, max_uses=2)
+        pool.warm()
+        
+        ids = [pool.execute(['pwsh', '-Command', 'x'], timeout=5)['container_id'] for _ in range(4)]
+        
+        assert ids[0] == ids[1]
+        assert ids[1] != ids[2]
+        assert ids[2] == ids[3]
+        assert pool.get_stats()['containers_recycled'] == 2
+    
+    def test_failed_command(self):
+        """测试命令失败时返回错误输出"""
+        client = FakeDockerClient()
+        pool = make_pool(client, resettable=True)
+        
+        result = pool.execute(['pwsh', '-Command', 'fail now'], timeout=5)
+        
+        assert result['return_code'] == 1
+        assert result['error'] == 'boom'
+        assert result['output'] == ''
+        # 没有预热时第一次借用未命中
+        assert pool.get_stats()['misses'] == 1
+    
+    def test_pool_exhausted(self):
+        """测试达到最大容器数时返回 None"""
+        client = FakeDockerClient()
+        pool = make_pool(client, min_size=0, max_size=1)
+        
+        held = pool.acquire()
+        
+        assert held is not None
+        assert pool.acquire() is None
+        assert pool.execute(['pwsh', '-Command', 'x'], timeout=5) is None
+        
+        pool.release(held)
+        assert pool.acquire() is not None
+    
+    def test_concurrent_acquire_respects_max_size(self):
+        """测试并发借用不超过最大容器数"""
+        client = FakeDockerClient()
+        pool = make_pool(client, min_size=0, max_size=3)
+        results = []
+        lock = threading.Lock()
+        
+        def borrow():
+            pooled = pool.acquire()
+            with lock:
+                results.append(pooled)
+        
+        threads = [threading.Thread(target=borrow) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert len([r for r in results if r is not None]) == 3
+        assert len(client.containers.created) == 3
+    
+    def test_timeout_discards_container(self):
+        """测试超时后删除容器"""
+        client = FakeDockerClient()
+        pool = make_pool(client, resettable=True)
+        pool.warm()
+        client.exec_delay = 0.5
+        
+        with pytest.raises(SandboxPoolTimeout):
+            pool.execute(['pwsh', '-Command', 'Start-Sleep 10'], timeout=0.05)
+        
+        assert client.containers.created[0].removed
+        stats = pool.get_stats()
+        assert stats['timeouts'] == 1
+        assert stats['live_containers'] == 1
+        assert stats['containers_recycled'] == 0
+    
+    def test_exec_error(self):
+        """测试 exec 失败时删除容器并抛出异常"""
+        client = FakeDockerClient()
+        pool = make_pool(client, resettable=True)
+        pool.warm()
+        client.exec_error = "daemon gone"
+        
+        with pytest.raises(SandboxPoolError):
+            pool.execute(['pwsh', '-Command', 'Get-Date'], timeout=5)
+        
+        assert client.containers.created[0].removed
+    
+    def test_start_failure(self):
+        """测试容器无法启动"""
+        client = FakeDockerClient()
+        client.run_error = "no such image"
+        pool = make_pool(client)
+        
+        assert pool.warm() == 0
+        with pytest.raises(SandboxPoolError):
+            pool.acquire()
+        
+        stats = pool.get_stats()
+        assert stats['containers_failed'] == 2
+        assert stats['live_containers'] == 0
+    
+    def test_stopped_container_skipped(self):
+        """测试借用时跳过已停止的容器"""
+        client = FakeDockerClient()
+        pool = make_pool(client, min_size=2, max_size=3)
+        pool.warm()
+        client.containers.created[0].status = 'exited'
+        
+        pooled = pool.acquire()
+        
+        assert pooled.container is client.containers.created[1]
+        assert client.containers.created[0].removed
+    
+    def test_reap_idle(self):
+        """测试回收超过最少数量的空闲容器"""
+        client = FakeDockerClient()
+        pool = make_pool(client, min_size=1, max_size=3, idle_timeout=10, resettable=True)
+        held = [pool.acquire() for _ in range(3)]
+        for pooled in held:
+            pool.release(pooled)
+        
+        assert pool.reap_idle() == 0
+        
+        for pooled in held:
+            pooled.last_used -= 60
+        
+        assert pool.reap_idle() == 2
+        stats = pool.get_stats()
+        assert stats['idle_containers'] == 1
+        assert stats['containers_reaped'] == 2
+        assert len(client.live()) == 1
+    
+    def test_close(self):
+        """测试关闭容器池删除空闲容器"""
+        client = FakeDockerClient()
+        pool = make_pool(client, min_size=2, max_size=2)
+        pool.warm()
+        
+        pool.close()
+        
+        assert client.live() == []
+        with pytest.raises(SandboxPoolError):
+            pool.acquire()
+
+
+class TestSandboxExecutorPool:
+    """沙箱执行器使用容器池的测试类"""
+    
+    def make_executor(self, client, **config):
+        options = {'sandbox_pool_enabled': True, 'read_only': True}
+        options.update(config)
+        sandbox = SandboxExecutor(options)
+        sandbox._docker_client = client
+        sandbox._docker_available = True
+        sandbox.is_windows = False
+        return sandbox
+    
+    def test_execute_in_pool(self):
+        """测试命令在预热容器中执行"""
+        client = FakeDockerClient()
+        sandbox = self.make_executor(client)
+        
+        result = sandbox.execute("Get-Date")
+        
+        assert result.success
+        assert result.output == 'ran Get-Date'
+        assert result.metadata['pooled'] is True
+        assert result.metadata['sandbox'] is True
+        
+        container = client.containers.created[0]
+        assert 'command' in container.config
+        assert container.config['network_mode'] == 'none'
+        assert container.config['read_only'] is True
+        assert ['pwsh', '-Command', 'Get-Date'] in container.execs
+        
+        info = sandbox.get_sandbox_info()
+        assert info['pool']['commands'] == 1
+        
+        sandbox.close()
+        assert client.live() == []
+    
+    def test_pool_timeout(self):
+        """测试容器池执行超时"""
+        client = FakeDockerClient()
+        client.exec_delay = 0.5
+        sandbox = self.make_executor(client)
+        
+        result = sandbox.execute("Start-Sleep 10", timeout=0.05)
+        
+        assert result.status == ExecutionStatus.TIMEOUT
+        sandbox.close()
+    
+    def test_pool_disabled(self):
+        """测试未启用容器池"""
+        client = FakeDockerClient()
+        sandbox = self.make_executor(client, sandbox_pool_enabled=False)
+        
+        assert sandbox.pool is None
+        assert sandbox.get_sandbox_info()['pool'] is None
+    
+    def test_cleanup_reaps_pool(self):
+        """测试清理容器时回收空闲的预热容器"""
+        client = FakeDockerClient()
+        sandbox = self.make_executor(client, sandbox_pool_min_size=0, sandbox_pool_idle_timeout=0)
+        sandbox.execute("Get-Date")
+        time.sleep(0.01)
+        
+        assert sandbox.cleanup_containers() == 1
+        assert client.live() == []
+        sandbox.close()
@@ -197,3 +197,71 @@ class TestSecurityEngine:
             assert isinstance(result, ValidationResult)
             assert hasattr(result, 'is_valid')
             assert hasattr(result, 'risk_level')
+
+
+class TestVerdictCache:
+    """测试验证结果缓存"""
+    
+    def setup_method(self):
+        """每个测试方法前的设置"""
+        self.engine = SecurityEngine({'whitelist_mode': 'strict', 'require_confirmation': True})
+        self.context = Context(session_id="test-session")
+    
+    def test_repeated_command_uses_cache(self):
+        """测试重复验证同一命令时不再扫描规则"""
+        with patch.object(self.engine.whitelist, 'validate', wraps=self.engine.whitelist.validate) as validate:
+            with patch.object(self.engine.permission_checker, 'requires_admin', return_value=False) as requires_admin:
+                first = self.engine.validate_command("Get-Process", self.context)
+                second = self.engine.validate_command("  Get-Process ", self.context)
+        
+        assert validate.call_count == 1
+        assert requires_admin.call_count == 1
+        assert first.risk_level == second.risk_level == RiskLevel.SAFE
+        stats = self.engine.get_verdict_cache_stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+    
+    def test_cached_result_is_copy(self):
+        """测试修改返回结果不影响缓存"""
+        first = self.engine.validate_command("Format-Volume -DriveLetter D", self.context)
+        first.blocked_reasons.append("调用方修改")
+        
+        second = self.engine.validate_command("Format-Volume -DriveLetter D", self.context)
+        
+        assert "调用方修改" not in second.blocked_reasons
+    
+    def test_add_custom_rule_invalidates(self):
+        """测试添加自定义规则后缓存失效"""
+        assert self.engine.validate_command("Delete-Everything", self.context).is_valid
+        
+        self.engine.whitelist.add_custom_rule(r"Delete-Everything", "删除所有内容", RiskLevel.CRITICAL)
+        
+        result = self.engine.validate_command("Delete-Everything", self.context)
+        assert result.is_valid is False
+        assert result.risk_level == RiskLevel.CRITICAL
+    
+    def test_add_safe_command_invalidates(self):
+        """测试添加安全命令后缓存失效"""
+        assert self.engine.validate_command("My-Tool", self.context).risk_level == RiskLevel.LOW
+        
+        self.engine.whitelist.add_safe_command("My-Tool")
+        
+        assert self.engine.validate_command("My-Tool", self.context).risk_level == RiskLevel.SAFE
+    
+    def test_cache_bounded(self):
+        """测试缓存条目数有上限"""
+        engine = SecurityEngine({'verdict_cache_size': 3})
+        for index in range(10):
+            engine.validate_command(f"Get-Item file{index}.txt", self.context)
+        
+        assert engine.get_verdict_cache_stats()['size'] == 3
+    
+    def test_cache_disabled(self):
+        """测试缓存大小为 0 时不缓存"""
+        engine = SecurityEngine({'verdict_cache_size': 0})
+        engine.validate_command("Get-Date", self.context)
+        engine.validate_command("Get-Date", self.context)
+        
+        stats = engine.get_verdict_cache_stats()
+        assert stats['size'] == 0
+        assert stats['hits'] == 0
@@ -4,6 +4,7 @@
 
 import pytest
 import platform
+from unittest.mock import patch
 from src.security.permissions import PermissionChecker
 
 
@@ -119,3 +120,14 @@ class TestPermissionChecker:
         assert self.checker.requires_admin("Format-Volume -DriveLetter C")
         assert self.checker.requires_admin("Initialize-Disk -Number 1")
         assert self.checker.requires_admin("New-Partition -DiskNumber 1 -Size 100GB")
+    
+    def test_current_permissions_detected_once(self):
+        """测试进程权限只检测一次"""
+        PermissionChecker.reset_permission_cache()
+        try:
+            with patch.object(PermissionChecker, '_detect_current_permissions', return_value=True) as detect:
+                assert self.checker.check_current_permissions() is True
+                assert PermissionChecker().check_current_permissions() is True
+                assert detect.call_count == 1
+        finally:
+            PermissionChecker.reset_permission_cache()
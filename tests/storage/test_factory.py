@@ -5,10 +5,13 @@
 import pytest
 import tempfile
 import shutil
+from pathlib import Path
 
 from src.storage.factory import StorageFactory, StorageType
 from src.storage.interfaces import StorageInterface
 from src.storage.file_storage import FileStorage
+from src.storage.memory_storage import MemoryStorage
+from src.storage.sqlite_storage import SQLiteStorage
 
 
 @pytest.fixture
@@ -56,15 +59,28 @@ class TestStorageFactory:
         
         assert isinstance(storage, FileStorage)
     
-    def test_create_memory_storage_not_implemented(self):
-        """测试创建内存存储（未实现）"""
-        with pytest.raises(NotImplementedError):
-            StorageFactory.create_storage(storage_type="memory")
+    def test_create_memory_storage(self):
+        """测试创建内存存储"""
+        storage = StorageFactory.create_storage(
+            storage_type=StorageType.MEMORY.value,
+            config={"max_history_size": 10}
+        )
+        
+        assert isinstance(storage, MemoryStorage)
+        assert isinstance(storage, StorageInterface)
+        assert storage.max_history_size == 10
     
-    def test_create_database_storage_not_implemented(self):
-        """测试创建数据库存储（未实现）"""
-        with pytest.raises(NotImplementedError):
-            StorageFactory.create_storage(storage_type="database")
+    def test_create_database_storage(self, temp_storage_dir):
+        """测试创建数据库存储"""
+        storage = StorageFactory.create_storage(
+            storage_type=StorageType.DATABASE.value,
+            config={"base_path": temp_storage_dir, "max_history_size": 10}
+        )
+        
+        assert isinstance(storage, SQLiteStorage)
+        assert isinstance(storage, StorageInterface)
+        assert storage.db_path == Path(temp_storage_dir) / "storage.db"
+        assert storage.max_history_size == 10
     
     def test_create_invalid_storage_type(self):
         """测试创建无效的存储类型"""
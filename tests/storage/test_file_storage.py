@@ -2,11 +2,15 @@
 文件存储测试
 """
 
+import json
 import pytest
 import tempfile
 import shutil
+import threading
+import time
 from pathlib import Path
 from datetime import datetime, timedelta
+from unittest.mock import patch
 
 from src.storage.file_storage import FileStorage
 
@@ -113,6 +117,16 @@ class TestHistoryOperations:
         assert result is True
         assert not file_storage.history_file.exists()
     
+    def test_delete_history(self, file_storage):
+        """测试删除指定记录"""
+        for i in range(3):
+            file_storage.save_history({"command_id": f"id{i}", "input": f"test{i}"})
+        
+        assert file_storage.delete_history(["id1", "missing"]) is True
+        
+        history = file_storage.load_history()
+        assert [entry["command_id"] for entry in history] == ["id0", "id2"]
+    
     def test_history_includes_timestamp(self, file_storage):
         """测试历史记录包含时间戳"""
         entry = {"input": "test", "command": "cmd", "success": True}
@@ -265,3 +279,209 @@ class TestStorageInfo:
         assert info["config_exists"] is False
         assert info["history_count"] == 0
         assert info["cache_count"] == 0
+
+
+class TestHistoryLog:
+    """测试只追加的 JSON Lines 历史文件"""
+    
+    def test_history_is_json_lines(self, file_storage):
+        """测试每条记录占一行"""
+        file_storage.save_history({"input": "测试", "command": "cmd1", "success": True})
+        file_storage.save_history({"input": "多行\n输入", "command": "cmd2", "success": True})
+        
+        lines = file_storage.history_file.read_text(encoding='utf-8').splitlines()
+        
+        assert file_storage.history_file.name == "history.jsonl"
+        assert len(lines) == 2
+        assert json.loads(lines[1])["input"] == "多行\n输入"
+    
+    def test_migrate_legacy_history(self, temp_storage_dir):
+        """测试旧版 history.json 一次性迁移"""
+        legacy = Path(temp_storage_dir) / "history.json"
+        legacy.write_text(json.dumps([
+            {"input": "old1", "command": "cmd1", "success": True},
+            {"input": "old2", "command": "cmd2", "success": False}
+        ]), encoding='utf-8')
+        
+        storage = FileStorage(base_path=temp_storage_dir)
+        storage.save_history({"input": "new", "command": "cmd3", "success": True})
+        
+        history = storage.load_history()
+        assert [entry["input"] for entry in history] == ["old1", "old2", "new"]
+        assert not legacy.exists()
+        assert (Path(temp_storage_dir) / "history.json.migrated").exists()
+        
+        # 再次打开不会重复迁移
+        assert len(FileStorage(base_path=temp_storage_dir).load_history()) == 3
+    
+    def test_compaction_keeps_recent_entries(self, temp_storage_dir):
+        """测试超过上限后压缩为最近的记录"""
+        storage = FileStorage(base_path=temp_storage_dir, max_history_size=10)
+        
+        for i in range(25):
+            storage.save_history({"input": f"test{i}", "command": "cmd", "success": True})
+        
+        line_count = len(storage.history_file.read_bytes().splitlines())
+        assert line_count <= 11
+        
+        history = storage.load_history()
+        assert len(history) == 10
+        assert history[-1]["input"] == "test24"
+        assert history[0]["input"] == "test15"
+        assert storage.get_storage_info()["history_count"] == 10
+    
+    def test_load_history_limit_across_blocks(self, file_storage):
+        """测试反向读取跨越多个数据块"""
+        padding = "x" * 1000
+        file_storage.save_history_batch([
+            {"input": f"test{i}", "command": padding, "success": True}
+            for i in range(300)
+        ])
+        
+        history = file_storage.load_history(limit=150)
+        
+        assert len(history) == 150
+        assert history[0]["input"] == "test150"
+        assert history[-1]["input"] == "test299"
+    
+    def test_torn_line_skipped(self, file_storage):
+        """测试写入中断留下的半行被跳过"""
+        file_storage.save_history({"input": "ok", "command": "cmd", "success": True})
+        with open(file_storage.history_file, 'ab') as f:
+            f.write(b'{"input": "torn", "comm')
+        
+        history = file_storage.load_history(limit=5)
+        
+        assert [entry["input"] for entry in history] == ["ok"]
+    
+    def test_concurrent_appends(self, temp_storage_dir):
+        """测试多个实例并发追加不会丢失记录"""
+        storages = [FileStorage(base_path=temp_storage_dir) for _ in range(4)]
+        
+        def worker(index, storage):
+            for i in range(50):
+                storage.save_history({"input": f"w{index}-{i}", "command": "cmd", "success": True})
+        
+        threads = [
+            threading.Thread(target=worker, args=(index, storage))
+            for index, storage in enumerate(storages)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert len(storages[0].load_history()) == 200
+    
+    def test_other_writer_counts_only_new_bytes(self, temp_storage_dir):
+        """测试其他实例追加后只统计新增部分，不重新扫描整个文件"""
+        first = FileStorage(base_path=temp_storage_dir)
+        second = FileStorage(base_path=temp_storage_dir)
+        for i in range(5):
+            first.save_history({"input": f"a{i}", "command": "cmd", "success": True})
+        second.save_history({"input": "b0", "command": "cmd", "success": True})
+        second.save_history({"input": "b1", "command": "cmd", "success": True})
+        
+        start = first._history_size
+        with patch.object(first, "_count_history_lines", wraps=first._count_history_lines) as count:
+            first.save_history({"input": "a5", "command": "cmd", "success": True})
+        
+        assert first._history_count == 8
+        count.assert_called_once_with(start, first._history_size)
+    
+    def test_count_recomputed_after_other_writer_compacts(self, temp_storage_dir):
+        """测试其他实例压缩（替换文件）后重新统计行数"""
+        first = FileStorage(base_path=temp_storage_dir)
+        second = FileStorage(base_path=temp_storage_dir)
+        for i in range(5):
+            first.save_history({"input": f"a{i}", "command": "cmd", "success": True})
+        second.save_history_batch([{"input": f"b{i}", "command": "cmd", "success": True} for i in range(8)])
+        
+        first.save_history({"input": "a5", "command": "cmd", "success": True})
+        
+        assert first._history_count == 9
+    
+    def test_save_history_batch_replaces_log(self, file_storage):
+        """测试批量保存原子地覆盖历史文件"""
+        file_storage.save_history({"input": "old", "command": "cmd", "success": True})
+        
+        result = file_storage.save_history_batch([{"input": "new", "command": "cmd", "success": True}])
+        
+        assert result is True
+        assert [entry["input"] for entry in file_storage.load_history()] == ["new"]
+        assert not list(Path(file_storage.base_path).glob("*.tmp"))
+    
+    def test_fsync_policy(self, temp_storage_dir):
+        """测试 fsync 策略"""
+        with patch('src.storage.file_storage.os.fsync') as mock_fsync:
+            always = FileStorage(base_path=temp_storage_dir, history_fsync="always")
+            always.save_history({"input": "a", "command": "cmd", "success": True})
+            always.save_history({"input": "b", "command": "cmd", "success": True})
+            assert mock_fsync.call_count == 2
+            
+            mock_fsync.reset_mock()
+            never = FileStorage(base_path=temp_storage_dir, history_fsync="never")
+            never.save_history({"input": "c", "command": "cmd", "success": True})
+            assert mock_fsync.call_count == 0
+            
+            interval = FileStorage(base_path=temp_storage_dir, history_fsync_interval=3600)
+            interval.save_history({"input": "d", "command": "cmd", "success": True})
+            interval.save_history({"input": "e", "command": "cmd", "success": True})
+            assert mock_fsync.call_count == 1
+    
+    def test_invalid_fsync_policy(self, temp_storage_dir):
+        """测试不支持的 fsync 策略"""
+        with pytest.raises(ValueError):
+            FileStorage(base_path=temp_storage_dir, history_fsync="sometimes")
+    
+    def test_load_history_since(self, file_storage):
+        """测试增量加载只返回新追加的完整行"""
+        entries, cursor, reset = file_storage.load_history_since()
+        assert entries == [] and reset is True
+        
+        file_storage.save_history({"input": "a", "command": "cmd"})
+        entries, cursor, reset = file_storage.load_history_since(cursor)
+        assert [entry["input"] for entry in entries] == ["a"] and reset is True
+        
+        file_storage.save_history({"input": "b", "command": "cmd"})
+        with open(file_storage.history_file, 'ab') as f:
+            f.write(b'{"input": "par')
+        entries, cursor, reset = file_storage.load_history_since(cursor)
+        assert [entry["input"] for entry in entries] == ["b"] and reset is False
+        
+        # 重写后需要重建
+        file_storage.save_history_batch([{"input": "c"}])
+        entries, cursor, reset = file_storage.load_history_since(cursor)
+        assert [entry["input"] for entry in entries] == ["c"] and reset is True
+    
+    @pytest.mark.parametrize("size", [10_000, 100_000])
+    def test_benchmark_tail_load(self, temp_storage_dir, size):
+        """基准测试：追加和读取最近记录的耗时与历史总量无关"""
+        storage = FileStorage(base_path=temp_storage_dir, history_fsync="never")
+        storage.save_history_batch([
+            {"input": f"test{i}", "command": "Get-Process", "success": True, "timestamp": "2024-01-01T00:00:00"}
+            for i in range(size)
+        ])
+        
+        start = time.perf_counter()
+        for i in range(100):
+            storage.save_history({"input": f"new{i}", "command": "Get-Date", "success": True})
+        append_time = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        for _ in range(100):
+            recent = storage.load_history(limit=50)
+        tail_time = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        full = storage.load_history()
+        full_time = time.perf_counter() - start
+        
+        print(f"\n{size} 条: 追加 {append_time * 10:.3f}ms/条, "
+              f"读取最近 50 条 {tail_time * 10:.3f}ms/次, 全量读取 {full_time * 1000:.1f}ms")
+        
+        assert recent[-1]["input"] == "new99"
+        assert len(full) == size + 100
+        # 单次追加和读取尾部都远快于一次全量读取
+        assert append_time / 100 < full_time
+        assert tail_time / 100 < full_time
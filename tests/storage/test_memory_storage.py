@@ -0,0 +1,190 @@
+"""
+内存存储测试
+"""
+
+import pytest
+import threading
+import time
+
+from src.storage.memory_storage import MemoryStorage
+from src.storage.interfaces import StorageInterface
+
+
+@pytest.fixture
+def memory_storage():
+    """创建内存存储实例"""
+    return MemoryStorage()
+
+
+class TestMemoryHistory:
+    """测试历史记录操作"""
+    
+    def test_implements_interface(self, memory_storage):
+        """测试实现存储接口"""
+        assert isinstance(memory_storage, StorageInterface)
+    
+    def test_save_and_load_history(self, memory_storage):
+        """测试保存和加载历史记录"""
+        for i in range(5):
+            assert memory_storage.save_history({"input": f"test{i}", "command": f"cmd{i}", "success": True})
+        
+        history = memory_storage.load_history()
+        recent = memory_storage.load_history(limit=2)
+        
+        assert [entry["input"] for entry in history] == [f"test{i}" for i in range(5)]
+        assert [entry["input"] for entry in recent] == ["test3", "test4"]
+        assert "timestamp" in history[0]
+    
+    def test_bounded_history(self):
+        """测试历史记录超出上限后丢弃最旧的记录"""
+        storage = MemoryStorage(max_history_size=3)
+        for i in range(5):
+            storage.save_history({"input": f"test{i}", "command": "cmd", "success": True})
+        
+        assert [entry["input"] for entry in storage.load_history()] == ["test2", "test3", "test4"]
+    
+    def test_returned_data_is_copied(self, memory_storage):
+        """测试修改返回值不会影响已保存的数据"""
+        entry = {"input": "test", "command": "cmd", "tags": ["a"]}
+        memory_storage.save_history(entry)
+        entry["tags"].append("b")
+        
+        loaded = memory_storage.load_history()
+        loaded[0]["tags"].append("c")
+        
+        assert memory_storage.load_history()[0]["tags"] == ["a"]
+    
+    def test_save_history_batch_and_clear(self, memory_storage):
+        """测试批量保存和清除历史记录"""
+        memory_storage.save_history({"input": "old", "command": "cmd"})
+        memory_storage.save_history_batch([{"input": "new1"}, {"input": "new2"}])
+        
+        assert [entry["input"] for entry in memory_storage.load_history()] == ["new1", "new2"]
+        
+        assert memory_storage.clear_history() is True
+        assert memory_storage.load_history() == []
+    
+    def test_delete_history(self, memory_storage):
+        """测试删除指定记录"""
+        for i in range(3):
+            memory_storage.save_history({"command_id": f"id{i}", "input": f"test{i}"})
+        
+        assert memory_storage.delete_history(["id1"]) is True
+        assert [entry["command_id"] for entry in memory_storage.load_history()] == ["id0", "id2"]
+    
+    def test_load_history_since(self):
+        """测试增量加载"""
+        storage = MemoryStorage(max_history_size=3)
+        storage.save_history({"input": "a"})
+        entries, cursor, reset = storage.load_history_since()
+        assert reset is True and len(entries) == 1
+        
+        storage.save_history({"input": "b"})
+        entries, cursor, reset = storage.load_history_since(cursor)
+        assert reset is False and [entry["input"] for entry in entries] == ["b"]
+        
+        # 新增记录超过上限时无法增量加载
+        for i in range(4):
+            storage.save_history({"input": f"c{i}"})
+        entries, cursor, reset = storage.load_history_since(cursor)
+        assert reset is True and len(entries) == 3
+        
+        storage.clear_history()
+        entries, cursor, reset = storage.load_history_since(cursor)
+        assert reset is True and entries == []
+    
+    def test_concurrent_appends(self, memory_storage):
+        """测试多线程并发写入"""
+        def worker(index):
+            for i in range(250):
+                memory_storage.save_history({"input": f"w{index}-{i}", "command": "cmd"})
+        
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert len(memory_storage.load_history()) == 1000
+
+
+class TestMemoryConfigAndCache:
+    """测试配置和缓存操作"""
+    
+    def test_config_round_trip(self, memory_storage):
+        """测试保存和加载配置"""
+        assert memory_storage.load_config() is None
+        
+        memory_storage.save_config({"ai": {"provider": "local"}})
+        
+        assert memory_storage.load_config() == {"ai": {"provider": "local"}}
+    
+    def test_cache_with_ttl(self, memory_storage):
+        """测试缓存过期"""
+        memory_storage.save_cache("permanent", "value")
+        memory_storage.save_cache("temp", "value", ttl=0.1)
+        assert memory_storage.load_cache("temp") == "value"
+        
+        time.sleep(0.15)
+        
+        assert memory_storage.load_cache("temp") is None
+        assert memory_storage.load_cache("permanent") == "value"
+        assert memory_storage.get_storage_info()["cache_count"] == 1
+    
+    def test_clear_cache(self, memory_storage):
+        """测试清除缓存"""
+        memory_storage.save_cache("key1", "value1")
+        
+        assert memory_storage.clear_cache() is True
+        assert memory_storage.load_cache("key1") is None
+
+
+class TestMemoryContextData:
+    """测试会话、快照和用户偏好"""
+    
+    def test_session_round_trip(self, memory_storage):
+        """测试保存和加载会话"""
+        assert memory_storage.save_session({"session_id": "s1", "commands": ["Get-Date"]})
+        
+        assert memory_storage.load_session("s1")["commands"] == ["Get-Date"]
+        assert memory_storage.load_session("missing") is None
+        assert memory_storage.save_session({"commands": []}) is False
+    
+    def test_snapshot_and_preferences(self, memory_storage):
+        """测试保存和加载快照与用户偏好"""
+        assert memory_storage.save_snapshot({"snapshot_id": "snap1", "data": 1})
+        assert memory_storage.save_user_preferences({"user_id": "u1", "theme": "dark"})
+        
+        assert memory_storage.load_snapshot("snap1")["data"] == 1
+        assert memory_storage.load_user_preferences("u1")["theme"] == "dark"
+        
+        info = memory_storage.get_storage_info()
+        assert info["backend"] == "memory"
+        assert info["snapshot_count"] == 1
+
+
+class TestMemoryDump:
+    """测试转储和恢复"""
+    
+    def test_dump_and_restore(self, tmp_path):
+        """测试转储后由新实例恢复"""
+        dump_path = tmp_path / "dump.json"
+        storage = MemoryStorage(max_history_size=10, dump_path=str(dump_path))
+        storage.save_history({"input": "test", "command": "cmd"})
+        storage.save_session({"session_id": "s1"})
+        storage.save_cache("key1", "value1", ttl=3600)
+        storage.save_cache("expired", "value", ttl=-1)
+        
+        assert storage.dump() is True
+        assert dump_path.exists()
+        
+        restored = MemoryStorage(max_history_size=10, dump_path=str(dump_path))
+        
+        assert restored.load_history()[0]["input"] == "test"
+        assert restored.load_session("s1") == {"session_id": "s1"}
+        assert restored.load_cache("key1") == "value1"
+        assert restored.load_cache("expired") is None
+    
+    def test_dump_without_path(self, memory_storage):
+        """测试未设置转储路径时不转储"""
+        assert memory_storage.dump() is False
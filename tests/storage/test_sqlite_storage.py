@@ -0,0 +1,286 @@
+"""
+SQLite 存储测试
+"""
+
+import pytest
+import sqlite3
+import tempfile
+import shutil
+import threading
+import multiprocessing
+import time
+from pathlib import Path
+
+from src.storage.sqlite_storage import SQLiteStorage
+from src.storage.interfaces import StorageInterface
+
+
+@pytest.fixture
+def temp_storage_dir():
+    """创建临时存储目录"""
+    temp_dir = tempfile.mkdtemp()
+    yield temp_dir
+    # 清理
+    shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+@pytest.fixture
+def sqlite_storage(temp_storage_dir):
+    """创建 SQLite 存储实例"""
+    storage = SQLiteStorage(db_path=str(Path(temp_storage_dir) / "storage.db"))
+    yield storage
+    storage.close()
+
+
+def _append_history(db_path, worker, count):
+    """在子进程中追加历史记录"""
+    storage = SQLiteStorage(db_path=db_path)
+    for i in range(count):
+        storage.save_history({"input": f"w{worker}-{i}", "command": "cmd", "success": True})
+    storage.close()
+
+
+class TestSQLiteStorageInitialization:
+    """测试 SQLite 存储初始化"""
+    
+    def test_implements_interface(self, sqlite_storage):
+        """测试实现存储接口"""
+        assert isinstance(sqlite_storage, StorageInterface)
+        assert sqlite_storage.db_path.exists()
+    
+    def test_wal_mode(self, sqlite_storage):
+        """测试使用 WAL 日志模式"""
+        conn = sqlite3.connect(str(sqlite_storage.db_path))
+        try:
+            mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        finally:
+            conn.close()
+        
+        assert mode == "wal"
+    
+    def test_history_indexes(self, sqlite_storage):
+        """测试历史记录查询使用索引"""
+        conn = sqlite_storage._connection()
+        indexes = {row["name"] for row in conn.execute("PRAGMA index_list(history)")}
+        
+        assert {"idx_history_timestamp", "idx_history_success", "idx_history_session"} <= indexes
+        
+        plan = " ".join(
+            row["detail"] for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT data FROM history WHERE session_id = ? "
+                "ORDER BY timestamp DESC", ("s1",)
+            )
+        )
+        assert "idx_history_session" in plan
+
+
+class TestSQLiteHistory:
+    """测试历史记录操作"""
+    
+    def test_save_and_load_history(self, sqlite_storage):
+        """测试保存和加载历史记录"""
+        for i in range(5):
+            assert sqlite_storage.save_history({"input": f"test{i}", "command": f"cmd{i}", "success": True})
+        
+        history = sqlite_storage.load_history()
+        recent = sqlite_storage.load_history(limit=2)
+        
+        assert [entry["input"] for entry in history] == [f"test{i}" for i in range(5)]
+        assert [entry["input"] for entry in recent] == ["test3", "test4"]
+        assert "timestamp" in history[0]
+    
+    def test_max_history_size(self, temp_storage_dir):
+        """测试超过上限后删除最旧的记录"""
+        storage = SQLiteStorage(db_path=str(Path(temp_storage_dir) / "storage.db"), max_history_size=3)
+        for i in range(5):
+            storage.save_history({"input": f"test{i}", "command": "cmd", "success": True})
+        
+        history = storage.load_history()
+        
+        assert [entry["input"] for entry in history] == ["test2", "test3", "test4"]
+    
+    def test_query_history(self, sqlite_storage):
+        """测试分页和条件查询"""
+        sqlite_storage.save_history_batch([
+            {
+                "user_input": f"命令{i}",
+                "command": "Get-Process" if i % 2 else "Get-ChildItem",
+                "success": i % 3 != 0,
+                "session_id": "s1" if i < 10 else "s2",
+                "timestamp": f"2024-01-15T10:{i:02d}:00"
+            }
+            for i in range(20)
+        ])
+        
+        page, total = sqlite_storage.query_history(offset=5, limit=5)
+        assert total == 20
+        assert [entry["user_input"] for entry in page] == [f"命令{i}" for i in range(14, 9, -1)]
+        
+        _, total = sqlite_storage.query_history(search="process")
+        assert total == 10
+        
+        failed, total = sqlite_storage.query_history(success=False, session_id="s1", limit=None)
+        assert total == 4
+        assert all(entry["success"] is False for entry in failed)
+        
+        _, total = sqlite_storage.query_history(
+            start_time="2024-01-15T10:05:00", end_time="2024-01-15T10:10:00"
+        )
+        assert total == 5
+    
+    def test_query_history_escapes_wildcards(self, sqlite_storage):
+        """测试搜索关键词中的通配符按字面匹配"""
+        sqlite_storage.save_history({"user_input": "100%", "command": "cmd", "success": True})
+        sqlite_storage.save_history({"user_input": "1000", "command": "cmd", "success": True})
+        
+        results, total = sqlite_storage.query_history(search="100%")
+        
+        assert total == 1
+        assert results[0]["user_input"] == "100%"
+    
+    def test_save_history_batch_replaces(self, sqlite_storage):
+        """测试批量保存替换全部历史记录"""
+        sqlite_storage.save_history({"input": "old", "command": "cmd", "success": True})
+        
+        assert sqlite_storage.save_history_batch([{"input": "new", "command": "cmd", "success": True}])
+        assert [entry["input"] for entry in sqlite_storage.load_history()] == ["new"]
+    
+    def test_clear_history(self, sqlite_storage):
+        """测试清除历史记录"""
+        sqlite_storage.save_history({"input": "test", "command": "cmd", "success": True})
+        
+        assert sqlite_storage.clear_history() is True
+        assert sqlite_storage.load_history() == []
+    
+    def test_delete_history(self, sqlite_storage):
+        """测试删除指定记录"""
+        for i in range(3):
+            sqlite_storage.save_history({"command_id": f"id{i}", "input": f"test{i}", "command": "cmd"})
+        
+        assert sqlite_storage.delete_history(["id0", "id2"]) is True
+        assert [entry["command_id"] for entry in sqlite_storage.load_history()] == ["id1"]
+    
+    def test_load_history_since(self, sqlite_storage):
+        """测试按行 ID 增量加载"""
+        sqlite_storage.save_history({"command_id": "a", "input": "a", "command": "cmd"})
+        entries, cursor, reset = sqlite_storage.load_history_since()
+        assert reset is True and len(entries) == 1
+        
+        sqlite_storage.save_history({"command_id": "b", "input": "b", "command": "cmd"})
+        entries, cursor, reset = sqlite_storage.load_history_since(cursor)
+        assert reset is False and [entry["input"] for entry in entries] == ["b"]
+        
+        entries, cursor, reset = sqlite_storage.load_history_since(cursor)
+        assert reset is False and entries == []
+        
+        # 删除记录后需要重建
+        sqlite_storage.delete_history(["a"])
+        entries, cursor, reset = sqlite_storage.load_history_since(cursor)
+        assert reset is True and [entry["input"] for entry in entries] == ["b"]
+        
+        sqlite_storage.clear_history()
+        entries, cursor, reset = sqlite_storage.load_history_since(cursor)
+        assert reset is True and entries == []
+    
+    def test_concurrent_threads(self, sqlite_storage):
+        """测试多线程并发写入"""
+        def worker(index):
+            for i in range(25):
+                sqlite_storage.save_history({"input": f"w{index}-{i}", "command": "cmd", "success": True})
+        
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert len(sqlite_storage.load_history()) == 100
+    
+    def test_concurrent_processes(self, sqlite_storage):
+        """测试多个进程（如 gunicorn 工作进程）并发写入"""
+        processes = [
+            multiprocessing.Process(target=_append_history, args=(str(sqlite_storage.db_path), index, 25))
+            for index in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(timeout=60)
+        
+        assert all(process.exitcode == 0 for process in processes)
+        assert len(sqlite_storage.load_history()) == 100
+
+
+class TestSQLiteConfigAndCache:
+    """测试配置和缓存操作"""
+    
+    def test_config_round_trip(self, sqlite_storage):
+        """测试保存和加载配置"""
+        assert sqlite_storage.load_config() is None
+        
+        sqlite_storage.save_config({"ai": {"provider": "local"}})
+        
+        assert sqlite_storage.load_config() == {"ai": {"provider": "local"}}
+    
+    def test_cache_round_trip(self, sqlite_storage):
+        """测试保存和加载缓存"""
+        sqlite_storage.save_cache("key1", {"value": [1, 2, 3]})
+        
+        assert sqlite_storage.load_cache("key1") == {"value": [1, 2, 3]}
+        assert sqlite_storage.load_cache("missing") is None
+    
+    def test_cache_with_ttl(self, sqlite_storage):
+        """测试缓存过期"""
+        sqlite_storage.save_cache("temp", "value", ttl=1)
+        assert sqlite_storage.load_cache("temp") == "value"
+        
+        time.sleep(1.1)
+        
+        assert sqlite_storage.load_cache("temp") is None
+        assert sqlite_storage.get_storage_info()["cache_count"] == 0
+    
+    def test_clear_cache(self, sqlite_storage):
+        """测试清除缓存"""
+        sqlite_storage.save_cache("key1", "value1")
+        
+        assert sqlite_storage.clear_cache() is True
+        assert sqlite_storage.load_cache("key1") is None
+
+
+class TestSQLiteContextData:
+    """测试会话、快照和用户偏好"""
+    
+    def test_session_round_trip(self, sqlite_storage):
+        """测试保存和加载会话"""
+        assert sqlite_storage.save_session({"session_id": "s1", "commands": ["Get-Date"]})
+        assert sqlite_storage.save_session({"session_id": "s1", "commands": ["Get-Date", "ls"]})
+        
+        assert sqlite_storage.load_session("s1")["commands"] == ["Get-Date", "ls"]
+        assert sqlite_storage.load_session("missing") is None
+        assert sqlite_storage.save_session({"commands": []}) is False
+    
+    def test_snapshot_round_trip(self, sqlite_storage):
+        """测试保存和加载快照"""
+        assert sqlite_storage.save_snapshot({"snapshot_id": "snap1", "session_id": "s1", "data": 1})
+        
+        assert sqlite_storage.load_snapshot("snap1")["data"] == 1
+        assert sqlite_storage.save_snapshot({"session_id": "s1"}) is False
+    
+    def test_preferences_round_trip(self, sqlite_storage):
+        """测试保存和加载用户偏好"""
+        assert sqlite_storage.save_user_preferences({"user_id": "u1", "theme": "dark"})
+        
+        assert sqlite_storage.load_user_preferences("u1")["theme"] == "dark"
+        assert sqlite_storage.load_user_preferences("u2") is None
+    
+    def test_storage_info(self, sqlite_storage):
+        """测试获取存储信息"""
+        sqlite_storage.save_history({"input": "test", "command": "cmd", "success": True})
+        sqlite_storage.save_session({"session_id": "s1"})
+        
+        info = sqlite_storage.get_storage_info()
+        
+        assert info["backend"] == "sqlite"
+        assert info["history_count"] == 1
+        assert info["session_count"] == 1
+        assert info["total_size"] > 0
@@ -0,0 +1,149 @@
+"""
+模板内容缓存单元测试
+"""
+
+import os
+
+import pytest
+
+from src.template_engine.content_cache import TemplateContentCache, content_hash, get_content_cache
+from src.template_engine.models import Template, TemplateCategory
+
+
+def write(path, text, mtime_ns=None):
+    """写入文件，可指定修改时间"""
+    path.write_text(text, encoding='utf-8')
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def cache():
+    return TemplateContentCache(max_size=100)
+
+
+class TestTemplateContentCache:
+    """测试模板内容缓存"""
+    
+    def test_hit_and_hash(self, cache, tmp_path):
+        """测试重复读取命中缓存并计算摘要"""
+        path = tmp_path / "a.ps1"
+        write(path, "Get-Process")
+        
+        entry = cache.get_entry(str(path))
+        
+        assert cache.get(str(path)) == "Get-Process"
+        assert entry.content_hash == content_hash("Get-Process")
+        assert cache.get_stats()['misses'] == 1
+        assert cache.get_stats()['hits'] == 1
+    
+    def test_reload_on_mtime_change(self, cache, tmp_path):
+        """测试大小不变但修改时间变化时重新读取"""
+        path = tmp_path / "a.ps1"
+        write(path, "Get-Process", mtime_ns=1_000_000_000)
+        assert cache.get(str(path)) == "Get-Process"
+        
+        write(path, "Get-Service", mtime_ns=2_000_000_000)
+        
+        assert cache.get(str(path)) == "Get-Service"
+        assert cache.get_stats()['reloads'] == 1
+    
+    def test_reload_on_size_change(self, cache, tmp_path):
+        """测试修改时间不变但大小变化时重新读取"""
+        path = tmp_path / "a.ps1"
+        write(path, "Get-Process", mtime_ns=1_000_000_000)
+        cache.get(str(path))
+        
+        write(path, "Get-ChildItem", mtime_ns=1_000_000_000)
+        
+        assert cache.get(str(path)) == "Get-ChildItem"
+    
+    def test_invalidate(self, cache, tmp_path):
+        """测试手动失效"""
+        path = tmp_path / "a.ps1"
+        write(path, "Get-Process", mtime_ns=1_000_000_000)
+        cache.get(str(path))
+        
+        # 修改时间和大小都不变时只能靠失效
+        write(path, "Get-Service", mtime_ns=1_000_000_000)
+        assert cache.get(str(path)) == "Get-Process"
+        
+        cache.invalidate(str(path))
+        assert cache.get(str(path)) == "Get-Service"
+        
+        cache.invalidate()
+        assert len(cache) == 0
+    
+    def test_bounded_size(self, cache, tmp_path):
+        """测试按总字符数做 LRU 淘汰"""
+        paths = []
+        for i in range(3):
+            path = tmp_path / f"{i}.ps1"
+            write(path, str(i) * 40)
+            paths.append(str(path))
+        
+        cache.get(paths[0])
+        cache.get(paths[1])
+        cache.get(paths[0])
+        cache.get(paths[2])
+        
+        assert paths[1] not in cache
+        assert paths[0] in cache and paths[2] in cache
+        stats = cache.get_stats()
+        assert stats['total_size'] == 80
+        assert stats['evictions'] == 1
+    
+    def test_oversized_content_not_cached(self, cache, tmp_path):
+        """测试超过上限的内容不进入缓存"""
+        path = tmp_path / "big.ps1"
+        write(path, "x" * 200)
+        
+        assert cache.get(str(path)) == "x" * 200
+        assert len(cache) == 0
+    
+    def test_missing_file(self, cache, tmp_path):
+        """测试文件不存在"""
+        with pytest.raises(OSError):
+            cache.get(str(tmp_path / "missing.ps1"))
+
+
+class TestTemplateLoadContent:
+    """测试模板通过共享缓存加载内容"""
+    
+    def make_template(self, path):
+        return Template(
+            id="t", name="t", category=TemplateCategory.AUTOMATION, file_path=str(path),
+            description="", keywords=[], parameters={}
+        )
+    
+    def test_sees_changes_on_disk(self, tmp_path):
+        """测试文件修改后读到新内容"""
+        path = tmp_path / "t.ps1"
+        write(path, "Get-Process", mtime_ns=1_000_000_000)
+        template = self.make_template(path)
+        
+        assert template.load_content() == "Get-Process"
+        assert template.content is None
+        
+        write(path, "Get-Service", mtime_ns=2_000_000_000)
+        assert template.load_content() == "Get-Service"
+        assert str(path) in get_content_cache()
+    
+    def test_explicit_content(self, tmp_path):
+        """测试显式设置的内容优先"""
+        template = self.make_template(tmp_path / "missing.ps1")
+        template.content = "Write-Host 'hi'"
+        
+        assert template.load_content() == "Write-Host 'hi'"
+        assert template.content_info() == {
+            'hash': content_hash("Write-Host 'hi'"), 'size': 15, 'mtime': None
+        }
+    
+    def test_content_info(self, tmp_path):
+        """测试内容摘要信息"""
+        path = tmp_path / "t.ps1"
+        write(path, "Get-Process", mtime_ns=3_000_000_000)
+        
+        info = self.make_template(path).content_info()
+        
+        assert info == {'hash': content_hash("Get-Process"), 'size': 11, 'mtime': 3.0}
@@ -0,0 +1,159 @@
+"""
+PowerShell 语法检查器单元测试
+
+使用一个遵循相同分帧协议的 Python 脚本模拟 PowerShell 解析宿主，
+它把括号不匹配或引号未闭合的脚本视为语法错误。
+"""
+
+import sys
+import textwrap
+
+import pytest
+
+from src.execution.host_pool import FRAME_PREFIX
+from src.template_engine.models import Template, TemplateCategory
+from src.template_engine.syntax_checker import PowerShellSyntaxChecker, SyntaxCheckError
+from src.template_engine.template_validator import TemplateValidator
+
+
+FAKE_PARSER_SCRIPT = textwrap.dedent('''
+    import base64, json, sys, time
+
+    PREFIX = {prefix!r}
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        req = json.loads(line)
+        batch = base64.b64decode(req['command']).decode('utf-8')
+        errors = []
+        for i, encoded in enumerate(batch.split(',')):
+            script = base64.b64decode(encoded).decode('utf-8')
+            if script.startswith('sleep'):
+                time.sleep(5)
+            for number, text in enumerate(script.split('\\n'), 1):
+                if text.count('{{') != text.count('}}'):
+                    errors.append('%d\\t%d\\tMissing closing brace' % (i, number))
+                if text.count('"') % 2:
+                    errors.append('%d\\t%d\\tThe string is missing the terminator' % (i, number))
+        resp = {{'id': req['id'], 'ok': True, 'output': '\\n'.join(errors), 'error': '', 'memory': 1024}}
+        sys.stdout.write(PREFIX + json.dumps(resp) + '\\n')
+        sys.stdout.flush()
+''').format(prefix=FRAME_PREFIX)
+
+
+@pytest.fixture
+def host_args(tmp_path):
+    script = tmp_path / "fake_parser.py"
+    script.write_text(FAKE_PARSER_SCRIPT, encoding='utf-8')
+    return [sys.executable, str(script)]
+
+
+@pytest.fixture
+def checker(host_args):
+    checker = PowerShellSyntaxChecker(host_args=host_args, batch_size=2, timeout=2)
+    yield checker
+    checker.close()
+
+
+class TestPowerShellSyntaxChecker:
+    """测试语法检查器"""
+    
+    def test_check(self, checker):
+        """测试单个脚本"""
+        assert checker.check('Write-Host "ok"') == []
+        assert checker.check('if ($true) {\nWrite-Host "a') == [
+            "第 1 行: Missing closing brace",
+            "第 2 行: The string is missing the terminator"
+        ]
+    
+    def test_batch_uses_one_host(self, checker):
+        """测试批量检查只启动一个宿主，并按 batch_size 分批"""
+        scripts = ['Get-Process', '{', 'Get-Service', '"', 'Get-Item']
+        
+        results = checker.check_batch(scripts)
+        
+        assert results == [[], ["第 1 行: Missing closing brace"], [], ["第 1 行: The string is missing the terminator"], []]
+        stats = checker.get_stats()
+        assert stats['hosts_started'] == 1
+        assert stats['requests'] == 3
+    
+    def test_cache_by_content(self, checker):
+        """测试相同内容只解析一次"""
+        checker.check_batch(['Get-Process', '{', 'Get-Process'])
+        assert checker.get_stats()['requests'] == 1
+        
+        assert checker.check('{') == ["第 1 行: Missing closing brace"]
+        stats = checker.get_stats()
+        assert stats['requests'] == 1
+        assert stats['cache_hits'] == 1
+        
+        checker.clear_cache()
+        checker.check('{')
+        assert checker.get_stats()['requests'] == 2
+    
+    def test_empty_scripts_skip_host(self, checker):
+        """测试空脚本不启动宿主"""
+        assert checker.check_batch(['', '  \n']) == [[], []]
+        assert checker.get_stats()['hosts_started'] == 0
+    
+    def test_timeout_restarts_host(self, checker):
+        """测试超时后终止宿主，下次检查重新启动"""
+        with pytest.raises(SyntaxCheckError, match="超时"):
+            checker.check('sleep')
+        
+        assert checker.check('Get-Process') == []
+        assert checker.get_stats()['hosts_started'] == 2
+    
+    def test_powershell_not_found(self):
+        """测试未找到 PowerShell"""
+        checker = PowerShellSyntaxChecker()
+        checker.host_args = None
+        
+        with pytest.raises(SyntaxCheckError, match="未找到 PowerShell"):
+            checker.check('Get-Process')
+
+
+class TestValidatorBatch:
+    """测试验证器使用语法检查器"""
+    
+    def test_validate_powershell_syntax(self, checker):
+        """测试语法验证结果"""
+        validator = TemplateValidator(syntax_checker=checker)
+        
+        assert validator.validate_powershell_syntax('Get-Process').is_valid
+        result = validator.validate_powershell_syntax('{')
+        assert not result.is_valid
+        assert result.errors == ["PowerShell 语法错误: 第 1 行: Missing closing brace"]
+    
+    def test_checker_failure(self):
+        """测试语法检查无法完成时返回错误，空脚本仍然有效"""
+        checker = PowerShellSyntaxChecker(host_args=[sys.executable, '-c', 'import sys; sys.exit(1)'])
+        validator = TemplateValidator(syntax_checker=checker)
+        
+        results = validator.validate_syntax_batch(['', 'Get-Process'])
+        
+        assert results[0].is_valid
+        assert not results[1].is_valid
+        assert "PowerShell 语法验证失败" in results[1].errors[0]
+    
+    def test_validate_templates(self, checker, tmp_path):
+        """测试批量验证模板"""
+        templates = []
+        for template_id, content in [("good", "Get-Process"), ("bad", "{"), ("missing", None)]:
+            path = tmp_path / f"{template_id}.ps1"
+            if content is not None:
+                path.write_text(content, encoding='utf-8')
+            templates.append(Template(
+                id=template_id, name=template_id, category=TemplateCategory.AUTOMATION,
+                file_path=str(path), description="", keywords=[], parameters={}
+            ))
+        validator = TemplateValidator(enable_security_checks=False, syntax_checker=checker)
+        
+        results = validator.validate_templates(templates)
+        
+        assert results["good"].is_valid
+        assert not results["bad"].is_valid
+        assert "无法加载模板内容" in results["missing"].errors[0]
+        assert checker.get_stats()['requests'] == 1
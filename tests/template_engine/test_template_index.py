@@ -0,0 +1,251 @@
+"""
+模板索引单元测试
+"""
+
+import random
+
+import pytest
+
+from src.template_engine.custom_models import CustomTemplate
+from src.template_engine.custom_template_manager import CustomTemplateManager
+from src.template_engine.models import Intent, Template, TemplateCategory
+from src.template_engine.template_index import TemplateIndex
+from src.template_engine.template_manager import TemplateManager
+from src.template_engine.template_matcher import TemplateMatcher
+
+
+def make_template(template_id, name="", description="", keywords=None, tags=None):
+    """创建模板，传入 tags 时创建自定义模板"""
+    if tags is None:
+        return Template(
+            id=template_id,
+            name=name,
+            category=TemplateCategory.AUTOMATION,
+            file_path="",
+            description=description,
+            keywords=keywords or [],
+            parameters={}
+        )
+    return CustomTemplate(
+        id=template_id,
+        name=name,
+        category=TemplateCategory.AUTOMATION,
+        file_path="",
+        description=description,
+        keywords=keywords or [],
+        parameters={},
+        tags=tags
+    )
+
+
+def naive_search(templates, keywords):
+    """逐个模板扫描的参考实现"""
+    results = []
+    for template in templates:
+        texts = list(template.keywords) + [template.name, template.description]
+        if isinstance(template, CustomTemplate):
+            texts += template.tags
+        if any(keyword.lower() in text.lower() for keyword in keywords for text in texts):
+            results.append(template)
+    return results
+
+
+@pytest.fixture
+def templates():
+    return [
+        make_template("rename", "批量重命名文件", "Batch Rename files", ["重命名", "rename"]),
+        make_template("backup", "备份文件", "备份指定目录", ["备份", "Backup"]),
+        make_template("monitor", "资源监控", "监控 CPU 和内存", ["监控", "cpu"]),
+        make_template("custom_a", "清理日志", "删除旧日志", ["清理"], tags=["Logs", "维护"]),
+    ]
+
+
+@pytest.fixture
+def index(templates):
+    index = TemplateIndex()
+    index.rebuild(templates)
+    return index
+
+
+class TestTemplateIndex:
+    """测试模板索引"""
+    
+    @pytest.mark.parametrize("keywords", [
+        ["重命名"], ["RENAME"], ["文件"], ["u"], ["日志"], ["logs"], ["维护"],
+        ["不存在"], ["备份", "cpu"], ["件"], ["batch re"],
+    ])
+    def test_search_matches_naive_scan(self, index, templates, keywords):
+        """测试搜索结果与逐个扫描一致"""
+        assert index.search(keywords) == naive_search(templates, keywords)
+    
+    def test_empty_keyword_matches_all(self, index, templates):
+        """测试空关键词匹配全部模板"""
+        assert index.search([""]) == templates
+    
+    def test_none_keyword_ignored(self, index):
+        """测试忽略 None 关键词"""
+        assert [t.id for t in index.search([None, "备份"])] == ["backup"]
+    
+    def test_tags_only_for_custom_templates(self):
+        """测试只有自定义模板的标签参与搜索"""
+        index = TemplateIndex()
+        plain = make_template("plain", "a", "b")
+        plain.tags = ["secret"]
+        index.add(plain)
+        
+        assert index.search(["secret"]) == []
+    
+    def test_precomputed_fields(self, index):
+        """测试预先计算的小写字段"""
+        entry = index.get("backup")
+        
+        assert entry.keywords == ["备份", "backup"]
+        assert entry.keyword_set == frozenset(["备份", "Backup"])
+        assert entry.tags == []
+        assert index.get("custom_a").tags == ["logs", "维护"]
+    
+    def test_update_keeps_order(self, index):
+        """测试更新模板时保持原来的顺序并替换旧词项"""
+        index.add(make_template("rename", "改名", "", ["改名"]))
+        
+        assert index.search(["重命名"]) == []
+        assert [t.id for t in index.search(["改名", "备份"])] == ["rename", "backup"]
+    
+    def test_remove(self, index):
+        """测试删除模板"""
+        assert index.remove("backup") is True
+        assert index.remove("backup") is False
+        
+        assert index.search(["备份"]) == []
+        assert "backup" not in index
+        assert len(index) == 3
+    
+    def test_random_consistency(self):
+        """测试大量随机增删后与逐个扫描一致"""
+        rng = random.Random(7)
+        alphabet = "abc文件日志"
+        index = TemplateIndex()
+        current = {}
+        
+        def word():
+            return "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 5)))
+        
+        for step in range(500):
+            template_id = f"t{rng.randint(0, 60)}"
+            if rng.random() < 0.2:
+                index.remove(template_id)
+                current.pop(template_id, None)
+            else:
+                template = make_template(template_id, word(), word(), [word()], tags=[word()])
+                index.add(template)
+                current[template_id] = template
+        
+        ordered = sorted(current.values(), key=lambda t: index.get(t.id).order)
+        for _ in range(50):
+            keywords = [word() for _ in range(rng.randint(1, 2))]
+            assert index.search(keywords) == naive_search(ordered, keywords)
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    """包含一个系统模板和一个自定义模板的配置"""
+    config_path = tmp_path / "config" / "templates.yaml"
+    config_path.parent.mkdir()
+    config_path.write_text("""templates:
+  file_management:
+    batch_rename:
+      name: "批量重命名文件"
+      description: "批量重命名文件"
+      file: "templates/file_management/batch_rename.ps1"
+      keywords: ["重命名", "批量"]
+      parameters: {}
+  custom:
+    clean_logs:
+      name: "清理日志"
+      description: "删除旧日志"
+      file: "templates/custom/clean_logs.ps1"
+      keywords: ["清理"]
+      tags: ["维护"]
+      parameters: {}
+""", encoding='utf-8')
+    return tmp_path, config_path
+
+
+class TestTemplateManagerIndex:
+    """测试模板管理器使用和维护索引"""
+    
+    def test_search_uses_index(self, workspace):
+        """测试加载后建立索引"""
+        _, config_path = workspace
+        manager = TemplateManager(str(config_path))
+        
+        assert len(manager.index) == 2
+        assert [t.id for t in manager.search_templates(["维护", "批量"])] == ["batch_rename", "clean_logs"]
+    
+    def test_add_and_remove_template(self, workspace):
+        """测试增量增删模板"""
+        _, config_path = workspace
+        manager = TemplateManager(str(config_path))
+        
+        template = manager.add_custom_template("archive", {
+            "name": "归档文件", "description": "", "keywords": ["归档"], "tags": ["存储"]
+        })
+        
+        assert isinstance(template, CustomTemplate)
+        assert manager.get_template("archive") is template
+        assert manager.search_templates(["存储"]) == [template]
+        
+        assert manager.remove_template("archive") is True
+        assert manager.remove_template("archive") is False
+        assert manager.search_templates(["存储"]) == []
+    
+    def test_custom_template_manager_sync(self, workspace):
+        """测试自定义模板管理器同步模板管理器的索引"""
+        tmp_path, config_path = workspace
+        manager = TemplateManager(str(config_path))
+        custom_manager = CustomTemplateManager(
+            templates_dir=str(tmp_path / "templates"),
+            config_path=str(config_path),
+            template_manager=manager
+        )
+        config = {"name": "清理日志", "description": "", "keywords": ["清理", "日志"], "tags": []}
+        
+        custom_manager._sync_template_manager("clean_logs", "custom", config)
+        assert manager.search_templates(["维护"]) == []
+        assert [t.id for t in manager.search_templates(["日志"])] == ["clean_logs"]
+        
+        # 其他分类的模板不会被模板管理器加载，也不同步
+        custom_manager._sync_template_manager("other", "my_scripts", config)
+        assert manager.get_template("other") is None
+        
+        custom_manager._sync_template_manager("clean_logs", "custom")
+        assert manager.search_templates(["日志"]) == []
+
+
+class TestTemplateMatcherIndex:
+    """测试模板匹配器使用预先计算的字段"""
+    
+    def test_score_uses_index(self, workspace):
+        """测试打分结果"""
+        _, config_path = workspace
+        manager = TemplateManager(str(config_path))
+        matcher = TemplateMatcher(manager)
+        intent = Intent(action="清理", target="files", confidence=1.0, raw_input="帮我做一下日常维护")
+        
+        match = matcher.match(intent)
+        
+        assert match.template.id == "clean_logs"
+        assert match.score == 12
+        assert match.matched_keywords == ["清理", "维护"]
+    
+    def test_template_outside_index(self, workspace):
+        """测试不在索引中的模板也能打分"""
+        _, config_path = workspace
+        matcher = TemplateMatcher(TemplateManager(str(config_path)))
+        template = make_template("x", "x", "", ["Backup"])
+        intent = Intent(action="none", target="none", confidence=1.0, raw_input="BACKUP now")
+        
+        score, matched = matcher._calculate_score(intent, template)
+        
+        assert score == 2
+        assert matched == ["Backup"]
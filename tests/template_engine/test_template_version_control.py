@@ -11,6 +11,7 @@ from datetime import datetime, timedelta
 from pathlib import Path
 
 from src.template_engine.template_version_control import (
+    MAX_DELTA_CHAIN,
     TemplateVersionControl,
     TemplateVersion
 )
@@ -541,5 +542,246 @@ Write-Host "中文内容 & 特殊符号 <>"
         assert retrieved.change_description == "包含特殊字符的版本"
 
 
+
+class TestVersionStorage:
+    """测试版本清单和内容对象存储"""
+    
+    @pytest.fixture
+    def large_content(self):
+        """较长的模板内容（只改一行时适合保存为增量）"""
+        return "".join(f"Write-Host 'line {i}'\n" for i in range(200))
+    
+    def objects_dir(self, temp_history_dir):
+        return Path(temp_history_dir) / "test_template" / "objects"
+    
+    def test_list_reads_only_manifest(self, version_control, large_content, monkeypatch):
+        """测试列出版本只读取清单，内容在访问时才读取"""
+        version_control.create_version("test_template", large_content, {"v": 1})
+        version_control.create_version("test_template", large_content + "# x\n", {"v": 2})
+        
+        loaded = []
+        original = version_control._load_content
+        monkeypatch.setattr(
+            version_control, "_load_content",
+            lambda template_id, digest: loaded.append(digest) or original(template_id, digest)
+        )
+        
+        versions = version_control.list_versions("test_template")
+        assert [v.config for v in versions] == [{"v": 2}, {"v": 1}]
+        assert loaded == []
+        
+        assert versions[0].content == large_content + "# x\n"
+        assert len(loaded) == 1
+    
+    def test_identical_content_deduplicated(self, version_control, temp_history_dir):
+        """测试相同内容只保存一份"""
+        for i in range(3):
+            version_control.create_version("test_template", "Get-Process", {"i": i})
+        
+        assert len(list(self.objects_dir(temp_history_dir).glob("*.json"))) == 1
+        assert len(version_control.list_versions("test_template")) == 3
+    
+    def test_delta_between_versions(self, version_control, temp_history_dir, large_content):
+        """测试只改动一行时保存为增量"""
+        version_control.create_version("test_template", large_content, {})
+        changed = large_content.replace("line 100", "line one hundred")
+        v2 = version_control.create_version("test_template", changed, {})
+        
+        with open(self.objects_dir(temp_history_dir) / f"{v2.content_hash}.json", encoding='utf-8') as f:
+            stored = json.load(f)
+        
+        assert stored['base'] == version_control.get_version("test_template", 1).content_hash
+        assert 'content' not in stored
+        assert version_control.get_version("test_template", 2).content == changed
+    
+    def test_delta_chain_is_bounded(self, temp_history_dir, large_content):
+        """测试增量链超过上限后保存完整内容"""
+        vc = TemplateVersionControl(history_dir=temp_history_dir, max_versions=30)
+        contents = [large_content + f"# change {i}\n" for i in range(20)]
+        for content in contents:
+            vc.create_version("test_template", content, {})
+        
+        depths = []
+        for version in vc.list_versions("test_template"):
+            with open(self.objects_dir(temp_history_dir) / f"{version.content_hash}.json", encoding='utf-8') as f:
+                depths.append(json.load(f)['depth'])
+        
+        assert max(depths) <= 8
+        assert 0 in depths[:-1]
+        assert [v.content for v in vc.list_versions("test_template")] == contents[::-1]
+    
+    def test_cleanup_keeps_delta_bases(self, temp_history_dir, large_content):
+        """测试清理旧版本时保留仍被增量引用的内容对象，删除其余对象"""
+        vc = TemplateVersionControl(history_dir=temp_history_dir, max_versions=2)
+        vc.create_version("test_template", "Get-Process", {})
+        contents = [large_content + f"# change {i}\n" for i in range(4)]
+        for content in contents:
+            vc.create_version("test_template", content, {})
+        
+        versions = vc.list_versions("test_template")
+        assert [v.version_number for v in versions] == [5, 4]
+        assert [v.content for v in versions] == [contents[3], contents[2]]
+        
+        stored = {p.stem for p in self.objects_dir(temp_history_dir).glob("*.json")}
+        assert vc.get_version("test_template", 1) is None
+        assert len(stored) == 5 - 1  # "Get-Process" 不再被引用
+    
+    def test_version_numbers_not_reused_after_cleanup(self, temp_history_dir):
+        """测试清理后版本号继续递增"""
+        vc = TemplateVersionControl(history_dir=temp_history_dir, max_versions=1)
+        for i in range(3):
+            vc.create_version("test_template", f"v{i}", {})
+        
+        assert [v.version_number for v in vc.list_versions("test_template")] == [3]
+        assert vc.create_version("test_template", "v3", {}).version_number == 4
+    
+    def test_corrupted_object(self, version_control, temp_history_dir):
+        """测试内容对象损坏"""
+        version = version_control.create_version("test_template", "Get-Process", {})
+        (self.objects_dir(temp_history_dir) / f"{version.content_hash}.json").write_text("{}", encoding='utf-8')
+        
+        with pytest.raises(TemplateError, match="无法读取版本内容|校验失败"):
+            version_control.get_version("test_template", 1).content
+    
+    def test_migrate_legacy_versions(self, temp_history_dir, sample_template_config):
+        """测试迁移旧格式的版本文件"""
+        template_dir = Path(temp_history_dir) / "test_template"
+        template_dir.mkdir()
+        for number in (1, 2):
+            legacy = TemplateVersion(
+                template_id="test_template",
+                version_number=number,
+                timestamp=datetime(2024, 1, number),
+                content=f"Write-Host {number}",
+                config=sample_template_config,
+                change_description=f"Version {number}"
+            )
+            with open(template_dir / f"v{number}_2024010{number}_000000.json", 'w', encoding='utf-8') as f:
+                json.dump(legacy.to_dict(), f)
+        
+        vc = TemplateVersionControl(history_dir=temp_history_dir)
+        versions = vc.list_versions("test_template")
+        
+        assert [v.version_number for v in versions] == [2, 1]
+        assert versions[1].content == "Write-Host 1"
+        assert versions[1].timestamp == datetime(2024, 1, 1)
+        assert not list(template_dir.glob("v*.json"))
+        assert (template_dir / "manifest.json").exists()
+        assert vc.create_version("test_template", "Write-Host 3", {}).version_number == 3
+    
+    def read_object(self, temp_history_dir, digest):
+        with open(self.objects_dir(temp_history_dir) / f"{digest}.json", encoding='utf-8') as f:
+            return json.load(f)
+    
+    def test_returning_content_reuses_object(self, version_control, temp_history_dir, large_content):
+        """测试内容改回旧版本时复用已有的内容对象"""
+        changed = large_content + "# changed\n"
+        v1 = version_control.create_version("test_template", large_content, {})
+        version_control.create_version("test_template", changed, {})
+        v3 = version_control.create_version("test_template", large_content, {})
+        
+        assert v3.content_hash == v1.content_hash
+        assert len(list(self.objects_dir(temp_history_dir).glob("*.json"))) == 2
+        assert version_control.get_version("test_template", 3).content == large_content
+    
+    def test_delta_round_trip_at_chain_limit(self, temp_history_dir, large_content):
+        """测试增量链达到上限时下一个版本保存完整内容，所有版本都能还原"""
+        vc = TemplateVersionControl(history_dir=temp_history_dir, max_versions=50)
+        contents = [large_content.replace("line 1'", f"line 1 rev {i}'") for i in range(MAX_DELTA_CHAIN + 3)]
+        versions = [vc.create_version("test_template", content, {}) for content in contents]
+        
+        depths = [self.read_object(temp_history_dir, v.content_hash)['depth'] for v in versions]
+        
+        assert depths[:MAX_DELTA_CHAIN + 1] == list(range(MAX_DELTA_CHAIN + 1))
+        assert depths[MAX_DELTA_CHAIN + 1] == 0
+        assert depths[MAX_DELTA_CHAIN + 2] == 1
+        for version, content in zip(versions, contents):
+            assert vc.get_version("test_template", version.version_number).content == content
+    
+    def test_cleanup_keeps_base_of_deleted_version(self, temp_history_dir, large_content):
+        """测试删除的版本仍是保留版本的增量基础时保留其内容对象"""
+        vc = TemplateVersionControl(history_dir=temp_history_dir, max_versions=1)
+        v1 = vc.create_version("test_template", large_content, {})
+        v2 = vc.create_version("test_template", large_content + "# tail\n", {})
+        
+        assert [v.version_number for v in vc.list_versions("test_template")] == [2]
+        assert self.read_object(temp_history_dir, v2.content_hash)['base'] == v1.content_hash
+        assert (self.objects_dir(temp_history_dir) / f"{v1.content_hash}.json").exists()
+        assert vc.get_version("test_template", 2).content == large_content + "# tail\n"
+        
+        # 新的完整内容不再依赖旧对象，旧对象被回收
+        v3 = vc.create_version("test_template", "Get-Date", {})
+        stored = {p.stem for p in self.objects_dir(temp_history_dir).glob("*.json")}
+        assert stored == {v3.content_hash}
+    
+    @pytest.mark.parametrize("corruption", ["not json", "[1, 2]", '{"depth": 0, "content": "Get-Date"}'])
+    def test_corrupted_object_rejected(self, version_control, temp_history_dir, corruption):
+        """测试无效的 JSON、无效的格式和被篡改的内容都被拒绝"""
+        version = version_control.create_version("test_template", "Get-Process", {})
+        (self.objects_dir(temp_history_dir) / f"{version.content_hash}.json").write_text(corruption, encoding='utf-8')
+        
+        with pytest.raises(TemplateError):
+            version_control.get_version("test_template", 1).content
+    
+    def test_missing_delta_base_rejected(self, version_control, temp_history_dir, large_content):
+        """测试增量基础缺失时读取失败"""
+        v1 = version_control.create_version("test_template", large_content, {})
+        version_control.create_version("test_template", large_content + "# tail\n", {})
+        (self.objects_dir(temp_history_dir) / f"{v1.content_hash}.json").unlink()
+        
+        with pytest.raises(TemplateError, match="无法读取版本内容"):
+            version_control.get_version("test_template", 2).content
+    
+    def test_cyclic_delta_chain_rejected(self, version_control, temp_history_dir, large_content):
+        """测试循环的增量链不会无限读取"""
+        version_control.create_version("test_template", large_content, {})
+        v2 = version_control.create_version("test_template", large_content + "# tail\n", {})
+        path = self.objects_dir(temp_history_dir) / f"{v2.content_hash}.json"
+        obj = json.loads(path.read_text(encoding='utf-8'))
+        obj['base'] = v2.content_hash
+        path.write_text(json.dumps(obj), encoding='utf-8')
+        
+        with pytest.raises(TemplateError, match="增量链过长"):
+            version_control.get_version("test_template", 2).content
+    
+    def test_migrate_skips_corrupted_legacy_file(self, temp_history_dir):
+        """测试迁移时跳过损坏的旧版本文件并保留它"""
+        template_dir = Path(temp_history_dir) / "test_template"
+        template_dir.mkdir()
+        legacy = TemplateVersion(
+            template_id="test_template",
+            version_number=1,
+            timestamp=datetime(2024, 1, 1),
+            content="Write-Host 1",
+            config={}
+        )
+        (template_dir / "v1_20240101_000000.json").write_text(json.dumps(legacy.to_dict()), encoding='utf-8')
+        (template_dir / "v2_20240102_000000.json").write_text("{broken", encoding='utf-8')
+        
+        vc = TemplateVersionControl(history_dir=temp_history_dir)
+        versions = vc.list_versions("test_template")
+        
+        assert [v.content for v in versions] == ["Write-Host 1"]
+        assert [p.name for p in template_dir.glob("v*.json")] == ["v2_20240102_000000.json"]
+    
+    def test_line_diff(self, version_control, large_content):
+        """测试行级差异"""
+        version_control.create_version("test_template", large_content, {"a": 1})
+        version_control.create_version("test_template", large_content.replace("line 5'", "line five'"), {"a": 1})
+        version_control.create_version("test_template", large_content, {"a": 2})
+        
+        diff = version_control.get_version_diff("test_template", 1, 2, context_lines=0)
+        
+        assert diff['content_changed'] is True
+        assert diff['lines_added'] == 1
+        assert diff['lines_removed'] == 1
+        assert "-Write-Host 'line 5'" in diff['diff']
+        assert "+Write-Host 'line five'" in diff['diff']
+        
+        same = version_control.get_version_diff("test_template", 1, 3)
+        assert same['content_changed'] is False
+        assert same['config_changed'] is True
+        assert same['diff'] == []
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
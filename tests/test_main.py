@@ -89,6 +89,38 @@ class TestPowerShellAssistantInitialization:
         # 验证
         mock_config_manager.assert_called_once_with(custom_config_path)
         assert assistant.config == mock_config
+    
+    @patch('src.main.ConfigManager')
+    @patch('src.main.LogEngine')
+    @patch('src.main.StorageFactory')
+    @patch('src.main.ContextManager')
+    @patch('src.main.AIEngine')
+    @patch('src.main.SecurityEngine')
+    @patch('src.main.CommandExecutor')
+    @patch('src.main.ExecutionScheduler')
+    def test_rebuild_executor(
+        self,
+        mock_scheduler,
+        mock_executor,
+        mock_security,
+        mock_ai,
+        mock_context,
+        mock_storage_factory,
+        mock_log,
+        mock_config_manager
+    ):
+        """测试重建执行引擎时切换调度器并关闭旧执行引擎"""
+        old_executor, new_executor = Mock(), Mock()
+        mock_executor.side_effect = [old_executor, new_executor]
+        assistant = PowerShellAssistant()
+        scheduler = assistant.scheduler
+        
+        assistant.rebuild_executor()
+        
+        assert assistant.executor is new_executor
+        scheduler.set_executor.assert_called_once_with(new_executor)
+        old_executor.close.assert_called_once()
+        new_executor.close.assert_not_called()
 
 
 class TestProcessRequest:
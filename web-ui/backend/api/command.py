@@ -1,22 +1,31 @@
 """
 Command API endpoints for translation and execution
 """
+import json
 import os
+import queue
 import sys
+import threading
 import time
 from datetime import datetime
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
+from flask_socketio import ConnectionRefusedError
 from pydantic import ValidationError
 
 from models.command import TranslateRequest, ExecuteRequest
 from utils.validation import validate_and_sanitize_command_input, ValidationError as CustomValidationError
-from api.csrf import csrf_protect
+from api.csrf import csrf_protect, verify_csrf_token
 
 # Add parent directory to path to import PowerShellAssistant
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
 
+from src.execution.scheduler import SchedulerQueueFull
+
 command_bp = Blueprint('command', __name__)
 
+# Maximum number of inputs accepted by /translate/batch
+MAX_BATCH_SIZE = 100
+
 # Global assistant instance (lazy loaded)
 _assistant = None
 _assistant_config_path = None
@@ -121,53 +130,18 @@ def translate_command():
             current_app.logger.info(f"🔄 重新生成模式 - 反馈: {translate_req.feedback}")
         current_app.logger.info(f"🤖 开始 AI 翻译...")
         
-        suggestion = assistant.ai_engine.translate_natural_language(translate_req.input, context)
-        
-        current_app.logger.info(f"✅ AI 生成命令: {suggestion.generated_command}")
-        current_app.logger.info(f"📊 置信度: {suggestion.confidence_score * 100:.1f}%")
-        
-        # Perform security check
-        current_app.logger.info(f"🔒 执行安全检查...")
-        validation = assistant.security_engine.validate_command(suggestion.generated_command, context)
-        
-        # Map risk level to security level string
-        risk_level_map = {
-            'safe': 'safe',
-            'low': 'low',
-            'medium': 'medium',
-            'high': 'high',
-            'critical': 'critical'
-        }
-        
-        security_level = risk_level_map.get(validation.risk_level.value, 'safe')
-        
-        # Log security result
-        security_emoji = {
-            'safe': '✅',
-            'low': '⚠️',
-            'medium': '⚠️',
-            'high': '🚨',
-            'critical': '🛑'
-        }
-        current_app.logger.info(f"{security_emoji.get(security_level, '❓')} 安全级别: {security_level}")
+        if _wants_stream():
+            return Response(
+                stream_with_context(_stream_translation(assistant, translate_req.input, context)),
+                mimetype='text/event-stream',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
         
-        if validation.warnings:
-            for warning in validation.warnings:
-                current_app.logger.warning(f"⚠️ 安全警告: {warning}")
+        suggestion = assistant.ai_engine.translate_natural_language(translate_req.input, context)
         
         response = {
             'success': True,
-            'data': {
-                'command': suggestion.generated_command,
-                'confidence': suggestion.confidence_score,
-                'explanation': suggestion.explanation,
-                'security': {
-                    'level': security_level,
-                    'warnings': validation.warnings,
-                    'requires_confirmation': validation.requires_confirmation,
-                    'requires_elevation': validation.requires_elevation
-                }
-            }
+            'data': _build_translate_data(assistant, suggestion, context)
         }
         
         current_app.logger.info(f"🎉 命令翻译完成")
@@ -203,6 +177,276 @@ def translate_command():
         }), 500
 
 
+@command_bp.route('/translate/batch', methods=['POST'])
+@csrf_protect
+def translate_batch():
+    """
+    Translate a list of natural language inputs
+    
+    POST /api/command/translate/batch
+    Request body: {"inputs": ["...", ...], "context": {...}}
+    Response: results in input order, each with its own security info and timing
+    
+    Identical inputs are translated once; cache and rule hits are answered
+    directly and only the remaining inputs are sent to the AI model, with at
+    most ``ai.batch_concurrency`` model calls at a time.
+    """
+    try:
+        data = request.get_json(silent=True)
+        if data is None:
+            return jsonify({
+                'success': False,
+                'error': {
+                    'message': 'Request body is required or invalid JSON',
+                    'code': 400
+                }
+            }), 400
+        
+        inputs = data.get('inputs')
+        if not isinstance(inputs, list) or not inputs or not all(isinstance(item, str) for item in inputs):
+            return jsonify({
+                'success': False,
+                'error': {
+                    'message': 'inputs must be a non-empty list of strings',
+                    'code': 400
+                }
+            }), 400
+        
+        if len(inputs) > MAX_BATCH_SIZE:
+            return jsonify({
+                'success': False,
+                'error': {
+                    'message': f'A batch can contain at most {MAX_BATCH_SIZE} inputs',
+                    'code': 400
+                }
+            }), 400
+        
+        # Validate and sanitize every input; invalid ones are reported per item
+        sanitized = []
+        invalid = {}
+        for index, text in enumerate(inputs):
+            try:
+                sanitized.append(validate_and_sanitize_command_input(text))
+            except CustomValidationError as e:
+                sanitized.append('')
+                invalid[index] = f'Input validation failed: {str(e)}'
+        
+        assistant = get_assistant()
+        
+        from src.interfaces.base import Context
+        request_context = data.get('context') or {}
+        context = Context(
+            session_id=request_context.get('sessionId', 'web-session'),
+            working_directory=os.getcwd(),
+            command_history=request_context.get('history', [])
+        )
+        
+        current_app.logger.info(f"📝 批量翻译: {len(inputs)} 条输入")
+        start_time = time.time()
+        items = assistant.ai_engine.translate_batch(sanitized, context)
+        
+        results = []
+        sources = {}
+        for item in items:
+            result = {
+                'index': item.index,
+                'input': inputs[item.index],
+                'success': item.success and item.index not in invalid,
+                'source': item.source,
+                'elapsed_ms': round(item.elapsed * 1000, 2)
+            }
+            if item.index in invalid:
+                result['error'] = invalid[item.index]
+            elif item.success:
+                result.update(_build_translate_data(assistant, item.suggestion, context))
+                sources[item.source] = sources.get(item.source, 0) + 1
+            else:
+                result['error'] = item.error
+            results.append(result)
+        
+        current_app.logger.info(f"🎉 批量翻译完成: {sources}")
+        return jsonify({
+            'success': True,
+            'data': {
+                'results': results,
+                'total': len(results),
+                'sources': sources,
+                'elapsed_ms': round((time.time() - start_time) * 1000, 2)
+            }
+        }), 200
+        
+    except RuntimeError as e:
+        current_app.logger.error(f"Runtime error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': {
+                'message': str(e),
+                'code': 503
+            }
+        }), 503
+    except Exception as e:
+        current_app.logger.error(f"Batch translation error: {str(e)}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'error': {
+                'message': f'Batch translation failed: {str(e)}',
+                'code': 500
+            }
+        }), 500
+
+
+def _wants_stream():
+    """Whether the client asked for a Server-Sent Events translation stream"""
+    if request.args.get('stream', '').lower() in ('1', 'true'):
+        return True
+    return 'text/event-stream' in request.headers.get('Accept', '')
+
+
+def _sse_event(event, data):
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _build_translate_data(assistant, suggestion, context):
+    """
+    Run the security check for a translated command and build the response data
+    
+    Args:
+        assistant: PowerShellAssistant instance
+        suggestion: Translation suggestion
+        context: Translation context
+        
+    Returns:
+        TranslateResponse data dict
+    """
+    current_app.logger.info(f"✅ AI 生成命令: {suggestion.generated_command}")
+    current_app.logger.info(f"📊 置信度: {suggestion.confidence_score * 100:.1f}%")
+    
+    # Perform security check
+    current_app.logger.info(f"🔒 执行安全检查...")
+    validation = assistant.security_engine.validate_command(suggestion.generated_command, context)
+    
+    # Map risk level to security level string
+    risk_level_map = {
+        'safe': 'safe',
+        'low': 'low',
+        'medium': 'medium',
+        'high': 'high',
+        'critical': 'critical'
+    }
+    
+    security_level = risk_level_map.get(validation.risk_level.value, 'safe')
+    
+    # Log security result
+    security_emoji = {
+        'safe': '✅',
+        'low': '⚠️',
+        'medium': '⚠️',
+        'high': '🚨',
+        'critical': '🛑'
+    }
+    current_app.logger.info(f"{security_emoji.get(security_level, '❓')} 安全级别: {security_level}")
+    
+    if validation.warnings:
+        for warning in validation.warnings:
+            current_app.logger.warning(f"⚠️ 安全警告: {warning}")
+    
+    return {
+        'command': suggestion.generated_command,
+        'confidence': suggestion.confidence_score,
+        'explanation': suggestion.explanation,
+        'security': {
+            'level': security_level,
+            'warnings': validation.warnings,
+            'requires_confirmation': validation.requires_confirmation,
+            'requires_elevation': validation.requires_elevation
+        }
+    }
+
+
+def _stream_translation(assistant, text, context):
+    """
+    Translate in a worker thread and yield Server-Sent Events
+    
+    Events:
+        partial: ``{"command": ...}`` each time the command preview extracted
+            from the model output changes (AI translations only)
+        result: the TranslateResponse data, same as the JSON endpoint
+        error: ``{"message": ..., "code": ...}``
+    
+    The model stops generating as soon as the first complete command line
+    has arrived, so the result event follows the last partial event closely.
+    """
+    app = current_app._get_current_object()
+    events = queue.Queue()
+    
+    def on_partial(command):
+        events.put(('partial', {'command': command}))
+    
+    def worker():
+        with app.app_context():
+            try:
+                suggestion = assistant.ai_engine.translate_natural_language(
+                    text, context, partial_callback=on_partial
+                )
+                events.put(('result', _build_translate_data(assistant, suggestion, context)))
+            except RuntimeError as e:
+                app.logger.error(f"Runtime error: {str(e)}")
+                events.put(('error', {'message': str(e), 'code': 503}))
+            except Exception as e:
+                app.logger.error(f"Translation error: {str(e)}", exc_info=True)
+                events.put(('error', {'message': f'Translation failed: {str(e)}', 'code': 500}))
+    
+    threading.Thread(target=worker, daemon=True).start()
+    
+    while True:
+        event, data = events.get()
+        yield _sse_event(event, data)
+        if event != 'partial':
+            break
+    
+    app.logger.info(f"🎉 命令翻译完成")
+
+
+def _parse_risk_level(value):
+    """Map a risk level string from the client to RiskLevel (None if absent)"""
+    if not value:
+        return None
+    from src.interfaces.base import RiskLevel
+    risk_level_map = {
+        'safe': RiskLevel.SAFE,
+        'low': RiskLevel.LOW,
+        'medium': RiskLevel.MEDIUM,
+        'high': RiskLevel.HIGH,
+        'critical': RiskLevel.CRITICAL
+    }
+    return risk_level_map.get(value.lower())
+
+
+def _save_history(assistant, command, result, execution_time):
+    """Save an executed command to history (failures are logged, not raised)"""
+    history_id = f"hist_{int(time.time() * 1000)}"
+    history_entry = {
+        'id': history_id,
+        'command_id': history_id,
+        'user_input': '',  # Not available in execute endpoint
+        'command': command,
+        'success': result.return_code == 0 and not result.error,
+        'output': result.output or '',
+        'error': result.error or '',
+        'execution_time': execution_time,
+        'timestamp': datetime.now().isoformat(),
+        'sandbox': result.metadata.get('executed_in_sandbox', False) if result.metadata else False
+    }
+    
+    try:
+        # Save single entry to history
+        assistant.storage.save_history(history_entry)
+        current_app.logger.info(f"Saved to history: {history_entry['id']}")
+    except Exception as e:
+        current_app.logger.warning(f"Failed to save history: {str(e)}")
+
+
 @command_bp.route('/execute', methods=['POST'])
 @csrf_protect
 def execute_command():
@@ -231,18 +475,8 @@ def execute_command():
         assistant = get_assistant()
         
         # 获取命令的风险等级（如果有的话）
-        risk_level = None
-        if hasattr(execute_req, 'risk_level') and execute_req.risk_level:
-            # 将字符串风险等级转换为枚举
-            from src.interfaces.base import RiskLevel
-            risk_level_map = {
-                'safe': RiskLevel.SAFE,
-                'low': RiskLevel.LOW,
-                'medium': RiskLevel.MEDIUM,
-                'high': RiskLevel.HIGH,
-                'critical': RiskLevel.CRITICAL
-            }
-            risk_level = risk_level_map.get(execute_req.risk_level.lower())
+        # 将字符串风险等级转换为枚举
+        risk_level = _parse_risk_level(getattr(execute_req, 'risk_level', None))
         
         # Execute command with timeout and risk level
         current_app.logger.info(f"⚡ 开始执行命令: {execute_req.command}")
@@ -250,8 +484,11 @@ def execute_command():
             current_app.logger.info(f"🔍 风险等级: {risk_level.value}")
         start_time = time.time()
         
-        result = assistant.executor.execute(
+        # Run through the scheduler so concurrent requests are queued instead
+        # of all starting PowerShell processes at once
+        result = assistant.scheduler.execute(
             execute_req.command,
+            session_id=getattr(execute_req, 'session_id', None),
             timeout=execute_req.timeout,
             risk_level=risk_level
         )
@@ -272,24 +509,7 @@ def execute_command():
         assistant.log_engine.log_execution(execute_req.command, result)
         
         # Save to history
-        history_entry = {
-            'id': f"hist_{int(time.time() * 1000)}",
-            'user_input': '',  # Not available in execute endpoint
-            'command': execute_req.command,
-            'success': result.return_code == 0 and not result.error,
-            'output': result.output or '',
-            'error': result.error or '',
-            'execution_time': execution_time,
-            'timestamp': datetime.now().isoformat(),
-            'sandbox': result.metadata.get('executed_in_sandbox', False) if result.metadata else False
-        }
-        
-        try:
-            # Save single entry to history
-            assistant.storage.save_history(history_entry)
-            current_app.logger.info(f"Saved to history: {history_entry['id']}")
-        except Exception as e:
-            current_app.logger.warning(f"Failed to save history: {str(e)}")
+        _save_history(assistant, execute_req.command, result, execution_time)
         
         response = {
             'success': True,
@@ -298,7 +518,8 @@ def execute_command():
                 'error': result.error,
                 'executionTime': execution_time,
                 'returnCode': result.return_code,
-                'sandbox': result.metadata.get('executed_in_sandbox', False) if result.metadata else False
+                'sandbox': result.metadata.get('executed_in_sandbox', False) if result.metadata else False,
+                'queueWait': result.metadata.get('queue_wait', 0.0) if result.metadata else 0.0
             }
         }
         
@@ -315,6 +536,15 @@ def execute_command():
                 'code': 400
             }
         }), 400
+    except SchedulerQueueFull as e:
+        current_app.logger.warning(f"Execution rejected: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': {
+                'message': str(e),
+                'code': 429
+            }
+        }), 429
     except RuntimeError as e:
         current_app.logger.error(f"Runtime error: {str(e)}")
         return jsonify({
@@ -333,3 +563,257 @@ def execute_command():
                 'code': 500
             }
         }), 500
+
+
+# Socket.IO channel for streaming command output
+# (client sid, execution_id) -> (ExecutionScheduler, ScheduledExecution)
+# Execution ids are chosen by the client, so they are only unique per client
+_active_streams = {}
+_active_streams_lock = threading.Lock()
+
+# Stop reading a stream while this many packets wait to be sent to its client
+STREAM_MAX_UNSENT_PACKETS = 32
+
+
+def _unsent_packets(socketio, sid):
+    """Number of packets queued for a /command client but not yet sent"""
+    try:
+        eio_sid = socketio.server.manager.eio_sid_from_sid(sid, '/command')
+        return socketio.server.eio._get_socket(eio_sid).queue.qsize()
+    except Exception:
+        # Disconnected client, or a transport without a send queue
+        return 0
+
+
+def _submit_stream(socketio, sid, execution_id, assistant, execute_req, risk_level):
+    """
+    Queue a streaming execution on the assistant's scheduler
+    
+    The stream shares the scheduler's global and per-session limits with
+    /execute; its output is emitted to the client from a scheduler worker.
+    ``socketio.emit`` only queues packets, so the worker stops reading while
+    the client has STREAM_MAX_UNSENT_PACKETS packets pending. The stream
+    then buffers at most ``stream_max_pending_chunks`` chunks and the
+    command blocks on its output pipe until the client catches up.
+    
+    Returns:
+        ScheduledExecution whose result is the stream's ExecutionResult
+    
+    Raises:
+        SchedulerQueueFull: The execution queue is full
+    """
+    started = {}
+    cancelled = threading.Event()
+    
+    def cancel_stream():
+        cancelled.set()
+        stream = started.get('stream')
+        if stream is not None:
+            stream.cancel()
+    
+    def run():
+        stream = assistant.executor.execute_stream(
+            execute_req.command,
+            timeout=execute_req.timeout,
+            risk_level=risk_level
+        )
+        started['stream'] = stream
+        if cancelled.is_set():
+            stream.cancel()
+        
+        chunks = iter(stream)
+        try:
+            for chunk in chunks:
+                while (_unsent_packets(socketio, sid) >= STREAM_MAX_UNSENT_PACKETS
+                       and not stream.cancelled):
+                    socketio.sleep(0.05)
+                socketio.emit('output', {
+                    'executionId': execution_id,
+                    'stream': chunk.stream,
+                    'data': chunk.text,
+                    'sequence': chunk.sequence
+                }, namespace='/command', to=sid)
+            return stream.result
+        finally:
+            # Kills the command if emitting failed part way (no-op once finished)
+            chunks.close()
+            # The client has (or no longer wants) the output; the spill files are not needed
+            stream.remove_spill_files()
+    
+    return assistant.scheduler.submit_call(
+        run,
+        command=execute_req.command,
+        session_id=getattr(execute_req, 'session_id', None),
+        on_cancel=cancel_stream
+    )
+
+
+def _run_stream(socketio, app, sid, execution_id, assistant, execute_req, job):
+    """
+    Wait for a queued streaming execution and report its result to one client
+    """
+    with app.app_context():
+        try:
+            result = job.result()
+            execution_time = result.execution_time
+            
+            assistant.log_engine.log_execution(execute_req.command, result)
+            _save_history(assistant, execute_req.command, result, execution_time)
+            
+            socketio.emit('execution_complete', {
+                'executionId': execution_id,
+                'status': result.status.value,
+                'returnCode': result.return_code,
+                'executionTime': execution_time,
+                'queueWait': result.metadata.get('queue_wait', 0.0),
+                'outputSize': result.metadata.get('output_size', len(result.output)),
+                'truncated': bool(result.metadata.get('output_truncated')),
+                'error': result.error if result.status.value != 'success' else '',
+                'sandbox': result.metadata.get('executed_in_sandbox', False)
+            }, namespace='/command', to=sid)
+            app.logger.info(f"Streamed execution completed: return_code={result.return_code}")
+        except Exception as e:
+            app.logger.error(f"Streaming execution error: {str(e)}", exc_info=True)
+            socketio.emit('execution_error', {
+                'executionId': execution_id,
+                'message': f'Execution failed: {str(e)}',
+                'code': 500
+            }, namespace='/command', to=sid)
+        finally:
+            with _active_streams_lock:
+                _active_streams.pop((sid, execution_id), None)
+
+
+def setup_command_stream_handlers(socketio):
+    """
+    Setup Socket.IO handlers for streaming command execution
+    
+    Namespace ``/command``:
+        connect: when CSRF protection is enabled the client must pass a valid
+            token as ``auth={'csrf_token': ...}`` (or the ``X-CSRF-Token``
+            header); connections without one are refused
+        execute: an ExecuteRequest plus optional ``executionId``; replies with
+            ``execution_started``, then ``output`` events
+            ``{executionId, stream, data, sequence}`` as the command produces
+            output, then ``execution_complete`` (or ``execution_error``);
+            streams share the scheduler limits of /execute and are rejected
+            with code 429 when its queue is full
+        cancel: ``{executionId}`` stops a running execution of the same client
+    
+    Args:
+        socketio: Flask-SocketIO instance
+    """
+    
+    @socketio.on('connect', namespace='/command')
+    def handle_connect(auth=None):
+        """Refuse clients without a valid CSRF token"""
+        if not current_app.config.get('WTF_CSRF_ENABLED', True):
+            return
+        
+        csrf_token = (auth or {}).get('csrf_token') if isinstance(auth, dict) else None
+        csrf_token = csrf_token or request.headers.get('X-CSRF-Token')
+        if not csrf_token:
+            current_app.logger.warning('CSRF token missing for /command connection')
+            raise ConnectionRefusedError('CSRF token is missing')
+        if not verify_csrf_token(csrf_token):
+            current_app.logger.warning('Invalid CSRF token for /command connection')
+            raise ConnectionRefusedError('Invalid or expired CSRF token')
+    
+    @socketio.on('execute', namespace='/command')
+    def handle_execute(data):
+        """Start a streaming execution for the requesting client"""
+        sid = request.sid
+        data = data or {}
+        execution_id = data.get('executionId') or f"exec_{int(time.time() * 1000)}_{sid[:8]}"
+        
+        try:
+            execute_req = ExecuteRequest(**{k: v for k, v in data.items() if k != 'executionId'})
+            assistant = get_assistant()
+        except ValidationError as e:
+            socketio.emit('execution_error', {
+                'executionId': execution_id,
+                'message': 'Validation error',
+                'details': e.errors(),
+                'code': 400
+            }, namespace='/command', to=sid)
+            return
+        except RuntimeError as e:
+            socketio.emit('execution_error', {
+                'executionId': execution_id,
+                'message': str(e),
+                'code': 503
+            }, namespace='/command', to=sid)
+            return
+        
+        # Reserve the id before submitting so concurrent requests cannot reuse it
+        key = (sid, execution_id)
+        with _active_streams_lock:
+            duplicate = key in _active_streams
+            if not duplicate:
+                _active_streams[key] = None
+        if duplicate:
+            socketio.emit('execution_error', {
+                'executionId': execution_id,
+                'message': 'Execution id is already in use',
+                'code': 409
+            }, namespace='/command', to=sid)
+            return
+        
+        risk_level = _parse_risk_level(getattr(execute_req, 'risk_level', None))
+        try:
+            job = _submit_stream(socketio, sid, execution_id, assistant, execute_req, risk_level)
+        except SchedulerQueueFull as e:
+            with _active_streams_lock:
+                _active_streams.pop(key, None)
+            current_app.logger.warning(f"Streamed execution rejected: {str(e)}")
+            socketio.emit('execution_error', {
+                'executionId': execution_id,
+                'message': str(e),
+                'code': 429
+            }, namespace='/command', to=sid)
+            return
+        except Exception as e:
+            with _active_streams_lock:
+                _active_streams.pop(key, None)
+            current_app.logger.error(f"Execution error: {str(e)}", exc_info=True)
+            socketio.emit('execution_error', {
+                'executionId': execution_id,
+                'message': f'Execution failed: {str(e)}',
+                'code': 500
+            }, namespace='/command', to=sid)
+            return
+        
+        with _active_streams_lock:
+            _active_streams[key] = (assistant.scheduler, job)
+        
+        current_app.logger.info(f"⚡ 开始流式执行命令: {execute_req.command}")
+        socketio.emit('execution_started', {
+            'executionId': execution_id,
+            'command': execute_req.command
+        }, namespace='/command', to=sid)
+        
+        socketio.start_background_task(
+            _run_stream, socketio, current_app._get_current_object(), sid,
+            execution_id, assistant, execute_req, job
+        )
+    
+    @socketio.on('cancel', namespace='/command')
+    def handle_cancel(data):
+        """Cancel a running execution owned by the requesting client"""
+        execution_id = (data or {}).get('executionId')
+        with _active_streams_lock:
+            entry = _active_streams.get((request.sid, execution_id))
+        # None is a reservation whose job is not submitted yet
+        if entry:
+            scheduler, job = entry
+            scheduler.cancel(job.id)
+            current_app.logger.info(f"Cancelled streamed execution: {execution_id}")
+    
+    @socketio.on('disconnect', namespace='/command')
+    def handle_disconnect():
+        """Stop executions whose client went away"""
+        with _active_streams_lock:
+            entries = [entry for (sid, _), entry in _active_streams.items()
+                       if sid == request.sid and entry is not None]
+        for scheduler, job in entries:
+            scheduler.cancel(job.id)
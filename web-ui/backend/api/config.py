@@ -230,11 +230,7 @@ def update_config():
         # Re-initialize executor if sandbox settings changed
         if 'security.sandbox_enabled' in updates or 'security.sandbox_for_high_risk_only' in updates:
             current_app.logger.info("Sandbox settings changed, re-initializing executor...")
-            from src.execution import CommandExecutor
-            executor_config = assistant.config.execution.model_dump()
-            executor_config['sandbox_enabled'] = assistant.config.security.sandbox_enabled
-            executor_config['sandbox_for_high_risk_only'] = assistant.config.security.sandbox_for_high_risk_only
-            assistant.executor = CommandExecutor(executor_config)
+            assistant.rebuild_executor()
             current_app.logger.info(f"Executor re-initialized with sandbox_enabled={assistant.config.security.sandbox_enabled}, sandbox_for_high_risk_only={assistant.config.security.sandbox_for_high_risk_only}")
         
         response = {
@@ -287,11 +283,7 @@ def reset_config():
         assistant.config = assistant.config_manager.load_config()
         
         # Re-initialize executor with reset sandbox settings
-        from src.execution import CommandExecutor
-        executor_config = assistant.config.execution.model_dump()
-        executor_config['sandbox_enabled'] = assistant.config.security.sandbox_enabled
-        executor_config['sandbox_for_high_risk_only'] = assistant.config.security.sandbox_for_high_risk_only
-        assistant.executor = CommandExecutor(executor_config)
+        assistant.rebuild_executor()
         
         # Format response (convert snake_case to camelCase for frontend)
         response = {
@@ -12,6 +12,9 @@ from api.csrf import csrf_protect
 # Add parent directory to path to import PowerShellAssistant
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
 
+from src.storage import SQLiteStorage
+from utils.history_index import history_index, make_history_id
+
 history_bp = Blueprint('history', __name__)
 
 
@@ -21,12 +24,27 @@ def get_assistant():
     return get_cmd_assistant()
 
 
+def _format_item(item_id, item):
+    """Format a stored history entry as a HistoryItem response"""
+    return {
+        'id': item_id,
+        'user_input': item.get('user_input', ''),
+        'command': item.get('command', ''),
+        'success': item.get('success', False),
+        'output': item.get('output', ''),
+        'error': item.get('error', ''),
+        'execution_time': item.get('execution_time', 0.0),
+        'timestamp': item.get('timestamp', datetime.now().isoformat())
+    }
+
+
 @history_bp.route('', methods=['GET'])
 def get_history():
     """
     Get command history list with pagination and search
     
     GET /api/history?page=1&limit=20&search=keyword
+    GET /api/history?limit=20&cursor=<next_cursor>
     Response: HistoryListResponse
     """
     try:
@@ -34,53 +52,49 @@ def get_history():
         page = int(request.args.get('page', 1))
         limit = int(request.args.get('limit', 20))
         search = request.args.get('search', '').lower()
+        cursor = request.args.get('cursor') or None
         
         # Get assistant instance
         assistant = get_assistant()
         
-        # Load history from storage
-        history_data = assistant.storage.load_history()
+        start_idx = (page - 1) * limit
+        next_cursor = None
         
-        # Filter by search query if provided
-        if search:
-            history_data = [
-                item for item in history_data
-                if search in item.get('user_input', '').lower() or
-                   search in item.get('command', '').lower()
+        if isinstance(assistant.storage, SQLiteStorage):
+            # Database storage: filter, sort and paginate with indexed queries
+            paginated_items, total = assistant.storage.query_history(
+                offset=start_idx,
+                limit=limit,
+                search=search or None
+            )
+            paginated_items = [
+                (make_history_id(item, start_idx + idx), item)
+                for idx, item in enumerate(paginated_items)
             ]
+        else:
+            # File/memory storage: query the incrementally maintained history index
+            try:
+                result = history_index.query(
+                    assistant.storage,
+                    offset=start_idx,
+                    limit=limit,
+                    search=search,
+                    cursor=cursor
+                )
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': {
+                        'message': str(e),
+                        'code': 400
+                    }
+                }), 400
+            paginated_items = result['items']
+            total = result['total']
+            next_cursor = result['next_cursor']
         
-        # Sort by timestamp (newest first)
-        history_data.sort(
-            key=lambda x: x.get('timestamp', ''),
-            reverse=True
-        )
-        
-        # Calculate pagination
-        total = len(history_data)
-        start_idx = (page - 1) * limit
-        end_idx = start_idx + limit
-        paginated_items = history_data[start_idx:end_idx]
-        
-        # Format items and ensure IDs are present
-        items = []
-        for idx, item in enumerate(paginated_items):
-            # Generate ID if not present (use timestamp-based ID for consistency)
-            if 'id' not in item or not item['id']:
-                timestamp = item.get('timestamp', datetime.now().isoformat())
-                item_id = f"hist_{timestamp.replace(':', '').replace('-', '').replace('.', '')[:20]}"
-            else:
-                item_id = item['id']
-            
-            items.append({
-                'id': item_id,
-                'user_input': item.get('user_input', ''),
-                'command': item.get('command', ''),
-                'success': item.get('success', False),
-                'output': item.get('output', ''),
-                'error': item.get('error', ''),
-                'execution_time': item.get('execution_time', 0.0),
-                'timestamp': item.get('timestamp', datetime.now().isoformat())
-            })
+        # Format items
+        items = [_format_item(item_id, item) for item_id, item in paginated_items]
         
         response = {
             'success': True,
@@ -88,7 +102,8 @@ def get_history():
                 'items': items,
                 'total': total,
                 'page': page,
-                'limit': limit
+                'limit': limit,
+                'next_cursor': next_cursor
             }
         }
         
@@ -118,23 +133,8 @@ def get_history_detail(history_id):
         # Get assistant instance
         assistant = get_assistant()
         
-        # Load history from storage
-        history_data = assistant.storage.load_history()
-        
-        # Find the specific item
-        item = None
-        for idx, hist_item in enumerate(history_data):
-            # Generate consistent ID if not present
-            if 'id' not in hist_item or not hist_item['id']:
-                timestamp = hist_item.get('timestamp', datetime.now().isoformat())
-                item_id = f"hist_{timestamp.replace(':', '').replace('-', '').replace('.', '')[:20]}"
-            else:
-                item_id = hist_item['id']
-            
-            if item_id == history_id:
-                item = hist_item
-                item['id'] = item_id  # Ensure ID is in the item
-                break
+        # Look up the item by ID in the history index
+        item = history_index.get(assistant.storage, history_id)
         
         if not item:
             return jsonify({
@@ -147,16 +147,7 @@ def get_history_detail(history_id):
         
         response = {
             'success': True,
-            'data': {
-                'id': history_id,
-                'user_input': item.get('user_input', ''),
-                'command': item.get('command', ''),
-                'success': item.get('success', False),
-                'output': item.get('output', ''),
-                'error': item.get('error', ''),
-                'execution_time': item.get('execution_time', 0.0),
-                'timestamp': item.get('timestamp', datetime.now().isoformat())
-            }
+            'data': _format_item(history_id, item)
         }
         
         return jsonify(response), 200
@@ -185,27 +176,9 @@ def delete_history(history_id):
         # Get assistant instance
         assistant = get_assistant()
         
-        # Load history from storage
-        history_data = assistant.storage.load_history()
-        
-        # Find and remove the item
-        found = False
-        new_history = []
-        for idx, item in enumerate(history_data):
-            # Generate consistent ID if not present
-            if 'id' not in item or not item['id']:
-                timestamp = item.get('timestamp', datetime.now().isoformat())
-                item_id = f"hist_{timestamp.replace(':', '').replace('-', '').replace('.', '')[:20]}"
-                item['id'] = item_id  # Add ID to item for future consistency
-            else:
-                item_id = item['id']
-            
-            if item_id != history_id:
-                new_history.append(item)
-            else:
-                found = True
-        
-        if not found:
+        # Check existence through the history index before touching storage
+        item = history_index.get(assistant.storage, history_id)
+        if item is None:
             return jsonify({
                 'success': False,
                 'error': {
@@ -214,8 +187,22 @@ def delete_history(history_id):
                 }
             }), 404
         
-        # Save updated history using batch save
-        success = assistant.storage.save_history_batch(new_history)
+        command_id = item.get('command_id')
+        if command_id:
+            # Let the storage delete by key and drop only this entry from the index
+            success = assistant.storage.delete_history([command_id])
+            history_index.remove(history_id)
+        else:
+            # Entries saved without a command_id can only be removed by rewriting history
+            new_history = []
+            for seq, entry in enumerate(assistant.storage.load_history()):
+                entry_id = make_history_id(entry, seq)
+                if entry_id != history_id:
+                    entry.setdefault('id', entry_id)
+                    new_history.append(entry)
+            
+            success = assistant.storage.save_history_batch(new_history)
+            history_index.invalidate()
         
         if not success:
             return jsonify({
@@ -260,6 +247,7 @@ def clear_all_history():
         
         # Clear all history
         success = assistant.storage.clear_history()
+        history_index.invalidate()
         
         if not success:
             return jsonify({
@@ -10,8 +10,21 @@ from flask import Blueprint, request, jsonify, current_app
 # Add parent directory to path to import PowerShellAssistant
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
 
+from src.log_engine.log_reader import LogTailReader
+
 logs_bp = Blueprint('logs', __name__)
 
+# Tail readers keyed by log file path; each keeps its own timestamp index
+_log_readers = {}
+
+
+def get_log_reader(log_file):
+    """Get the cached tail reader for a log file"""
+    reader = _log_readers.get(log_file)
+    if reader is None:
+        reader = _log_readers.setdefault(log_file, LogTailReader(log_file))
+    return reader
+
 
 def get_assistant():
     """Get PowerShellAssistant instance from command API"""
@@ -63,57 +76,13 @@ def get_logs():
                 }
             }), 200
         
-        # Parse log file
-        logs = []
-        with open(log_file, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-            
-            current_app.logger.info(f"Total lines in log file: {len(lines)}")
-            
-            # Read last N lines (reverse order for recent logs)
-            for line in reversed(lines[-limit*2:]):  # Read more than limit to account for filtering
-                line = line.strip()
-                if not line:
-                    continue
-                
-                # Parse log line (format: timestamp - name - level - message)
-                try:
-                    parts = line.split(' - ', 3)
-                    if len(parts) >= 4:
-                        timestamp_str, source, log_level, message = parts
-                        
-                        # Debug: log parsed values
-                        current_app.logger.debug(f"Parsed line: level={log_level}, source={source}")
-                        
-                        # Filter by level if specified
-                        if level and log_level != level:
-                            continue
-                        
-                        # Filter by timestamp if specified
-                        if since:
-                            try:
-                                log_time = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
-                                since_time = datetime.fromisoformat(since.replace('Z', '+00:00'))
-                                if log_time < since_time:
-                                    continue
-                            except:
-                                pass
-                        
-                        logs.append({
-                            'timestamp': timestamp_str,
-                            'level': log_level,
-                            'message': message,
-                            'source': source
-                        })
-                        
-                        if len(logs) >= limit:
-                            break
-                    else:
-                        current_app.logger.debug(f"Failed to parse line (not enough parts): {line[:100]}")
-                except Exception as e:
-                    # Skip malformed lines
-                    current_app.logger.debug(f"Failed to parse line: {line[:100]}, error: {e}")
-                    continue
+        # Read the newest entries backwards from the end of the log and its
+        # rotated backups instead of loading the whole file
+        logs = get_log_reader(log_file).read(
+            level=level or None,
+            limit=limit,
+            since=since or None
+        )
         
         current_app.logger.info(f"Parsed {len(logs)} log entries")
         current_app.logger.info(f"ERROR/CRITICAL count: {len([log for log in logs if log['level'] in ['ERROR', 'CRITICAL']])}")
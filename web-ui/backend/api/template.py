@@ -1,6 +1,8 @@
 """
 Template API endpoints for managing PowerShell script templates
 """
+import hashlib
+import json
 import os
 import sys
 from datetime import datetime
@@ -13,6 +15,8 @@ from api.csrf import csrf_protect
 # Add parent directory to path to import PowerShellAssistant
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
 
+from src.template_engine.content_cache import content_hash
+
 template_bp = Blueprint('template', __name__)
 
 
@@ -80,6 +84,85 @@ def get_sample_templates():
     return samples
 
 
+def get_content_info(template):
+    """
+    Get the content hash and size of a template without returning its content
+    
+    Args:
+        template: Template object (or sample template with script_content)
+        
+    Returns:
+        Dictionary with hash, size and mtime (None when not backed by a file)
+    """
+    if hasattr(template, 'content_info'):
+        return template.content_info()
+    content = getattr(template, 'script_content', None) or ''
+    return {'hash': content_hash(content), 'size': len(content), 'mtime': None}
+
+
+def get_template_timestamps(template, mtime=None):
+    """
+    Get stable creation/update timestamps for a template
+    
+    Args:
+        template: Template object
+        mtime: Modification time of the template file, if any
+        
+    Returns:
+        Tuple of (createdAt, updatedAt) ISO strings, None when unknown
+    """
+    modified = datetime.fromtimestamp(mtime).isoformat() if mtime else None
+    created_at = getattr(template, 'created_at', None)
+    updated_at = getattr(template, 'updated_at', None)
+    return (
+        created_at.isoformat() if isinstance(created_at, datetime) else modified,
+        updated_at.isoformat() if isinstance(updated_at, datetime) else modified
+    )
+
+
+def conditional_response(payload, etag):
+    """
+    Build a JSON response with an ETag, answering 304 when If-None-Match matches
+    
+    Args:
+        payload: Response body
+        etag: Entity tag for the body
+        
+    Returns:
+        Flask response
+    """
+    response = jsonify(payload)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+
+def find_template(assistant, template_id):
+    """
+    Find a template by ID in the template engine, falling back to sample templates
+    
+    Args:
+        assistant: PowerShellAssistant instance
+        template_id: Template ID
+        
+    Returns:
+        Template object or None
+    """
+    template_engine = getattr(assistant, 'template_engine', None)
+    template_manager = getattr(template_engine, 'template_manager', None) if template_engine else None
+    if template_manager:
+        template = template_manager.get_template(template_id)
+        if template:
+            return template
+        if template_manager.list_templates():
+            return None
+    
+    for sample in get_sample_templates():
+        if sample.name == template_id:
+            return sample
+    return None
+
+
 def validate_template_data(data):
     """
     Validate template data
@@ -124,7 +207,9 @@ def get_templates():
     Get list of templates with optional filtering
     
     GET /api/templates?category=automation&search=backup
-    Response: List of templates
+    Response: List of template metadata with contentHash, ETag header
+    
+    Script content is not included; fetch it with GET /api/templates/:id/content.
     """
     try:
         # Get query parameters
@@ -170,29 +255,23 @@ def get_templates():
                    any(search in kw.lower() for kw in getattr(t, 'keywords', []))
             ]
         
-        # Format templates for response
+        # Format templates for response (metadata only, content is fetched on demand)
         template_list = []
         for template in templates:
-            # Load template content if not already loaded
             try:
-                if hasattr(template, 'load_content'):
-                    content = template.load_content()
-                elif hasattr(template, 'content'):
-                    content = template.content or ""
-                elif hasattr(template, 'script_content'):
-                    content = template.script_content
-                else:
-                    content = ""
+                info = get_content_info(template)
             except Exception as e:
                 current_app.logger.warning(f"Failed to load content for template {template.name}: {str(e)}")
-                content = ""
+                info = {'hash': None, 'size': 0, 'mtime': None}
             
+            created_at, updated_at = get_template_timestamps(template, info['mtime'])
             template_list.append({
                 'id': template.id if hasattr(template, 'id') else template.name,
                 'name': template.name,
                 'description': template.description,
                 'category': template.category.value if hasattr(template.category, 'value') else str(template.category),
-                'scriptContent': content,
+                'contentHash': info['hash'],
+                'contentSize': info['size'],
                 'parameters': [
                     {
                         'name': p.name,
@@ -204,8 +283,8 @@ def get_templates():
                     for p in (template.parameters.values() if isinstance(template.parameters, dict) else template.parameters)
                 ],
                 'keywords': getattr(template, 'keywords', []),
-                'createdAt': datetime.now().isoformat(),
-                'updatedAt': datetime.now().isoformat()
+                'createdAt': created_at,
+                'updatedAt': updated_at
             })
         
         response = {
@@ -217,7 +296,10 @@ def get_templates():
         }
         
         current_app.logger.info(f"Retrieved {len(template_list)} templates")
-        return jsonify(response), 200
+        etag = hashlib.sha256(
+            json.dumps(response, sort_keys=True, default=str).encode('utf-8')
+        ).hexdigest()
+        return conditional_response(response, etag)
         
     except Exception as e:
         current_app.logger.error(f"Error retrieving templates: {str(e)}", exc_info=True)
@@ -312,6 +394,55 @@ def get_template_detail(template_id):
         }), 500
 
 
+@template_bp.route('/<template_id>/content', methods=['GET'])
+def get_template_content(template_id):
+    """
+    Get the script content of a template
+    
+    GET /api/templates/:id/content
+    Response: Template content with contentHash, ETag header
+    """
+    try:
+        assistant = get_assistant()
+        template = find_template(assistant, template_id)
+        
+        if not template:
+            return jsonify({
+                'success': False,
+                'error': {
+                    'message': f'Template not found: {template_id}',
+                    'code': 404
+                }
+            }), 404
+        
+        if hasattr(template, 'load_content'):
+            content = template.load_content()
+        else:
+            content = template.script_content or ''
+        digest = content_hash(content)
+        
+        response = {
+            'success': True,
+            'data': {
+                'id': template_id,
+                'scriptContent': content,
+                'contentHash': digest,
+                'contentSize': len(content)
+            }
+        }
+        return conditional_response(response, digest)
+        
+    except Exception as e:
+        current_app.logger.error(f"Error retrieving template content: {str(e)}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'error': {
+                'message': f'Failed to retrieve template content: {str(e)}',
+                'code': 500
+            }
+        }), 500
+
+
 @template_bp.route('', methods=['POST'])
 @csrf_protect
 def create_template():
@@ -72,6 +72,13 @@ def create_app(config=None):
         'AUTH_ENABLED': os.environ.get('AUTH_ENABLED', 'False').lower() == 'true',
         'WTF_CSRF_ENABLED': os.environ.get('CSRF_ENABLED', 'False').lower() == 'true',
         'WTF_CSRF_TIME_LIMIT': None,  # No time limit for CSRF tokens
+        # Frontend origins allowed by CORS and Socket.IO (comma separated)
+        'CORS_ORIGINS': [
+            origin.strip() for origin in os.environ.get(
+                'CORS_ORIGINS',
+                'http://localhost:5173,http://localhost:5174,http://localhost:3000'
+            ).split(',') if origin.strip()
+        ],
         # Caching configuration
         'CACHE_TYPE': os.environ.get('CACHE_TYPE', 'SimpleCache'),
         'CACHE_DEFAULT_TIMEOUT': int(os.environ.get('CACHE_TIMEOUT', '300')),
@@ -111,14 +118,14 @@ def create_app(config=None):
     # Initialize CORS
     CORS(app, resources={
         r"/api/*": {
-            "origins": ["http://localhost:5173", "http://localhost:5174", "http://localhost:3000"],
+            "origins": app.config['CORS_ORIGINS'],
             "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
             "allow_headers": ["Content-Type", "Authorization", "X-CSRF-Token"]
         }
     })
     
     # Initialize SocketIO for real-time logs
-    socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+    socketio = SocketIO(app, cors_allowed_origins=app.config['CORS_ORIGINS'], async_mode='threading')
     
     # Store socketio instance in app config for access in blueprints
     app.config['SOCKETIO'] = socketio
@@ -170,6 +177,10 @@ def create_app(config=None):
     from api.logs import setup_websocket_handlers
     setup_websocket_handlers(socketio)
     
+    # Setup Socket.IO channel for streaming command output
+    from api.command import setup_command_stream_handlers
+    setup_command_stream_handlers(socketio)
+    
     # Health check endpoint
     @app.route('/api/health')
     def health_check():
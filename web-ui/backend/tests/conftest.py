@@ -39,13 +39,19 @@ def mock_assistant():
     # Mock executor
     assistant.executor = MagicMock()
     
+    # Real scheduler on top of the mocked executor; a mocked executor has a
+    # host pool, so commands go through executor.execute
+    from src.execution.scheduler import ExecutionScheduler
+    assistant.scheduler = ExecutionScheduler(assistant.executor)
+    
     # Mock log engine
     assistant.log_engine = MagicMock()
     
     # Mock storage engine
     assistant.storage = MagicMock()
     
-    return assistant
+    yield assistant
+    assistant.scheduler.close()
 
 
 @pytest.fixture
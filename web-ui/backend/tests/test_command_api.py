@@ -247,6 +247,113 @@ class TestTranslateEndpoint:
         confidence = data['data']['confidence']
         assert 0.0 <= confidence <= 1.0
 
+    
+    def test_translate_stream(self, client, mock_assistant, mock_suggestion, mock_validation):
+        """Test Server-Sent Events stream with partial commands"""
+        def translate(text, context, partial_callback=None):
+            partial_callback('Get-')
+            partial_callback('Get-Date')
+            return mock_suggestion
+        
+        mock_assistant.ai_engine.translate_natural_language.side_effect = translate
+        mock_assistant.security_engine.validate_command.return_value = mock_validation
+        
+        with patch('api.command.get_assistant', return_value=mock_assistant):
+            response = client.post('/api/command/translate?stream=1',
+                json={'input': '显示当前时间'}
+            )
+            body = response.get_data(as_text=True)
+        
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+        
+        events = [
+            (block.split('\n')[0][len('event: '):], json.loads(block.split('\n')[1][len('data: '):]))
+            for block in body.strip().split('\n\n')
+        ]
+        assert events[0] == ('partial', {'command': 'Get-'})
+        assert events[1] == ('partial', {'command': 'Get-Date'})
+        assert events[2][0] == 'result'
+        assert events[2][1]['command'] == 'Get-Date'
+        assert events[2][1]['security']['level'] == 'safe'
+    
+    def test_translate_stream_error(self, client, mock_assistant):
+        """Test Server-Sent Events stream reports translation errors"""
+        mock_assistant.ai_engine.translate_natural_language.side_effect = RuntimeError("AI engine unavailable")
+        
+        with patch('api.command.get_assistant', return_value=mock_assistant):
+            response = client.post('/api/command/translate',
+                json={'input': '显示当前时间'},
+                headers={'Accept': 'text/event-stream'}
+            )
+            body = response.get_data(as_text=True)
+        
+        assert response.status_code == 200
+        assert body.startswith('event: error\n')
+        assert '"code": 503' in body
+
+
+
+class TestTranslateBatchEndpoint:
+    """Tests for /api/command/translate/batch endpoint"""
+    
+    def make_item(self, index, text, suggestion=None, source='rule', error=None):
+        item = MagicMock()
+        item.index = index
+        item.input = text
+        item.suggestion = suggestion
+        item.success = suggestion is not None
+        item.source = source
+        item.error = error
+        item.elapsed = 0.0125
+        return item
+    
+    def test_translate_batch_success(self, client, mock_assistant, mock_suggestion, mock_validation):
+        """Test batch translation keeps input order and reports timing"""
+        mock_assistant.ai_engine.translate_batch.return_value = [
+            self.make_item(0, '显示当前时间', mock_suggestion, 'cache'),
+            self.make_item(1, '未知输入', None, 'translator', 'Ollama 服务不可用'),
+            self.make_item(2, '显示当前时间', mock_suggestion, 'duplicate')
+        ]
+        mock_assistant.security_engine.validate_command.return_value = mock_validation
+        
+        with patch('api.command.get_assistant', return_value=mock_assistant):
+            response = client.post('/api/command/translate/batch',
+                json={'inputs': ['显示当前时间', '未知输入', '显示当前时间']}
+            )
+        
+        assert response.status_code == 200
+        data = response.get_json()['data']
+        
+        assert data['total'] == 3
+        assert [r['index'] for r in data['results']] == [0, 1, 2]
+        assert data['results'][0]['command'] == 'Get-Date'
+        assert data['results'][0]['source'] == 'cache'
+        assert data['results'][0]['elapsed_ms'] == 12.5
+        assert data['results'][0]['security']['level'] == 'safe'
+        assert data['results'][1]['success'] is False
+        assert data['results'][1]['error'] == 'Ollama 服务不可用'
+        assert data['sources'] == {'cache': 1, 'duplicate': 1}
+        
+        call_args = mock_assistant.ai_engine.translate_batch.call_args
+        assert call_args[0][0] == ['显示当前时间', '未知输入', '显示当前时间']
+    
+    def test_translate_batch_invalid_inputs(self, client):
+        """Test batch translation rejects a missing or malformed input list"""
+        for body in ({}, {'inputs': []}, {'inputs': 'Get-Date'}, {'inputs': [1, 2]}):
+            response = client.post('/api/command/translate/batch', json=body)
+            
+            assert response.status_code == 400
+            assert response.get_json()['success'] is False
+    
+    def test_translate_batch_too_large(self, client):
+        """Test batch translation enforces the maximum batch size"""
+        response = client.post('/api/command/translate/batch',
+            json={'inputs': ['显示当前时间'] * 101}
+        )
+        
+        assert response.status_code == 400
+
 
 class TestTranslateRequestValidation:
     """Tests for TranslateRequest model validation"""
@@ -736,3 +843,128 @@ class TestExecuteResponseModel:
         assert response.output is None
         assert response.error == 'Command not found'
         assert response.return_code == 1
+
+
+class TestExecuteStreamChannel:
+    """Tests for the /command Socket.IO streaming execution channel"""
+    
+    def _run(self, app, mock_assistant, payload, wait=1.5):
+        """Emit an execute event and collect the events sent back"""
+        import time
+        socketio = app.config['SOCKETIO']
+        with patch('api.command.get_assistant', return_value=mock_assistant):
+            socket_client = socketio.test_client(app, namespace='/command')
+            socket_client.emit('execute', payload, namespace='/command')
+            time.sleep(wait)
+            received = socket_client.get_received('/command')
+            socket_client.disconnect(namespace='/command')
+        return received
+    
+    def test_output_streamed_before_completion(self, app, mock_assistant):
+        """Test output chunks are emitted before execution_complete"""
+        import sys
+        from src.execution.output_stream import StreamingExecution
+        
+        script = 'import time\nfor i in range(3):\n    print(i, flush=True)\n    time.sleep(0.1)'
+        mock_assistant.executor.execute_stream.side_effect = lambda command, timeout, risk_level: \
+            StreamingExecution([sys.executable, '-c', script], command, timeout)
+        
+        received = self._run(app, mock_assistant, {
+            'command': 'Get-ChildItem -Recurse',
+            'session_id': 'test-session-123',
+            'executionId': 'exec-1'
+        })
+        
+        names = [event['name'] for event in received]
+        assert names[0] == 'execution_started'
+        assert names[-1] == 'execution_complete'
+        output = [event['args'][0] for event in received if event['name'] == 'output']
+        assert ''.join(chunk['data'] for chunk in output).split() == ['0', '1', '2']
+        assert all(chunk['executionId'] == 'exec-1' for chunk in output)
+        
+        complete = received[-1]['args'][0]
+        assert complete['status'] == 'success'
+        assert complete['returnCode'] == 0
+        mock_assistant.storage.save_history.assert_called_once()
+    
+    def test_validation_error(self, app, mock_assistant):
+        """Test invalid requests are rejected on the channel"""
+        received = self._run(app, mock_assistant, {'executionId': 'exec-2'}, wait=0.2)
+        
+        assert received[-1]['name'] == 'execution_error'
+        assert received[-1]['args'][0]['code'] == 400
+        mock_assistant.executor.execute_stream.assert_not_called()
+    
+    def test_connect_requires_csrf_token(self, app):
+        """Test the channel refuses connections without a CSRF token"""
+        from api.csrf import generate_csrf_token
+        
+        app.config['WTF_CSRF_ENABLED'] = True
+        socketio = app.config['SOCKETIO']
+        
+        rejected = socketio.test_client(app, namespace='/command')
+        assert not rejected.is_connected('/command')
+        
+        accepted = socketio.test_client(
+            app, namespace='/command', auth={'csrf_token': generate_csrf_token()}
+        )
+        assert accepted.is_connected('/command')
+        accepted.disconnect(namespace='/command')
+    
+    def test_cancel_ignores_other_clients(self, app, mock_assistant):
+        """Test one client cannot cancel another client's execution id"""
+        from api.command import _active_streams, _active_streams_lock
+        
+        scheduler = MagicMock()
+        with _active_streams_lock:
+            _active_streams[('other-sid', 'exec-3')] = (scheduler, MagicMock())
+        try:
+            socketio = app.config['SOCKETIO']
+            socket_client = socketio.test_client(app, namespace='/command')
+            socket_client.emit('cancel', {'executionId': 'exec-3'}, namespace='/command')
+            socket_client.disconnect(namespace='/command')
+        finally:
+            with _active_streams_lock:
+                _active_streams.pop(('other-sid', 'exec-3'), None)
+        
+        scheduler.cancel.assert_not_called()
+    
+    def test_stream_rejected_when_queue_full(self, app, mock_assistant):
+        """Test streamed executions share the scheduler queue limit"""
+        from src.execution.scheduler import ExecutionScheduler
+        
+        mock_assistant.scheduler.close()
+        mock_assistant.scheduler = ExecutionScheduler(mock_assistant.executor, max_queue_size=0)
+        
+        received = self._run(app, mock_assistant, {
+            'command': 'Get-Date',
+            'session_id': 'test-session-123',
+            'executionId': 'exec-4'
+        }, wait=0.2)
+        
+        assert received[-1]['name'] == 'execution_error'
+        assert received[-1]['args'][0]['code'] == 429
+        mock_assistant.executor.execute_stream.assert_not_called()
+    
+    def test_duplicate_execution_id_rejected(self, app, mock_assistant):
+        """Test an execution id cannot be reused while it is running"""
+        import sys
+        import time
+        from src.execution.output_stream import StreamingExecution
+        
+        mock_assistant.executor.execute_stream.side_effect = lambda command, timeout, risk_level: \
+            StreamingExecution([sys.executable, '-c', 'import time; time.sleep(0.5)'], command, timeout)
+        payload = {'command': 'Get-Date', 'session_id': 'test-session-123', 'executionId': 'exec-5'}
+        
+        socketio = app.config['SOCKETIO']
+        with patch('api.command.get_assistant', return_value=mock_assistant):
+            socket_client = socketio.test_client(app, namespace='/command')
+            socket_client.emit('execute', payload, namespace='/command')
+            socket_client.emit('execute', payload, namespace='/command')
+            time.sleep(1.5)
+            received = socket_client.get_received('/command')
+            socket_client.disconnect(namespace='/command')
+        
+        errors = [event['args'][0] for event in received if event['name'] == 'execution_error']
+        assert [error['code'] for error in errors] == [409]
+        assert [event['name'] for event in received].count('execution_complete') == 1
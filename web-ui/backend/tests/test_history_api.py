@@ -285,6 +285,26 @@ class TestHistoryAPI:
         assert len(saved_history) == 1
         assert saved_history[0]['id'] == 'hist_002'
     
+    def test_delete_history_by_command_id(self, client, mock_assistant):
+        """Test entries with a command_id are deleted through the storage"""
+        mock_assistant.storage.load_history.return_value = [
+            {
+                'id': 'hist_001',
+                'command_id': 'hist_001',
+                'user_input': 'Command 1',
+                'command': 'Get-Command1',
+                'success': True,
+                'timestamp': '2024-01-15T10:30:00'
+            }
+        ]
+        mock_assistant.storage.delete_history.return_value = True
+        
+        response = client.delete('/api/history/hist_001')
+        
+        assert response.status_code == 200
+        mock_assistant.storage.delete_history.assert_called_once_with(['hist_001'])
+        mock_assistant.storage.save_history_batch.assert_not_called()
+    
     def test_delete_history_not_found(self, client, mock_assistant):
         """Test deleting non-existent history item"""
         mock_assistant.storage.load_history.return_value = []
@@ -406,3 +426,30 @@ class TestHistoryAPI:
         assert response.status_code == 200
         data = response.get_json()
         assert len(data['data']['items']) == 1
+    
+    def test_get_history_database_storage(self, client, mock_assistant, tmp_path):
+        """Test that database storage paginates and searches with SQL queries"""
+        from src.storage import SQLiteStorage
+        
+        storage = SQLiteStorage(db_path=str(tmp_path / 'storage.db'))
+        storage.save_history_batch([
+            {
+                'id': f'hist_{i:03d}',
+                'user_input': f'Command {i}',
+                'command': 'Get-Process' if i % 2 else 'Get-ChildItem',
+                'success': True,
+                'timestamp': f'2024-01-15T10:{i:02d}:00'
+            }
+            for i in range(25)
+        ])
+        mock_assistant.storage = storage
+        
+        response = client.get('/api/history?page=2&limit=10')
+        data = response.get_json()
+        assert data['data']['total'] == 25
+        assert data['data']['items'][0]['id'] == 'hist_014'
+        
+        response = client.get('/api/history?search=process')
+        data = response.get_json()
+        assert data['data']['total'] == 12
+        assert all(item['command'] == 'Get-Process' for item in data['data']['items'])
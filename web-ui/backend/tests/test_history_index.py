@@ -0,0 +1,180 @@
+"""
+Unit tests for the incremental history index
+"""
+import time
+import pytest
+
+from src.storage import FileStorage, MemoryStorage
+from utils.history_index import HistoryIndex, make_history_id
+
+
+def _entry(i, command='Get-Process', **extra):
+    entry = {
+        'user_input': f'命令 {i}',
+        'command': command,
+        'success': True,
+        'timestamp': f'2024-01-15T10:{i // 60:02d}:{i % 60:02d}'
+    }
+    entry.update(extra)
+    return entry
+
+
+@pytest.fixture
+def file_storage(tmp_path):
+    """File storage in a temporary directory"""
+    return FileStorage(base_path=str(tmp_path), history_fsync='never')
+
+
+class TestHistoryIndex:
+    """Test suite for HistoryIndex"""
+    
+    def test_pages_newest_first(self, file_storage):
+        """Test offset pagination returns newest entries first"""
+        file_storage.save_history_batch([_entry(i) for i in range(25)])
+        index = HistoryIndex()
+        
+        first = index.query(file_storage, offset=0, limit=10)
+        last = index.query(file_storage, offset=20, limit=10)
+        
+        assert first['total'] == 25
+        assert [item['user_input'] for _, item in first['items']][:2] == ['命令 24', '命令 23']
+        assert [item['user_input'] for _, item in last['items']] == [f'命令 {i}' for i in range(4, -1, -1)]
+    
+    def test_matches_full_scan(self, file_storage):
+        """Test results equal the previous load-filter-sort-slice behaviour"""
+        entries = [
+            _entry(i % 7, command=['Get-Process', 'Get-ChildItem', 'Stop-Service'][i % 3])
+            for i in range(50)
+        ]
+        file_storage.save_history_batch(entries)
+        index = HistoryIndex()
+        
+        for search in ['', 'get', 'process', '命令 3', 'x', 'nothing']:
+            expected = [
+                item for item in file_storage.load_history()
+                if search in item['user_input'].lower() or search in item['command'].lower()
+            ]
+            expected.sort(key=lambda x: x['timestamp'], reverse=True)
+            
+            result = index.query(file_storage, offset=5, limit=10, search=search)
+            
+            assert result['total'] == len(expected)
+            assert [item for _, item in result['items']] == expected[5:15]
+    
+    def test_keyset_cursor(self, file_storage):
+        """Test walking all pages with next_cursor"""
+        file_storage.save_history_batch([_entry(i) for i in range(25)])
+        index = HistoryIndex()
+        
+        seen = []
+        cursor = None
+        while True:
+            result = index.query(file_storage, limit=10, cursor=cursor)
+            seen.extend(item['user_input'] for _, item in result['items'])
+            cursor = result['next_cursor']
+            if cursor is None:
+                break
+        
+        assert seen == [f'命令 {i}' for i in range(24, -1, -1)]
+    
+    def test_invalid_cursor(self, file_storage):
+        """Test malformed cursors are rejected"""
+        with pytest.raises(ValueError):
+            HistoryIndex().query(file_storage, cursor='not-a-cursor')
+    
+    def test_incremental_refresh(self, file_storage):
+        """Test appended entries are indexed without rebuilding"""
+        file_storage.save_history_batch([_entry(i) for i in range(10)])
+        index = HistoryIndex()
+        index.query(file_storage)
+        
+        file_storage.save_history(_entry(10, command='Restart-Service'))
+        entries, _, reset = file_storage.load_history_since(index._cursor)
+        assert len(entries) == 1 and reset is False
+        
+        result = index.query(file_storage, search='restart')
+        assert result['total'] == 1
+        assert index.size == 11
+    
+    def test_rebuild_after_rewrite(self, file_storage):
+        """Test the index is rebuilt when the history file is rewritten"""
+        file_storage.save_history_batch([_entry(i) for i in range(10)])
+        index = HistoryIndex()
+        index.query(file_storage)
+        
+        file_storage.save_history_batch([_entry(99)])
+        
+        result = index.query(file_storage)
+        assert result['total'] == 1
+        assert index.get(file_storage, make_history_id(_entry(0), 0)) is None
+    
+    def test_get_by_id(self, file_storage):
+        """Test detail lookup by explicit and generated IDs"""
+        file_storage.save_history(_entry(1, id='hist_custom'))
+        file_storage.save_history(_entry(2))
+        index = HistoryIndex()
+        
+        assert index.get(file_storage, 'hist_custom')['user_input'] == '命令 1'
+        assert index.get(file_storage, 'hist_20240115T100002')['user_input'] == '命令 2'
+        assert index.get(file_storage, 'hist_missing') is None
+    
+    def test_remove_by_id(self):
+        """Test removing one entry keeps the rest of the index searchable"""
+        storage = MemoryStorage()
+        storage.save_history(_entry(1, id='hist_a', command_id='hist_a'))
+        storage.save_history(_entry(2, id='hist_b', command_id='hist_b'))
+        index = HistoryIndex()
+        index.query(storage)
+        
+        storage.delete_history(['hist_a'])
+        index.remove('hist_a')
+        
+        assert index.get(storage, 'hist_a') is None
+        assert index.query(storage, search='命令')['total'] == 1
+    
+    def test_respects_max_history_size(self, tmp_path):
+        """Test entries beyond max_history_size are not visible"""
+        storage = MemoryStorage()
+        storage.max_history_size = 5
+        storage.save_history_batch([_entry(i) for i in range(8)])
+        index = HistoryIndex()
+        
+        result = index.query(storage, limit=10)
+        
+        assert result['total'] == 5
+        assert result['items'][-1][1]['user_input'] == '命令 3'
+        assert index.query(storage, search='命令 1')['total'] == 0
+    
+    def test_memory_storage_incremental(self):
+        """Test incremental refresh with the in-memory backend"""
+        storage = MemoryStorage()
+        index = HistoryIndex()
+        storage.save_history(_entry(1))
+        index.query(storage)
+        
+        storage.save_history(_entry(2))
+        assert index.query(storage)['total'] == 2
+        
+        storage.clear_history()
+        assert index.query(storage)['total'] == 0
+    
+    def test_benchmark_page_cost(self, file_storage):
+        """Test page requests do not scale with history size"""
+        file_storage.save_history_batch([_entry(i) for i in range(20000)])
+        index = HistoryIndex()
+        index.query(file_storage)
+        
+        start = time.perf_counter()
+        for page in range(100):
+            index.query(file_storage, offset=page * 20, limit=20)
+        indexed_time = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        for page in range(5):
+            history = file_storage.load_history()
+            history.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
+            history[page * 20:(page + 1) * 20]
+        scan_time = (time.perf_counter() - start) / 5 * 100
+        
+        print(f"\n20000 entries, 100 pages: indexed {indexed_time * 1000:.1f}ms, full scan {scan_time * 1000:.1f}ms")
+        assert indexed_time < scan_time / 10
@@ -409,3 +409,77 @@ class TestTemplateAPI:
             assert call_kwargs['name'] == 'Full Template'
             assert call_kwargs['author'] == 'test_user'
             assert call_kwargs['tags'] == ['system', 'monitoring']
+
+
+class TestTemplateContentAPI:
+    """Test suite for template list metadata and on-demand content"""
+    
+    @pytest.fixture
+    def engine_assistant(self, mock_assistant, tmp_path):
+        """Assistant whose template engine serves one file-backed template"""
+        from src.template_engine.models import Template, TemplateCategory
+        
+        script = tmp_path / "backup.ps1"
+        script.write_text("Copy-Item -Path {{source}}", encoding='utf-8')
+        template = Template(
+            id="backup",
+            name="Backup",
+            category=TemplateCategory.AUTOMATION,
+            file_path=str(script),
+            description="Backup files",
+            keywords=["backup"],
+            parameters={}
+        )
+        
+        manager = MagicMock()
+        manager.list_templates.return_value = [template]
+        manager.get_template.side_effect = lambda template_id: template if template_id == "backup" else None
+        mock_assistant.template_engine.template_manager = manager
+        mock_assistant.script_path = script
+        return mock_assistant
+    
+    def test_list_returns_metadata_and_hash(self, client, engine_assistant):
+        """Test template list omits script content and includes its hash"""
+        from src.template_engine.content_cache import content_hash
+        
+        with patch('api.template.get_assistant', return_value=engine_assistant):
+            response = client.get('/api/templates')
+        
+        assert response.status_code == 200
+        item = response.get_json()['data']['items'][0]
+        assert 'scriptContent' not in item
+        assert item['contentHash'] == content_hash("Copy-Item -Path {{source}}")
+        assert item['contentSize'] == len("Copy-Item -Path {{source}}")
+        assert response.headers['ETag']
+    
+    def test_list_not_modified(self, client, engine_assistant):
+        """Test template list answers 304 for a matching If-None-Match"""
+        with patch('api.template.get_assistant', return_value=engine_assistant):
+            first = client.get('/api/templates')
+            second = client.get('/api/templates', headers={'If-None-Match': first.headers['ETag']})
+            
+            engine_assistant.script_path.write_text("Copy-Item -Path {{source}} -Force", encoding='utf-8')
+            third = client.get('/api/templates', headers={'If-None-Match': first.headers['ETag']})
+        
+        assert second.status_code == 304
+        assert third.status_code == 200
+        assert third.headers['ETag'] != first.headers['ETag']
+    
+    def test_get_content(self, client, engine_assistant):
+        """Test on-demand content endpoint with ETag"""
+        with patch('api.template.get_assistant', return_value=engine_assistant):
+            response = client.get('/api/templates/backup/content')
+            cached = client.get('/api/templates/backup/content', headers={'If-None-Match': response.headers['ETag']})
+        
+        assert response.status_code == 200
+        data = response.get_json()['data']
+        assert data['scriptContent'] == "Copy-Item -Path {{source}}"
+        assert response.headers['ETag'].strip('"') == data['contentHash']
+        assert cached.status_code == 304
+    
+    def test_get_content_not_found(self, client, engine_assistant):
+        """Test content endpoint for unknown template"""
+        with patch('api.template.get_assistant', return_value=engine_assistant):
+            response = client.get('/api/templates/missing/content')
+        
+        assert response.status_code == 404
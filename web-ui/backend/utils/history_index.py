@@ -0,0 +1,288 @@
+"""
+In-memory query index for command history
+
+Keeps the history of one worker process indexed so that list, search and
+detail requests do not reload and rescan the whole history file:
+- a stable ID index (history ID -> entry)
+- an ordered (timestamp, sequence) key list for newest-first pagination
+  with either page offsets or keyset cursors
+- an inverted index of character unigrams/bigrams over ``user_input`` and
+  ``command`` that narrows substring searches to candidate entries
+
+The index is refreshed incrementally through ``storage.load_history_since``:
+only newly appended entries are indexed, and the index is rebuilt only when
+the storage reports that its history was rewritten (delete, clear, compaction).
+"""
+import base64
+import bisect
+import json
+import os
+import sys
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
+
+from src.storage.interfaces import StorageInterface
+
+
+def make_history_id(item: Dict[str, Any], seq: int) -> str:
+    """
+    Return the ID of a history item
+    
+    Items without an explicit ``id`` get a timestamp-based ID; items that also
+    lack a timestamp fall back to their position in the history.
+    
+    Args:
+        item: History entry
+        seq: Sequence number of the entry in append order
+        
+    Returns:
+        History item ID
+    """
+    if item.get('id'):
+        return item['id']
+    timestamp = item.get('timestamp')
+    if timestamp:
+        return f"hist_{timestamp.replace(':', '').replace('-', '').replace('.', '')[:20]}"
+    return f"hist_seq{seq}"
+
+
+def encode_cursor(key: Tuple[str, int]) -> str:
+    """Encode an order key as an opaque cursor string"""
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """
+    Decode a cursor string produced by ``encode_cursor``
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        timestamp, order = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return str(timestamp), int(order)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def _grams(text: str) -> set:
+    """Character unigrams and bigrams of a lowercased text"""
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+class HistoryIndex:
+    """Incrementally maintained history index for one storage backend"""
+    
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._storage = None
+        self._reset()
+    
+    def _reset(self) -> None:
+        self._cursor = None
+        self._next_seq = 0
+        self._entries: Dict[int, Dict[str, Any]] = {}
+        self._texts: Dict[int, Tuple[str, str]] = {}
+        # ID -> sequence numbers sharing that ID, oldest first
+        self._ids: Dict[str, List[int]] = {}
+        # Sorted ascending by (timestamp, -seq); newest-first pages are read from the end.
+        # Equal timestamps keep append order, matching a stable reverse sort.
+        self._order: List[Tuple[str, int]] = []
+        self._postings: Dict[str, set] = {}
+    
+    def invalidate(self) -> None:
+        """Drop the index; the next query rebuilds it from storage"""
+        with self._lock:
+            self._reset()
+    
+    @property
+    def size(self) -> int:
+        """Number of indexed entries"""
+        return len(self._entries)
+    
+    def refresh(self, storage) -> None:
+        """
+        Bring the index up to date with the storage
+        
+        Args:
+            storage: StorageInterface implementation
+        """
+        with self._lock:
+            if storage is not self._storage:
+                self._storage = storage
+                self._reset()
+            
+            if isinstance(storage, StorageInterface):
+                entries, cursor, reset = storage.load_history_since(self._cursor)
+            else:
+                # Duck-typed storages only provide load_history(): reload fully
+                entries, cursor, reset = StorageInterface.load_history_since(storage, self._cursor)
+            if reset:
+                self._reset()
+            for entry in entries:
+                self._add(entry)
+            self._cursor = cursor
+            
+            # Hide entries that the storage has not compacted away yet
+            max_size = getattr(storage, 'max_history_size', None)
+            if isinstance(max_size, int) and max_size > 0:
+                while len(self._entries) > max_size:
+                    self._evict_oldest()
+    
+    def _add(self, entry: Dict[str, Any]) -> None:
+        seq = self._next_seq
+        self._next_seq += 1
+        
+        user_input = (entry.get('user_input') or '').lower()
+        command = (entry.get('command') or '').lower()
+        
+        self._entries[seq] = entry
+        self._texts[seq] = (user_input, command)
+        self._ids.setdefault(make_history_id(entry, seq), []).append(seq)
+        
+        key = (entry.get('timestamp') or '', -seq)
+        if not self._order or key > self._order[-1]:
+            self._order.append(key)
+        else:
+            bisect.insort(self._order, key)
+        
+        for gram in _grams(user_input) | _grams(command):
+            self._postings.setdefault(gram, set()).add(seq)
+    
+    def _evict_oldest(self) -> None:
+        # Entries are inserted in sequence order, so the first key is the oldest
+        self._remove(next(iter(self._entries)))
+    
+    def _remove(self, seq: int) -> None:
+        entry = self._entries.pop(seq)
+        user_input, command = self._texts.pop(seq)
+        
+        item_id = make_history_id(entry, seq)
+        seqs = self._ids.get(item_id)
+        if seqs and seq in seqs:
+            seqs.remove(seq)
+            if not seqs:
+                del self._ids[item_id]
+        
+        key = (entry.get('timestamp') or '', -seq)
+        position = bisect.bisect_left(self._order, key)
+        if position < len(self._order) and self._order[position] == key:
+            del self._order[position]
+        
+        for gram in _grams(user_input) | _grams(command):
+            postings = self._postings.get(gram)
+            if postings is not None:
+                postings.discard(seq)
+                if not postings:
+                    del self._postings[gram]
+    
+    def _search_keys(self, search: str) -> List[Tuple[str, int]]:
+        """Order keys of entries matching a lowercased substring, ascending"""
+        if len(search) == 1:
+            grams = {search}
+        else:
+            grams = {search[i:i + 2] for i in range(len(search) - 1)}
+        candidates = None
+        # Intersect the smallest posting lists first
+        for gram in sorted(grams, key=lambda g: len(self._postings.get(g, ()))):
+            postings = self._postings.get(gram)
+            if not postings:
+                return []
+            candidates = set(postings) if candidates is None else candidates & postings
+            if not candidates:
+                return []
+        
+        keys = []
+        for seq in candidates:
+            user_input, command = self._texts[seq]
+            if search in user_input or search in command:
+                keys.append((self._entries[seq].get('timestamp') or '', -seq))
+        keys.sort()
+        return keys
+    
+    def query(
+        self,
+        storage,
+        offset: int = 0,
+        limit: int = 20,
+        search: str = '',
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Get one page of history, newest first
+        
+        Args:
+            storage: StorageInterface implementation
+            offset: Number of matching entries to skip (ignored with ``cursor``)
+            limit: Page size
+            search: Case-insensitive substring over user_input and command
+            cursor: Keyset cursor returned as ``next_cursor`` by a previous call
+            
+        Returns:
+            Dict with ``items`` (list of (id, entry)), ``total`` and ``next_cursor``
+            
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        with self._lock:
+            self.refresh(storage)
+            
+            keys = self._search_keys(search.lower()) if search else self._order
+            total = len(keys)
+            
+            # Position (exclusive) in ascending keys where this page ends
+            if cursor:
+                end = bisect.bisect_left(keys, decode_cursor(cursor))
+            else:
+                end = max(0, total - max(0, offset))
+            start = max(0, end - max(0, limit))
+            page_keys = keys[start:end][::-1]
+            
+            items = []
+            for _, order in page_keys:
+                seq = -order
+                items.append((make_history_id(self._entries[seq], seq), self._entries[seq]))
+            
+            return {
+                'items': items,
+                'total': total,
+                'next_cursor': encode_cursor(page_keys[-1]) if page_keys and start > 0 else None
+            }
+    
+    def remove(self, history_id: str) -> None:
+        """
+        Drop the entries with this ID from the index
+        
+        Used after deleting them from storage so that the rest of the index
+        stays in place.
+        
+        Args:
+            history_id: History item ID
+        """
+        with self._lock:
+            for seq in list(self._ids.get(history_id, ())):
+                self._remove(seq)
+    
+    def get(self, storage, history_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a history entry by ID
+        
+        Args:
+            storage: StorageInterface implementation
+            history_id: History item ID
+            
+        Returns:
+            History entry or None if not found
+        """
+        with self._lock:
+            self.refresh(storage)
+            seqs = self._ids.get(history_id)
+            return self._entries[seqs[0]] if seqs else None
+
+
+# Per-process index shared by the history endpoints
+history_index = HistoryIndex()
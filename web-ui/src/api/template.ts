@@ -33,11 +33,15 @@ export interface Template {
   name: string
   description: string
   category: string
-  scriptContent: string
+  /** Script content; not included in list responses, load it with getTemplateContent */
+  scriptContent?: string
+  /** SHA-256 of the script content */
+  contentHash?: string | null
+  contentSize?: number
   parameters: TemplateParameter[]
   keywords: string[]
-  createdAt: string
-  updatedAt: string
+  createdAt: string | null
+  updatedAt: string | null
 }
 
 /**
@@ -98,6 +102,19 @@ export interface TemplateDetailResponse {
   data: Template
 }
 
+/**
+ * Response from template content API
+ */
+export interface TemplateContentResponse {
+  success: boolean
+  data: {
+    id: string
+    scriptContent: string
+    contentHash: string
+    contentSize: number
+  }
+}
+
 /**
  * Response from create/update template API
  */
@@ -187,6 +204,34 @@ export const templateApi = {
     }
   },
 
+  /**
+   * Get the script content of a template
+   *
+   * The list API only returns metadata and a content hash; content is
+   * loaded on demand. Responses carry an ETag so unchanged content is
+   * revalidated by the browser cache instead of being downloaded again.
+   *
+   * @param id - Template ID
+   * @returns Promise resolving to template content response
+   * @throws Error if request fails or template not found
+   *
+   * @example
+   * ```typescript
+   * const result = await templateApi.getTemplateContent('tmpl_123')
+   * console.log(result.data.scriptContent)
+   * ```
+   */
+  getTemplateContent: async (id: string): Promise<TemplateContentResponse> => {
+    try {
+      const response = (await apiClient.get(
+        `/templates/${id}/content`
+      )) as TemplateContentResponse
+      return response
+    } catch (error) {
+      throw error
+    }
+  },
+
   /**
    * Create a new template
    *
@@ -340,6 +340,38 @@ export const useTemplateStore = defineStore('template', () => {
     return templates.value.find((t) => t.id === id) || null
   }
 
+  /**
+   * Load the script content of a template on demand
+   *
+   * Content already loaded for the same content hash is reused.
+   *
+   * @param template - Template from the list
+   * @returns Template with scriptContent, or null if loading failed
+   */
+  const loadTemplateContent = async (template: Template): Promise<Template | null> => {
+    if (template.scriptContent !== undefined) {
+      return template
+    }
+
+    try {
+      const response = await templateApi.getTemplateContent(template.id)
+
+      if (response.success) {
+        const loaded = { ...template, ...response.data }
+        const index = templates.value.findIndex((t) => t.id === template.id)
+        if (index !== -1 && templates.value[index].contentHash === response.data.contentHash) {
+          templates.value[index] = loaded
+        }
+        return loaded
+      }
+      return null
+    } catch (error: any) {
+      console.error('Failed to load template content:', error)
+      ElMessage.error('加载模板内容失败')
+      return null
+    }
+  }
+
   // ============================================================================
   // Return
   // ============================================================================
@@ -370,6 +402,7 @@ export const useTemplateStore = defineStore('template', () => {
     setCategory,
     clearFilters,
     refresh,
-    getTemplateById
+    getTemplateById,
+    loadTemplateContent
   }
 })